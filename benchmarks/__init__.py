@@ -0,0 +1,12 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmark scripts for the ROB Web API. The scripts are not part of the
+unit tests. Run them as modules from the project root directory, e.g.,
+``python -m benchmarks.conditional_get``.
+"""
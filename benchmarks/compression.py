@@ -0,0 +1,71 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmark for the compression of JSON responses. Compresses serialized
+leader boards and run listings of typical sizes with the supported content
+encodings and compression levels. Reports the compressed size (bandwidth)
+and the CPU time for compressing a single response.
+"""
+
+import argparse
+import json
+
+from benchmarks.leaderboard import leaderboard
+from benchmarks.util import Timer
+from robflask.api.compress import compress_chunks, encodings
+
+
+def run_listing(size):
+    """Get serialized run listing with the given number of runs."""
+    runs = list()
+    for i in range(size):
+        runs.append({
+            'id': '{:032x}'.format(i),
+            'state': 'SUCCESS',
+            'createdAt': '2021-01-01T00:00:00.000000',
+            'startedAt': '2021-01-01T00:00:01.000000',
+            'finishedAt': '2021-01-01T00:00:02.000000'
+        })
+    return {'runs': runs}
+
+
+def main(rounds):
+    """Run the benchmark for a given number of compression rounds per
+    response.
+    """
+    responses = [
+        ('leaderboard-10', leaderboard(10)),
+        ('leaderboard-1000', leaderboard(1000)),
+        ('leaderboard-10000', leaderboard(10000)),
+        ('runs-10', run_listing(10)),
+        ('runs-1000', run_listing(1000))
+    ]
+    print('response             bytes  encoding  level     compressed  ratio  cpu(ms)')
+    for name, doc in responses:
+        data = json.dumps(doc).encode('utf-8')
+        for encoding in encodings():
+            for level in [1, 6, 9]:
+                with Timer() as timer:
+                    for _ in range(rounds):
+                        size = sum(len(b) for b in compress_chunks(data, encoding=encoding, level=level))
+                print('{:18s} {:8d}  {:8s}  {:5d}  {:13d}  {:5.2f}  {:7.3f}'.format(
+                    name,
+                    len(data),
+                    encoding,
+                    level,
+                    size,
+                    len(data) / size,
+                    timer.cpu / rounds * 1000
+                ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=20, help='Number of compression rounds per response')
+    args = parser.parse_args()
+    main(rounds=args.rounds)
@@ -0,0 +1,85 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmark for conditional GET requests. Simulates clients that poll the
+read endpoints of the Web API and compares the transferred bytes and the CPU
+time for unconditional requests with requests that send the entity tag of the
+previous response in the If-None-Match header.
+"""
+
+import argparse
+import tempfile
+
+from benchmarks.util import BENCHMARK_ID, Timer, create_app
+from robflask.api.util import HEADER_TOKEN
+from robflask.tests.user import create_user
+
+import flowserv.view.group as glbls
+import robflask.config as config
+
+
+def poll(client, urls, headers, rounds, conditional):
+    """Poll the given list of Urls. Returns the number of transferred body
+    bytes, the number of 304 responses and the timer.
+    """
+    etags = dict()
+    transferred = 0
+    not_modified = 0
+    with Timer() as timer:
+        for _ in range(rounds):
+            for url in urls:
+                req_headers = dict(headers)
+                if conditional and url in etags:
+                    req_headers['If-None-Match'] = etags[url]
+                r = client.get(url, headers=req_headers)
+                transferred += len(r.data)
+                if r.status_code == 304:
+                    not_modified += 1
+                else:
+                    etags[url] = r.headers.get('ETag')
+    return transferred, not_modified, timer
+
+
+def main(rounds):
+    """Run the benchmark for a given number of polling rounds."""
+    with tempfile.TemporaryDirectory() as basedir:
+        app = create_app(basedir)
+        with app.test_client() as client:
+            _, token = create_user(client, 'alice')
+            headers = {HEADER_TOKEN: token}
+            api = config.API_PATH()
+            url = '{}/workflows/{}/groups'.format(api, BENCHMARK_ID)
+            r = client.post(url, json={glbls.GROUP_NAME: 'G1'}, headers=headers)
+            group_id = r.json[glbls.GROUP_ID]
+            urls = [
+                '{}/workflows'.format(api),
+                '{}/workflows/{}'.format(api, BENCHMARK_ID),
+                '{}/workflows/{}/leaderboard'.format(api, BENCHMARK_ID),
+                '{}/workflows/{}/groups'.format(api, BENCHMARK_ID),
+                '{}/groups/{}'.format(api, group_id),
+                '{}/groups/{}/runs'.format(api, group_id),
+                '{}/uploads/{}/files'.format(api, group_id)
+            ]
+            print('requests  mode         bytes  304s  wall(s)  cpu(s)')
+            for conditional in [False, True]:
+                size, hits, timer = poll(client, urls, headers, rounds, conditional)
+                print('{:8d}  {:11s} {:6d} {:5d}  {:7.3f}  {:6.3f}'.format(
+                    rounds * len(urls),
+                    'conditional' if conditional else 'full',
+                    size,
+                    hits,
+                    timer.elapsed,
+                    timer.cpu
+                ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=200, help='Number of polling rounds')
+    args = parser.parse_args()
+    main(rounds=args.rounds)
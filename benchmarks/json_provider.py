@@ -0,0 +1,83 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmark for the JSON providers. Serializes response documents with the
+standard library provider and the orjson provider and compares the CPU time
+per document. The documents are responses of the Web API that are created by
+the flowserv serializers (workflow handle, submission listing and user
+listing) and serialized leader boards and run listings of typical sizes.
+"""
+
+import argparse
+import tempfile
+
+from benchmarks.compression import run_listing
+from benchmarks.leaderboard import leaderboard
+from benchmarks.util import BENCHMARK_ID, Timer, create_app
+from robflask.api.jsonprovider import OrjsonProvider
+from robflask.api.util import HEADER_TOKEN
+from robflask.tests.user import create_user
+
+import flowserv.view.group as glbls
+import robflask.config as config
+
+
+def responses(app, size):
+    """Get response documents of the Web API for a database with the given
+    number of users and submissions.
+    """
+    api = config.API_PATH()
+    with app.test_client() as client:
+        url = '{}/workflows/{}/groups'.format(api, BENCHMARK_ID)
+        for i in range(size):
+            _, token = create_user(client, 'user{}'.format(i))
+            client.post(url, json={glbls.GROUP_NAME: 'G{}'.format(i)}, headers={HEADER_TOKEN: token})
+        headers = {HEADER_TOKEN: token}
+        return [
+            ('workflow', client.get('{}/workflows/{}'.format(api, BENCHMARK_ID)).json),
+            ('submissions-{}'.format(size), client.get(url, headers=headers).json),
+            ('users-{}'.format(size), client.get('{}/users'.format(api), headers=headers).json),
+            ('leaderboard-1000', leaderboard(1000)),
+            ('leaderboard-10000', leaderboard(10000)),
+            ('runs-1000', run_listing(1000))
+        ]
+
+
+def main(size, rounds):
+    """Run the benchmark for a given number of users and submissions and a
+    given number of serialization rounds per document.
+    """
+    if OrjsonProvider is None:
+        print('orjson provider is not available')
+        return
+    with tempfile.TemporaryDirectory() as basedir:
+        app = create_app(basedir)
+        providers = [('json', app.json_provider_class(app)), ('orjson', OrjsonProvider(app))]
+        print('response              bytes  provider  cpu(ms)  speedup')
+        for name, doc in responses(app, size):
+            times = list()
+            for provider_name, provider in providers:
+                with Timer() as timer:
+                    for _ in range(rounds):
+                        data = provider.dumps(doc)
+                times.append(timer.cpu)
+                print('{:18s} {:9d}  {:8s}  {:7.3f}  {:7.2f}'.format(
+                    name,
+                    len(data),
+                    provider_name,
+                    timer.cpu / rounds * 1000,
+                    times[0] / timer.cpu if timer.cpu > 0 else 0
+                ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=200, help='Number of users and submissions')
+    parser.add_argument('--rounds', type=int, default=50, help='Number of serialization rounds per document')
+    args = parser.parse_args()
+    main(size=args.size, rounds=args.rounds)
@@ -0,0 +1,149 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmark for leader board requests. Compares the response size and the
+request latency for the full leader board with requests for the top entries
+of the ranking (with and without the rank of a submission).
+
+Cold cache: the database is seeded with a large number of runs with results.
+flowserv loads the results of all successful runs of the workflow from the
+database and sorts the ranking in Python (RankingManager.get_ranking). The
+benchmark measures the ranking manager directly and leader board requests
+that are not served from the leader board cache.
+
+Cache hits: a synthetic leader board with a large number of ranking entries
+is added to the leader board cache before every request.
+"""
+
+import argparse
+import random
+import tempfile
+
+from benchmarks.loadtest import seed_database
+from benchmarks.util import BENCHMARK_ID, Timer, create_app, percentiles
+from robflask.leaderboard import cache
+
+import robflask.config as config
+
+
+def leaderboard(size):
+    """Get serialized leader board with the given number of ranking entries."""
+    ranking = list()
+    for i in range(size):
+        ranking.append({
+            'run': {
+                'id': 'R{}'.format(i),
+                'createdAt': '2021-01-01T00:00:00',
+                'startedAt': '2021-01-01T00:00:01',
+                'finishedAt': '2021-01-01T00:00:02'
+            },
+            'group': {'id': 'G{}'.format(i), 'name': 'Submission {}'.format(i)},
+            'results': [{'name': 'avg_count', 'value': size - i}]
+        })
+    return {'schema': [{'name': 'avg_count', 'label': 'Avg. Count', 'dtype': 'int'}], 'ranking': ranking}
+
+
+def cold_cache(app, url, rounds, limit):
+    """Measure the ranking manager of flowserv and leader board requests that
+    are not served from the leader board cache.
+    """
+    from robflask.service import service
+    latencies = list()
+    with Timer() as timer:
+        for _ in range(rounds):
+            with service() as api:
+                workflows = api.workflows()
+                workflow = workflows.workflow_repo.get_workflow(BENCHMARK_ID)
+                with Timer() as t:
+                    ranking = workflows.ranking_manager.get_ranking(workflow, include_all=True)
+            latencies.append(t.elapsed)
+    report('ranking', len(ranking), latencies, timer.cpu)
+    queries = [
+        ('cold-full', '?includeAll=true'),
+        ('cold-top-{}'.format(limit), '?includeAll=true&limit={}'.format(limit))
+    ]
+    with app.test_client() as client:
+        for name, query in queries:
+            latencies = list()
+            with Timer() as timer:
+                for _ in range(rounds):
+                    cache().invalidate()
+                    with Timer() as t:
+                        r = client.get(url + query)
+                    latencies.append(t.elapsed)
+            report(name, len(r.data), latencies, timer.cpu)
+
+
+def cache_hits(app, url, size, rounds, limit):
+    """Measure leader board requests for a synthetic leader board of the
+    given size that are served from the leader board cache.
+    """
+    doc = leaderboard(size)
+    queries = [
+        ('full', ''),
+        ('top-{}'.format(limit), '?limit={}'.format(limit)),
+        ('top+rank', '?limit={}&groupId=G{}'.format(limit, size - 1))
+    ]
+    with app.test_client() as client:
+        for name, query in queries:
+            latencies = list()
+            with Timer() as timer:
+                for _ in range(rounds):
+                    # Ensure that every request is served from the cache.
+                    cache().put(BENCHMARK_ID, None, None, doc)
+                    with Timer() as t:
+                        r = client.get(url + query)
+                    latencies.append(t.elapsed)
+            report(name, len(r.data), latencies, timer.cpu)
+
+
+def main(size, runs, rounds, limit, seed):
+    """Run the benchmark for a seeded database with the given number of runs
+    and a synthetic leader board of the given size.
+    """
+    with tempfile.TemporaryDirectory() as basedir:
+        app = create_app(basedir)
+        seed_database(
+            app,
+            workflows=1,
+            users=1,
+            groups=max(1, runs // 10),
+            runs=runs,
+            uploads=0,
+            rng=random.Random(seed)
+        )
+        url = '{}/workflows/{}/leaderboard'.format(config.API_PATH(), BENCHMARK_ID)
+        print('request          size      p50(ms)  p95(ms)  p99(ms)  cpu(s)')
+        cold_cache(app, url, rounds=rounds, limit=limit)
+        cache_hits(app, url, size=size, rounds=rounds, limit=limit)
+
+
+def report(name, size, latencies, cpu):
+    """Print the result size (number of ranking entries or response bytes)
+    and the latency statistics for a benchmark case.
+    """
+    stats = percentiles(latencies)
+    print('{:15s}  {:9d}  {:7.2f}  {:7.2f}  {:7.2f}  {:6.3f}'.format(
+        name,
+        size,
+        stats['p50'] * 1000,
+        stats['p95'] * 1000,
+        stats['p99'] * 1000,
+        cpu
+    ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=100000, help='Number of cached ranking entries')
+    parser.add_argument('--runs', type=int, default=5000, help='Number of seeded runs')
+    parser.add_argument('--rounds', type=int, default=20, help='Number of requests per query')
+    parser.add_argument('--limit', type=int, default=20, help='Number of entries on a page')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for the random number generator')
+    args = parser.parse_args()
+    main(size=args.size, runs=args.runs, rounds=args.rounds, limit=args.limit, seed=args.seed)
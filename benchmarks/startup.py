@@ -0,0 +1,106 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmark for the cold start of a Web API worker. Starts fresh Python
+interpreters and measures the time for importing the application factory,
+for creating the Flask application, and for handling the first request.
+Optionally prints the modules with the largest cumulative import time.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.util import create_app
+from flowserv.model.database import TEST_DB
+
+
+DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = os.path.join(DIR, '..')
+
+
+"""Code that is executed by each worker process. Expects the base directory
+and the database connect Url as arguments.
+"""
+WORKER = '''
+import json
+import sys
+import time
+start = time.perf_counter()
+import robflask.api
+imported = time.perf_counter()
+from robflask.service import init_service
+init_service(basedir=sys.argv[1], database=sys.argv[2])
+app = robflask.api.create_app({'TESTING': True})
+created = time.perf_counter()
+import robflask.config as config
+with app.test_client() as client:
+    client.get(config.API_PATH() + '/')
+served = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'create': created - imported,
+    'request': served - created
+}))
+'''
+
+
+def import_times(stderr):
+    """Get list of (module, cumulative import time in seconds) pairs from the
+    output of an interpreter that is run with -X importtime. The list is
+    sorted by decreasing import time.
+    """
+    modules = list()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        modules.append((module.strip(), int(cumulative) / 1000000))
+    return sorted(modules, key=lambda m: -m[1])
+
+
+def worker(basedir, database, importtime=False):
+    """Run a single worker process. Returns the measured times and the
+    output of the interpreter on standard error.
+    """
+    args = [sys.executable]
+    if importtime:
+        args.extend(['-X', 'importtime'])
+    args.extend(['-c', WORKER, basedir, database])
+    proc = subprocess.run(args, cwd=ROOT_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return json.loads(proc.stdout.decode('utf-8').splitlines()[-1]), proc.stderr.decode('utf-8')
+
+
+def main(workers, top):
+    """Run the benchmark for the given number of worker processes."""
+    with tempfile.TemporaryDirectory() as basedir:
+        # Create the database and the benchmark before starting the workers.
+        create_app(basedir)
+        database = TEST_DB(basedir)
+        times = [worker(basedir, database)[0] for _ in range(workers)]
+        print('phase      min(s)  mean(s)')
+        for phase in ['import', 'create', 'request']:
+            values = [t[phase] for t in times]
+            print('{:8s}  {:7.3f}  {:7.3f}'.format(phase, min(values), sum(values) / len(values)))
+        if top > 0:
+            _, stderr = worker(basedir, database, importtime=True)
+            print()
+            print('cumulative(ms)  module')
+            for module, cumulative in import_times(stderr)[:top]:
+                print('{:14.1f}  {}'.format(cumulative * 1000, module))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=10, help='Number of worker processes')
+    parser.add_argument('--top', type=int, default=20, help='Number of modules in the import time profile')
+    args = parser.parse_args()
+    main(workers=args.workers, top=args.top)
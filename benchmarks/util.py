@@ -0,0 +1,96 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Helper functions for Web API benchmarks."""
+
+from typing import Dict, List, Optional
+
+import os
+import time
+
+from flask import Flask
+
+from flowserv.model.database import DB, TEST_DB
+
+
+DIR = os.path.dirname(os.path.realpath(__file__))
+BENCHMARK_DIR = os.path.join(DIR, '../tests/.files/helloworld')
+BENCHMARK_ID = 'helloworld'
+
+
+def create_app(basedir: str, database: Optional[str] = None) -> Flask:
+    """Create a Flask app for a fresh database in the given base directory.
+    The database contains a single helloworld benchmark.
+
+    Parameters
+    ----------
+    basedir: string
+        Base directory for all workflow files.
+    database: string, default=None
+        Optional connect Url for the database. By default, a SQLite database
+        in the base directory is used. NOTE: All existing tables in the given
+        database are dropped.
+
+    Returns
+    -------
+    flask.Flask
+    """
+    connect_url = database if database is not None else TEST_DB(basedir)
+    DB(connect_url=connect_url).init()
+    from robflask.service import init_service
+    init_service(basedir=basedir, database=connect_url)
+    from robflask.service import service
+    with service() as api:
+        api.workflows().create_workflow(
+            identifier=BENCHMARK_ID,
+            name='Hello World',
+            description='Hello World Demo',
+            source=BENCHMARK_DIR
+        )
+    # Do not write access records to the benchmark output unless the logger
+    # levels are configured explicitly.
+    import robflask.config as config
+    os.environ.setdefault(config.ROB_WEBAPI_LOG_LEVELS, 'robflask.access=WARNING')
+    from robflask.api import create_app
+    return create_app({'TESTING': True})
+
+
+def percentiles(values: List[float]) -> Dict:
+    """Get the 50th, 95th, and 99th percentile for a list of latency values.
+
+    Parameters
+    ----------
+    values: list of float
+        List of measured values.
+
+    Returns
+    -------
+    dict
+    """
+    values = sorted(values)
+    result = dict()
+    for p in [50, 95, 99]:
+        pos = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+        result['p{}'.format(p)] = values[pos] if values else None
+    return result
+
+
+class Timer(object):
+    """Context manager that measures the elapsed wall clock and CPU time."""
+    def __enter__(self):
+        """Start the timer."""
+        self.elapsed = 0
+        self.cpu = 0
+        self._start = time.perf_counter()
+        self._start_cpu = time.process_time()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        """Stop the timer."""
+        self.elapsed = time.perf_counter() - self._start
+        self.cpu = time.process_time() - self._start_cpu
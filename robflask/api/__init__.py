@@ -10,27 +10,34 @@
 ROB web API.
 """
 
-import logging
+import importlib
 import os
-import sys
 
 from flask import Flask, jsonify, make_response
 from flask_cors import CORS
-from logging.handlers import RotatingFileHandler
 
 import flowserv.error as err
 import robflask.error as rob
 import robflask.config as config
 
 
-# Initialize the logger.
-root = logging.getLogger()
-root.setLevel(logging.DEBUG)
-handler = logging.StreamHandler(sys.stdout)
-handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(message)s')
-handler.setFormatter(formatter)
-root.addHandler(handler)
+"""Modules that define the blueprints for the API components."""
+BLUEPRINTS = [
+    # Service Descriptor
+    'robflask.api.server',
+    # Batch Requests
+    'robflask.api.batch',
+    # Benchmark Service
+    'robflask.api.benchmark',
+    # Run Service
+    'robflask.api.run',
+    # Submission Service
+    'robflask.api.submission',
+    # Submission File Upload Service
+    'robflask.api.files',
+    # User Service
+    'robflask.api.user'
+]
 
 
 def create_app(test_config=None):
@@ -41,24 +48,64 @@ def create_app(test_config=None):
     if test_config is not None:  # pragma: no cover
         app.config.update(test_config)
     app.config['MAX_CONTENT_LENGTH'] = config.MAX_CONTENT_LENGTH()
-    # Enable CORS
-    CORS(app)
     # --------------------------------------------------------------------------
-    # Initialize error logging
+    # Initialize logging
     # --------------------------------------------------------------------------
-    # Use rotating file handler for server logs
-    logdir = config.LOG_DIR()
-    os.makedirs(config.LOG_DIR(), exist_ok=True)
-    file_handler = RotatingFileHandler(
-        os.path.join(logdir, 'webapi.log'),
-        maxBytes=1024 * 1024 * 100,
-        backupCount=20
+    # Log records are written as JSON documents by a background thread. Errors
+    # are also written to a rotating log file in the log directory.
+    from robflask.logger import init_logging, init_request_logging
+    init_logging(
+        logdir=config.LOG_DIR(),
+        level=config.LOG_LEVEL(),
+        levels=config.LOG_LEVELS(),
+        sampling=config.LOG_SAMPLING()
     )
-    file_handler.setLevel(logging.ERROR)
-    file_handler.setFormatter(
-        logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    )
-    app.logger.addHandler(file_handler)
+    # Profile selected requests. No request hooks are registered if profiling
+    # is disabled. The hooks are registered first to include the time of all
+    # other request and response hooks in the profile.
+    if config.PROFILE():
+        from robflask.profiling import RequestProfiler, init_profiling
+        profiler = RequestProfiler(
+            outdir=os.path.join(config.LOG_DIR(), 'profiles'),
+            mode=config.PROFILE_MODE(),
+            rate=config.PROFILE_RATE(),
+            key=config.PROFILE_KEY(),
+            endpoints=config.PROFILE_ENDPOINTS()
+        )
+        init_profiling(app, profiler)
+    # Add the request context to log records and write an access record for
+    # each request.
+    init_request_logging(app)
+    # Trace requests. The request span ends after the response body was sent.
+    if config.TRACING():
+        from robflask.tracing import EXPORTER_FILE, FileExporter, OTLPExporter, Tracer, init_tracing
+        exporters = list()
+        for exporter in config.TRACING_EXPORTERS():
+            if exporter == EXPORTER_FILE:
+                exporters.append(FileExporter(os.path.join(config.LOG_DIR(), 'traces.jsonl')))
+            else:
+                exporters.append(OTLPExporter(config.TRACING_ENDPOINT()))
+        tracer = Tracer(exporters)
+        app.extensions['robflask.tracing'] = tracer
+        init_tracing(app, tracer)
+    # Record request metrics. The hooks are registered before all other
+    # response hooks to record the size of the final response body.
+    if config.METRICS():
+        from robflask.metrics import init_metrics
+        init_metrics(app)
+    # Set the JSON provider that serializes the responses of all request
+    # handlers.
+    from robflask.api.jsonprovider import init_json
+    init_json(app, provider=config.JSON_PROVIDER())
+    # Compress JSON responses for clients that accept a supported content
+    # encoding.
+    from robflask.api.compress import COMPRESS_LEVEL, COMPRESS_MINSIZE, compress_response
+    app.config[COMPRESS_LEVEL] = config.COMPRESS_LEVEL()
+    app.config[COMPRESS_MINSIZE] = config.COMPRESS_MIN_SIZE()
+    app.after_request(compress_response)
+    # Enable CORS. The Link header contains the link to the next page of
+    # paginated listings.
+    CORS(app, expose_headers=['Link'])
 
     # --------------------------------------------------------------------------
     # Define error handlers
@@ -95,6 +142,42 @@ def create_app(test_config=None):
         """
         return make_response(jsonify({'message': str(error)}), 400)
 
+    @app.errorhandler(rob.UploadOffsetError)
+    def invalid_upload_offset(error):
+        """JSON response handler for uploaded chunks that do not start at the
+        current end of the uploaded file. The response contains the expected
+        offset to allow the client to resume the upload.
+
+        Parameters
+        ----------
+        error : Exception
+            Exception thrown by request Handler
+
+        Returns
+        -------
+        Http response
+        """
+        return make_response(jsonify({'message': str(error), 'offset': error.offset}), 409)
+
+    @app.errorhandler(rob.ServiceUnavailableError)
+    def service_unavailable(error):
+        """JSON response handler for requests that cannot be handled because
+        a resource of the worker process is exhausted. The response contains
+        the Retry-After header.
+
+        Parameters
+        ----------
+        error : Exception
+            Exception thrown by request Handler
+
+        Returns
+        -------
+        Http response
+        """
+        response = make_response(jsonify({'message': str(error)}), 503)
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response
+
     @app.errorhandler(err.UnauthenticatedAccessError)
     def unauthenticated_access(error):
         """JSON response handler for unauthenticated requests.
@@ -140,6 +223,38 @@ def create_app(test_config=None):
         """
         return make_response(jsonify({'message': str(error)}), 404)
 
+    @app.errorhandler(rob.UnknownBlobError)
+    def unknown_blob(error):
+        """JSON response handler for requests that reference unknown file
+        content.
+
+        Parameters
+        ----------
+        error : Exception
+            Exception thrown by request Handler
+
+        Returns
+        -------
+        Http response
+        """
+        return make_response(jsonify({'message': str(error)}), 404)
+
+    @app.errorhandler(rob.UnknownUploadSessionError)
+    def unknown_upload_session(error):
+        """JSON response handler for requests that access unknown upload
+        sessions.
+
+        Parameters
+        ----------
+        error : Exception
+            Exception thrown by request Handler
+
+        Returns
+        -------
+        Http response
+        """
+        return make_response(jsonify({'message': str(error)}), 404)
+
     @app.errorhandler(413)
     def upload_error(error):
         """Exception handler for file uploads that exceed the file size
@@ -157,27 +272,35 @@ def create_app(test_config=None):
     # --------------------------------------------------------------------------
     # Import blueprints for API components
     # --------------------------------------------------------------------------
-    # Service Descriptor
-    import robflask.api.server as server
-    app.register_blueprint(server.bp)
-    # Benchmark Service
-    import robflask.api.benchmark as benchmarks
-    app.register_blueprint(benchmarks.bp)
-    # Run Service
-    import robflask.api.run as runs
-    app.register_blueprint(runs.bp)
-    # Submission Service
-    import robflask.api.submission as submissions
-    app.register_blueprint(submissions.bp)
-    # Submission File Upload Service
-    import robflask.api.files as files
-    app.register_blueprint(files.bp)
-    # User Service
-    import robflask.api.user as users
-    app.register_blueprint(users.bp)
+    # All API blueprints are registered under the API path from the service
+    # configuration. Blueprint modules are only imported here, i.e., when the
+    # application is created.
+    api_path = config.API_PATH()
+    for module in BLUEPRINTS:
+        app.register_blueprint(importlib.import_module(module).bp, url_prefix=api_path)
+    # Request metrics endpoint.
+    if config.METRICS():
+        import robflask.api.metrics as metrics
+        app.register_blueprint(metrics.bp)
     # Include the ROB UI blueprint only if the environment variable is set.
     if os.environ.get(config.ROB_UI_PATH) is not None:
         import robflask.api.ui as robui
         app.register_blueprint(robui.bp)
     # Return the app
     return app
+
+
+def create_asgi_app(test_config=None):
+    """Initialize the ASGI application. The application serves the Flask
+    application from an ASGI server (e.g., uvicorn). Request handlers run in
+    a bounded thread pool. The pool size is set by the Web API configuration.
+    Request bodies are limited by the maximum content length of the Flask
+    application.
+    """
+    from robflask.api.asgi import ASGIAdapter
+    app = create_app(test_config=test_config)
+    return ASGIAdapter(
+        app,
+        max_workers=config.ASGI_THREADS(),
+        max_content_length=app.config.get('MAX_CONTENT_LENGTH')
+    )
@@ -0,0 +1,609 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""ASGI adapter for the Flask application of the ROB Web API.
+
+The adapter serves the (synchronous) Flask application from an ASGI server
+(e.g., uvicorn). Request handlers and all blocking calls to the flowserv API
+run in a bounded thread pool. The event loop only holds the connections of
+clients while data is transferred:
+
+- Request bodies up to the buffer size are received in the event loop before
+  the request handler is called. Larger bodies are streamed to the request
+  handler: the handler reads the body from an input stream that receives the
+  next message from the client when the buffered data was consumed. The body
+  is never stored by the adapter. Requests with a declared body size that
+  exceeds the maximum content length of the application are rejected with
+  status code 413 before the body is received. Bodies without a declared size
+  are rejected when the received data exceeds the maximum content length.
+- Response bodies are read chunk by chunk in the thread pool. No thread is
+  occupied while the event loop waits for a slow client to receive a chunk.
+- Response bodies that support asynchronous iteration (i.e., event streams and
+  long-poll requests that wait for run state changes) are iterated in the
+  event loop.
+
+Response bodies are closed in the thread pool when the response is finished
+or when the client disconnects.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+import asyncio
+import json
+import logging
+import sys
+
+from werkzeug.exceptions import BadRequest, ClientDisconnected, HTTPException, InternalServerError
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.wsgi import FileWrapper
+
+from robflask.api.util import ASYNC_ENVIRON
+
+
+"""Size of blocks (in bytes) that are read from files in response bodies."""
+CHUNK_SIZE = 64 * 1024
+
+"""Size (in bytes) of the part of the request body that is received before the
+request handler is called.
+"""
+BUFFER_SIZE = 64 * 1024
+
+
+class ASGIAdapter(object):
+    """ASGI application that dispatches HTTP requests to a WSGI application.
+    The WSGI application is called in a thread pool of fixed size.
+    """
+    def __init__(
+        self, app: Callable, max_workers: Optional[int] = 32,
+        buffer_size: Optional[int] = BUFFER_SIZE,
+        max_content_length: Optional[int] = None
+    ):
+        """Initialize the WSGI application and the thread pool.
+
+        Parameters
+        ----------
+        app: callable
+            WSGI application.
+        max_workers: int, default=32
+            Maximum number of threads that run request handlers and read
+            response bodies.
+        buffer_size: int, default=64KB
+            Size of the part of the request body that is received before the
+            request handler is called. The remaining body is streamed to the
+            request handler.
+        max_content_length: int, default=None
+            Maximum size of request bodies. The size is not limited if the
+            value is None.
+        """
+        self.app = app
+        self.max_workers = max_workers
+        self.buffer_size = buffer_size
+        self.max_content_length = max_content_length
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='robflask'
+        )
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable):
+        """Handle an ASGI connection. Only HTTP and lifespan connections are
+        supported.
+
+        Parameters
+        ----------
+        scope: dict
+            Connection scope.
+        receive: callable
+            Awaitable that returns the next event from the client.
+        send: callable
+            Awaitable that sends an event to the client.
+        """
+        if scope['type'] == 'http':
+            await self.handle(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        else:
+            raise ValueError("unsupported connection type '{}'".format(scope['type']))
+
+    async def handle(self, scope: Dict, receive: Callable, send: Callable):
+        """Handle an HTTP request. Receives the first part of the request
+        body, calls the WSGI application in the thread pool and sends the
+        response body.
+
+        Parameters
+        ----------
+        scope: dict
+            Connection scope.
+        receive: callable
+            Awaitable that returns the next event from the client.
+        send: callable
+            Awaitable that sends an event to the client.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            size = content_length(scope)
+        except ValueError:
+            await send_error(send, BadRequest('invalid content length'))
+            return
+        if size is not None and self.max_content_length is not None and size > self.max_content_length:
+            # Reject the request before the body is received.
+            await send_error(send, RequestEntityTooLarge())
+            return
+        body = RequestBody(receive=receive, loop=loop, limit=self.max_content_length)
+        try:
+            await body.prefetch(self.buffer_size)
+        except ClientDisconnected:
+            # The client disconnected before the request was sent.
+            return
+        except RequestEntityTooLarge as ex:
+            await send_error(send, ex)
+            return
+        response = WSGIResponse()
+        try:
+            environ = wsgi_environ(scope, body)
+            app_iter = await loop.run_in_executor(
+                self.executor,
+                self.app,
+                environ,
+                response.start_response
+            )
+        except Exception as ex:  # pragma: no cover
+            logging.exception(ex)
+            await send_error(send, InternalServerError())
+            return
+        finally:
+            # Data that was not read by the request handler is discarded
+            # while waiting for the client to disconnect.
+            body.close()
+        try:
+            # Send the response body while watching for a disconnect of the
+            # client. The transfer is cancelled if the client disconnects.
+            sender = asyncio.ensure_future(self.send_body(response, app_iter, send))
+            disconnect = asyncio.ensure_future(wait_disconnect(receive))
+            await asyncio.wait([sender, disconnect], return_when=asyncio.FIRST_COMPLETED)
+            for task in [sender, disconnect]:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(sender, disconnect, return_exceptions=True)
+            if sender.done() and not sender.cancelled() and sender.exception() is not None:
+                ex = sender.exception()
+                logging.error('error sending response', exc_info=ex)
+        finally:
+            await loop.run_in_executor(self.executor, close_body, app_iter)
+
+    async def lifespan(self, receive: Callable, send: Callable):
+        """Handle the lifespan protocol of the ASGI server. The thread pool is
+        shut down when the server shuts down.
+
+        Parameters
+        ----------
+        receive: callable
+            Awaitable that returns the next event from the server.
+        send: callable
+            Awaitable that sends an event to the server.
+        """
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def send_body(self, response: 'WSGIResponse', app_iter: Iterable, send: Callable):
+        """Send the response body to the client. Chunks of synchronous
+        response bodies are read in the thread pool.
+
+        Parameters
+        ----------
+        response: robflask.api.asgi.WSGIResponse
+            Status and headers of the response.
+        app_iter: iterable
+            Response body that was returned by the WSGI application.
+        send: callable
+            Awaitable that sends an event to the client.
+        """
+        started = False
+
+        async def send_chunk(chunk):
+            nonlocal started
+            if not started:
+                await send(response.start_message())
+                started = True
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+        if hasattr(app_iter, '__aiter__'):
+            async for chunk in app_iter:
+                await send_chunk(chunk)
+        else:
+            loop = asyncio.get_running_loop()
+            chunks = iter(app_iter)
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+                if chunk is None:
+                    break
+                await send_chunk(chunk)
+        # The response is started by the first chunk. Send the headers if the
+        # body was empty.
+        await send_chunk(b'')
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+
+class RequestBody(object):
+    """Input stream for the request body of the WSGI application. The body is
+    received from the client while the request handler reads it. Messages are
+    only received when the request handler reads more data than is buffered,
+    i.e., the buffer never holds more than the prefetched part of the body or
+    the requested data plus one message.
+
+    The stream is read by the request handler in a thread of the thread pool.
+    Messages are received in the event loop. The reading thread waits for the
+    next message.
+    """
+    def __init__(
+        self, receive: Callable, loop: asyncio.AbstractEventLoop,
+        limit: Optional[int] = None
+    ):
+        """Initialize the receive callable and the maximum body size.
+
+        Parameters
+        ----------
+        receive: callable
+            Awaitable that returns the next event from the client.
+        loop: asyncio.AbstractEventLoop
+            Event loop of the ASGI server.
+        limit: int, default=None
+            Maximum size of the request body.
+        """
+        self.receive = receive
+        self.loop = loop
+        self.limit = limit
+        self.buffer = bytearray()
+        self.size = 0
+        self.eof = False
+        self.closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Get iterator over the lines in the request body.
+
+        Returns
+        -------
+        iterator of bytes
+        """
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def close(self):
+        """Close the stream. Data that was not received is discarded."""
+        self.closed = True
+
+    async def prefetch(self, size: int):
+        """Receive messages in the event loop until the buffer contains at
+        least the given number of bytes or the body was received.
+
+        Parameters
+        ----------
+        size: int
+            Number of bytes that are received before the request handler is
+            called.
+
+        Raises
+        ------
+        werkzeug.exceptions.ClientDisconnected
+        werkzeug.exceptions.RequestEntityTooLarge
+        """
+        while not self.eof and len(self.buffer) < size:
+            self._append(await self.receive())
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        """Read up to the given number of bytes from the request body. Reads
+        the remaining body if the size is negative or None.
+
+        Parameters
+        ----------
+        size: int, default=-1
+            Maximum number of bytes that are returned.
+
+        Returns
+        -------
+        bytes
+        """
+        while (size is None or size < 0 or len(self.buffer) < size) and self._receive():
+            pass
+        if size is None or size < 0:
+            size = len(self.buffer)
+        return self._consume(min(size, len(self.buffer)))
+
+    def readline(self, size: Optional[int] = -1) -> bytes:
+        """Read the next line from the request body.
+
+        Parameters
+        ----------
+        size: int, default=-1
+            Maximum number of bytes that are returned.
+
+        Returns
+        -------
+        bytes
+        """
+        while b'\n' not in self.buffer and (size is None or size < 0 or len(self.buffer) < size):
+            if not self._receive():
+                break
+        end = self.buffer.find(b'\n') + 1 or len(self.buffer)
+        if size is not None and size >= 0:
+            end = min(end, size)
+        return self._consume(end)
+
+    def readlines(self, hint: Optional[int] = -1) -> List[bytes]:
+        """Read the remaining lines from the request body.
+
+        Returns
+        -------
+        list of bytes
+        """
+        return list(self)
+
+    def _append(self, message: Dict):
+        """Add the data of a received message to the buffer.
+
+        Raises
+        ------
+        werkzeug.exceptions.ClientDisconnected
+        werkzeug.exceptions.RequestEntityTooLarge
+        """
+        if message['type'] == 'http.disconnect':
+            self.eof = True
+            raise ClientDisconnected()
+        if not message.get('more_body', False):
+            self.eof = True
+        chunk = message.get('body', b'')
+        self.size += len(chunk)
+        if self.limit is not None and self.size > self.limit:
+            self.eof = True
+            raise RequestEntityTooLarge()
+        self.buffer.extend(chunk)
+
+    def _consume(self, size: int) -> bytes:
+        """Remove the given number of bytes from the start of the buffer.
+
+        Returns
+        -------
+        bytes
+        """
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def _receive(self) -> bool:
+        """Receive the next message from the client in the event loop and wait
+        for the result. Returns False if the whole body was received.
+
+        Returns
+        -------
+        bool
+        """
+        if self.eof or self.closed:
+            return False
+        future = asyncio.run_coroutine_threadsafe(self.receive(), self.loop)
+        self._append(future.result())
+        return True
+
+
+class WSGIResponse(object):
+    """Status and headers of the response that are set by the WSGI
+    application using the start_response callable.
+    """
+    def __init__(self):
+        """Initialize the response status and headers."""
+        self.status = None
+        self.headers = list()
+
+    def start_message(self) -> Dict:
+        """Get the ASGI message that starts the response.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            'type': 'http.response.start',
+            'status': self.status,
+            'headers': self.headers
+        }
+
+    def start_response(
+        self, status: str, headers: List[Tuple[str, str]], exc_info=None
+    ) -> Callable:
+        """WSGI start_response callable. Returns a write callable that is not
+        supported by the adapter.
+
+        Parameters
+        ----------
+        status: string
+            HTTP status line, e.g., '200 OK'.
+        headers: list of tuple
+            List of response headers.
+        exc_info: tuple, default=None
+            Exception information if the response is started after an error.
+
+        Returns
+        -------
+        callable
+        """
+        if exc_info is not None and self.status is not None:  # pragma: no cover
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [
+            (key.lower().encode('latin-1'), value.encode('latin-1'))
+            for key, value in headers
+        ]
+
+        def write(data):  # pragma: no cover
+            raise NotImplementedError('write callable is not supported')
+
+        return write
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def close_body(app_iter: Iterable):
+    """Close the response body of the WSGI application. Errors are logged.
+    Closing a generator fails if the transfer was cancelled while the next
+    chunk was read. The generator is closed when it is garbage collected in
+    this case.
+
+    Parameters
+    ----------
+    app_iter: iterable
+        Response body that was returned by the WSGI application.
+    """
+    close = getattr(app_iter, 'close', None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception as ex:
+        logging.warning('error closing response: {}'.format(ex))
+
+
+def content_length(scope: Dict) -> Optional[int]:
+    """Get the declared size of the request body from the Content-Length
+    header. Returns None if the header is not given.
+
+    Parameters
+    ----------
+    scope: dict
+        HTTP connection scope.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    for key, value in scope.get('headers', list()):
+        if key.lower() == b'content-length':
+            size = int(value)
+            if size < 0:
+                raise ValueError('invalid content length {}'.format(size))
+            return size
+    return None
+
+
+def file_wrapper(f: IO, buffer_size: Optional[int] = CHUNK_SIZE) -> FileWrapper:
+    """Wrap file objects in response bodies. Files are read in blocks of at
+    least the default chunk size to reduce the number of calls to the thread
+    pool.
+
+    Parameters
+    ----------
+    f: file-like object
+        File object that is opened for reading in binary mode.
+    buffer_size: int, default=64KB
+        Requested block size.
+
+    Returns
+    -------
+    werkzeug.wsgi.FileWrapper
+    """
+    return FileWrapper(f, max(buffer_size, CHUNK_SIZE))
+
+
+async def send_error(send: Callable, error: HTTPException):
+    """Send an error response. The response body has the same format as the
+    error responses of the Flask application.
+
+    Parameters
+    ----------
+    send: callable
+        Awaitable that sends an event to the client.
+    error: werkzeug.exceptions.HTTPException
+        Error that is returned to the client.
+    """
+    await send({
+        'type': 'http.response.start',
+        'status': error.code,
+        'headers': [(b'content-type', b'application/json')]
+    })
+    body = json.dumps({'error': str(error)}).encode('utf-8')
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def wait_disconnect(receive: Callable):
+    """Wait until the client disconnects.
+
+    Parameters
+    ----------
+    receive: callable
+        Awaitable that returns the next event from the client.
+    """
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+def wsgi_environ(scope: Dict, body: IO) -> Dict:
+    """Get the WSGI environment for an HTTP connection scope. The environment
+    contains a flag that allows request handlers to return response bodies
+    that support asynchronous iteration.
+
+    Parameters
+    ----------
+    scope: dict
+        HTTP connection scope.
+    body: robflask.api.asgi.RequestBody
+        Input stream for the request body.
+
+    Returns
+    -------
+    dict
+    """
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'wsgi.file_wrapper': file_wrapper,
+        ASYNC_ENVIRON: True
+    }
+    for key, value in scope.get('headers', list()):
+        key = key.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key not in ['CONTENT_LENGTH', 'CONTENT_TYPE']:
+            key = 'HTTP_{}'.format(key)
+        if key in environ:
+            value = '{},{}'.format(environ[key], value)
+        environ[key] = value
+    return environ
@@ -0,0 +1,131 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Blueprint for batch requests.
+
+A batch request contains a list of read-only (GET) sub-requests for routes of
+the Web API. The sub-requests are dispatched to the request handlers of the
+application in order. All sub-requests use the access token of the batch
+request and share a single service API instance, i.e., the token is validated
+once and all service calls use the same database session.
+
+Sub-requests that return streamed responses (e.g., file downloads or event
+streams) are not supported.
+"""
+
+from typing import Dict
+
+import logging
+
+from flask import Blueprint, current_app, jsonify, make_response, request
+
+from robflask.api.util import ACCESS_TOKEN, HEADER_TOKEN, jsonbody
+
+import robflask.config as config
+import robflask.error as err
+
+
+bp = Blueprint('batch', __name__)
+
+
+"""Maximum number of sub-requests in a batch request."""
+MAX_BATCH_REQUESTS = 25
+
+"""Labels for batch requests and responses."""
+BATCH_BODY = 'body'
+BATCH_METHOD = 'method'
+BATCH_PATH = 'path'
+BATCH_REQUESTS = 'requests'
+BATCH_RESPONSES = 'responses'
+BATCH_STATUS = 'status'
+
+
+@bp.route('/batch', methods=['POST'])
+def batch_request():
+    """Handle a list of sub-requests. Expects a list of requests in the
+    request body. Each request contains the request path (relative to the
+    API base path, including an optional query string) and the optional
+    request method (only GET is supported).
+
+    The response contains the status code and the JSON body of the response
+    for each sub-request (in the same order as the requests).
+
+    Returns
+    -------
+    flask.response_class
+
+    Raises
+    ------
+    robflask.error.InvalidRequestError
+    """
+    # The access token is optional. Sub-requests that require an
+    # authenticated user will fail if no token is given.
+    token = ACCESS_TOKEN(request, raise_error=False)
+    obj = jsonbody(request, mandatory=[BATCH_REQUESTS])
+    requests = obj[BATCH_REQUESTS]
+    if not isinstance(requests, list):
+        raise err.InvalidRequestError('expected list of requests')
+    if len(requests) > MAX_BATCH_REQUESTS:
+        raise err.InvalidRequestError('too many requests (max. {})'.format(MAX_BATCH_REQUESTS))
+    for req in requests:
+        if not isinstance(req, dict) or not isinstance(req.get(BATCH_PATH), str):
+            raise err.InvalidRequestError('invalid request {}'.format(req))
+        if req.get(BATCH_METHOD, 'GET').upper() != 'GET':
+            raise err.InvalidRequestError('unsupported method {}'.format(req[BATCH_METHOD]))
+        if req[BATCH_PATH].lstrip('/').split('?')[0] == 'batch':
+            raise err.InvalidRequestError('nested batch requests are not supported')
+    app = current_app._get_current_object()
+    responses = list()
+    from robflask.service import service
+    with service.shared(access_token=token):
+        for req in requests:
+            responses.append(dispatch(app, path=req[BATCH_PATH], token=token))
+    return make_response(jsonify({BATCH_RESPONSES: responses}), 200)
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def dispatch(app, path: str, token: str) -> Dict:
+    """Dispatch a GET request for the given path to the request handlers of
+    the application. Returns a dictionary with the response status code and
+    the JSON response body.
+
+    Parameters
+    ----------
+    app: flask.Flask
+        Flask application.
+    path: string
+        Request path relative to the API base path.
+    token: string
+        Access token of the batch request.
+
+    Returns
+    -------
+    dict
+    """
+    headers = {HEADER_TOKEN: token} if token is not None else dict()
+    url = '{}/{}'.format(config.API_PATH(), path.lstrip('/'))
+    with app.test_request_context(
+        url,
+        method='GET',
+        base_url=request.url_root,
+        headers=headers,
+        environ_base={'REMOTE_ADDR': request.remote_addr}
+    ):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as ex:
+            logging.exception(ex)
+            return {BATCH_STATUS: 500, BATCH_BODY: {'message': 'internal server error'}}
+        if response.is_streamed or response.direct_passthrough:
+            # Release resources that are held by the response body (e.g., the
+            # subscription of an event stream).
+            response.close()
+            body = {'message': 'streamed responses are not supported'}
+            return {BATCH_STATUS: 400, BATCH_BODY: body}
+        return {BATCH_STATUS: response.status_code, BATCH_BODY: response.get_json(silent=True)}
@@ -8,18 +8,29 @@
 
 """Blueprint for benchmark resources and benchmark leader boards."""
 
-from flask import Blueprint, jsonify, make_response, request, send_file
+from flask import Blueprint, jsonify, make_response, request
 
 from flowserv.model.template.schema import SortColumn
-from robflask.api.util import ACCESS_TOKEN
+from robflask.api.download import archive_compression, send_archive, send_cached_archive, send_handle
+from robflask.api.util import ACCESS_TOKEN, conditional
+from robflask.archive import archive_key, stream_archive
+from robflask.leaderboard import cache, leaderboard_page, result_schema
 
-import robflask.config as config
+import flowserv.model.workflow.state as st
+import flowserv.view.files as flbls
+import flowserv.view.run as rlbls
+import robflask.error as err
 
 
-bp = Blueprint('workflows', __name__, url_prefix=config.API_PATH())
+bp = Blueprint('workflows', __name__)
+
+
+"""Label for the post-processing run handle in serialized workflow handles."""
+WORKFLOW_POSTPROC = 'postproc'
 
 
 @bp.route('/workflows', methods=['GET'])
+@conditional
 def list_benchmarks():
     """Get listing of available benchmarks. The benchmark listing is available
     to everyone, independent of whether they are currently authenticated or
@@ -32,6 +43,7 @@ def list_benchmarks():
 
 
 @bp.route('/workflows/<string:workflow_id>', methods=['GET'])
+@conditional
 def get_benchmark(workflow_id):
     """Get handle for given a benchmark. Benchmarks are available to everyone,
     independent of whether they are currently authenticated or not.
@@ -45,10 +57,16 @@ def get_benchmark(workflow_id):
 
 
 @bp.route('/workflows/<string:workflow_id>/leaderboard', methods=['GET'])
+@conditional
 def get_leaderboard(workflow_id):
     """Get leader board for a given benchmark. Benchmarks and their results are
     available to everyone, independent of whether they are authenticated or
     not.
+
+    The optional query arguments 'limit' and 'offset' select a page of the
+    ranking. The optional query argument 'groupId' adds the rank of the given
+    submission to the response. If any of these arguments is given the
+    response also contains the total number of ranking entries.
     """
     # The orderBy argument can include a list of column names. Each column name
     # may be suffixed by the sort order.
@@ -62,7 +80,7 @@ def get_leaderboard(workflow_id):
                 if col[pos + 1:].lower() == 'asc':
                     sort_desc = False
                 col = col[:pos]
-            sort_columns.append(SortColumn(col, sort_desc=sort_desc))
+            sort_columns.append((col, sort_desc))
     else:
         sort_columns = None
     # The includeAll argument is a flag. If the argument is given without value
@@ -73,15 +91,44 @@ def get_leaderboard(workflow_id):
             include_all = True
         else:
             include_all = include_all.lower() == 'true'
-    # Get serialization of the result ranking
+    # Arguments for a page of the ranking.
+    try:
+        limit = request.args.get('limit')
+        limit = int(limit) if limit is not None else None
+        offset = int(request.args.get('offset', 0))
+    except ValueError as ex:
+        raise err.InvalidRequestError(str(ex))
+    if (limit is not None and limit < 1) or offset < 0:
+        raise err.InvalidRequestError('invalid limit or offset')
+    group_id = request.args.get('groupId')
+    paginated = limit is not None or 'offset' in request.args or group_id is not None
+    # Return the cached ranking if it exists. Otherwise, get serialization of
+    # the result ranking from the service and add it to the cache.
+    leaderboards = cache()
+    r = leaderboards.get(workflow_id, sort_columns, include_all)
+    if r is not None:
+        if paginated:
+            r = leaderboard_page(r, limit=limit, offset=offset, group_id=group_id)
+        response = make_response(jsonify(r), 200)
+        response.headers['X-Cache'] = 'HIT'
+        return response
     from robflask.service import service
     with service() as api:
+        order_by = None
+        if sort_columns is not None:
+            order_by = [SortColumn(c, sort_desc=d) for c, d in sort_columns]
         r = api.workflows().get_ranking(
             workflow_id,
-            order_by=sort_columns,
+            order_by=order_by,
             include_all=include_all
         )
-    return make_response(jsonify(r), 200)
+        schema = result_schema(api, workflow_id)
+    leaderboards.put(workflow_id, sort_columns, include_all, r, schema=schema)
+    if paginated:
+        r = leaderboard_page(r, limit=limit, offset=offset, group_id=group_id)
+    response = make_response(jsonify(r), 200)
+    response.headers['X-Cache'] = 'MISS'
+    return response
 
 
 @bp.route('/workflows/<string:workflow_id>/downloads/archive')
@@ -89,14 +136,35 @@ def download_benchmark_archive(workflow_id):
     """Download a compressed tar archive containing all current resource files
     for a benchmark that were created during post-processing.
     """
+    compresslevel = archive_compression()
     from robflask.service import service
     with service() as api:
-        fh = api.workflows().get_result_archive(workflow_id)
-    return send_file(
-        fh.open(),
-        as_attachment=True,
-        attachment_filename='results.tar.gz',
-        mimetype='application/gzip'
+        wf = api.workflows().get_workflow(workflow_id=workflow_id)
+        postproc = wf.get(WORKFLOW_POSTPROC)
+        # Use the service API to get the archive if the benchmark has no
+        # successful post-processing run (to raise the respective error).
+        if postproc is None or postproc.get(rlbls.RUN_STATE) != st.STATE_SUCCESS:
+            fh = api.workflows().get_result_archive(workflow_id)
+            return send_handle(fh, download_name='results.tar.gz', mimetype='application/gzip')
+        # The archive only changes when a new post-processing run finishes.
+        # Send the cached archive for the current post-processing run if it
+        # exists.
+        key = archive_key('postproc', postproc[rlbls.RUN_ID], compresslevel)
+        response = send_cached_archive(key, basename='results', compresslevel=compresslevel)
+        if response is not None:
+            return response
+        files = list()
+        for f in postproc.get(rlbls.RUN_FILES, list()):
+            fh = api.workflows().get_result_file(
+                workflow_id=workflow_id,
+                file_id=f[flbls.FILE_ID]
+            )
+            files.append((f[flbls.FILE_NAME], fh))
+    return send_archive(
+        stream_archive(files, compresslevel=compresslevel),
+        basename='results',
+        compresslevel=compresslevel,
+        key=key
     )
 
 
@@ -111,11 +179,4 @@ def get_benchmark_resource(workflow_id, file_id):
             workflow_id=workflow_id,
             file_id=file_id
         )
-        attachment_filename = fh.name
-        mimetype = fh.mime_type
-    return send_file(
-        fh.open(),
-        as_attachment=True,
-        attachment_filename=attachment_filename,
-        mimetype=mimetype
-    )
+    return send_handle(fh, download_name=fh.name, mimetype=fh.mime_type)
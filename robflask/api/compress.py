@@ -0,0 +1,155 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Compression of JSON responses.
+
+The content encoding is negotiated using the Accept-Encoding header of the
+request. Responses are compressed using gzip or, if the optional brotli
+package is installed, brotli. Only JSON responses with a body that exceeds the
+configured minimum size are compressed. Bodies that exceed the streaming
+threshold are compressed in chunks while the response is sent.
+
+Streamed responses (e.g., file downloads, result archives, event streams and
+long-poll requests) are not compressed. Downloads are either compressed
+already (e.g., gzip archives) or are sent directly from the file system.
+"""
+
+from typing import Callable, Iterator, List, Tuple
+
+import zlib
+
+from flask import Response, current_app, request
+
+try:  # pragma: no cover
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+"""Application configuration keys for the compression level and the minimum
+size of compressed response bodies.
+"""
+COMPRESS_LEVEL = 'ROB_COMPRESS_LEVEL'
+COMPRESS_MINSIZE = 'ROB_COMPRESS_MINSIZE'
+
+"""Mimetypes of compressible responses."""
+COMPRESS_MIMETYPES = ['application/json']
+
+"""Bodies that exceed this size (in bytes) are compressed in chunks while the
+response is sent.
+"""
+STREAM_SIZE = 1024 * 1024
+
+"""Size of chunks (in bytes) for compressed response bodies that are sent in
+streaming fashion.
+"""
+CHUNK_SIZE = 64 * 1024
+
+
+def compress_response(response: Response) -> Response:
+    """Compress the body of a JSON response using the content encoding that
+    is preferred by the client. The response is not modified if compression
+    is disabled, if the response is not a JSON response, if the body is
+    smaller than the configured minimum size, or if the client does not
+    accept a supported encoding.
+
+    Parameters
+    ----------
+    response: flask.response_class
+        Response for the current request.
+
+    Returns
+    -------
+    flask.response_class
+    """
+    level = current_app.config.get(COMPRESS_LEVEL, 0)
+    if level <= 0 or response.is_streamed or response.direct_passthrough:
+        return response
+    if response.mimetype not in COMPRESS_MIMETYPES or 'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code < 200 or response.status_code in [204, 304] or request.method == 'HEAD':
+        return response
+    encoding = request.accept_encodings.best_match(encodings())
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < current_app.config.get(COMPRESS_MINSIZE, 0):
+        return response
+    if len(data) > STREAM_SIZE:
+        response.response = compress_chunks(data, encoding=encoding, level=level)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(b''.join(compress_chunks(data, encoding=encoding, level=level)))
+    response.headers['Content-Encoding'] = encoding
+    # The entity tag of the uncompressed body remains valid for conditional
+    # requests. It is marked as weak since the bodies for different content
+    # encodings are not byte-for-byte identical.
+    etag, weak = response.get_etag()
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def compress_chunks(data: bytes, encoding: str, level: int) -> Iterator[bytes]:
+    """Compress the given data in chunks using the given content encoding.
+
+    Parameters
+    ----------
+    data: bytes
+        Uncompressed response body.
+    encoding: string
+        Content encoding ('br' or 'gzip').
+    level: int
+        Compression level (1-9).
+
+    Returns
+    -------
+    iterator of bytes
+    """
+    compress, flush = compressor(encoding=encoding, level=level)
+    for start in range(0, len(data), CHUNK_SIZE):
+        chunk = compress(data[start:start + CHUNK_SIZE])
+        if chunk:
+            yield chunk
+    yield flush()
+
+
+def compressor(encoding: str, level: int) -> Tuple[Callable, Callable]:
+    """Get the compress and flush function of a compressor for the given
+    content encoding.
+
+    Parameters
+    ----------
+    encoding: string
+        Content encoding ('br' or 'gzip').
+    level: int
+        Compression level (1-9).
+
+    Returns
+    -------
+    (callable, callable)
+    """
+    if encoding == 'br':
+        c = brotli.Compressor(mode=brotli.MODE_TEXT, quality=level)
+        return c.process, c.finish
+    # Use window bits 16 + 15 for a gzip header and trailer.
+    c = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return c.compress, c.flush
+
+
+def encodings() -> List[str]:
+    """Get the list of supported content encodings in order of preference.
+
+    Returns
+    -------
+    list of string
+    """
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
@@ -0,0 +1,263 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Helper functions for sending file handles and archives in download
+responses.
+
+Files that are stored on the local file system are sent using Flask's
+``send_file`` for the file path. This allows the WSGI server to use its file
+wrapper (e.g., ``sendfile``) and supports conditional and range requests. All
+other file handles are streamed in chunks of fixed size. Range requests for a
+single byte range are supported for these handles as well if the file size is
+known.
+
+Archives are generated while they are sent and are added to the archive cache
+at the same time. Repeated downloads are served from the cache. The compression of an archive can
+be selected using the query arguments 'compression' (either 'gzip' or 'none')
+and 'level' (the gzip compression level).
+"""
+
+from typing import IO, Iterator, Optional, Tuple
+
+from flask import Response, request, send_file
+
+from flowserv.model.files.base import IOHandle
+from robflask.archive import archive_cache
+from robflask.handle import file_size, local_path
+
+import robflask.config as config
+import robflask.error as err
+
+
+"""Size of chunks (in bytes) for streamed file downloads."""
+CHUNK_SIZE = 64 * 1024
+
+
+def archive_compression() -> Optional[int]:
+    """Get the compression level for an archive download from the query
+    arguments of the current request. Returns None if an uncompressed archive
+    was requested.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    robflask.error.InvalidRequestError
+    """
+    compression = request.args.get('compression', 'gzip').lower()
+    if compression == 'none':
+        return None
+    elif compression != 'gzip':
+        raise err.InvalidRequestError("unknown compression '{}'".format(compression))
+    level = request.args.get('level')
+    if level is None:
+        return config.ARCHIVE_COMPRESSLEVEL()
+    try:
+        level = int(level)
+    except ValueError as ex:
+        raise err.InvalidRequestError(str(ex))
+    if not 0 <= level <= 9:
+        raise err.InvalidRequestError('invalid compression level {}'.format(level))
+    return level
+
+
+def send_archive(
+    chunks: Iterator[bytes], basename: str, compresslevel: Optional[int] = None,
+    key: Optional[str] = None
+) -> Response:
+    """Get response that streams the chunks of a tar archive as an attachment.
+    The compression level determines the attachment file name and mime type.
+    If a cache key is given the archive is added to the archive cache while it
+    is sent.
+
+    Parameters
+    ----------
+    chunks: iterator of bytes
+        Chunks of the archive content.
+    basename: string
+        Name of the attachment file without suffix.
+    compresslevel: int, default=None
+        Compression level for gzip or None for an uncompressed archive.
+    key: string, default=None
+        Optional key for the archive in the archive cache.
+
+    Returns
+    -------
+    flask.response_class
+    """
+    filename, mimetype = archive_attachment(basename, compresslevel)
+    if key is not None:
+        chunks = archive_cache().store(key, chunks)
+    response = Response(chunks, mimetype=mimetype, direct_passthrough=True)
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    return response
+
+
+def send_cached_archive(
+    key: str, basename: str, compresslevel: Optional[int] = None
+) -> Optional[Response]:
+    """Get response that sends the archive with the given key from the archive
+    cache. Returns None if the archive is not in the cache.
+
+    Parameters
+    ----------
+    key: string
+        Unique archive key.
+    basename: string
+        Name of the attachment file without suffix.
+    compresslevel: int, default=None
+        Compression level for gzip or None for an uncompressed archive.
+
+    Returns
+    -------
+    flask.response_class
+    """
+    cached_file = archive_cache().get(key)
+    if cached_file is None:
+        return None
+    filename, mimetype = archive_attachment(basename, compresslevel)
+    return send_file(
+        cached_file,
+        as_attachment=True,
+        download_name=filename,
+        mimetype=mimetype,
+        conditional=True
+    )
+
+
+def send_handle(
+    fh: IOHandle, download_name: str, mimetype: Optional[str] = None
+) -> Response:
+    """Get response that sends the content of the given file handle as an
+    attachment.
+
+    Parameters
+    ----------
+    fh: flowserv.model.files.base.IOHandle
+        Handle for the downloaded file.
+    download_name: string
+        File name for the attachment.
+    mimetype: string, default=None
+        File mime type.
+
+    Returns
+    -------
+    flask.response_class
+    """
+    filename = local_path(fh)
+    if filename is not None:
+        return send_file(
+            filename,
+            as_attachment=True,
+            download_name=download_name,
+            mimetype=mimetype,
+            conditional=True
+        )
+    size = file_size(fh)
+    start, end, status = 0, size, 200
+    # Only requests for a single byte range are supported. Requests that
+    # contain multiple ranges receive the full file.
+    rng = request.range
+    if rng is not None and size is not None and len(rng.ranges) == 1:
+        byte_range = rng.range_for_length(size)
+        if byte_range is None:
+            response = Response(status=416)
+            response.headers['Content-Range'] = 'bytes */{}'.format(size)
+            return response
+        start, end = byte_range
+        status = 206
+    f = fh.open()
+    response = Response(
+        read_chunks(f, start=start, end=end),
+        status=status,
+        mimetype=mimetype if mimetype is not None else 'application/octet-stream',
+        direct_passthrough=True
+    )
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    if size is not None:
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.content_length = end - start
+    if status == 206:
+        response.headers['Content-Range'] = rng.to_content_range_header(size)
+    # Ensure that the file is closed if the response is closed before the
+    # content was read.
+    response.call_on_close(f.close)
+    return response
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def archive_attachment(basename: str, compresslevel: Optional[int] = None) -> Tuple[str, str]:
+    """Get the attachment file name and mime type for an archive.
+
+    Parameters
+    ----------
+    basename: string
+        Name of the attachment file without suffix.
+    compresslevel: int, default=None
+        Compression level for gzip or None for an uncompressed archive.
+
+    Returns
+    -------
+    (string, string)
+    """
+    if compresslevel is not None:
+        return basename + '.tar.gz', 'application/gzip'
+    return basename + '.tar', 'application/x-tar'
+
+
+def read_chunks(
+    f: IO, start: Optional[int] = 0, end: Optional[int] = None,
+    chunk_size: Optional[int] = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Generator that reads the bytes from position start (inclusive) to end
+    (exclusive) of the given file object in chunks of fixed size. Reads until
+    the end of the file if no end position is given. The file is closed when
+    the generator is exhausted or closed.
+
+    Parameters
+    ----------
+    f: file-like object
+        File object that is opened for reading in binary mode.
+    start: int, default=0
+        Start position.
+    end: int, default=None
+        End position.
+    chunk_size: int, default=64KB
+        Maximum number of bytes that are read at once.
+
+    Returns
+    -------
+    iterator of bytes
+    """
+    try:
+        if start > 0:
+            # Skip the bytes before the start position for file objects that
+            # do not support random access.
+            if f.seekable():
+                f.seek(start)
+            else:
+                skip = start
+                while skip > 0:
+                    chunk = f.read(min(chunk_size, skip))
+                    if not chunk:
+                        return
+                    skip -= len(chunk)
+        remaining = end - start if end is not None else None
+        while remaining is None or remaining > 0:
+            n = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = f.read(n)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
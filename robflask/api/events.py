@@ -0,0 +1,379 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Response bodies that wait for run state changes.
+
+Event streams and long-poll responses wait for notifications from the shared
+run watcher. The response bodies support synchronous iteration for WSGI
+servers and asynchronous iteration for the ASGI adapter. Under ASGI, waiting
+clients do not occupy a worker thread.
+
+The response bodies are returned as the application iterable of the WSGI
+response (i.e., in direct passthrough mode). The WSGI server (or the ASGI
+adapter) closes the body when the response is finished or the client
+disconnected. Closing the body removes the subscription from the watcher.
+
+Under WSGI, each open event stream and each waiting long-poll request holds a
+worker thread. With a synchronous worker that has a single thread, one stream
+blocks the whole worker. These endpoints should therefore be served by the
+ASGI adapter, or by a WSGI server with threaded or green-thread workers. The
+number of streams and long-poll requests that wait in worker threads of a
+process is limited. Requests that exceed the limit are rejected with status
+503 and a Retry-After header, so that they do not take the remaining threads
+of the worker. The limit is unbounded by default if the threads of the process
+are green threads (i.e., gevent or eventlet workers), where idle streams are
+cheap.
+"""
+
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import json
+import sys
+import threading
+
+from robflask.leaderboard import TERMINAL_STATES
+from robflask.watcher import Subscription, watcher
+
+import flowserv.view.run as labels
+
+
+"""Interval (in seconds) for keep-alive messages in event streams and the
+reconnection time (in milliseconds) for clients.
+"""
+SSE_HEARTBEAT = 15
+SSE_RETRY = 3000
+
+"""Time (in seconds) after which clients may retry requests that were rejected
+because the stream limit was reached.
+"""
+STREAM_RETRY_AFTER = 5
+
+"""Default maximum number of waiting requests for processes that use operating
+system threads.
+"""
+STREAM_MAX_THREADS = 8
+
+
+class EventStream(object):
+    """Response body that streams run state changes for a given subscription
+    as server-sent events. The stream starts with one event for each of the
+    given runs. The stream for a single run is closed after the run reached a
+    terminal state.
+    """
+    def __init__(self, sub: Subscription, runs: List[Dict], limit: Optional['StreamLimit'] = None):
+        """Initialize the subscription, the runs for the initial events, and
+        the stream limit that the stream holds a slot of.
+
+        Parameters
+        ----------
+        sub: robflask.watcher.Subscription
+            Subscription for run state changes.
+        runs: list of dict
+            List of serialized run descriptors for the initial events.
+        limit: robflask.api.events.StreamLimit, default=None
+            Stream limit. The slot is released when the stream is closed.
+        """
+        self.sub = sub
+        self.runs = runs
+        self.limit = limit
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        """Get the event messages while waiting for notifications in the
+        event loop.
+
+        Returns
+        -------
+        async iterator of bytes
+        """
+        async def generate():
+            try:
+                yield self._retry()
+                events = [(run[labels.RUN_ID], run) for run in self.runs]
+                while True:
+                    for message, done in self._messages(events):
+                        yield message
+                        if done:
+                            return
+                    event = await self.sub.async_get(timeout=SSE_HEARTBEAT)
+                    events = self._next(event)
+                    if events is None:
+                        return
+                    elif not events:
+                        yield b': keep-alive\n\n'
+            finally:
+                self.close()
+
+        return generate()
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Get the event messages while waiting for notifications in the
+        current thread.
+
+        Returns
+        -------
+        iterator of bytes
+        """
+        try:
+            yield self._retry()
+            events = [(run[labels.RUN_ID], run) for run in self.runs]
+            while True:
+                for message, done in self._messages(events):
+                    yield message
+                    if done:
+                        return
+                event = self.sub.get(timeout=SSE_HEARTBEAT)
+                events = self._next(event)
+                if events is None:
+                    return
+                elif not events:
+                    # Send a comment to keep the connection alive and to
+                    # detect disconnected clients.
+                    yield b': keep-alive\n\n'
+        finally:
+            self.close()
+
+    def close(self):
+        """Remove the subscription from the run watcher and release the slot
+        of the stream limit.
+        """
+        watcher().unsubscribe(self.sub)
+        limit, self.limit = self.limit, None
+        if limit is not None:
+            limit.release()
+
+    def _messages(self, events):
+        """Get event messages for a list of (run identifier, run descriptor)
+        pairs. Each message is accompanied by a flag that indicates whether
+        the stream is finished after the message.
+        """
+        for run_id, run in events:
+            done = False
+            if self.sub.run_id is not None:
+                done = run is None or run[labels.RUN_STATE] in TERMINAL_STATES
+            yield sse_message(run_id, run).encode('utf-8'), done
+
+    def _next(self, event):
+        """Get the list of events for a notification. Returns None if the
+        subscription was closed and an empty list if no notification was
+        received.
+        """
+        if event is not None:
+            return [event]
+        elif self.sub.closed:
+            return None
+        return list()
+
+    def _retry(self) -> bytes:
+        """Get the initial message with the client reconnection time."""
+        return 'retry: {}\n\n'.format(SSE_RETRY).encode('utf-8')
+
+
+class LongPoll(object):
+    """Response body for a long-poll request. Waits for a notification for
+    the subscription (or until the timeout expires) before the body is sent.
+    The body contains the identifier of all runs (in the given state) for the
+    subscribed submission.
+    """
+    def __init__(self, sub: Subscription, timeout: float, state: Optional[str] = None):
+        """Initialize the subscription, the wait time, and the optional state
+        filter.
+
+        Parameters
+        ----------
+        sub: robflask.watcher.Subscription
+            Subscription for run state changes.
+        timeout: float
+            Maximum time (in seconds) to wait for a notification.
+        state: string, default=None
+            Only include runs that are in the given state.
+        """
+        self.sub = sub
+        self.timeout = timeout
+        self.state = state
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        """Wait for a notification in the event loop and return the body.
+
+        Returns
+        -------
+        async iterator of bytes
+        """
+        async def generate():
+            try:
+                await self.sub.async_get(timeout=self.timeout)
+            finally:
+                self.close()
+            yield self.body()
+
+        return generate()
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Wait for a notification in the current thread and return the body.
+
+        Returns
+        -------
+        iterator of bytes
+        """
+        try:
+            self.sub.get(timeout=self.timeout)
+        finally:
+            self.close()
+        yield self.body()
+
+    def body(self) -> bytes:
+        """Get the serialized list of run identifiers for the current run
+        states of the subscription.
+
+        Returns
+        -------
+        bytes
+        """
+        runs = self.sub.snapshot()
+        return json.dumps({labels.RUN_LIST: poll_result(runs, self.state)}).encode('utf-8')
+
+    def close(self):
+        """Remove the subscription from the run watcher."""
+        watcher().unsubscribe(self.sub)
+
+
+class StreamLimit(object):
+    """Upper bound for the number of event streams and long-poll requests that
+    wait for run state changes in the worker threads of a process. The limit
+    is shared by all request handlers in a worker process. All methods are
+    thread-safe.
+    """
+    def __init__(self, maxsize: int):
+        """Initialize the maximum number of waiting requests.
+
+        Parameters
+        ----------
+        maxsize: int
+            Maximum number of waiting requests. The number is unbounded if
+            the value is zero.
+        """
+        self.maxsize = maxsize
+        self.active = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Reserve a slot for a waiting request. Returns False if all slots
+        are taken.
+
+        Returns
+        -------
+        bool
+        """
+        with self._lock:
+            if self.maxsize > 0 and self.active >= self.maxsize:
+                self.rejected += 1
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        """Release the slot of a waiting request."""
+        with self._lock:
+            self.active -= 1
+
+    def stats(self) -> Dict:
+        """Get dictionary with the number of waiting and rejected requests.
+
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            return {'active': self.active, 'rejected': self.rejected}
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def green_threads() -> bool:
+    """Test whether the threading module has been monkey-patched to use green
+    threads by gevent or eventlet. The modules are not imported if they have
+    not been loaded by the server.
+
+    Returns
+    -------
+    bool
+    """
+    monkey = sys.modules.get('gevent.monkey')
+    if monkey is not None and monkey.is_module_patched('threading'):
+        return True
+    patcher = sys.modules.get('eventlet.patcher')
+    if patcher is not None and patcher.is_monkey_patched('thread'):
+        return True
+    return False
+
+
+def poll_result(runs: Dict[str, Dict], state: Optional[str] = None) -> List[str]:
+    """Get the identifier of all runs in the given mapping that are in the
+    given state. Includes all runs if the state is None.
+
+    Parameters
+    ----------
+    runs: dict
+        Mapping of run identifier to serialized run descriptors.
+    state: string, default=None
+        Run state identifier.
+
+    Returns
+    -------
+    list of string
+    """
+    return [
+        run_id for run_id, run in runs.items()
+        if state is None or run[labels.RUN_STATE] == state
+    ]
+
+
+def sse_message(run_id: str, run: Optional[Dict]) -> str:
+    """Get server-sent event message for a run state change. Uses the event
+    type 'deleted' if the run descriptor is None.
+
+    Parameters
+    ----------
+    run_id: string
+        Unique run identifier.
+    run: dict
+        Serialized run descriptor.
+
+    Returns
+    -------
+    string
+    """
+    if run is None:
+        return 'event: deleted\ndata: {}\n\n'.format(json.dumps({labels.RUN_ID: run_id}))
+    return 'event: state\ndata: {}\n\n'.format(json.dumps(run))
+
+
+# -- Stream limit singleton ---------------------------------------------------
+
+"""Global stream limit that is used by all request handlers."""
+_limit = None
+
+
+def stream_limit() -> StreamLimit:
+    """Get the global stream limit. The limit is created on first access using
+    the maximum number of streams from the Web API configuration. If no
+    maximum is configured the limit is unbounded for green-thread workers and
+    STREAM_MAX_THREADS otherwise.
+
+    Returns
+    -------
+    robflask.api.events.StreamLimit
+    """
+    global _limit
+    if _limit is None:
+        from robflask.config import STREAM_MAX
+        maxsize = STREAM_MAX()
+        if maxsize is None:
+            maxsize = 0 if green_threads() else STREAM_MAX_THREADS
+        _limit = StreamLimit(maxsize=maxsize)
+    return _limit
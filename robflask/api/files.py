@@ -8,25 +8,48 @@
 
 """Blueprint for uploads and downloads of files that are associated with
 submissions.
+
+Files that exceed the maximum request size are uploaded in chunks using an
+upload session. Chunks are streamed to a staging file. Each chunk is limited by
+the maximum content length of the Flask application. The total file size is
+limited by the maximum upload size of the Web API configuration.
+
+The content of uploaded files is kept in a content-addressed blob store. Files
+with the SHA-256 checksum of content that was uploaded to the submission before
+can be added to the submission without uploading the content again.
 """
 
-from flask import Blueprint, jsonify, make_response, request, send_file
+from typing import Optional
+
+import os
+
+from flask import Blueprint, current_app, jsonify, make_response, request
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import get_input_stream
 
-from flowserv.model.files.base import FlaskFile
-from robflask.api.util import ACCESS_TOKEN
+from flowserv.error import UnauthenticatedAccessError, UnauthorizedAccessError
+from robflask.api.download import send_handle
+from robflask.api.pagination import page_response, paginate, sort_key
+from robflask.api.util import ACCESS_TOKEN, conditional, jsonbody
+from robflask.blob import BlobFile, blob_store
+from robflask.upload import upload_sessions
 
-import robflask.config as config
+import flowserv.view.files as flbls
 import robflask.error as err
+import robflask.upload as labels
 
 
-bp = Blueprint('uploads', __name__, url_prefix=config.API_PATH())
+bp = Blueprint('uploads', __name__)
 
 
 @bp.route('/uploads/<string:group_id>/files', methods=['GET'])
+@conditional
 def list_files(group_id):
     """List all uploaded files fora given submission. The user has to be a
-    member of the submission in order to be allowed to list files.
+    member of the submission in order to be allowed to list files. The
+    listing is paginated if the request contains the query argument 'limit'
+    or 'cursor'. Paginated files are ordered by their name.
     """
     # Get the access token first to raise an error immediately if no token is
     # present (to avoid unnecessarily instantiating the service API).
@@ -35,7 +58,8 @@ def list_files(group_id):
         # Authentication of the user from the expected api_token in the header
         # will fail if no token is given or if the user is not logged in.
         r = api.uploads().list_uploaded_files(group_id=group_id)
-    return make_response(jsonify(r), 200)
+    r, cursor = paginate(r, flbls.FILE_LIST, key=sort_key(flbls.FILE_NAME, flbls.FILE_ID))
+    return page_response(r, cursor)
 
 
 @bp.route('/uploads/<string:group_id>/files', methods=['POST'])
@@ -52,22 +76,182 @@ def upload_file(group_id):
         # A browser may submit a empty part without filename
         if file.filename == '':
             raise err.InvalidRequestError('empty file name')
-        # Save uploaded file to a bytes buffer.
         filename = secure_filename(file.filename)
+        # Write the uploaded file to the blob store. The file content is only
+        # stored once if the same file was uploaded before.
+        checksum, blobfile = blob_store().write(file.stream)
         from robflask.service import service
         with service(access_token=token) as api:
             # Authentication of the user from the expected api_token in the
             # header will fail if the user is not logged in.
             r = api.uploads().upload_file(
                 group_id=group_id,
-                file=FlaskFile(file),
+                file=BlobFile(blobfile),
                 name=filename
             )
+        r[labels.UPLOAD_CHECKSUM] = checksum
         return make_response(jsonify(r), 201)
     else:
         raise err.InvalidRequestError('no file request')
 
 
+@bp.route('/uploads/<string:group_id>/blobs/<string:checksum>', methods=['GET'])
+def get_blob(group_id, checksum):
+    """Check whether a file with the given SHA-256 checksum has been uploaded
+    to the submission before. Clients use a HEAD request to avoid uploading a
+    file whose content is already stored on the server. The user has to be a
+    member of the submission. Content that was only uploaded to other
+    submissions is reported as unknown.
+    """
+    from robflask.service import service
+    with service(access_token=ACCESS_TOKEN(request)) as api:
+        blobfile = group_blob(api, group_id=group_id, checksum=checksum)
+    if blobfile is None:
+        raise err.UnknownBlobError(checksum)
+    doc = {labels.UPLOAD_CHECKSUM: checksum.lower(), labels.UPLOAD_SIZE: os.path.getsize(blobfile)}
+    return make_response(jsonify(doc), 200)
+
+
+@bp.route('/uploads/<string:group_id>/blobs/<string:checksum>', methods=['POST'])
+def upload_blob(group_id, checksum):
+    """Upload a file for a submission by referencing the SHA-256 checksum of
+    content that has been uploaded to the submission before. The request body
+    contains the name of the uploaded file. The user has to be a member of the
+    submission in order to be allowed to upload files.
+    """
+    token = ACCESS_TOKEN(request)
+    obj = jsonbody(request, mandatory=[labels.UPLOAD_NAME])
+    filename = secure_filename(obj[labels.UPLOAD_NAME])
+    if filename == '':
+        raise err.InvalidRequestError('empty file name')
+    from robflask.service import service
+    with service(access_token=token) as api:
+        blobfile = group_blob(api, group_id=group_id, checksum=checksum)
+        if blobfile is None:
+            raise err.UnknownBlobError(checksum)
+        r = api.uploads().upload_file(
+            group_id=group_id,
+            file=BlobFile(blobfile),
+            name=filename
+        )
+    r[labels.UPLOAD_CHECKSUM] = checksum.lower()
+    return make_response(jsonify(r), 201)
+
+
+@bp.route('/uploads/<string:group_id>/sessions', methods=['POST'])
+def create_upload_session(group_id):
+    """Start a resumable chunked upload for a file that is part of a given
+    submission. The request body contains the file name and the (optional)
+    file size. The user has to be a member of the submission in order to be
+    allowed to upload files.
+    """
+    # Get the access token first to raise an error immediately if no token is
+    # present (to avoid unnecessarily instantiating the service API).
+    token = ACCESS_TOKEN(request)
+    obj = jsonbody(request, mandatory=[labels.UPLOAD_NAME], optional=[labels.UPLOAD_SIZE])
+    filename = secure_filename(obj[labels.UPLOAD_NAME])
+    if filename == '':
+        raise err.InvalidRequestError('empty file name')
+    size = obj.get(labels.UPLOAD_SIZE)
+    if size is not None and (not isinstance(size, int) or size < 0):
+        raise err.InvalidRequestError('invalid file size {}'.format(size))
+    from robflask.service import service
+    user_id = service.authenticate(token)
+    if user_id is None:
+        raise UnauthenticatedAccessError()
+    with service(access_token=token) as api:
+        # Listing the uploaded files verifies that the user is a member of
+        # the submission.
+        api.uploads().list_uploaded_files(group_id=group_id)
+    doc = upload_sessions().create(group_id=group_id, user_id=user_id, name=filename, size=size)
+    return make_response(jsonify(doc), 201)
+
+
+@bp.route(
+    '/uploads/<string:group_id>/sessions/<string:session_id>',
+    methods=['GET']
+)
+def get_upload_session(group_id, session_id):
+    """Get the upload session handle. The offset in the response is the number
+    of bytes that have been received. It is used by the client to resume an
+    interrupted upload.
+    """
+    session_handle(ACCESS_TOKEN(request), group_id, session_id)
+    return make_response(jsonify(upload_sessions().get(session_id)), 200)
+
+
+@bp.route(
+    '/uploads/<string:group_id>/sessions/<string:session_id>',
+    methods=['PUT']
+)
+def upload_chunk(group_id, session_id):
+    """Upload the next chunk of a file. The raw request body contains the
+    chunk data. The position of the chunk in the uploaded file is given by
+    the query argument 'offset'. Chunks that do not start at the current end
+    of the uploaded data are rejected with status code 409. Chunks that
+    exceed the maximum request size are rejected with status code 413.
+    """
+    doc = session_handle(ACCESS_TOKEN(request), group_id, session_id)
+    try:
+        offset = int(request.args.get(labels.UPLOAD_OFFSET, doc[labels.UPLOAD_OFFSET]))
+    except ValueError as ex:
+        raise err.InvalidRequestError(str(ex))
+    # Read the request body from the WSGI input stream directly. Each chunk is
+    # limited by the maximum content length of the application. Chunks with a
+    # larger declared size are rejected before they are read.
+    limit = current_app.config.get('MAX_CONTENT_LENGTH')
+    if limit is not None and request.content_length is not None and request.content_length > limit:
+        raise RequestEntityTooLarge()
+    stream = get_input_stream(request.environ)
+    doc = upload_sessions().write(session_id=session_id, offset=offset, stream=stream, limit=limit)
+    return make_response(jsonify(doc), 200)
+
+
+@bp.route(
+    '/uploads/<string:group_id>/sessions/<string:session_id>',
+    methods=['POST']
+)
+def complete_upload(group_id, session_id):
+    """Complete a chunked upload. The uploaded file is added to the files of
+    the submission. If the request body contains a checksum it is compared to
+    the SHA-256 checksum of the uploaded data.
+    """
+    token = ACCESS_TOKEN(request)
+    doc = session_handle(token, group_id, session_id)
+    obj = jsonbody(request, optional=[labels.UPLOAD_CHECKSUM]) if request.data else dict()
+    sessions = upload_sessions()
+    size = doc.get(labels.UPLOAD_SIZE)
+    if size is not None and doc[labels.UPLOAD_OFFSET] != size:
+        msg = 'incomplete upload ({} of {} bytes)'
+        raise err.InvalidRequestError(msg.format(doc[labels.UPLOAD_OFFSET], size))
+    checksum = sessions.checksum(session_id)
+    expected = obj.get(labels.UPLOAD_CHECKSUM)
+    if expected is not None and expected.lower() != checksum:
+        raise err.InvalidRequestError('checksum mismatch')
+    blobfile = blob_store().add(sessions.datafile(session_id), checksum)
+    sessions.delete(session_id)
+    from robflask.service import service
+    with service(access_token=token) as api:
+        r = api.uploads().upload_file(
+            group_id=group_id,
+            file=BlobFile(blobfile),
+            name=doc[labels.UPLOAD_NAME]
+        )
+    r[labels.UPLOAD_CHECKSUM] = checksum
+    return make_response(jsonify(r), 201)
+
+
+@bp.route(
+    '/uploads/<string:group_id>/sessions/<string:session_id>',
+    methods=['DELETE']
+)
+def delete_upload_session(group_id, session_id):
+    """Cancel a chunked upload and remove all uploaded data."""
+    session_handle(ACCESS_TOKEN(request), group_id, session_id)
+    upload_sessions().delete(session_id)
+    return make_response(jsonify(dict()), 204)
+
+
 @bp.route(
     '/uploads/<string:group_id>/files/<string:file_id>',
     methods=['GET']
@@ -81,12 +265,7 @@ def download_file(group_id, file_id):
     from robflask.service import service
     with service() as api:
         fh = api.uploads().get_uploaded_file_handle(group_id=group_id, file_id=file_id)
-        return send_file(
-            fh.open(),
-            as_attachment=True,
-            attachment_filename=fh.name,
-            mimetype=fh.mime_type
-        )
+    return send_handle(fh, download_name=fh.name, mimetype=fh.mime_type)
 
 
 @bp.route(
@@ -104,3 +283,81 @@ def delete_file(group_id, file_id):
         # will fail if no token is given or if the user is not logged in.
         api.uploads().delete_file(group_id=group_id, file_id=file_id)
     return make_response(jsonify(dict()), 204)
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def group_blob(api, group_id: str, checksum: str) -> Optional[str]:
+    """Get path to the blob file for the given checksum if the blob is linked
+    to an uploaded file of the given submission. Returns None if the content
+    was not uploaded to the submission (or if the uploaded file is a copy of
+    the blob). Listing the uploaded files verifies that the user is a member
+    of the submission.
+
+    Parameters
+    ----------
+    api: flowserv.service.api.API
+        Service API for the authenticated user.
+    group_id: string
+        Unique submission identifier.
+    checksum: string
+        Hex digest of the SHA-256 checksum for the file content.
+
+    Returns
+    -------
+    string
+
+    Raises
+    ------
+    flowserv.error.UnauthorizedAccessError
+    flowserv.error.UnknownWorkflowGroupError
+    """
+    files = api.uploads().list_uploaded_files(group_id=group_id)[flbls.FILE_LIST]
+    blobfile = blob_store().get(checksum)
+    if blobfile is None:
+        return None
+    size = os.path.getsize(blobfile)
+    for f in files:
+        if f.get(flbls.FILE_SIZE) != size:
+            continue
+        fh = api.uploads().get_uploaded_file_handle(group_id=group_id, file_id=f[flbls.FILE_ID])
+        filename = getattr(fh.fileobj, 'filename', None)
+        if filename is not None and os.path.isfile(filename) and os.path.samefile(filename, blobfile):
+            return blobfile
+    return None
+
+
+def session_handle(token: str, group_id: str, session_id: str) -> dict:
+    """Get the serialized upload session with the given identifier. Ensures
+    that the session belongs to the given submission and that it was created
+    by the user that is identified by the access token.
+
+    Parameters
+    ----------
+    token: string
+        User access token.
+    group_id: string
+        Unique submission identifier.
+    session_id: string
+        Unique upload session identifier.
+
+    Returns
+    -------
+    dict
+
+    Raises
+    ------
+    flowserv.error.UnauthenticatedAccessError
+    flowserv.error.UnauthorizedAccessError
+    robflask.error.UnknownUploadSessionError
+    """
+    from robflask.service import service
+    user_id = service.authenticate(token)
+    if user_id is None:
+        raise UnauthenticatedAccessError()
+    doc = upload_sessions().get(session_id)
+    if doc[labels.UPLOAD_GROUP] != group_id:
+        raise err.UnknownUploadSessionError(session_id)
+    if doc[labels.UPLOAD_USER] != user_id:
+        raise UnauthorizedAccessError()
+    return doc
@@ -0,0 +1,164 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""JSON providers for the Flask application.
+
+Request handlers serialize their responses using ``jsonify``. The JSON
+provider of the application that is used by ``jsonify`` is selected by the
+Web API configuration. The 'orjson' provider uses the optional orjson package
+which serializes large documents (e.g., leader boards and run listings)
+considerably faster than the JSON module of the standard library. The
+application falls back to the standard library provider if orjson is not
+installed.
+"""
+
+from typing import Any, Optional
+
+import logging
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from robflask.metrics import PHASE_SERIALIZE, phase
+
+try:  # pragma: no cover
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+"""Identifier for the supported JSON providers."""
+JSON_ORJSON = 'orjson'
+JSON_STDLIB = 'json'
+
+JSON_PROVIDERS = [JSON_ORJSON, JSON_STDLIB]
+
+
+if orjson is not None:  # pragma: no cover
+    class OrjsonProvider(DefaultJSONProvider):
+        """JSON provider that serializes responses using orjson. Follows the
+        configuration of the default provider for sorting keys and for
+        indenting the output. Objects that orjson does not serialize natively
+        are serialized by the default function of the default provider.
+        """
+        def dumps(self, obj: Any, **kwargs) -> str:
+            """Serialize the given object as a JSON string.
+
+            Parameters
+            ----------
+            obj: any
+                Serialized object.
+
+            Returns
+            -------
+            string
+            """
+            option = self._options(
+                sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                indent=bool(kwargs.get('indent'))
+            )
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+        def loads(self, s: Any, **kwargs) -> Any:
+            """Deserialize the given JSON string or bytes.
+
+            Parameters
+            ----------
+            s: string or bytes
+                JSON document.
+
+            Returns
+            -------
+            any
+            """
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            """Get a JSON response for the given arguments (see ``jsonify``).
+            The serialized document is passed to the response as bytes.
+
+            Returns
+            -------
+            flask.response_class
+            """
+            with phase(PHASE_SERIALIZE):
+                return self._response(*args, **kwargs)
+
+        def _response(self, *args, **kwargs):
+            """Get a JSON response for the given arguments."""
+            obj = self._prepare_response_obj(args, kwargs)
+            # Responses are indented in debug mode unless compact output is
+            # enforced (same as for the default provider).
+            indent = not (self.compact or (self.compact is None and not self._app.debug))
+            data = orjson.dumps(obj, default=self.default, option=self._options(self.sort_keys, indent))
+            if indent:
+                data += b'\n'
+            return self._app.response_class(data, mimetype=self.mimetype)
+
+        def _options(self, sort_keys: bool, indent: bool) -> int:
+            """Get the orjson options for sorting keys and indenting the
+            output.
+
+            Returns
+            -------
+            int
+            """
+            option = orjson.OPT_NON_STR_KEYS
+            if sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return option
+else:  # pragma: no cover
+    OrjsonProvider = None
+
+
+class StdlibProvider(DefaultJSONProvider):
+    """Default JSON provider that records the time for serializing JSON
+    responses in the request metrics.
+    """
+    def response(self, *args, **kwargs):
+        """Get a JSON response for the given arguments (see ``jsonify``).
+
+        Returns
+        -------
+        flask.response_class
+        """
+        with phase(PHASE_SERIALIZE):
+            return super(StdlibProvider, self).response(*args, **kwargs)
+
+
+def init_json(app: Flask, provider: Optional[str] = JSON_ORJSON) -> str:
+    """Set the JSON provider for the given application. Falls back to the
+    standard library provider if the selected provider is not available.
+    Returns the identifier of the provider that is used.
+
+    Parameters
+    ----------
+    app: flask.Flask
+        Flask application.
+    provider: string, default='orjson'
+        Identifier of the selected JSON provider.
+
+    Returns
+    -------
+    string
+
+    Raises
+    ------
+    ValueError
+    """
+    if provider not in JSON_PROVIDERS:
+        raise ValueError("unknown JSON provider '{}'".format(provider))
+    if provider == JSON_ORJSON:
+        if OrjsonProvider is not None:
+            app.json = OrjsonProvider(app)
+            return JSON_ORJSON
+        logging.info('orjson is not available; using standard library JSON provider')
+    app.json = StdlibProvider(app)
+    return JSON_STDLIB
@@ -0,0 +1,24 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Blueprint for the request metrics endpoint."""
+
+from flask import Blueprint, Response
+
+from robflask.metrics import metrics
+
+
+bp = Blueprint('metrics', __name__)
+
+
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Get the request metrics and the cache statistics in the Prometheus
+    text exposition format.
+    """
+    return Response(metrics().exposition(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,195 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Cursor-based pagination for listing endpoints.
+
+Listing endpoints return a single page of the listing if the request contains
+the query argument 'limit' (maximum number of items on the page) or 'cursor'
+(position after the last item on the previous page). Listings are ordered by
+a sort key that is unique for each item (e.g., the creation time and the item
+identifier). The cursor encodes the sort key of the last item on a page. The
+next page therefore starts at the correct position even if items were added
+to or removed from the listing in between.
+
+The link to the next page is contained in the 'Link' header of the response.
+No link is included for the last page. Requests without pagination arguments
+return the full listing.
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+import base64
+import bisect
+import json
+
+from flask import Response, jsonify, make_response, request
+
+import robflask.error as err
+
+
+"""Default and maximum number of items on a page."""
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+"""Query arguments for pagination."""
+PAGE_CURSOR = 'cursor'
+PAGE_LIMIT = 'limit'
+
+
+def decode_cursor(cursor: str) -> Tuple:
+    """Get the sort key that is encoded in the given cursor.
+
+    Parameters
+    ----------
+    cursor: string
+        Cursor for a listing page.
+
+    Returns
+    -------
+    tuple
+
+    Raises
+    ------
+    robflask.error.InvalidRequestError
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(cursor + padding).decode('utf-8'))
+        if not isinstance(key, list) or not all(isinstance(k, str) for k in key):
+            raise ValueError('invalid sort key')
+    except ValueError:
+        raise err.InvalidRequestError("invalid cursor '{}'".format(cursor))
+    return tuple(key)
+
+
+def encode_cursor(key: Tuple) -> str:
+    """Get the cursor for a page that ends with an item with the given sort
+    key.
+
+    Parameters
+    ----------
+    key: tuple
+        Sort key of the last item on a page.
+
+    Returns
+    -------
+    string
+    """
+    data = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('utf-8').rstrip('=')
+
+
+def page_args() -> Tuple[Optional[int], Optional[Tuple]]:
+    """Get the page size and the decoded cursor from the query arguments of
+    the current request. Returns (None, None) if the request does not contain
+    pagination arguments.
+
+    Returns
+    -------
+    (int, tuple)
+
+    Raises
+    ------
+    robflask.error.InvalidRequestError
+    """
+    limit = request.args.get(PAGE_LIMIT)
+    cursor = request.args.get(PAGE_CURSOR)
+    if limit is None and cursor is None:
+        return None, None
+    try:
+        limit = DEFAULT_PAGE_SIZE if limit is None else int(limit)
+    except ValueError as ex:
+        raise err.InvalidRequestError(str(ex))
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise err.InvalidRequestError('limit must be between 1 and {}'.format(MAX_PAGE_SIZE))
+    return limit, decode_cursor(cursor) if cursor is not None else None
+
+
+def paginate(doc: Dict, label: str, key: Callable) -> Tuple[Dict, Optional[str]]:
+    """Get the page of the listing in the given response document that is
+    selected by the pagination arguments of the current request. Returns the
+    modified document and the cursor for the next page. The cursor is None if
+    the page is the last page or if the request does not contain pagination
+    arguments.
+
+    Parameters
+    ----------
+    doc: dict
+        Serialized listing.
+    label: string
+        Key for the list of items in the listing.
+    key: callable
+        Function that returns the sort key (a tuple of strings) for an item.
+
+    Returns
+    -------
+    (dict, string)
+
+    Raises
+    ------
+    robflask.error.InvalidRequestError
+    """
+    limit, cursor = page_args()
+    if limit is None:
+        return doc, None
+    items = sorted(doc[label], key=key)
+    start = 0
+    if cursor is not None:
+        start = bisect.bisect_right([key(item) for item in items], cursor)
+    page = items[start:start + limit]
+    next_cursor = None
+    if start + limit < len(items):
+        next_cursor = encode_cursor(key(page[-1]))
+    doc = dict(doc)
+    doc[label] = page
+    return doc, next_cursor
+
+
+def page_response(doc: Dict, cursor: Optional[str] = None) -> Response:
+    """Get JSON response for a listing page. Adds the link to the next page
+    if a cursor is given.
+
+    Parameters
+    ----------
+    doc: dict
+        Serialized listing page.
+    cursor: string, default=None
+        Cursor for the next page.
+
+    Returns
+    -------
+    flask.response_class
+    """
+    response = make_response(jsonify(doc), 200)
+    if cursor is not None:
+        args = request.args.to_dict(flat=False)
+        args[PAGE_CURSOR] = [cursor]
+        url = '{}?{}'.format(request.base_url, urlencode(args, doseq=True))
+        response.headers['Link'] = '<{}>; rel="next"'.format(url)
+    return response
+
+
+def sort_key(*labels: str) -> Callable:
+    """Get function that returns the sort key for a serialized item. The sort
+    key is the tuple of the item values for the given labels. Missing values
+    are replaced by the empty string.
+
+    Parameters
+    ----------
+    labels: string
+        Labels for the item values in the sort key.
+
+    Returns
+    -------
+    callable
+    """
+    def key(item: Dict) -> Tuple[str, ...]:
+        return tuple(str(item.get(label) or '') for label in labels)
+
+    return key
@@ -8,24 +8,61 @@
 
 """Blueprint for submission runs and run results."""
 
-from flask import Blueprint, jsonify, make_response, request, send_file
+from typing import Dict, List, Optional
 
-from flowserv.error import UnknownParameterError
-from robflask.api.util import ACCESS_TOKEN, jsonbody
+import logging
 
+from flask import Blueprint, Response, jsonify, make_response, request
+
+from sqlalchemy.orm import selectinload
+
+from flowserv.error import UnauthorizedAccessError, UnknownObjectError, UnknownParameterError
+from flowserv.model.base import RunObject
+from robflask.api.download import archive_compression, read_chunks, send_archive, send_cached_archive, send_handle
+from robflask.api.events import STREAM_RETRY_AFTER, EventStream, LongPoll, StreamLimit, poll_result, stream_limit
+from robflask.api.pagination import page_response, paginate, sort_key
+from robflask.api.util import ACCESS_TOKEN, conditional, is_async, jsonbody, last_modified
+from robflask.archive import archive_cache, archive_key, archive_prefix, stream_archive
+from robflask.leaderboard import TERMINAL_STATES, cache
+from robflask.logger import EVENT_DOWNLOAD
+from robflask.tracing import span
+from robflask.watcher import watcher
+
+import flowserv.model.workflow.state as st
 import flowserv.util as util
+import flowserv.view.files as flbls
 import flowserv.view.run as labels
 import robflask.config as config
 import robflask.error as err
 
 
-bp = Blueprint('runs', __name__, url_prefix=config.API_PATH())
+bp = Blueprint('runs', __name__)
+
+
+"""List of valid run state identifier."""
+RUN_STATES = [st.STATE_PENDING, st.STATE_RUNNING] + TERMINAL_STATES
+
+"""Maximum number of runs in a batch status request."""
+MAX_STATUS_RUNS = 1000
+
+"""Projections for run handles in batch status responses. The compact
+projection only contains the run state and timestamps.
+"""
+PROJECTION_COMPACT = 'compact'
+PROJECTION_FULL = 'full'
+
+"""Labels for batch status requests and responses."""
+STATUS_MISSING = 'missing'
+STATUS_PROJECTION = 'projection'
 
 
 @bp.route('/groups/<string:group_id>/runs', methods=['GET'])
+@conditional
 def list_runs(group_id):
     """Get a listing of all runs for a given submission. The user has to be a
-    submission member in order to be authorized to list the runs.
+    submission member in order to be authorized to list the runs. The listing
+    is paginated if the request contains the query argument 'limit' or
+    'cursor'. Paginated runs are ordered by their creation time.
     """
     # Get the access token first to raise an error immediately if no token is
     # present (to avoid unnecessarily instantiating the service API).
@@ -34,9 +71,108 @@ def list_runs(group_id):
         # Authentication of the user from the expected api_token in the header
         # will fail if no token is given or if the user is not logged in.
         r = api.runs().list_runs(group_id=group_id)
+        # Notify the leader board cache about the observed run states.
+        for run in r[labels.RUN_LIST]:
+            cache().run_state(run, api=api)
+    r, cursor = paginate(r, labels.RUN_LIST, key=sort_key(labels.RUN_CREATED, labels.RUN_ID))
+    return page_response(r, cursor)
+
+
+@bp.route('/groups/<string:group_id>/runs/poll', methods=['GET'])
+@conditional
+def poll_runs(group_id):
+    """Get the identifier of all runs for a given submission that are in the
+    state that is specified by the optional query argument 'state'. The user
+    has to be a submission member in order to be authorized to poll the runs.
+
+    If the query argument 'wait' is given the request is held until the state
+    of a submission run changes or until the given number of seconds have
+    passed (long-polling). The maximum wait time is limited by the Web API
+    configuration. When the API is served by the ASGI adapter the request
+    waits in the event loop instead of occupying a worker thread. Otherwise,
+    the request is rejected with status 503 if the maximum number of waiting
+    requests for the worker process is reached.
+
+    Parameters
+    ----------
+    group_id: string
+        Unique submission identifier
+
+    Returns
+    -------
+    flask.response_class
+
+    Raises
+    ------
+    flowserv.error.UnauthenticatedAccessError
+    flowserv.error.UnauthorizedAccessError
+    flowserv.error.UnknownWorkflowGroupError
+    robflask.error.InvalidRequestError
+    robflask.error.ServiceUnavailableError
+    """
+    # Get the access token first to raise an error immediately if no token is
+    # present (to avoid unnecessarily instantiating the service API).
+    token = ACCESS_TOKEN(request)
+    state = request.args.get('state')
+    if state is not None and state not in RUN_STATES:
+        raise err.InvalidRequestError("unknown run state '{}'".format(state))
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError as ex:
+        raise err.InvalidRequestError(str(ex))
+    wait = min(max(wait, 0), config.POLL_MAX_WAIT())
+    runs = group_runs(token=token, group_id=group_id)
+    if wait > 0:
+        # Wait for a notification from the shared run watcher. The watcher
+        # notifies the subscriber immediately if it has seen a more recent
+        # state for any of the runs.
+        if is_async(request):
+            sub = watcher().subscribe(group_id=group_id, token=token, runs=runs)
+            # The response body is generated after the wait is over. The body
+            # is not known in advance and the response is therefore not
+            # conditional.
+            return long_poll(LongPoll(sub=sub, timeout=wait, state=state))
+        limit = acquire_stream()
+        try:
+            sub = watcher().subscribe(group_id=group_id, token=token, runs=runs)
+            try:
+                sub.get(timeout=wait)
+            finally:
+                watcher().unsubscribe(sub)
+        finally:
+            limit.release()
+        runs = sub.snapshot()
+    r = {labels.RUN_LIST: poll_result(runs, state)}
     return make_response(jsonify(r), 200)
 
 
+@bp.route('/groups/<string:group_id>/runs/events', methods=['GET'])
+def stream_group_runs(group_id):
+    """Stream state changes for all runs of a given submission as server-sent
+    events. The user has to be a submission member in order to be authorized
+    to receive the events.
+
+    Parameters
+    ----------
+    group_id: string
+        Unique submission identifier
+
+    Returns
+    -------
+    flask.response_class
+
+    Raises
+    ------
+    flowserv.error.UnauthenticatedAccessError
+    flowserv.error.UnauthorizedAccessError
+    flowserv.error.UnknownWorkflowGroupError
+    robflask.error.ServiceUnavailableError
+    """
+    token = ACCESS_TOKEN(request)
+    runs = group_runs(token=token, group_id=group_id)
+    return event_stream(group_id=group_id, token=token, runs=runs, initial=list(runs.values()))
+
+
 @bp.route('/groups/<string:group_id>/runs', methods=['POST'])
 def start_run(group_id):
     """Start a new run. Expects argument values for each mandatory benchmark
@@ -55,7 +191,10 @@ def start_run(group_id):
         # Authentication of the user from the expected api_token in the header
         # will fail if no token is given or if the user is not logged in.
         try:
-            r = api.runs().start_run(group_id=group_id, arguments=args)
+            # Record the submission of the run to the workflow engine as a
+            # separate span of the request trace.
+            with span('flowserv.start_run', attributes={'rob.group_id': group_id}):
+                r = api.runs().start_run(group_id=group_id, arguments=args)
         except UnknownParameterError as ex:
             # Convert unknown parameter errors into invalid request errors
             # to avoid sending a 404 response
@@ -64,6 +203,7 @@ def start_run(group_id):
 
 
 @bp.route('/runs/<string:run_id>', methods=['GET'])
+@conditional
 def get_run(run_id):
     """Get handle for a given run. The user has to be a member of the run
     submission in order to be authorized to access the run.
@@ -90,9 +230,101 @@ def get_run(run_id):
         # Authentication of the user from the expected api_token in the header
         # will fail if no token is given or if the user is not logged in.
         r = api.runs().get_run(run_id=run_id)
+        cache().run_state(r, api=api)
+    response = make_response(jsonify(r), 200)
+    # The handle for a run in a terminal state does not change anymore. Use
+    # the time when the run finished as the last modification time. Active
+    # runs are only validated using the entity tag since their state may change
+    # more than once within the one second resolution of HTTP dates.
+    if r.get(labels.RUN_STATE) in TERMINAL_STATES:
+        response.last_modified = last_modified([
+            r.get(labels.RUN_CREATED),
+            r.get(labels.RUN_STARTED),
+            r.get(labels.RUN_FINISHED)
+        ])
+    return response
+
+
+@bp.route('/runs/status', methods=['POST'])
+def get_run_status():
+    """Get handles for a list of runs. Expects the list of run identifier in
+    the request body. The optional element 'projection' selects either the
+    full run handles ('full') or only the run state and timestamps
+    ('compact').
+
+    Runs that do not exist or that the user is not authorized to access are
+    listed as missing in the response. All runs are retrieved using a single
+    service API instance, i.e., the access token is validated once for the
+    whole request. The run handles are retrieved with a single query.
+
+    Returns
+    -------
+    flask.response_class
+
+    Raises
+    ------
+    flowserv.error.UnauthenticatedAccessError
+    robflask.error.InvalidRequestError
+    """
+    # Get the access token first to raise an error immediately if no token is
+    # present (to avoid unnecessarily instantiating the service API).
+    token = ACCESS_TOKEN(request)
+    obj = jsonbody(request, mandatory=[labels.RUN_LIST], optional=[STATUS_PROJECTION])
+    run_ids = obj[labels.RUN_LIST]
+    if not isinstance(run_ids, list) or not all(isinstance(r, str) for r in run_ids):
+        raise err.InvalidRequestError('expected list of run identifier')
+    if len(run_ids) > MAX_STATUS_RUNS:
+        raise err.InvalidRequestError('too many runs (max. {})'.format(MAX_STATUS_RUNS))
+    projection = obj.get(STATUS_PROJECTION, PROJECTION_FULL)
+    if projection not in [PROJECTION_COMPACT, PROJECTION_FULL]:
+        raise err.InvalidRequestError("unknown projection '{}'".format(projection))
+    from robflask.service import service
+    with service(access_token=token) as api:
+        runs = run_status(api, run_ids=run_ids, compact=projection == PROJECTION_COMPACT)
+    r = {
+        labels.RUN_LIST: [runs[run_id] for run_id in run_ids if run_id in runs],
+        STATUS_MISSING: [run_id for run_id in run_ids if run_id not in runs]
+    }
     return make_response(jsonify(r), 200)
 
 
+@bp.route('/runs/<string:run_id>/events', methods=['GET'])
+def stream_run(run_id):
+    """Stream state changes for a given run as server-sent events. The stream
+    is closed after the run reached a terminal state. The user has to be a
+    member of the run submission in order to be authorized to receive the
+    events.
+
+    Parameters
+    ----------
+    run_id: string
+        Unique run identifier
+
+    Returns
+    -------
+    flask.response_class
+
+    Raises
+    ------
+    flowserv.error.UnauthenticatedAccessError
+    flowserv.error.UnauthorizedAccessError
+    flowserv.error.UnknownRunError
+    robflask.error.ServiceUnavailableError
+    """
+    token = ACCESS_TOKEN(request)
+    from robflask.service import service
+    with service(access_token=token) as api:
+        run = api.runs().get_run(run_id=run_id)
+    runs = group_runs(token=token, group_id=run[labels.RUN_GROUP])
+    return event_stream(
+        group_id=run[labels.RUN_GROUP],
+        token=token,
+        runs=runs,
+        initial=[runs.get(run_id, run)],
+        run_id=run_id
+    )
+
+
 @bp.route('/runs/<string:run_id>', methods=['DELETE'])
 def delete_run(run_id):
     """Delete the run with the given identifier. The user has to be a member of
@@ -119,7 +351,12 @@ def delete_run(run_id):
     with service(access_token=ACCESS_TOKEN(request)) as api:
         # Authentication of the user from the expected api_token in the header
         # will fail if no token is given or if the user is not logged in.
+        # Get the run handle first to be able to invalidate cached leader
+        # boards that include the results of the deleted run.
+        r = api.runs().get_run(run_id=run_id)
         api.runs().delete_run(run_id=run_id)
+    cache().run_deleted(r)
+    archive_cache().remove(archive_prefix('run', run_id))
     return make_response(jsonify(dict()), 204)
 
 
@@ -149,10 +386,11 @@ def cancel_run(run_id):
     # If the body contains a Json object verify that the object has the
     # mandatory element 'reason'
     reason = None
-    if request.json:
+    body = request.get_json(silent=True)
+    if body:
         try:
             obj = util.validate_doc(
-                request.json,
+                body,
                 mandatory=['reason']
             )
             reason = obj['reason']
@@ -166,6 +404,7 @@ def cancel_run(run_id):
             run_id=run_id,
             reason=reason
         )
+        cache().run_state(r, api=api)
     return make_response(jsonify(r), 200)
 
 
@@ -175,7 +414,10 @@ def download_result_archive(run_id):
     generated by a given workflow run.
 
     NOTE: At this point, the user is not authenticated for file downloads to
-    allow download in the GUI via browser redirect.
+    allow download in the GUI via browser redirect. If the request contains
+    an access token the archive is generated while it is sent. The query
+    arguments 'compression' and 'level' select the archive compression for
+    these requests.
 
     Parameters
     ----------
@@ -189,16 +431,36 @@ def download_result_archive(run_id):
     Raises
     ------
     flowserv.error.UnknownWorkflowGroupError
+    robflask.error.InvalidRequestError
     """
+    # The list of run result files is only accessible for members of the run
+    # submission. The archive is generated by the Web API if the request
+    # contains a valid access token. Otherwise, the archive that is generated
+    # by the service API is sent (which is always gzip compressed).
+    token = ACCESS_TOKEN(request, raise_error=False)
+    if token is not None:
+        compresslevel = archive_compression()
+    else:
+        compresslevel = config.ARCHIVE_COMPRESSLEVEL()
+    # Archives of finished runs do not change. Send the cached archive if it
+    # exists.
+    key = archive_key('run', run_id, compresslevel)
+    response = send_cached_archive(key, basename='run', compresslevel=compresslevel)
+    if response is not None:
+        return response
     from robflask.service import service
-    with service() as api:
-        ioBuffer = api.runs().get_result_archive(run_id=run_id)
-        return send_file(
-            ioBuffer.open(),
-            as_attachment=True,
-            attachment_filename='run.tar.gz',
-            mimetype='application/gzip'
-        )
+    with service(access_token=token) as api:
+        run = api.runs().get_run(run_id=run_id) if token is not None else None
+        if run is None or run[labels.RUN_STATE] != st.STATE_SUCCESS:
+            fh = api.runs().get_result_archive(run_id=run_id)
+            chunks = read_chunks(fh.open())
+        else:
+            files = list()
+            for f in run.get(labels.RUN_FILES, list()):
+                fh = api.runs().get_result_file(run_id=run_id, file_id=f[flbls.FILE_ID])
+                files.append((f[flbls.FILE_NAME], fh))
+            chunks = stream_archive(files, compresslevel=compresslevel)
+    return send_archive(chunks, basename='run', compresslevel=compresslevel, key=key)
 
 
 @bp.route('/runs/<string:run_id>/downloads/files/<string:file_id>')
@@ -227,15 +489,239 @@ def download_result_file(run_id, file_id):
     flowserv.error.UnauthorizedAccessError
     flowserv.error.UnknownWorkflowGroupError
     """
-    print('download {} {}'.format(run_id, file_id))
+    logging.info('download result file {} of run {}'.format(file_id, run_id), extra={'event': EVENT_DOWNLOAD})
     from robflask.service import service
     with service() as api:
         # Authentication of the user from the expected api_token in the header
         # will fail if no token is given or if the user is not logged in.
         fh = api.runs().get_result_file(run_id=run_id, file_id=file_id)
-        return send_file(
-            fh.open(),
-            as_attachment=True,
-            attachment_filename=fh.name,
-            mimetype=fh.mime_type
+    return send_handle(fh, download_name=fh.name, mimetype=fh.mime_type)
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def compact_run(run: Dict) -> Dict:
+    """Get compact projection of a serialized run handle that only contains
+    the run identifier, state, and timestamps. The start and finish time are
+    None if they are not set for the run state (e.g., for pending runs).
+
+    Parameters
+    ----------
+    run: dict
+        Serialized run handle.
+
+    Returns
+    -------
+    dict
+    """
+    return {
+        labels.RUN_ID: run[labels.RUN_ID],
+        labels.RUN_STATE: run[labels.RUN_STATE],
+        labels.RUN_CREATED: run[labels.RUN_CREATED],
+        labels.RUN_STARTED: run.get(labels.RUN_STARTED),
+        labels.RUN_FINISHED: run.get(labels.RUN_FINISHED)
+    }
+
+
+def acquire_stream() -> StreamLimit:
+    """Reserve a slot of the stream limit for a request that waits for run
+    state changes in the current worker thread. The caller has to release the
+    slot when the request is finished.
+
+    Returns
+    -------
+    robflask.api.events.StreamLimit
+
+    Raises
+    ------
+    robflask.error.ServiceUnavailableError
+    """
+    limit = stream_limit()
+    if not limit.acquire():
+        raise err.ServiceUnavailableError(
+            'too many open event streams',
+            retry_after=STREAM_RETRY_AFTER
         )
+    return limit
+
+
+def event_stream(
+    group_id: str, token: str, runs: Dict[str, Dict], initial: List[Dict],
+    run_id: Optional[str] = None
+) -> Response:
+    """Get response that streams run state changes for the runs of a given
+    submission as server-sent events. The stream starts with one event for
+    each of the given initial runs. If a run identifier is given, only
+    changes for that run are streamed and the stream is closed after the run
+    reached a terminal state.
+
+    Streams that are sent by a WSGI server hold a slot of the stream limit
+    until the stream is closed.
+
+    Parameters
+    ----------
+    group_id: string
+        Unique submission identifier.
+    token: string
+        Access token for the authenticated user.
+    runs: dict
+        Mapping of run identifier to the serialized run descriptors for all
+        runs of the submission.
+    initial: list of dict
+        List of serialized run descriptors for the initial events.
+    run_id: string, default=None
+        Unique identifier of a single run.
+
+    Returns
+    -------
+    flask.response_class
+
+    Raises
+    ------
+    robflask.error.ServiceUnavailableError
+    """
+    limit = acquire_stream() if not is_async(request) else None
+    try:
+        sub = watcher().subscribe(group_id=group_id, token=token, runs=runs, run_id=run_id)
+    except Exception:
+        if limit is not None:
+            limit.release()
+        raise
+    # The event stream is passed to the server as the application iterable.
+    # The server closes the stream (and removes the subscription) when the
+    # client disconnects.
+    return Response(
+        EventStream(sub=sub, runs=initial, limit=limit),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        direct_passthrough=True
+    )
+
+
+def group_runs(token: str, group_id: str) -> Dict[str, Dict]:
+    """Get the serialized descriptors for all runs of the given submission.
+    Returns a mapping of run identifier to run descriptor.
+
+    Parameters
+    ----------
+    token: string
+        Access token for the authenticated user.
+    group_id: string
+        Unique submission identifier
+
+    Returns
+    -------
+    dict
+    """
+    from robflask.service import service
+    with service(access_token=token) as api:
+        r = api.runs().list_runs(group_id=group_id)
+        # Notify the leader board cache about the observed run states.
+        for run in r[labels.RUN_LIST]:
+            cache().run_state(run, api=api)
+    return {run[labels.RUN_ID]: run for run in r[labels.RUN_LIST]}
+
+
+def long_poll(body: LongPoll) -> Response:
+    """Get response for a long-poll request that waits for run state changes
+    while the response body is sent.
+
+    Parameters
+    ----------
+    body: robflask.api.events.LongPoll
+        Response body for the long-poll request.
+
+    Returns
+    -------
+    flask.response_class
+    """
+    return Response(
+        body,
+        mimetype='application/json',
+        headers={'Cache-Control': 'no-cache'},
+        direct_passthrough=True
+    )
+
+
+def run_handles(api, run_ids: List[str]) -> Dict[str, Dict]:
+    """Get serialized handles for a list of runs. Returns a mapping of run
+    identifier to run handle. Runs that do not exist or that the user is not
+    authorized to access are not included in the result.
+
+    For the local service API, all runs are retrieved with a single query
+    (together with their files, messages, workflow and submission). Access is
+    verified once for each submission. For other service APIs the handle is
+    retrieved for each run individually.
+
+    Parameters
+    ----------
+    api: flowserv.service.api.API
+        Service API for the authenticated user.
+    run_ids: list of string
+        List of unique run identifier.
+
+    Returns
+    -------
+    dict
+    """
+    service = api.runs()
+    manager = getattr(service, 'run_manager', None)
+    if manager is None:
+        runs = dict()
+        for run_id in set(run_ids):
+            try:
+                runs[run_id] = service.get_run(run_id=run_id)
+            except (UnauthorizedAccessError, UnknownObjectError):
+                pass
+        return runs
+    query = manager.session.query(RunObject)\
+        .options(
+            selectinload(RunObject.files),
+            selectinload(RunObject.group),
+            selectinload(RunObject.log),
+            selectinload(RunObject.workflow)
+        )\
+        .filter(RunObject.run_id.in_(set(run_ids)))
+    runs, members = dict(), dict()
+    for run in query.all():
+        # Every user can access post-processing runs that do not belong to a
+        # submission.
+        group_id = run.group_id
+        if group_id is not None and group_id not in members:
+            try:
+                members[group_id] = service.auth.is_group_member(user_id=service.user_id, group_id=group_id)
+            except UnknownObjectError:  # pragma: no cover
+                members[group_id] = False
+        if group_id is None or members[group_id]:
+            runs[run.run_id] = service.serialize.run_handle(run=run, group=run.group)
+    return runs
+
+
+def run_status(api, run_ids: List[str], compact: bool) -> Dict[str, Dict]:
+    """Get serialized handles for a list of runs. Returns a mapping of run
+    identifier to run handle. Runs that do not exist or that the user is not
+    authorized to access are not included in the result.
+
+    The compact projection of each run contains the run identifier, the run
+    state and all run timestamps. Timestamps that are not set for the current
+    run state are None.
+
+    Parameters
+    ----------
+    api: flowserv.service.api.API
+        Service API for the authenticated user.
+    run_ids: list of string
+        List of unique run identifier.
+    compact: bool
+        Only include the run state and timestamps in the result.
+
+    Returns
+    -------
+    dict
+    """
+    runs = run_handles(api, run_ids=run_ids)
+    for run in runs.values():
+        cache().run_state(run, api=api)
+    if compact:
+        runs = {run_id: compact_run(run) for run_id, run in runs.items()}
+    return runs
@@ -12,10 +12,8 @@ from flask import Blueprint, jsonify, request
 
 from robflask.api.util import ACCESS_TOKEN
 
-import robflask.config as config
 
-
-bp = Blueprint('service', __name__, url_prefix=config.API_PATH())
+bp = Blueprint('service', __name__)
 
 
 @bp.route('/', methods=['GET'])
@@ -24,6 +22,9 @@ def service_descriptor():
     # If the request contains an access token we validate that the token is
     # still active. The access token is optional for the service descriptor.
     # Make sure not to raise an error if no token is present.
+    # The token is passed to the wrapped flowserv API factory (bypassing the
+    # access token cache) since the descriptor reports whether the token is
+    # valid.
     from robflask.service import service
-    with service(access_token=ACCESS_TOKEN(request, raise_error=False)) as api:
+    with service.factory(access_token=ACCESS_TOKEN(request, raise_error=False)) as api:
         return jsonify(api.server().to_dict()), 200
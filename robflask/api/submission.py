@@ -12,14 +12,17 @@ from flask import Blueprint, jsonify, make_response, request
 
 from flowserv.error import UnknownUserError
 
-from robflask.api.util import ACCESS_TOKEN, jsonbody
+from robflask.api.pagination import page_response, paginate, sort_key
+from robflask.api.util import ACCESS_TOKEN, conditional, jsonbody
+from robflask.archive import archive_cache, archive_prefix
+from robflask.leaderboard import cache
 
 import flowserv.view.group as labels
-import robflask.config as config
+import flowserv.view.run as rlbls
 import robflask.error as err
 
 
-bp = Blueprint('submissions', __name__, url_prefix=config.API_PATH())
+bp = Blueprint('submissions', __name__)
 
 
 @bp.route('/workflows/<string:workflow_id>/groups', methods=['POST'])
@@ -67,11 +70,20 @@ def delete_submission(group_id):
     # present (to avoid unnecessarily instantiating the service API).
     from robflask.service import service
     with service(access_token=ACCESS_TOKEN(request)) as api:
+        # Get the submission runs first to be able to remove their cached
+        # result archives.
+        runs = api.runs().list_runs(group_id=group_id)[rlbls.RUN_LIST]
         api.groups().delete_group(group_id=group_id)
+    # Deleting a submission removes the results of all submission runs from
+    # the leader board.
+    cache().invalidate()
+    for run in runs:
+        archive_cache().remove(archive_prefix('run', run[rlbls.RUN_ID]))
     return make_response(jsonify(dict()), 204)
 
 
 @bp.route('/groups/<string:group_id>', methods=['GET'])
+@conditional
 def get_submission(group_id):
     """Get handle for the submission with the given identifier. The user has to
     be authenticated in order to access a submission.
@@ -85,16 +97,20 @@ def get_submission(group_id):
 
 
 @bp.route('/workflows/<string:workflow_id>/groups', methods=['GET'])
+@conditional
 def list_submission(workflow_id):
     """Get a list of all submissions for a given benchmark. The user has to be
-    authenticated in order to be able to access the submission list.
+    authenticated in order to be able to access the submission list. The
+    listing is paginated if the request contains the query argument 'limit'
+    or 'cursor'. Paginated submissions are ordered by their name.
     """
     # Get the access token first to raise an error immediately if no token is
     # present (to avoid unnecessarily instantiating the service API).
     from robflask.service import service
     with service(access_token=ACCESS_TOKEN(request)) as api:
         r = api.groups().list_groups(workflow_id=workflow_id)
-    return make_response(jsonify(r), 200)
+    r, cursor = paginate(r, labels.GROUP_LIST, key=sort_key(labels.GROUP_NAME, labels.GROUP_ID))
+    return page_response(r, cursor)
 
 
 @bp.route('/groups/<string:group_id>', methods=['PUT'])
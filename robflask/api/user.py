@@ -8,21 +8,27 @@
 
 """Blueprint for user authentication and the user manager service."""
 
+import time
+
 from flask import Blueprint, jsonify, make_response, request
 
+from robflask.api.pagination import page_response, paginate, sort_key
 from robflask.api.util import ACCESS_TOKEN, jsonbody
+from robflask.auth import token_cache
+from robflask.service import FLOWSERV_AUTH_LOGINTTL
 
 import flowserv.view.user as labels
-import robflask.config as config
 
 
-bp = Blueprint('users', __name__, url_prefix=config.API_PATH())
+bp = Blueprint('users', __name__)
 
 
 @bp.route('/users', methods=['GET'])
 def list_users():
     """Get listing of registered users. Only users that are registered and
-    currently logged in are allowed to query the database.
+    currently logged in are allowed to query the database. The listing is
+    paginated if the request contains the query argument 'limit' or 'cursor'.
+    Paginated users are ordered by their name.
 
     Returns
     -------
@@ -37,7 +43,8 @@ def list_users():
     from robflask.service import service
     with service(access_token=ACCESS_TOKEN(request)) as api:
         r = api.users().list_users(query=request.args.get('query'))
-    return make_response(jsonify(r), 200)
+    r, cursor = paginate(r, labels.USER_LIST, key=sort_key(labels.USER_NAME, labels.USER_ID))
+    return page_response(r, cursor)
 
 
 @bp.route('/users/activate', methods=['POST'])
@@ -85,6 +92,12 @@ def login_user():
     from robflask.service import service
     with service() as api:
         r = api.users().login_user(username=user, password=passwd)
+    # Invalidate cached tokens from previous logins and add the new token to
+    # the cache. The cached token expires no later than the token itself.
+    ttl = service.get(FLOWSERV_AUTH_LOGINTTL)
+    expires = time.time() + float(ttl) if ttl is not None else None
+    token_cache().invalidate(r[labels.USER_ID])
+    token_cache().put(r[labels.USER_TOKEN], r[labels.USER_ID], expires=expires)
     return make_response(jsonify(r), 200)
 
 
@@ -101,9 +114,13 @@ def logout_user():
     ------
     flowserv.error.UnauthenticatedAccessError
     """
+    token = ACCESS_TOKEN(request)
     from robflask.service import service
     with service() as api:
-        r = api.users().logout_user(api_key=ACCESS_TOKEN(request))
+        user_id = api.users().whoami_user(api_key=token)[labels.USER_ID]
+        r = api.users().logout_user(api_key=token)
+    # Invalidate the cached token in all worker processes.
+    token_cache().invalidate(user_id)
     return make_response(jsonify(r), 200)
 
 
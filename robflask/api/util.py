@@ -8,8 +8,11 @@
 
 """Collection of helper functions for handling web server requests."""
 
-from typing import Dict
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Dict, List, Optional
 
+from flask import request as flask_request
 from flowserv.error import UnauthenticatedAccessError
 from flowserv.service.remote import HEADER_TOKEN
 from flowserv.util import validate_doc
@@ -17,6 +20,12 @@ from flowserv.util import validate_doc
 import robflask.error as err
 
 
+"""Key for the WSGI environment flag that is set for requests that are
+dispatched by the ASGI adapter.
+"""
+ASYNC_ENVIRON = 'robflask.asgi'
+
+
 def ACCESS_TOKEN(request, raise_error=True) -> str:
     """Get the access token from the header of a given Flask request. Returns
     None if no token is present in the header and the raise error flag is
@@ -43,6 +52,54 @@ def ACCESS_TOKEN(request, raise_error=True) -> str:
     return token
 
 
+def conditional(f: Callable) -> Callable:
+    """Decorator for request handlers that return a JSON response for a GET
+    request. Adds a strong entity tag for the serialized response body. If the
+    request contains a matching If-None-Match header (or an If-Modified-Since
+    header and the handler set the Last-Modified time of the response) the
+    response is changed to 304 Not Modified without a body. Streamed responses
+    are not modified.
+
+    Parameters
+    ----------
+    f: callable
+        Request handler.
+
+    Returns
+    -------
+    callable
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        response = f(*args, **kwargs)
+        if response.status_code == 200 and not response.is_streamed:
+            response.add_etag()
+            # Responses may differ between users. Clients have to revalidate
+            # their cached copy for each request.
+            response.vary.add(HEADER_TOKEN)
+            response.cache_control.no_cache = True
+            response.make_conditional(flask_request)
+        return response
+    return wrapper
+
+
+def is_async(request) -> bool:
+    """Test if the given request is dispatched by the ASGI adapter. Request
+    handlers can return response bodies that support asynchronous iteration
+    for these requests.
+
+    Parameters
+    ----------
+    request: flask.request
+        Flask request object
+
+    Returns
+    -------
+    bool
+    """
+    return bool(request.environ.get(ASYNC_ENVIRON, False))
+
+
 def jsonbody(request, mandatory=None, optional=None) -> Dict:
     """Get Json object from the body of an API request. Validates the object
     based on the given (optional) lists of mandatory and optional labels.
@@ -68,10 +125,29 @@ def jsonbody(request, mandatory=None, optional=None) -> Dict:
     robflask.error.InvalidRequest
     """
     try:
+        # Requests without a JSON body are invalid requests independently of
+        # the content type.
         return validate_doc(
-            request.json,
+            request.get_json(silent=True),
             mandatory=mandatory,
             optional=optional
         )
     except (AttributeError, TypeError, ValueError) as ex:
         raise err.InvalidRequestError(str(ex))
+
+
+def last_modified(timestamps: List[str]) -> Optional[datetime]:
+    """Get the most recent of a given list of ISO formated timestamps. Values
+    that are None are ignored. Returns None if the list contains no timestamp.
+
+    Parameters
+    ----------
+    timestamps: list of string
+        List of timestamps in ISO format.
+
+    Returns
+    -------
+    datetime.datetime
+    """
+    values = [datetime.fromisoformat(ts) for ts in timestamps if ts is not None]
+    return max(values) if values else None
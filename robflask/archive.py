@@ -0,0 +1,413 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Streaming generator and on-disk cache for tar archives of run result
+files.
+
+The archive is produced incrementally. The content of each file is read in
+chunks that are written to the (optionally gzip compressed) output and handed
+to the caller as soon as they are available. The memory footprint is therefore
+independent of the size of the archived files.
+
+Result files of a run do not change after the run finished. Generated archives
+are therefore kept in a cache directory. Cached archives are identified by a
+key that contains the identifier of the run (or the post-processing run for
+benchmark archives) and the compression level. The total size of the cache is
+limited. The least recently used archives are removed when the limit is
+exceeded.
+"""
+
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+import gzip
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+
+from flowserv.model.files.base import IOHandle
+from robflask.handle import file_size, local_path
+
+
+"""Size of chunks (in bytes) that are read from archived files."""
+CHUNK_SIZE = 64 * 1024
+
+
+"""Suffix for temporary files of archives that are being written."""
+TMP_SUFFIX = '.tmp'
+
+"""Pattern for valid cache keys."""
+KEY_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+class ArchiveCache(object):
+    """Cache for generated archives in a directory on the local file system.
+    Each archive is stored in a file that is named by the archive key. The
+    modification time of a file is updated on every cache hit to keep track
+    of the least recently used archives.
+    """
+    def __init__(self, basedir: str, maxsize: int):
+        """Initialize the cache directory and the maximum cache size.
+
+        Parameters
+        ----------
+        basedir: string
+            Path to the cache directory.
+        maxsize: int
+            Maximum total size (in bytes) of all cached archives. Archives are
+            not cached if the value is zero or negative.
+        """
+        self.basedir = basedir
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get the path to the cached archive with the given key. Returns None
+        if the archive is not in the cache.
+
+        Parameters
+        ----------
+        key: string
+            Unique archive key.
+
+        Returns
+        -------
+        string
+        """
+        filename = self.filename(key)
+        # The archive is touched under the lock so that it is not evicted
+        # between the eviction scan and the removal of the file.
+        with self._lock:
+            if filename is not None:
+                try:
+                    os.utime(filename)
+                    self.hits += 1
+                    return filename
+                except OSError:
+                    pass
+            self.misses += 1
+        return None
+
+    def evict(self):
+        """Remove the least recently used archives until the total size of
+        the cache no longer exceeds the maximum size.
+        """
+        with self._lock:
+            files = list()
+            for entry in os.scandir(self.basedir):
+                if entry.is_file() and not entry.name.endswith(TMP_SUFFIX):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(f[1] for f in files)
+            for _, size, filename in sorted(files):
+                if total <= self.maxsize:
+                    break
+                try:
+                    os.remove(filename)
+                except OSError:  # pragma: no cover
+                    pass
+                total -= size
+
+    def filename(self, key: str) -> Optional[str]:
+        """Get the path for the archive file with the given key. Returns None
+        if the cache is disabled or if the key is not a valid file name.
+
+        Parameters
+        ----------
+        key: string
+            Unique archive key.
+
+        Returns
+        -------
+        string
+        """
+        if self.maxsize <= 0 or not KEY_PATTERN.match(key):
+            return None
+        return os.path.join(self.basedir, key)
+
+    def remove(self, prefix: str):
+        """Remove all cached archives with a key that starts with the given
+        prefix.
+
+        Parameters
+        ----------
+        prefix: string
+            Prefix for archive keys.
+        """
+        if not os.path.isdir(self.basedir):
+            return
+        for entry in os.scandir(self.basedir):
+            if entry.name.startswith(prefix) and not entry.name.endswith(TMP_SUFFIX):
+                try:
+                    os.remove(entry.path)
+                except OSError:  # pragma: no cover
+                    pass
+
+    def stats(self) -> Dict:
+        """Get dictionary with the current values of the cache counters.
+
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def store(self, key: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """Generator that passes on the given archive chunks and writes them to
+        a file in the cache directory. The archive is added to the cache only
+        if all chunks were written (i.e., the generator was not closed early).
+
+        Parameters
+        ----------
+        key: string
+            Unique archive key.
+        chunks: iterator of bytes
+            Chunks of the archive content.
+
+        Returns
+        -------
+        iterator of bytes
+        """
+        filename = self.filename(key)
+        if filename is None:
+            yield from chunks
+            return
+        os.makedirs(self.basedir, exist_ok=True)
+        fd, tmpfile = tempfile.mkstemp(dir=self.basedir, suffix=TMP_SUFFIX)
+        complete = False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                os.replace(tmpfile, filename)
+                self.evict()
+            else:
+                os.remove(tmpfile)
+
+
+class StreamBuffer(object):
+    """Write-only file-like object that collects written bytes until they are
+    retrieved by the stream generator.
+    """
+    def __init__(self):
+        """Initialize the list of buffered chunks."""
+        self._chunks = list()
+
+    def flush(self):
+        """Flushing the buffer has no effect."""
+        pass
+
+    def pop(self) -> bytes:
+        """Get all buffered bytes and clear the buffer.
+
+        Returns
+        -------
+        bytes
+        """
+        data = b''.join(self._chunks)
+        self._chunks = list()
+        return data
+
+    def write(self, data: bytes) -> int:
+        """Add bytes to the buffer.
+
+        Parameters
+        ----------
+        data: bytes
+            Written bytes.
+
+        Returns
+        -------
+        int
+        """
+        self._chunks.append(bytes(data))
+        return len(data)
+
+
+def stream_archive(
+    files: List[Tuple[str, IOHandle]], compresslevel: Optional[int] = 6
+) -> Iterator[bytes]:
+    """Generator for a tar archive that contains the given files. Each file is
+    represented by a tuple of archive member name and file handle.
+
+    The archive is compressed using gzip with the given compression level. If
+    the compression level is None an uncompressed tar archive is generated.
+
+    Parameters
+    ----------
+    files: list of (string, flowserv.model.files.base.IOHandle)
+        Archive member names and file handles.
+    compresslevel: int, default=6
+        Compression level (0-9) for gzip or None for uncompressed output.
+
+    Returns
+    -------
+    iterator of bytes
+    """
+    sink = StreamBuffer()
+    if compresslevel is not None:
+        out = gzip.GzipFile(fileobj=sink, mode='wb', compresslevel=compresslevel, mtime=0)
+    else:
+        out = sink
+    written = 0
+    for name, fh in files:
+        f, size, mtime = open_member(fh)
+        try:
+            info = tarfile.TarInfo(name=name)
+            info.size = size
+            info.mtime = mtime
+            header = info.tobuf(format=tarfile.PAX_FORMAT)
+            out.write(header)
+            written += len(header)
+            # Never write more (or less) bytes than given in the header, even
+            # if the file was modified after the size was determined.
+            remaining = size
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    chunk = tarfile.NUL * remaining
+                out.write(chunk)
+                written += len(chunk)
+                remaining -= len(chunk)
+                data = sink.pop()
+                if data:
+                    yield data
+        finally:
+            f.close()
+        # Pad the member data to the next block boundary and flush the
+        # compressed output for the completed member.
+        remainder = written % tarfile.BLOCKSIZE
+        if remainder:
+            out.write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+            written += tarfile.BLOCKSIZE - remainder
+        out.flush()
+        data = sink.pop()
+        if data:
+            yield data
+    # The end of the archive is marked by two empty blocks. The archive is
+    # padded to a multiple of the record size (as done by the tarfile module).
+    end = tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+    written += len(end)
+    remainder = written % tarfile.RECORDSIZE
+    if remainder:
+        end += tarfile.NUL * (tarfile.RECORDSIZE - remainder)
+    out.write(end)
+    if compresslevel is not None:
+        out.close()
+    data = sink.pop()
+    if data:
+        yield data
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def archive_key(kind: str, object_id: str, compresslevel: Optional[int]) -> str:
+    """Get the cache key for an archive. The key is composed of the archive
+    kind (e.g., 'run'), the identifier of the run whose files are archived,
+    and the compression level.
+
+    Parameters
+    ----------
+    kind: string
+        Archive type.
+    object_id: string
+        Unique identifier of the run or post-processing run.
+    compresslevel: int
+        Compression level for gzip or None for an uncompressed archive.
+
+    Returns
+    -------
+    string
+    """
+    suffix = 'tar' if compresslevel is None else 'tar.gz{}'.format(compresslevel)
+    return archive_prefix(kind, object_id) + suffix
+
+
+def archive_prefix(kind: str, object_id: str) -> str:
+    """Get the common prefix for the cache keys of all archives for the given
+    run (independent of the compression level).
+
+    Parameters
+    ----------
+    kind: string
+        Archive type.
+    object_id: string
+        Unique identifier of the run or post-processing run.
+
+    Returns
+    -------
+    string
+    """
+    return '{}-{}.'.format(kind, object_id)
+
+
+def open_member(fh: IOHandle) -> Tuple[IO, int, int]:
+    """Open the given file handle for reading. Returns the opened file object,
+    the file size, and the modification time.
+
+    Files that are stored on the local file system are opened directly. For
+    other file handles the size is taken from the handle if available. If the
+    size is unknown the content is copied to a temporary file first.
+
+    Parameters
+    ----------
+    fh: flowserv.model.files.base.IOHandle
+        Handle for an archived file.
+
+    Returns
+    -------
+    (file-like object, int, int)
+    """
+    filename = local_path(fh)
+    if filename is not None:
+        stat = os.stat(filename)
+        return open(filename, 'rb'), stat.st_size, int(stat.st_mtime)
+    size = file_size(fh)
+    f = fh.open()
+    if size is None:
+        tmp = tempfile.TemporaryFile()
+        try:
+            shutil.copyfileobj(f, tmp, CHUNK_SIZE)
+        finally:
+            f.close()
+        size = tmp.tell()
+        tmp.seek(0)
+        f = tmp
+    return f, size, int(time.time())
+
+
+# -- Cache singleton ----------------------------------------------------------
+
+"""Global archive cache that is used by all request handlers."""
+_cache = None
+
+
+def archive_cache() -> ArchiveCache:
+    """Get the global archive cache. The cache is (re-)created if the cache
+    directory in the Web API configuration changed.
+
+    Returns
+    -------
+    robflask.archive.ArchiveCache
+    """
+    global _cache
+    from robflask.config import ARCHIVE_CACHE_DIR, ARCHIVE_CACHE_SIZE
+    basedir = ARCHIVE_CACHE_DIR()
+    if _cache is None or _cache.basedir != basedir:
+        _cache = ArchiveCache(basedir=basedir, maxsize=ARCHIVE_CACHE_SIZE())
+    return _cache
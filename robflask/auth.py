@@ -0,0 +1,230 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Cache for validated access tokens.
+
+Requests of authenticated users contain an access token that flowserv
+validates against the database before the request is handled. The cache maps
+validated access tokens to the identifier of the authenticated user. Requests
+with a cached token are handled by the service API for the user identifier
+without validating the token again.
+
+Cache entries expire after a configurable time period. Entries also expire no
+later than the access token itself, both for tokens that are added at login
+and for tokens that were validated by flowserv.
+
+When a user logs in or out a marker file for the user is touched in a
+directory that is shared by all worker processes. Cache entries for the user
+that were created before the last change of the marker file are no longer
+valid. Logging out therefore invalidates the cached tokens of the user in all
+worker processes immediately.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import os
+import threading
+import time
+
+
+class TokenCache(object):
+    """Cache that maps access tokens to user identifiers. The cache is shared
+    by all request handlers in a worker process. All methods are thread-safe.
+    """
+    def __init__(
+        self, ttl: int, basedir: Optional[str] = None,
+        maxsize: Optional[int] = 10000
+    ):
+        """Initialize the time-to-live for cache entries, the directory for
+        user marker files, and the maximum number of cached tokens.
+
+        Parameters
+        ----------
+        ttl: int
+            Time (in seconds) after which a cached token expires. The cache is
+            disabled if the value is zero or negative.
+        basedir: string, default=None
+            Directory for user marker files. Tokens are only invalidated in
+            the local process if no directory is given.
+        maxsize: int, default=10000
+            Maximum number of cached tokens. The least recently used entry is
+            removed when the limit is exceeded.
+        """
+        self.ttl = ttl
+        self.basedir = basedir
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[str]:
+        """Get the identifier of the user that is associated with the given
+        access token. Returns None if the token is not in the cache or if the
+        entry is no longer valid.
+
+        Parameters
+        ----------
+        token: string
+            User access token.
+
+        Returns
+        -------
+        string
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                user_id, created, expires = entry
+                if expires > time.time() and not self._revoked(user_id, created):
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return user_id
+                del self._entries[token]
+            self.misses += 1
+        return None
+
+    def invalidate(self, user_id: str):
+        """Invalidate all cached tokens for the given user. The user marker
+        file is touched to invalidate the tokens in other worker processes as
+        well.
+
+        Parameters
+        ----------
+        user_id: string
+            Unique user identifier.
+        """
+        with self._lock:
+            for token in [t for t, e in self._entries.items() if e[0] == user_id]:
+                del self._entries[token]
+            self.invalidations += 1
+        filename = self._marker(user_id)
+        if filename is not None:
+            self.prune()
+            os.makedirs(self.basedir, exist_ok=True)
+            with open(filename, 'a'):
+                pass
+            os.utime(filename)
+
+    def prune(self):
+        """Remove user marker files that are older than the cache time-to-live.
+        All cache entries that were created before the last change of these
+        markers have expired.
+        """
+        if self.basedir is None or not os.path.isdir(self.basedir):
+            return
+        expired = time.time() - max(self.ttl, 0)
+        for entry in os.scandir(self.basedir):
+            try:
+                if entry.stat().st_mtime < expired:
+                    os.remove(entry.path)
+            except OSError:  # pragma: no cover
+                pass
+
+    def put(
+        self, token: str, user_id: str, expires: Optional[float] = None,
+        validated: Optional[float] = None
+    ):
+        """Add a validated access token to the cache.
+
+        Parameters
+        ----------
+        token: string
+            User access token.
+        user_id: string
+            Unique identifier of the authenticated user.
+        expires: float, default=None
+            Expiry time of the access token (in seconds since the epoch).
+        validated: float, default=None
+            Time when the validation of the token started. The entry is not
+            valid if the user logged out after that time. By default, the
+            current time is used.
+        """
+        if self.ttl <= 0:
+            return
+        validated = validated if validated is not None else time.time()
+        timeout = validated + self.ttl
+        if expires is not None:
+            timeout = min(timeout, expires)
+        with self._lock:
+            self._entries[token] = (user_id, validated, timeout)
+            self._entries.move_to_end(token)
+            while self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """Get dictionary with the current values of the cache counters. Each
+        cache hit is a token validation query that was not sent to the
+        database.
+
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'size': len(self._entries)
+            }
+
+    def _marker(self, user_id: str) -> Optional[str]:
+        """Get path to the marker file for the given user. Returns None if no
+        marker directory is configured.
+
+        Returns
+        -------
+        string
+        """
+        if self.basedir is None:
+            return None
+        return os.path.join(self.basedir, 'user-{}'.format(user_id))
+
+    def _revoked(self, user_id: str, created: float) -> bool:
+        """Test if the marker file for the given user has been changed after
+        the cache entry was created.
+
+        Returns
+        -------
+        bool
+        """
+        filename = self._marker(user_id)
+        if filename is None:
+            return False
+        try:
+            return os.stat(filename).st_mtime >= created
+        except OSError:
+            return False
+
+
+# -- Cache singleton ----------------------------------------------------------
+
+"""Global access token cache that is used by all request handlers."""
+_cache = None
+
+
+def token_cache() -> TokenCache:
+    """Get the global access token cache. The cache is (re-)created if the API
+    base directory changed. User marker files are kept in the sub-folder
+    'auth' of the API base directory.
+
+    Returns
+    -------
+    robflask.auth.TokenCache
+    """
+    global _cache
+    from flowserv.config import FLOWSERV_BASEDIR
+    from robflask.config import AUTH_TTL
+    from robflask.service import service
+    basedir = os.path.join(os.path.abspath(service.get(FLOWSERV_BASEDIR)), 'auth')
+    if _cache is None or _cache.basedir != basedir:
+        _cache = TokenCache(ttl=AUTH_TTL(), basedir=basedir)
+    return _cache
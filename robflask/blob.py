@@ -0,0 +1,284 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Content-addressed store for uploaded files.
+
+Uploaded files are hashed (SHA-256) while they are written to the blob store
+directory. Each distinct content is kept once in a file that is named by its
+checksum. Uploads are added to the flowserv file store using a file handle
+that creates a hard link to the blob instead of copying the content. Identical
+files that are uploaded for different submissions therefore share the same
+storage.
+
+Clients can check whether a file with a given checksum was uploaded to a
+submission before uploading it again. If it was, the upload can be created
+from the existing blob without transferring the content again. Only blobs that
+are linked to an uploaded file of the submission are visible to its members,
+i.e., clients cannot probe whether content was uploaded to other submissions.
+
+The link count of a blob file is the number of uploaded files that reference
+it (plus one for the blob itself). Blobs that are no longer referenced are
+removed periodically. Blobs that are returned by the store are kept for at
+least the grace period so that a new link to them can be created. If the
+flowserv file store does not support hard links (e.g., because it is located
+on a different file system or in a cloud bucket) the content is copied and the
+blob is removed after a grace period.
+"""
+
+from typing import Dict, IO, Optional, Tuple
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from flowserv.model.files.fs import FSFile
+
+
+"""Size of chunks (in bytes) that are read when hashing uploaded files."""
+CHUNK_SIZE = 64 * 1024
+
+"""Time (in seconds) that unreferenced blobs are kept and minimum interval
+between scans for unreferenced blobs.
+"""
+PRUNE_INTERVAL = 60 * 60
+
+"""Pattern for valid blob checksums (hex digest of SHA-256)."""
+CHECKSUM = re.compile(r'^[0-9a-f]{64}$')
+
+"""Suffix for temporary files of blobs that are being written."""
+TMP_SUFFIX = '.tmp'
+
+
+class BlobFile(FSFile):
+    """File handle for a blob in the blob store. The handle creates a hard
+    link to the blob file when it is stored in the flowserv file store. The
+    blob content is copied if the link cannot be created.
+    """
+    def store(self, filename: str):
+        """Create a hard link (or copy) of the blob at the given location.
+
+        Parameters
+        ----------
+        filename: string
+            Path to the target file.
+        """
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        if os.path.exists(filename):
+            os.remove(filename)
+        try:
+            os.link(self.filename, filename)
+        except OSError:
+            shutil.copy(self.filename, filename)
+
+
+class BlobStore(object):
+    """Store for uploaded file contents in a directory on the local file
+    system. Blobs are grouped in sub-folders by the first two characters of
+    their checksum.
+    """
+    def __init__(self, basedir: str, grace: Optional[int] = PRUNE_INTERVAL):
+        """Initialize the store directory.
+
+        Parameters
+        ----------
+        basedir: string
+            Path to the blob store directory.
+        grace: int, default=1h
+            Time (in seconds) that unreferenced blobs are kept. Also used as
+            the minimum interval between scans for unreferenced blobs.
+        """
+        self.basedir = basedir
+        self.grace = grace
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0
+        self._pruned = time.time()
+        self._lock = threading.Lock()
+
+    def add(self, filename: str, checksum: str) -> str:
+        """Move the given file into the blob store. If a blob with the same
+        checksum exists the file is removed instead. Returns the path to the
+        blob file.
+
+        Parameters
+        ----------
+        filename: string
+            Path to a file with the given checksum.
+        checksum: string
+            Hex digest of the SHA-256 checksum for the file content.
+
+        Returns
+        -------
+        string
+        """
+        blobfile = self.filename(checksum)
+        os.makedirs(os.path.dirname(blobfile), exist_ok=True)
+        with self._lock:
+            if os.path.isfile(blobfile):
+                self.hits += 1
+                self.saved += os.path.getsize(blobfile)
+                os.remove(filename)
+                os.utime(blobfile)
+            else:
+                self.misses += 1
+                try:
+                    os.replace(filename, blobfile)
+                except OSError:
+                    # Different file systems.
+                    shutil.move(filename, blobfile)
+        self.prune(force=False)
+        return blobfile
+
+    def filename(self, checksum: str) -> str:
+        """Get path to the blob file for the given checksum.
+
+        Parameters
+        ----------
+        checksum: string
+            Hex digest of the SHA-256 checksum for the file content.
+
+        Returns
+        -------
+        string
+
+        Raises
+        ------
+        ValueError
+        """
+        if not CHECKSUM.match(checksum):
+            raise ValueError("invalid checksum '{}'".format(checksum))
+        return os.path.join(self.basedir, checksum[:2], checksum)
+
+    def get(self, checksum: str) -> Optional[str]:
+        """Get path to the blob file for the given checksum. Returns None if
+        the blob does not exist or if the checksum is not valid. The
+        modification time of the blob is updated so that the blob is not
+        pruned before the caller created a link to it.
+
+        Parameters
+        ----------
+        checksum: string
+            Hex digest of the SHA-256 checksum for the file content.
+
+        Returns
+        -------
+        string
+        """
+        checksum = checksum.lower()
+        if not CHECKSUM.match(checksum):
+            return None
+        blobfile = self.filename(checksum)
+        with self._lock:
+            try:
+                os.utime(blobfile)
+            except OSError:
+                return None
+        return blobfile
+
+    def prune(self, force: Optional[bool] = True):
+        """Remove blobs that are not referenced by any uploaded file and that
+        have not been changed within the grace period. Unless forced, the
+        store is only scanned if the last scan is longer ago than the grace
+        period.
+
+        Parameters
+        ----------
+        force: bool, default=True
+            Scan the store independently of the time of the last scan.
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._pruned < self.grace:
+                return
+            self._pruned = now
+        if not os.path.isdir(self.basedir):
+            return
+        expired = now - self.grace
+        for folder in os.scandir(self.basedir):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                # The blob is checked and removed under the lock so that it is
+                # not removed after it was returned by get() or add().
+                with self._lock:
+                    try:
+                        stat = os.stat(entry.path)
+                        # The change time is updated whenever a link to the
+                        # blob is created or removed.
+                        if stat.st_nlink <= 1 and max(stat.st_ctime, stat.st_mtime) <= expired:
+                            os.remove(entry.path)
+                    except OSError:  # pragma: no cover
+                        pass
+
+    def stats(self) -> Dict:
+        """Get dictionary with the current values of the store counters. The
+        number of saved bytes is the total size of uploaded content that was
+        already contained in the store.
+
+        Returns
+        -------
+        dict
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'savedBytes': self.saved}
+
+    def write(self, f: IO) -> Tuple[str, str]:
+        """Write the content of the given file object to the blob store. The
+        checksum is computed while the content is written. Returns the
+        checksum and the path to the blob file.
+
+        Parameters
+        ----------
+        f: file-like object
+            File object that is opened for reading in binary mode.
+
+        Returns
+        -------
+        (string, string)
+        """
+        os.makedirs(self.basedir, exist_ok=True)
+        checksum = hashlib.sha256()
+        fd, tmpfile = tempfile.mkstemp(dir=self.basedir, suffix=TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    checksum.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.remove(tmpfile)
+            raise
+        checksum = checksum.hexdigest()
+        return checksum, self.add(tmpfile, checksum)
+
+
+# -- Blob store singleton -----------------------------------------------------
+
+"""Global blob store that is used by all request handlers."""
+_store = None
+
+
+def blob_store() -> BlobStore:
+    """Get the global blob store. The store is (re-)created if the store
+    directory in the Web API configuration changed.
+
+    Returns
+    -------
+    robflask.blob.BlobStore
+    """
+    global _store
+    from robflask.config import BLOB_DIR
+    basedir = BLOB_DIR()
+    if _store is None or _store.basedir != basedir:
+        _store = BlobStore(basedir=basedir)
+    return _store
@@ -15,6 +15,8 @@ are in upper case to emphasize that they access configuration values that are
 expected to remain constant throughout the lifespan of a running application.
 """
 
+from typing import Dict, List, Optional
+
 import os
 
 from flowserv.config import FLOWSERV_BASEDIR, FLOWSERV_API_PATH
@@ -26,10 +28,70 @@ API.
 # Path to the optional build files for the ROB user-interface to be served
 # by the Flask app.
 ROB_UI_PATH = 'ROB_UI_PATH'
+# Directory for cached result archives
+ROB_WEBAPI_ARCHIVE_CACHE = 'ROB_WEBAPI_ARCHIVE_CACHE'
+# Maximum total size of cached result archives (in bytes)
+ROB_WEBAPI_ARCHIVE_CACHESIZE = 'ROB_WEBAPI_ARCHIVE_CACHESIZE'
+# Default gzip compression level for result archives
+ROB_WEBAPI_ARCHIVE_COMPRESSLEVEL = 'ROB_WEBAPI_ARCHIVE_COMPRESSLEVEL'
+# Maximum number of threads that run request handlers for the ASGI app
+ROB_WEBAPI_ASGI_THREADS = 'ROB_WEBAPI_ASGI_THREADS'
+# Time (in seconds) after which cached access tokens expire
+ROB_WEBAPI_AUTH_TTL = 'ROB_WEBAPI_AUTH_TTL'
+# Directory for the content-addressed store of uploaded files
+ROB_WEBAPI_BLOB_DIR = 'ROB_WEBAPI_BLOB_DIR'
+# Compression level for JSON responses
+ROB_WEBAPI_COMPRESSLEVEL = 'ROB_WEBAPI_COMPRESSLEVEL'
+# Minimum size of compressed JSON responses (in bytes)
+ROB_WEBAPI_COMPRESSMINSIZE = 'ROB_WEBAPI_COMPRESSMINSIZE'
+# Database connection pool configuration
+ROB_WEBAPI_DB_MAXOVERFLOW = 'ROB_WEBAPI_DB_MAXOVERFLOW'
+ROB_WEBAPI_DB_POOLSIZE = 'ROB_WEBAPI_DB_POOLSIZE'
+ROB_WEBAPI_DB_PREPING = 'ROB_WEBAPI_DB_PREPING'
+ROB_WEBAPI_DB_RECYCLE = 'ROB_WEBAPI_DB_RECYCLE'
+# JSON provider for serializing responses ('orjson' or 'json')
+ROB_WEBAPI_JSON = 'ROB_WEBAPI_JSON'
 # Directory path for API logs
 ROB_WEBAPI_LOG = 'ROB_WEBAPI_LOG'
+# Level for the root logger
+ROB_WEBAPI_LOG_LEVEL = 'ROB_WEBAPI_LOG_LEVEL'
+# Comma-separated list of levels for individual loggers (e.g., 'robflask.access=WARNING')
+ROB_WEBAPI_LOG_LEVELS = 'ROB_WEBAPI_LOG_LEVELS'
+# Comma-separated list of sampling rates for log events (e.g., 'request=0.1')
+ROB_WEBAPI_LOG_SAMPLING = 'ROB_WEBAPI_LOG_SAMPLING'
 # Maximum size of uploaded files (in bytes)
 ROB_WEBAPI_CONTENTLENGTH = 'ROB_WEBAPI_CONTENTLENGTH'
+# Time (in seconds) after which cached leader boards expire
+ROB_WEBAPI_LEADERBOARD_TTL = 'ROB_WEBAPI_LEADERBOARD_TTL'
+# Enable the request metrics endpoint
+ROB_WEBAPI_METRICS = 'ROB_WEBAPI_METRICS'
+# Interval (in seconds) for checking run states while a long-poll request waits
+ROB_WEBAPI_POLL_INTERVAL = 'ROB_WEBAPI_POLL_INTERVAL'
+# Maximum time (in seconds) that a long-poll request is held
+ROB_WEBAPI_POLL_MAXWAIT = 'ROB_WEBAPI_POLL_MAXWAIT'
+# Enable profiling of selected requests
+ROB_WEBAPI_PROFILE = 'ROB_WEBAPI_PROFILE'
+# Comma-separated list of endpoints for sampled profiles
+ROB_WEBAPI_PROFILE_ENDPOINTS = 'ROB_WEBAPI_PROFILE_ENDPOINTS'
+# Key in the profiling request header that selects a request for profiling
+ROB_WEBAPI_PROFILE_KEY = 'ROB_WEBAPI_PROFILE_KEY'
+# Profiling mode ('sample' or 'cprofile')
+ROB_WEBAPI_PROFILE_MODE = 'ROB_WEBAPI_PROFILE_MODE'
+# Fraction of requests that are profiled
+ROB_WEBAPI_PROFILE_RATE = 'ROB_WEBAPI_PROFILE_RATE'
+# Maximum number of event streams and long-poll requests that wait in worker
+# threads of a process
+ROB_WEBAPI_STREAM_MAX = 'ROB_WEBAPI_STREAM_MAX'
+# Enable request tracing
+ROB_WEBAPI_TRACING = 'ROB_WEBAPI_TRACING'
+# Base Url of the collector for the OTLP span exporter
+ROB_WEBAPI_TRACING_ENDPOINT = 'ROB_WEBAPI_TRACING_ENDPOINT'
+# Comma-separated list of span exporters ('file' or 'otlp')
+ROB_WEBAPI_TRACING_EXPORTERS = 'ROB_WEBAPI_TRACING_EXPORTERS'
+# Directory for staging files of resumable chunked uploads
+ROB_WEBAPI_UPLOAD_DIR = 'ROB_WEBAPI_UPLOAD_DIR'
+# Maximum size of files that are uploaded in chunks
+ROB_WEBAPI_UPLOAD_MAXSIZE = 'ROB_WEBAPI_UPLOAD_MAXSIZE'
 
 
 # -- Helper methods to access configutation parameters ------------------------
@@ -45,6 +107,260 @@ def API_PATH() -> str:
     return service.get(FLOWSERV_API_PATH)
 
 
+def ARCHIVE_CACHE_DIR() -> str:
+    """Get the directory for cached result archives from the respective
+    environment variable 'ROB_WEBAPI_ARCHIVE_CACHE'. If the variable is not set
+    a sub-folder 'archives' in the API base directory is used as the default.
+
+    Returns
+    -------
+    string
+    """
+    cache_dir = os.environ.get(ROB_WEBAPI_ARCHIVE_CACHE)
+    # If the variable is not set use a sub-folder in the API base directory
+    if cache_dir is None:
+        from robflask.service import service
+        cache_dir = os.path.join(service.get(FLOWSERV_BASEDIR), 'archives')
+    return os.path.abspath(cache_dir)
+
+
+def ARCHIVE_CACHE_SIZE() -> int:
+    """Get the maximum total size (in bytes) of cached result archives from the
+    respective environment variable 'ROB_WEBAPI_ARCHIVE_CACHESIZE'. If the
+    variable is not set the default value that is equal to 1GB is used. The
+    archive cache is disabled if the value is zero.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_ARCHIVE_CACHESIZE)
+    return 1024 * 1024 * 1024 if value is None else int(value)
+
+
+def ARCHIVE_COMPRESSLEVEL() -> int:
+    """Get the default gzip compression level (0-9) for result archives from
+    the respective environment variable 'ROB_WEBAPI_ARCHIVE_COMPRESSLEVEL'. If
+    the variable is not set the default value 6 is used.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_ARCHIVE_COMPRESSLEVEL)
+    value = 6 if value is None else int(value)
+    if not 0 <= value <= 9:
+        raise ValueError('invalid compression level {}'.format(value))
+    return value
+
+
+def ASGI_THREADS() -> int:
+    """Get the maximum number of threads that run request handlers when the
+    Web API is served by an ASGI server from the respective environment
+    variable 'ROB_WEBAPI_ASGI_THREADS'. If the variable is not set the default
+    value of 32 threads is used.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_ASGI_THREADS)
+    value = 32 if value is None else int(value)
+    if value < 1:
+        raise ValueError('invalid number of threads {}'.format(value))
+    return value
+
+
+def AUTH_TTL() -> int:
+    """Get the time (in seconds) after which cached access tokens expire from
+    the respective environment variable 'ROB_WEBAPI_AUTH_TTL'. If the variable
+    is not set the default value of 60 seconds is used. Access tokens are not
+    cached if the value is zero or negative.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_AUTH_TTL)
+    return 60 if value is None else int(value)
+
+
+def BLOB_DIR() -> str:
+    """Get the directory for the content-addressed store of uploaded files
+    from the respective environment variable 'ROB_WEBAPI_BLOB_DIR'. If the
+    variable is not set a sub-folder 'blobs' in the API base directory is used
+    as the default. The directory should be on the same file system as the
+    flowserv file store.
+
+    Returns
+    -------
+    string
+    """
+    blob_dir = os.environ.get(ROB_WEBAPI_BLOB_DIR)
+    # If the variable is not set use a sub-folder in the API base directory
+    if blob_dir is None:
+        from robflask.service import service
+        blob_dir = os.path.join(service.get(FLOWSERV_BASEDIR), 'blobs')
+    return os.path.abspath(blob_dir)
+
+
+def COMPRESS_LEVEL() -> int:
+    """Get the compression level (0-9) for JSON responses from the respective
+    environment variable 'ROB_WEBAPI_COMPRESSLEVEL'. Responses are not
+    compressed if the value is 0. If the variable is not set the default value
+    6 is used.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_COMPRESSLEVEL)
+    value = 6 if value is None else int(value)
+    if not 0 <= value <= 9:
+        raise ValueError('invalid compression level {}'.format(value))
+    return value
+
+
+def COMPRESS_MIN_SIZE() -> int:
+    """Get the minimum size (in bytes) of JSON response bodies that are
+    compressed from the respective environment variable
+    'ROB_WEBAPI_COMPRESSMINSIZE'. If the variable is not set the default value
+    of 1KB is used.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_COMPRESSMINSIZE)
+    return 1024 if value is None else int(value)
+
+
+def DB_MAX_OVERFLOW() -> int:
+    """Get the number of database connections that can be opened in addition
+    to the connection pool size from the respective environment variable
+    'ROB_WEBAPI_DB_MAXOVERFLOW'. If the variable is not set the default value
+    10 is used. The number of connections is unbounded if the value is
+    negative.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_DB_MAXOVERFLOW)
+    return 10 if value is None else int(value)
+
+
+def DB_POOL_PREPING() -> bool:
+    """Get the flag that determines whether database connections are tested
+    for liveness when they are taken from the connection pool from the
+    respective environment variable 'ROB_WEBAPI_DB_PREPING'. The flag is False
+    if the variable is not set.
+
+    Returns
+    -------
+    bool
+    """
+    value = os.environ.get(ROB_WEBAPI_DB_PREPING, 'false')
+    return value.lower() in ['1', 'true', 'yes']
+
+
+def DB_POOL_RECYCLE() -> int:
+    """Get the time (in seconds) after which pooled database connections are
+    replaced from the respective environment variable 'ROB_WEBAPI_DB_RECYCLE'.
+    If the variable is not set the default value -1 is used, i.e., connections
+    are not recycled.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_DB_RECYCLE)
+    return -1 if value is None else int(value)
+
+
+def DB_POOL_SIZE() -> int:
+    """Get the number of database connections that are kept open in the
+    connection pool from the respective environment variable
+    'ROB_WEBAPI_DB_POOLSIZE'. If the variable is not set the default value 5
+    is used. Connection pooling is disabled if the value is zero.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_DB_POOLSIZE)
+    value = 5 if value is None else int(value)
+    if value < 0:
+        raise ValueError('invalid pool size {}'.format(value))
+    return value
+
+
+def JSON_PROVIDER() -> str:
+    """Get the identifier of the JSON provider that serializes responses from
+    the respective environment variable 'ROB_WEBAPI_JSON'. If the variable is
+    not set the default provider 'orjson' is used.
+
+    Returns
+    -------
+    string
+    """
+    return os.environ.get(ROB_WEBAPI_JSON, 'orjson').lower()
+
+
+def LEADERBOARD_TTL() -> int:
+    """Get the time (in seconds) after which cached leader boards expire from
+    the respective environment variable 'ROB_WEBAPI_LEADERBOARD_TTL'. If the
+    variable is not set the default value of 60 seconds is used. Leader boards
+    are not cached if the value is zero or negative.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_LEADERBOARD_TTL)
+    return 60 if value is None else int(value)
+
+
 def LOG_DIR() -> str:
     """Get the logging directory for the Web API from the respective
     environment variable 'ROB_WEBAPI_LOG'. If the variable is not set a
@@ -62,6 +378,64 @@ def LOG_DIR() -> str:
     return os.path.abspath(log_dir)
 
 
+def LOG_LEVEL() -> str:
+    """Get the level for the root logger from the respective environment
+    variable 'ROB_WEBAPI_LOG_LEVEL'. If the variable is not set the default
+    level 'INFO' is used.
+
+    Returns
+    -------
+    string
+
+    Raises
+    ------
+    ValueError
+    """
+    return log_level(os.environ.get(ROB_WEBAPI_LOG_LEVEL, 'INFO'))
+
+
+def LOG_LEVELS() -> Dict[str, str]:
+    """Get the levels for individual loggers from the respective environment
+    variable 'ROB_WEBAPI_LOG_LEVELS'. The value is a comma-separated list of
+    logger names and levels (e.g., 'robflask.access=WARNING,sqlalchemy=INFO').
+    If the variable is not set the result is empty.
+
+    Returns
+    -------
+    dict
+
+    Raises
+    ------
+    ValueError
+    """
+    values = key_values(os.environ.get(ROB_WEBAPI_LOG_LEVELS, ''))
+    return {name: log_level(level) for name, level in values.items()}
+
+
+def LOG_SAMPLING() -> Dict[str, float]:
+    """Get the sampling rates for log events from the respective environment
+    variable 'ROB_WEBAPI_LOG_SAMPLING'. The value is a comma-separated list of
+    event types and the fraction of records that are kept for each type
+    (e.g., 'request=0.1,download=0.5'). If the variable is not set all records
+    are kept.
+
+    Returns
+    -------
+    dict
+
+    Raises
+    ------
+    ValueError
+    """
+    rates = dict()
+    for event, value in key_values(os.environ.get(ROB_WEBAPI_LOG_SAMPLING, '')).items():
+        rate = float(value)
+        if not 0 <= rate <= 1:
+            raise ValueError('invalid sampling rate {}'.format(value))
+        rates[event] = rate
+    return rates
+
+
 def MAX_CONTENT_LENGTH() -> str:
     """Get the maximum size for uploaded files from the respective environment
     variable 'ROB_WEBAPI_CONTENTLENGTH'. If the variable is not set the
@@ -78,3 +452,290 @@ def MAX_CONTENT_LENGTH() -> str:
     value = os.environ.get(ROB_WEBAPI_CONTENTLENGTH)
     # If the variable is not set use a default of 16MB
     return 16 * 1024 * 1024 if value is None else int(value)
+
+
+def METRICS() -> bool:
+    """Get the flag that enables request metrics and the metrics endpoint
+    from the respective environment variable 'ROB_WEBAPI_METRICS'. If the
+    variable is not set request metrics are enabled.
+
+    Returns
+    -------
+    bool
+    """
+    value = os.environ.get(ROB_WEBAPI_METRICS, 'true')
+    return value.lower() in ['1', 'true', 'yes']
+
+
+def POLL_INTERVAL() -> float:
+    """Get the interval (in seconds) for checking the state of runs while a
+    long-poll request is waiting for a state change from the respective
+    environment variable 'ROB_WEBAPI_POLL_INTERVAL'. If the variable is not set
+    the default value of 1 second is used.
+
+    Returns
+    -------
+    float
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_POLL_INTERVAL)
+    return 1.0 if value is None else float(value)
+
+
+def POLL_MAX_WAIT() -> int:
+    """Get the maximum time (in seconds) that a long-poll request is held from
+    the respective environment variable 'ROB_WEBAPI_POLL_MAXWAIT'. If the
+    variable is not set the default value of 60 seconds is used.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_POLL_MAXWAIT)
+    return 60 if value is None else int(value)
+
+
+def PROFILE() -> bool:
+    """Get the flag that enables profiling of selected requests from the
+    respective environment variable 'ROB_WEBAPI_PROFILE'. If the variable is
+    not set profiling is disabled.
+
+    Returns
+    -------
+    bool
+    """
+    value = os.environ.get(ROB_WEBAPI_PROFILE, 'false')
+    return value.lower() in ['1', 'true', 'yes']
+
+
+def PROFILE_ENDPOINTS() -> Optional[List[str]]:
+    """Get the list of endpoints (e.g., 'runs.get_run') for requests that are
+    selected for profiling by random sampling from the respective environment
+    variable 'ROB_WEBAPI_PROFILE_ENDPOINTS'. The value is a comma-separated
+    list. If the variable is not set requests for all endpoints are sampled.
+
+    Returns
+    -------
+    list of string
+    """
+    value = os.environ.get(ROB_WEBAPI_PROFILE_ENDPOINTS)
+    if value is None:
+        return None
+    return [e.strip() for e in value.split(',') if e.strip()]
+
+
+def PROFILE_KEY() -> str:
+    """Get the key that selects a request for profiling if it is given in the
+    profiling request header from the respective environment variable
+    'ROB_WEBAPI_PROFILE_KEY'. Requests are not selected by the header if the
+    variable is not set.
+
+    Returns
+    -------
+    string
+    """
+    return os.environ.get(ROB_WEBAPI_PROFILE_KEY)
+
+
+def PROFILE_MODE() -> str:
+    """Get the profiling mode from the respective environment variable
+    'ROB_WEBAPI_PROFILE_MODE'. If the variable is not set the default mode
+    'sample' is used.
+
+    Returns
+    -------
+    string
+    """
+    return os.environ.get(ROB_WEBAPI_PROFILE_MODE, 'sample').lower()
+
+
+def PROFILE_RATE() -> float:
+    """Get the fraction of requests that are selected for profiling by random
+    sampling from the respective environment variable
+    'ROB_WEBAPI_PROFILE_RATE'. If the variable is not set the default value 0
+    is used, i.e., only requests with the profiling header are profiled.
+
+    Returns
+    -------
+    float
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_PROFILE_RATE)
+    value = 0.0 if value is None else float(value)
+    if not 0 <= value <= 1:
+        raise ValueError('invalid profiling rate {}'.format(value))
+    return value
+
+
+def STREAM_MAX() -> Optional[int]:
+    """Get the maximum number of event streams and long-poll requests that
+    wait for run state changes in the worker threads of a process from the
+    respective environment variable 'ROB_WEBAPI_STREAM_MAX'. The number is
+    unbounded if the value is zero. Returns None if the variable is not set.
+    In this case the limit depends on the type of worker (see
+    robflask.api.events.stream_limit). Requests that are served by the ASGI
+    adapter wait in the event loop and are not counted.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_STREAM_MAX)
+    if value is None:
+        return None
+    value = int(value)
+    if value < 0:
+        raise ValueError('invalid number of streams {}'.format(value))
+    return value
+
+
+def TRACING() -> bool:
+    """Get the flag that enables request tracing from the respective
+    environment variable 'ROB_WEBAPI_TRACING'. If the variable is not set
+    tracing is disabled.
+
+    Returns
+    -------
+    bool
+    """
+    value = os.environ.get(ROB_WEBAPI_TRACING, 'false')
+    return value.lower() in ['1', 'true', 'yes']
+
+
+def TRACING_ENDPOINT() -> str:
+    """Get the base Url of the collector for the OTLP span exporter from the
+    respective environment variable 'ROB_WEBAPI_TRACING_ENDPOINT'. If the
+    variable is not set the default Url 'http://localhost:4318' of a local
+    collector is used.
+
+    Returns
+    -------
+    string
+    """
+    return os.environ.get(ROB_WEBAPI_TRACING_ENDPOINT, 'http://localhost:4318')
+
+
+def TRACING_EXPORTERS() -> List[str]:
+    """Get the list of span exporters from the respective environment variable
+    'ROB_WEBAPI_TRACING_EXPORTERS'. The value is a comma-separated list of
+    exporter identifiers ('file' or 'otlp'). If the variable is not set spans
+    are only written to a file in the log directory.
+
+    Returns
+    -------
+    list of string
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_TRACING_EXPORTERS, 'file')
+    exporters = [e.strip().lower() for e in value.split(',') if e.strip()]
+    for exporter in exporters:
+        if exporter not in ['file', 'otlp']:
+            raise ValueError("unknown span exporter '{}'".format(exporter))
+    return exporters
+
+
+def UPLOAD_DIR() -> str:
+    """Get the directory for the staging files of resumable chunked uploads
+    from the respective environment variable 'ROB_WEBAPI_UPLOAD_DIR'. If the
+    variable is not set a sub-folder 'upload-sessions' in the API base
+    directory is used as the default.
+
+    Returns
+    -------
+    string
+    """
+    upload_dir = os.environ.get(ROB_WEBAPI_UPLOAD_DIR)
+    # If the variable is not set use a sub-folder in the API base directory
+    if upload_dir is None:
+        from robflask.service import service
+        upload_dir = os.path.join(service.get(FLOWSERV_BASEDIR), 'upload-sessions')
+    return os.path.abspath(upload_dir)
+
+
+def UPLOAD_MAX_SIZE() -> int:
+    """Get the maximum size (in bytes) of files that are uploaded in chunks
+    from the respective environment variable 'ROB_WEBAPI_UPLOAD_MAXSIZE'. If
+    the variable is not set the default value that is equal to 10GB is used.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ValueError
+    """
+    value = os.environ.get(ROB_WEBAPI_UPLOAD_MAXSIZE)
+    maxsize = 10 * 1024 * 1024 * 1024 if value is None else int(value)
+    if maxsize <= 0:
+        raise ValueError('invalid upload size limit {}'.format(value))
+    return maxsize
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def key_values(value: str) -> Dict[str, str]:
+    """Get the key-value pairs from a comma-separated list of 'key=value'
+    strings.
+
+    Parameters
+    ----------
+    value: string
+        Comma-separated list of key-value pairs.
+
+    Returns
+    -------
+    dict
+
+    Raises
+    ------
+    ValueError
+    """
+    result = dict()
+    for pair in value.split(','):
+        if not pair.strip():
+            continue
+        key, sep, val = pair.partition('=')
+        if not sep or not key.strip():
+            raise ValueError("invalid key-value pair '{}'".format(pair))
+        result[key.strip()] = val.strip()
+    return result
+
+
+def log_level(value: str) -> str:
+    """Get the normalized name of the given logging level.
+
+    Parameters
+    ----------
+    value: string
+        Logging level name.
+
+    Returns
+    -------
+    string
+
+    Raises
+    ------
+    ValueError
+    """
+    level = value.strip().upper()
+    if level not in ['CRITICAL', 'ERROR', 'WARNING', 'INFO', 'DEBUG', 'NOTSET']:
+        raise ValueError("invalid logging level '{}'".format(value))
+    return level
@@ -0,0 +1,253 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Connection pool configuration and monitoring for the database of the
+flowserv instance that is used by the Web API.
+
+flowserv creates the SQLAlchemy engine for its database object and does not
+expose the engine arguments. The Web API therefore creates the database object
+for the flowserv API factory itself. The engine of the database object is
+created with the pool options from the Web API configuration. The pool of the
+created engine is monitored using SQLAlchemy pool events.
+
+Pool options are not applied to SQLite databases. SQLite connections are
+local and the SQLite dialect uses its own pool implementation.
+"""
+
+from typing import Dict, Optional
+
+import os
+import threading
+import time
+
+from flowserv.model.database import DB
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+import flowserv.config as flconfig
+
+
+class PooledDB(DB):
+    """flowserv database object whose engine is created with the given pool
+    options. The pool of the engine is attached to the given pool monitor.
+
+    Options are not applied for SQLite databases.
+    """
+    def __init__(
+        self, connect_url: str, web_app: Optional[bool] = False,
+        options: Optional[Dict] = None, monitor: Optional['PoolMonitor'] = None
+    ):
+        """Create the database engine and the session factory.
+
+        Parameters
+        ----------
+        connect_url: string
+            SQLAlchemy database connect Url string.
+        web_app: boolean, default=False
+            Use scoped sessions for web applications if set to True.
+        options: dict, default=None
+            Keyword arguments for SQLAlchemy's create_engine.
+        monitor: robflask.database.PoolMonitor, default=None
+            Monitor for the pool of the created engine.
+        """
+        options = options if options is not None else dict()
+        capacity = None
+        if connect_url.startswith('sqlite'):
+            options = dict()
+        elif options.get('max_overflow', -1) >= 0:
+            capacity = options['pool_size'] + options['max_overflow']
+        # Ensure that the directory for a SQLite database file exists (as in
+        # flowserv).
+        if connect_url.startswith('sqlite://'):
+            dbdir = os.path.dirname(connect_url[9:])
+            if dbdir:
+                os.makedirs(dbdir, exist_ok=True)
+        self._engine = create_engine(connect_url, **options)
+        if monitor is not None:
+            monitor.attach(self._engine, capacity=capacity)
+        if web_app:
+            self._session = scoped_session(sessionmaker(bind=self._engine))
+        else:
+            self._session = sessionmaker(bind=self._engine)
+
+
+class PoolMonitor(object):
+    """Collect usage statistics for the connection pool of a database engine.
+    The monitor counts physical connections that were opened (connection
+    churn), connection checkouts and invalidated connections, and keeps track
+    of the number of connections that are currently in use.
+    """
+    def __init__(self):
+        """Initialize the counters."""
+        self._lock = threading.Lock()
+        self.reset()
+
+    def attach(self, engine, capacity: Optional[int] = None):
+        """Register pool event listeners for the given engine. Resets all
+        counters.
+
+        Parameters
+        ----------
+        engine: sqlalchemy.engine.Engine
+            Database engine.
+        capacity: int, default=None
+            Maximum number of connections in the pool (pool size plus
+            overflow). None if the number is unbounded or unknown.
+        """
+        self.reset()
+        with self._lock:
+            self.capacity = capacity
+        event.listen(engine.pool, 'connect', self._on_connect)
+        event.listen(engine.pool, 'checkout', self._on_checkout)
+        event.listen(engine.pool, 'checkin', self._on_checkin)
+        event.listen(engine.pool, 'invalidate', self._on_invalidate)
+
+    def stats(self) -> Dict:
+        """Get dictionary with the current pool statistics. The saturation is
+        the fraction of the maximum number of connections (pool size plus
+        overflow) that is currently in use. It is None if the pool size is
+        unbounded or unknown.
+
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            capacity = self.capacity
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'invalidated': self.invalidated,
+                'checkedout': self.checkedout,
+                'peak': self.peak,
+                'capacity': capacity,
+                'saturation': self.checkedout / capacity if capacity else None,
+                'holdTime': self.hold_time
+            }
+
+    def reset(self):
+        """Reset all counters."""
+        with self._lock:
+            self.capacity = None
+            self.connects = 0
+            self.checkouts = 0
+            self.invalidated = 0
+            self.checkedout = 0
+            self.peak = 0
+            self.hold_time = 0.0
+            self._checkout_time = dict()
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        """Decrement the number of connections in use."""
+        with self._lock:
+            self.checkedout = max(0, self.checkedout - 1)
+            start = self._checkout_time.pop(id(connection_record), None)
+            if start is not None:
+                self.hold_time += time.perf_counter() - start
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        """Increment the number of connections in use."""
+        with self._lock:
+            self.checkouts += 1
+            self.checkedout += 1
+            self.peak = max(self.peak, self.checkedout)
+            self._checkout_time[id(connection_record)] = time.perf_counter()
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        """Count new physical connections."""
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        """Count invalidated connections."""
+        with self._lock:
+            self.invalidated += 1
+
+
+def pool_options(
+    pool_size: int, max_overflow: int, pre_ping: bool, recycle: int
+) -> Dict:
+    """Get keyword arguments for SQLAlchemy's create_engine for the given pool
+    configuration. Connection pooling is disabled if the pool size is zero.
+
+    Parameters
+    ----------
+    pool_size: int
+        Number of connections that are kept open in the pool.
+    max_overflow: int
+        Number of connections that can be opened in addition to the pool size.
+    pre_ping: bool
+        Test connections for liveness when they are checked out.
+    recycle: int
+        Time (in seconds) after which connections are replaced. Connections
+        are not recycled if the value is negative.
+
+    Returns
+    -------
+    dict
+    """
+    if pool_size == 0:
+        return {'poolclass': NullPool, 'pool_pre_ping': pre_ping}
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_pre_ping': pre_ping,
+        'pool_recycle': recycle
+    }
+
+
+def init_db(env: Dict, options: Dict, monitor: 'PoolMonitor') -> DB:
+    """Create the database object for the flowserv API factory from the given
+    configuration. Follows the defaults of flowserv, i.e., uses a SQLite
+    database in the base directory if no database is configured. This
+    database is initialized if the database file does not exist.
+
+    Parameters
+    ----------
+    env: dict
+        flowserv configuration settings. Missing values for the base
+        directory and the database are set to their default.
+    options: dict
+        Keyword arguments for SQLAlchemy's create_engine.
+    monitor: robflask.database.PoolMonitor
+        Monitor for the pool of the created engine.
+
+    Returns
+    -------
+    flowserv.model.database.DB
+    """
+    if flconfig.FLOWSERV_BASEDIR not in env:
+        env[flconfig.FLOWSERV_BASEDIR] = flconfig.API_DEFAULTDIR()
+    os.makedirs(env[flconfig.FLOWSERV_BASEDIR], exist_ok=True)
+    web_app = env.setdefault(flconfig.FLOWSERV_WEBAPP, True)
+    url = env.get(flconfig.FLOWSERV_DB)
+    if url is not None:
+        return PooledDB(connect_url=url, web_app=web_app, options=options, monitor=monitor)
+    dbfile = '{}/flowserv.db'.format(env[flconfig.FLOWSERV_BASEDIR])
+    env[flconfig.FLOWSERV_DB] = 'sqlite:///{}'.format(dbfile)
+    db = PooledDB(connect_url=env[flconfig.FLOWSERV_DB], web_app=web_app, options=options, monitor=monitor)
+    if not os.path.isfile(dbfile):
+        db.init()
+    return db
+
+
+# -- Monitor singleton --------------------------------------------------------
+
+"""Global pool monitor for the database of the Web API service."""
+_monitor = PoolMonitor()
+
+
+def pool_monitor() -> PoolMonitor:
+    """Get the monitor for the connection pool of the global API factory.
+
+    Returns
+    -------
+    robflask.database.PoolMonitor
+    """
+    return _monitor
@@ -34,3 +34,102 @@ class InvalidRequestError(Exception):
         string
         """
         return self.message
+
+
+class ServiceUnavailableError(Exception):
+    """Error that is raised when a request cannot be handled because a
+    resource of the worker process is exhausted. The client may retry the
+    request after the given number of seconds.
+    """
+    def __init__(self, message, retry_after):
+        """Initialize error message and the retry interval.
+
+        Parameters
+        ----------
+        message : string
+            Error message.
+        retry_after : int
+            Number of seconds after which the client may retry the request.
+        """
+        Exception.__init__(self)
+        self.message = message
+        self.retry_after = retry_after
+
+    def __str__(self):
+        """Get printable representation of the exception.
+
+        Returns
+        -------
+        string
+        """
+        return self.message
+
+
+class UnknownBlobError(Exception):
+    """Error that is raised when a request references file content by a
+    checksum that is not contained in the blob store.
+    """
+    def __init__(self, checksum):
+        """Initialize error message.
+
+        Parameters
+        ----------
+        checksum : string
+            SHA-256 checksum of the file content.
+        """
+        Exception.__init__(self)
+        self.message = "unknown file content '{}'".format(checksum)
+
+    def __str__(self):
+        """Get printable representation of the exception.
+
+        Returns
+        -------
+        string
+        """
+        return self.message
+
+
+class UnknownUploadSessionError(Exception):
+    """Error that is raised when a request references an unknown (or expired)
+    upload session.
+    """
+    def __init__(self, session_id):
+        """Initialize error message.
+
+        Parameters
+        ----------
+        session_id : string
+            Unique upload session identifier.
+        """
+        Exception.__init__(self)
+        self.message = "unknown upload session '{}'".format(session_id)
+
+    def __str__(self):
+        """Get printable representation of the exception.
+
+        Returns
+        -------
+        string
+        """
+        return self.message
+
+
+class UploadOffsetError(InvalidRequestError):
+    """Error that is raised when the offset of an uploaded chunk does not
+    match the number of bytes that have been received for the upload session.
+    """
+    def __init__(self, offset, expected):
+        """Initialize error message and the expected offset.
+
+        Parameters
+        ----------
+        offset : int
+            Offset of the uploaded chunk.
+        expected : int
+            Number of bytes that have been received for the upload session.
+        """
+        super(UploadOffsetError, self).__init__(
+            'invalid offset {} (expected {})'.format(offset, expected)
+        )
+        self.offset = expected
@@ -0,0 +1,55 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Helper functions for file handles that are returned by the flowserv API."""
+
+from typing import Optional
+
+import os
+
+from flowserv.model.files.base import IOHandle
+
+
+def file_size(fh: IOHandle) -> Optional[int]:
+    """Get the size of the file that is referenced by the given handle.
+    Returns None if the size is unknown.
+
+    Parameters
+    ----------
+    fh: flowserv.model.files.base.IOHandle
+        Handle for a file object.
+
+    Returns
+    -------
+    int
+    """
+    try:
+        return fh.size()
+    except (AttributeError, NotImplementedError, OSError):
+        return None
+
+
+def local_path(fh: IOHandle) -> Optional[str]:
+    """Get the path for a file handle that references a file on the local file
+    system. Returns None if the file handle references a file in a different
+    storage backend or an in-memory object.
+
+    Parameters
+    ----------
+    fh: flowserv.model.files.base.IOHandle
+        Handle for a file object.
+
+    Returns
+    -------
+    string
+    """
+    # File handles in flowserv may wrap another handle for the file object.
+    filename = getattr(getattr(fh, 'fileobj', fh), 'filename', None)
+    if isinstance(filename, str) and os.path.isfile(filename):
+        return filename
+    return None
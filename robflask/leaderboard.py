@@ -0,0 +1,819 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Server-side cache for benchmark leader boards.
+
+Computing the leader board for a benchmark requires flowserv to query and sort
+the results of all runs for the benchmark. The leader board only changes when
+a run for the benchmark reaches a terminal state (or when a finished run is
+deleted). The cache keeps the serialized ranking for each combination of
+workflow identifier, sort columns and the include all flag. Entries for a
+workflow are invalidated whenever the Web API observes that a run for the
+workflow entered a terminal state. The first state that is observed for a run
+only serves as the baseline for later transitions. Listing the runs of a
+submission with finished runs therefore does not invalidate any cached leader
+boards.
+
+Cached leader boards are maintained incrementally where possible. Each cached
+ranking is kept together with the list of sort keys for its entries. When a
+request handler observes that a run finished successfully, the ranking entry
+for the run is created from the run handle and the result file that is defined
+in the workflow result schema. New entries are merged into the ranking at the
+position that is found by binary search over the sort keys when the leader
+board is read next. Reads of an updated leader board remain slices of the
+sorted ranking. Cached leader boards are invalidated instead if the entry for
+the run cannot be created (e.g., if the run is observed without an
+authenticated service API or if the result file cannot be read), or if the
+result schema of the workflow (and therefore the default sort order) is not
+known.
+
+Run state changes are made by the asynchronous workflow engine and are only
+observed by the Web API when the run state is read (e.g., when a client polls
+the state of a run). Cache entries therefore also expire after a configurable
+time period to put an upper bound on the time that a stale leader board can be
+served.
+
+Clients that only display the top entries of a leader board (or the rank of
+their own submission) request a page of the ranking. flowserv always returns
+the full ranking: it loads the results of all successful runs for the workflow
+and sorts them in Python. Pages are slices of the cached ranking. Only the
+entries on the requested page are serialized in the response.
+"""
+
+from collections import OrderedDict
+from functools import total_ordering
+from typing import Any, Dict, List, Optional, Tuple
+
+import bisect
+import json
+import logging
+import threading
+import time
+
+import flowserv.model.workflow.state as st
+import flowserv.view.files as flbls
+import flowserv.view.group as glbls
+import flowserv.view.run as labels
+
+from flowserv.model.template.schema import ResultSchema
+from flowserv.util import jquery
+
+
+"""Run states after which the results of a run no longer change."""
+TERMINAL_STATES = [st.STATE_CANCELED, st.STATE_ERROR, st.STATE_SUCCESS]
+
+"""Labels for serialized leader boards and leader board pages."""
+LEADERBOARD_LIMIT = 'limit'
+LEADERBOARD_OFFSET = 'offset'
+LEADERBOARD_RANK = 'rank'
+LEADERBOARD_RANKING = 'ranking'
+LEADERBOARD_TOTAL = 'total'
+RANKING_GROUP = 'group'
+RANKING_ID = 'id'
+RANKING_NAME = 'name'
+RANKING_RESULTS = 'results'
+RANKING_RUN = 'run'
+RANKING_VALUE = 'value'
+
+
+class LeaderboardCache(object):
+    """Cache for serialized leader boards. The cache is keyed by the workflow
+    identifier, the list of sort columns and the include all flag. Sort
+    columns are given as a list of (column name, sort descending) tuples.
+
+    The cache is shared by all request handlers in a worker process. All
+    methods are thread-safe.
+    """
+    def __init__(self, ttl: int, maxsize: Optional[int] = 256, maxruns: Optional[int] = 10000):
+        """Initialize the time-to-live for cache entries and the upper bounds
+        for the number of cached leader boards and tracked run states.
+
+        Parameters
+        ----------
+        ttl: int
+            Time (in seconds) after which a cached leader board expires. The
+            cache is disabled if the value is zero or negative.
+        maxsize: int, default=256
+            Maximum number of cached leader boards. The least recently used
+            entry is removed when the limit is exceeded.
+        maxruns: int, default=10000
+            Maximum number of runs for which the last observed state is kept.
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.maxruns = maxruns
+        self._entries = OrderedDict()
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.updates = 0
+
+    def get(
+        self, workflow_id: str, order_by: Optional[List[Tuple[str, bool]]],
+        include_all: Optional[bool]
+    ) -> Optional[Dict]:
+        """Get the cached leader board for the given key. Returns None if no
+        valid entry exists for the key.
+
+        Parameters
+        ----------
+        workflow_id: string
+            Unique workflow identifier.
+        order_by: list of (string, bool)
+            List of sort columns. Each column is represented by a tuple of
+            column name and sort descending flag.
+        include_all: bool
+            Include all runs of each group in the ranking.
+
+        Returns
+        -------
+        dict
+        """
+        key = self._key(workflow_id, order_by, include_all)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, ranking = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return ranking.leaderboard
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def invalidate(self, workflow_id: Optional[str] = None):
+        """Remove all cached leader boards for the given workflow. If no
+        workflow identifier is given the whole cache is cleared.
+
+        Parameters
+        ----------
+        workflow_id: string, default=None
+            Unique workflow identifier.
+        """
+        with self._lock:
+            if workflow_id is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == workflow_id]:
+                    del self._entries[key]
+            self.invalidations += 1
+
+    def put(
+        self, workflow_id: str, order_by: Optional[List[Tuple[str, bool]]],
+        include_all: Optional[bool], ranking: Dict,
+        schema: Optional[ResultSchema] = None
+    ):
+        """Add a serialized leader board to the cache. The cached leader board
+        is only maintained incrementally if the result schema of the workflow
+        is given.
+
+        Parameters
+        ----------
+        workflow_id: string
+            Unique workflow identifier.
+        order_by: list of (string, bool)
+            List of sort columns. Each column is represented by a tuple of
+            column name and sort descending flag.
+        include_all: bool
+            Include all runs of each group in the ranking.
+        ranking: dict
+            Serialized leader board.
+        schema: flowserv.model.template.schema.ResultSchema, default=None
+            Result schema of the workflow.
+        """
+        if self.ttl <= 0:
+            return
+        key = self._key(workflow_id, order_by, include_all)
+        ranking = SortedRanking(ranking, order_by=order_by, include_all=include_all, schema=schema)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, ranking)
+            self._entries.move_to_end(key)
+            while self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def run_state(self, run: Dict, api: Optional[Any] = None, workflow_id: Optional[str] = None):
+        """Notify the cache about the state of a run. The given dictionary is
+        a serialized run handle or run descriptor. Leader boards for the run
+        workflow are updated when the run enters a terminal state.
+
+        The first observed state of a run is recorded as the baseline for the
+        run and does not change the cache. Leader boards only change when the
+        cache observes the transition of a run from an active state to a
+        terminal state. Transitions that were not observed by the cache (e.g.,
+        before a restart) are reflected in the leader boards when the cached
+        entries expire.
+
+        If the run finished successfully and a service API is given, the
+        ranking entry for the run is inserted into all cached leader boards
+        for the run workflow. Otherwise, the leader boards for the workflow
+        are invalidated. Run descriptors in run listings do not contain the
+        workflow identifier. The run handle is read from the service API in
+        this case (unless the workflow identifier is given). The cache is not
+        changed if the workflow of the run cannot be determined.
+
+        Parameters
+        ----------
+        run: dict
+            Serialized run handle or run descriptor.
+        api: flowserv.service.api.API, default=None
+            Service API for a user that is authorized to access the run
+            result files.
+        workflow_id: string, default=None
+            Identifier of the run workflow for run descriptors that do not
+            contain the workflow identifier.
+        """
+        run_id = run.get(labels.RUN_ID)
+        state = run.get(labels.RUN_STATE)
+        if run_id is None or state is None:
+            return
+        with self._lock:
+            prev_state = self._runs.pop(run_id, None)
+            self._runs[run_id] = state
+            while self.maxruns is not None and len(self._runs) > self.maxruns:
+                self._runs.popitem(last=False)
+            if not self._entries:
+                return
+        if prev_state is None or prev_state in TERMINAL_STATES or state not in TERMINAL_STATES:
+            return
+        workflow_id = run.get(labels.RUN_WORKFLOW, workflow_id)
+        if api is not None and (workflow_id is None or (state == st.STATE_SUCCESS and labels.RUN_FILES not in run)):
+            # Read the run handle to get the workflow, the submission and the
+            # result files for the run.
+            try:
+                run = api.runs().get_run(run_id=run_id)
+                workflow_id = run.get(labels.RUN_WORKFLOW, workflow_id)
+            except Exception as ex:
+                logging.error(ex)
+        if workflow_id is None:
+            return
+        if state == st.STATE_SUCCESS and api is not None:
+            if self._insert(workflow_id, run, api):
+                return
+        self.invalidate(workflow_id=workflow_id)
+
+    def run_deleted(self, run: Dict, workflow_id: Optional[str] = None):
+        """Notify the cache that a run has been deleted. Invalidates the leader
+        boards for the workflow of the deleted run if the run was in a
+        terminal state. The cache is not changed if the workflow of the run
+        is not known.
+
+        Parameters
+        ----------
+        run: dict
+            Serialized handle or descriptor for the deleted run.
+        workflow_id: string, default=None
+            Identifier of the run workflow for run descriptors that do not
+            contain the workflow identifier.
+        """
+        with self._lock:
+            self._runs.pop(run.get(labels.RUN_ID), None)
+        workflow_id = run.get(labels.RUN_WORKFLOW, workflow_id)
+        if run.get(labels.RUN_STATE) in TERMINAL_STATES and workflow_id is not None:
+            self.invalidate(workflow_id=workflow_id)
+
+    def stats(self) -> Dict:
+        """Get dictionary with the current values of the cache counters.
+
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'updates': self.updates,
+                'size': len(self._entries)
+            }
+
+    def _insert(self, workflow_id: str, run: Dict, api: Any) -> bool:
+        """Insert the ranking entry for a successful run into all cached leader
+        boards for the given workflow. Returns False if the leader boards need
+        to be invalidated instead, i.e., if one of them cannot be maintained
+        incrementally or if the ranking entry cannot be created.
+
+        Returns
+        -------
+        bool
+        """
+        with self._lock:
+            rankings = [r for k, (_, r) in self._entries.items() if k[0] == workflow_id]
+            if not rankings:
+                return True
+            if not all(r.incremental for r in rankings):
+                return False
+            # The ranking entry is created from the format of the first cached
+            # leader board.
+            template = rankings[0].template
+            schema = rankings[0].schema
+            group_id = run.get(labels.RUN_GROUP)
+            groups = [r.group(group_id) for r in rankings]
+            group = next((g for g in groups if g is not None), None)
+        # Read the run results outside of the lock.
+        try:
+            entry = ranking_entry(api, run, template, group, schema)
+        except Exception as ex:
+            logging.error(ex)
+            entry = None
+        if entry is None:
+            return False
+        with self._lock:
+            for ranking in rankings:
+                ranking.insert(entry)
+            self.updates += 1
+        return True
+
+    def _key(
+        self, workflow_id: str, order_by: Optional[List[Tuple[str, bool]]],
+        include_all: Optional[bool]
+    ) -> Tuple:
+        """Get the cache key for a leader board request.
+
+        Returns
+        -------
+        tuple
+        """
+        order_by = tuple(order_by) if order_by is not None else None
+        return (workflow_id, order_by, bool(include_all))
+
+
+@total_ordering
+class SortValue(object):
+    """Wrapper for a result value in the sort key of a ranking entry. Values
+    for columns that are sorted in descending order compare in reverse order.
+    Missing values are ordered after all other values.
+    """
+    def __init__(self, value: Any, sort_desc: bool):
+        """Initialize the wrapped value and the sort order.
+
+        Parameters
+        ----------
+        value: any
+            Result value.
+        sort_desc: bool
+            Sort values in descending order.
+        """
+        self.value = value
+        self.sort_desc = sort_desc
+
+    def __eq__(self, other):
+        """Test if the wrapped values are equal."""
+        return self.value == other.value
+
+    def __lt__(self, other):
+        """Compare the wrapped values with respect to the sort order."""
+        if self.value is None or other.value is None:
+            return self.value is not None and other.value is None
+        if self.sort_desc:
+            return self.value > other.value
+        return self.value < other.value
+
+
+class SortedRanking(object):
+    """Serialized leader board together with the sort keys of its ranking
+    entries. The sort keys are used to insert the entries for new runs at
+    their position in the ranking by binary search.
+
+    The published ranking list is never modified in place. Request handlers
+    serialize the leader board outside of the cache lock. Inserted entries are
+    therefore kept in a list of pending entries. The pending entries are merged
+    into a new ranking list (a single copy of the list of references) the next
+    time the leader board is read.
+    """
+    def __init__(
+        self, leaderboard: Dict, order_by: Optional[List[Tuple[str, bool]]],
+        include_all: Optional[bool], schema: Optional[ResultSchema] = None
+    ):
+        """Initialize the leader board and the sort keys. The ranking can only
+        be maintained incrementally if the result schema of the workflow is
+        given and if the sort keys of the entries in the given ranking are in
+        ascending order.
+
+        Parameters
+        ----------
+        leaderboard: dict
+            Serialized leader board.
+        order_by: list of (string, bool)
+            List of sort columns. Each column is represented by a tuple of
+            column name and sort descending flag.
+        include_all: bool
+            Include all runs of each group in the ranking.
+        schema: flowserv.model.template.schema.ResultSchema, default=None
+            Result schema of the workflow.
+        """
+        self._leaderboard = leaderboard
+        self.include_all = bool(include_all)
+        self.schema = schema
+        self.order = sort_order(order_by, schema)
+        self.keys = None
+        self._pending = list()
+        self._removed = set()
+        if self.order is not None:
+            ranking = leaderboard.get(LEADERBOARD_RANKING, list())
+            keys = [self.key(entry) for entry in ranking]
+            if all(keys[i] <= keys[i + 1] for i in range(len(keys) - 1)):
+                self.keys = keys
+                self.runs = {entry_run(entry) for entry in ranking}
+                # Sort key and ranking entry of the best run for each group.
+                self.groups = dict()
+                for entry, key in zip(ranking, keys):
+                    self.groups.setdefault(entry_group(entry), (key, entry))
+
+    @property
+    def incremental(self) -> bool:
+        """Test if the ranking can be maintained incrementally.
+
+        Returns
+        -------
+        bool
+        """
+        return self.keys is not None
+
+    @property
+    def leaderboard(self) -> Dict:
+        """Get the serialized leader board. Pending entries are merged into the
+        ranking first.
+
+        Returns
+        -------
+        dict
+        """
+        if self._pending or self._removed:
+            self._merge()
+        return self._leaderboard
+
+    @property
+    def template(self) -> Optional[Dict]:
+        """Get a ranking entry that defines the format for new entries. Returns
+        None if the ranking is empty.
+
+        Returns
+        -------
+        dict
+        """
+        ranking = self._leaderboard.get(LEADERBOARD_RANKING)
+        return ranking[0] if ranking else None
+
+    def group(self, group_id: str) -> Optional[Dict]:
+        """Get the serialized submission for a group that has an entry in the
+        ranking. Returns None if the ranking contains no entry for the group.
+
+        Parameters
+        ----------
+        group_id: string
+            Unique submission identifier.
+
+        Returns
+        -------
+        dict
+        """
+        if not self.incremental or group_id not in self.groups:
+            return None
+        _, entry = self.groups[group_id]
+        return entry[RANKING_GROUP]
+
+    def insert(self, entry: Dict):
+        """Insert the ranking entry for a run. If the ranking contains only
+        the best run for each group, the entry replaces the current entry for
+        the group if it is ranked higher and it is ignored otherwise.
+
+        Parameters
+        ----------
+        entry: dict
+            Serialized ranking entry.
+        """
+        run_id = entry_run(entry)
+        if run_id in self.runs:
+            return
+        self.runs.add(run_id)
+        key = self.key(entry)
+        group_id = entry_group(entry)
+        best = self.groups.get(group_id)
+        if best is None or key < best[0]:
+            if best is not None and not self.include_all:
+                self._removed.add(entry_run(best[1]))
+            self.groups[group_id] = (key, entry)
+        elif not self.include_all:
+            return
+        self._pending.append((key, entry))
+
+    def key(self, entry: Dict) -> Tuple[SortValue, ...]:
+        """Get the sort key for a ranking entry.
+
+        Parameters
+        ----------
+        entry: dict
+            Serialized ranking entry.
+
+        Returns
+        -------
+        tuple
+        """
+        values = entry_results(entry)
+        return tuple(SortValue(values.get(col), desc) for col, desc in self.order)
+
+    def _merge(self):
+        """Merge the pending entries into a new ranking list and remove the
+        entries that were replaced by a higher ranked entry for the same
+        group. New entries are placed after existing entries with an equal
+        sort key.
+        """
+        ranking = self._leaderboard.get(LEADERBOARD_RANKING, list())
+        merged, keys, start = list(), list(), 0
+        for key, entry in sorted(self._pending, key=lambda e: e[0]):
+            pos = bisect.bisect_right(self.keys, key, lo=start)
+            merged.extend(ranking[start:pos])
+            keys.extend(self.keys[start:pos])
+            merged.append(entry)
+            keys.append(key)
+            start = pos
+        merged.extend(ranking[start:])
+        keys.extend(self.keys[start:])
+        if self._removed:
+            pos = [i for i, e in enumerate(merged) if entry_run(e) not in self._removed]
+            merged = [merged[i] for i in pos]
+            keys = [keys[i] for i in pos]
+        leaderboard = dict(self._leaderboard)
+        leaderboard[LEADERBOARD_RANKING] = merged
+        self._leaderboard = leaderboard
+        self.keys = keys
+        self._pending = list()
+        self._removed = set()
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def entry_group(entry: Dict) -> str:
+    """Get the submission identifier for a serialized ranking entry.
+
+    Parameters
+    ----------
+    entry: dict
+        Serialized ranking entry.
+
+    Returns
+    -------
+    string
+    """
+    return entry.get(RANKING_GROUP, dict()).get(RANKING_ID)
+
+
+def entry_results(entry: Dict) -> Dict:
+    """Get mapping of result column identifier to value for a serialized
+    ranking entry.
+
+    Parameters
+    ----------
+    entry: dict
+        Serialized ranking entry.
+
+    Returns
+    -------
+    dict
+    """
+    values = dict()
+    for r in entry.get(RANKING_RESULTS, list()):
+        values[r.get(RANKING_ID, r.get(RANKING_NAME))] = r.get(RANKING_VALUE)
+    return values
+
+
+def entry_run(entry: Dict) -> str:
+    """Get the run identifier for a serialized ranking entry.
+
+    Parameters
+    ----------
+    entry: dict
+        Serialized ranking entry.
+
+    Returns
+    -------
+    string
+    """
+    return entry.get(RANKING_RUN, dict()).get(RANKING_ID)
+
+
+def group_rank(ranking: List[Dict], group_id: str) -> Optional[int]:
+    """Get the rank of the first entry for the given group in a serialized
+    ranking. Ranks start at 1. Returns None if the ranking does not contain
+    an entry for the group.
+
+    Parameters
+    ----------
+    ranking: list of dict
+        List of serialized ranking entries.
+    group_id: string
+        Unique submission identifier.
+
+    Returns
+    -------
+    int
+    """
+    for pos, entry in enumerate(ranking):
+        if entry_group(entry) == group_id:
+            return pos + 1
+    return None
+
+
+def leaderboard_page(
+    leaderboard: Dict, limit: Optional[int] = None, offset: Optional[int] = 0,
+    group_id: Optional[str] = None
+) -> Dict:
+    """Get a page of a serialized leader board. The page contains the ranking
+    entries from the given offset, the total number of entries and, if a
+    submission identifier is given, the rank of the submission.
+
+    Parameters
+    ----------
+    leaderboard: dict
+        Serialized leader board.
+    limit: int, default=None
+        Maximum number of entries on the page. The page contains all entries
+        after the offset if no limit is given.
+    offset: int, default=0
+        Number of entries to skip.
+    group_id: string, default=None
+        Unique identifier of the submission whose rank is included in the
+        page.
+
+    Returns
+    -------
+    dict
+    """
+    ranking = leaderboard.get(LEADERBOARD_RANKING, list())
+    end = offset + limit if limit is not None else None
+    page = dict(leaderboard)
+    page[LEADERBOARD_RANKING] = ranking[offset:end]
+    page[LEADERBOARD_TOTAL] = len(ranking)
+    page[LEADERBOARD_OFFSET] = offset
+    if limit is not None:
+        page[LEADERBOARD_LIMIT] = limit
+    if group_id is not None:
+        page[LEADERBOARD_RANK] = group_rank(ranking, group_id)
+    return page
+
+
+def ranking_entry(
+    api: Any, run: Dict, template: Dict, group: Optional[Dict],
+    schema: ResultSchema
+) -> Optional[Dict]:
+    """Create the serialized ranking entry for a successful run. The entry
+    uses the same format as the given template entry. The result values are
+    read from the result file of the run that is defined in the workflow
+    result schema.
+
+    Returns None if no template is given (i.e., the entry format is not known)
+    or if the run result file cannot be read.
+
+    Parameters
+    ----------
+    api: flowserv.service.api.API
+        Service API for a user that is authorized to access the run result
+        files.
+    run: dict
+        Serialized handle for a successful run.
+    template: dict
+        Serialized ranking entry.
+    group: dict
+        Serialized submission for the run group. The submission is read from
+        the service API if no serialization is given.
+    schema: flowserv.model.template.schema.ResultSchema
+        Result schema of the workflow.
+
+    Returns
+    -------
+    dict
+    """
+    if template is None:
+        return None
+    values = run_results(api, run, schema)
+    if values is None:
+        return None
+    if group is None:
+        doc = api.groups().get_group(group_id=run.get(labels.RUN_GROUP))
+        group = {RANKING_ID: doc[glbls.GROUP_ID], RANKING_NAME: doc[glbls.GROUP_NAME]}
+    # Use the same labels for the run and the results as the template entry.
+    results = template.get(RANKING_RESULTS)
+    label = RANKING_NAME if results and RANKING_ID not in results[0] else RANKING_ID
+    return {
+        RANKING_RUN: {key: run.get(key) for key in template.get(RANKING_RUN, dict())},
+        RANKING_GROUP: group,
+        RANKING_RESULTS: [{label: key, RANKING_VALUE: val} for key, val in values.items()]
+    }
+
+
+def result_schema(api: Any, workflow_id: str) -> Optional[ResultSchema]:
+    """Get the result schema of a workflow. Returns None if the schema cannot
+    be accessed (e.g., for a remote service API) or if the workflow does not
+    have a result schema.
+
+    Parameters
+    ----------
+    api: flowserv.service.api.API
+        Service API.
+    workflow_id: string
+        Unique workflow identifier.
+
+    Returns
+    -------
+    flowserv.model.template.schema.ResultSchema
+    """
+    repo = getattr(api.workflows(), 'workflow_repo', None)
+    if repo is None:
+        return None
+    return repo.get_workflow(workflow_id).result_schema
+
+
+def run_results(api: Any, run: Dict, schema: ResultSchema) -> Optional[Dict]:
+    """Read the result values for a successful run from the result file that
+    is defined in the workflow result schema. Values are extracted and cast
+    to the column type in the same way as flowserv does. Returns None if the
+    run does not have the result file or if a required value is missing.
+
+    Parameters
+    ----------
+    api: flowserv.service.api.API
+        Service API for a user that is authorized to access the run result
+        files.
+    run: dict
+        Serialized handle for a successful run.
+    schema: flowserv.model.template.schema.ResultSchema
+        Result schema of the workflow.
+
+    Returns
+    -------
+    dict
+    """
+    for f in run.get(labels.RUN_FILES, list()):
+        if f[flbls.FILE_NAME] != schema.result_file:
+            continue
+        fh = api.runs().get_result_file(run_id=run[labels.RUN_ID], file_id=f[flbls.FILE_ID])
+        with fh.open() as fp:
+            doc = json.load(fp)
+        values = dict()
+        for col in schema.columns:
+            val = jquery(doc=doc, path=col.jpath())
+            if val is not None:
+                values[col.column_id] = col.cast(val)
+            elif col.required:
+                return None
+        return values
+    return None
+
+
+def sort_order(
+    order_by: Optional[List[Tuple[str, bool]]], schema: Optional[ResultSchema]
+) -> Optional[List[Tuple[str, bool]]]:
+    """Get the list of sort columns for a leader board. Columns without sort
+    order are sorted in descending order. If no sort columns are given, the
+    default sort order of the workflow result schema is used.
+
+    Returns None if the result schema is not given. Rankings without a known
+    result schema are not maintained incrementally.
+
+    Parameters
+    ----------
+    order_by: list of (string, bool)
+        List of sort columns. Each column is represented by a tuple of
+        column name and sort descending flag.
+    schema: flowserv.model.template.schema.ResultSchema
+        Result schema of the workflow.
+
+    Returns
+    -------
+    list of (string, bool)
+    """
+    if schema is None or not schema.columns:
+        return None
+    if order_by is None:
+        return [(col.column_id, col.sort_desc) for col in schema.get_default_order()]
+    return [(col, desc if desc is not None else True) for col, desc in order_by]
+
+
+# -- Cache singleton ----------------------------------------------------------
+
+"""Global leader board cache that is used by all request handlers."""
+_cache = None
+
+
+def cache() -> LeaderboardCache:
+    """Get the global leader board cache. The cache is created on first access
+    using the time-to-live value from the Web API configuration.
+
+    Returns
+    -------
+    robflask.leaderboard.LeaderboardCache
+    """
+    global _cache
+    if _cache is None:
+        from robflask.config import LEADERBOARD_TTL
+        _cache = LeaderboardCache(ttl=LEADERBOARD_TTL())
+    return _cache
@@ -0,0 +1,431 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Structured, non-blocking logging for the Web API.
+
+Log records are put on a queue by the thread that creates them. A background
+listener thread formats the records as JSON documents (one document per line)
+and writes them to standard output and, for errors, to a rotating log file in
+the log directory. Request handlers do not wait for log output.
+
+Records that are created while a request is handled contain the request
+identifier, the request route, and the identifier of the authenticated user.
+The request identifier is taken from the 'X-Request-ID' request header or it
+is generated if the header is missing. It is returned in the response header
+of the same name. After the response body was sent, an access record with
+the response status, size, and duration is written to the 'robflask.access'
+logger.
+
+Records for high-volume events can be sampled. The event of a record is set
+using the 'event' key in the extra arguments of the logging call. Sampling
+rates are given for each event type. Records with level WARNING or higher
+are never dropped.
+"""
+
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional
+
+import atexit
+import copy
+import datetime
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+from robflask.response import call_on_close
+
+
+"""Name of the logger for request access records."""
+ACCESS_LOGGER = 'robflask.access'
+
+"""Event types for sampled records."""
+EVENT_DOWNLOAD = 'download'
+EVENT_REQUEST = 'request'
+
+"""Request and response header for the request identifier."""
+HEADER_REQUEST_ID = 'X-Request-ID'
+
+"""Pattern for request identifiers that are taken from the request header.
+Identifiers that do not match the pattern (or that exceed the maximum length)
+are replaced by a generated identifier.
+"""
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,128}')
+
+"""Route for requests that do not match a route."""
+UNMATCHED_ROUTE = '<unmatched>'
+
+"""Attributes of log records that are included in the JSON documents (in
+addition to time, level, logger and message).
+"""
+RECORD_FIELDS = ['event', 'requestId', 'method', 'route', 'user', 'status', 'size', 'duration']
+
+
+class ContextFilter(logging.Filter):
+    """Add the request context of the current thread to log records. Values
+    that are set explicitly for a record are not overwritten.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Add the request context to the given record.
+
+        Parameters
+        ----------
+        record: logging.LogRecord
+            Log record.
+
+        Returns
+        -------
+        bool
+        """
+        context = getattr(_local, 'context', None)
+        if context is not None:
+            for key, value in context.items():
+                if not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """Format log records as single-line JSON documents."""
+    def format(self, record: logging.LogRecord) -> str:
+        """Get the JSON document for the given record.
+
+        Parameters
+        ----------
+        record: logging.LogRecord
+            Log record.
+
+        Returns
+        -------
+        string
+        """
+        doc = {
+            'time': datetime.datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key in RECORD_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                doc[key] = value
+        if record.exc_info:
+            doc['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            doc['exception'] = record.exc_text
+        return json.dumps(doc, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Sample log records for high-volume events. Records without an event,
+    records for events without a sampling rate, and records with level
+    WARNING or higher are always kept.
+    """
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        """Initialize the sampling rates for event types.
+
+        Parameters
+        ----------
+        rates: dict, default=None
+            Fraction of records that are kept for each event type.
+        """
+        super(SamplingFilter, self).__init__()
+        self.rates = rates if rates is not None else dict()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Test if the given record is kept.
+
+        Parameters
+        ----------
+        record: logging.LogRecord
+            Log record.
+
+        Returns
+        -------
+        bool
+        """
+        rate = self.rates.get(getattr(record, 'event', None))
+        if rate is None or record.levelno >= logging.WARNING or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class StructuredQueueHandler(QueueHandler):
+    """Queue handler that keeps the record attributes for the JSON formatter.
+    The message arguments and the exception information are resolved before
+    the record is put on the queue.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Prepare the given record for the queue.
+
+        Parameters
+        ----------
+        record: logging.LogRecord
+            Log record.
+
+        Returns
+        -------
+        logging.LogRecord
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogPipeline(object):
+    """Queue-based logging pipeline. Records from all loggers are put on a
+    queue by the root logger handler. The listener writes the records to the
+    output handlers in a background thread.
+    """
+    def __init__(
+        self, handlers: List[logging.Handler], level: Optional[str] = 'INFO',
+        levels: Optional[Dict[str, str]] = None, sampling: Optional[Dict[str, float]] = None
+    ):
+        """Initialize the output handlers and the logging configuration.
+
+        Parameters
+        ----------
+        handlers: list of logging.Handler
+            Output handlers.
+        level: string, default='INFO'
+            Level for the root logger.
+        levels: dict, default=None
+            Levels for individual loggers.
+        sampling: dict, default=None
+            Sampling rates for event types.
+        """
+        self.handlers = handlers
+        self.level = level
+        self.levels = levels if levels is not None else dict()
+        self.sampler = SamplingFilter(sampling)
+        q = queue.Queue(-1)
+        self.handler = StructuredQueueHandler(q)
+        self.handler.addFilter(ContextFilter())
+        self.handler.addFilter(self.sampler)
+        self.listener = QueueListener(q, *handlers, respect_handler_level=True)
+        self.running = False
+        self._replaced = list()
+
+    def start(self):
+        """Replace the handlers of the root logger with the queue handler and
+        start the listener thread. Existing root handlers (e.g., the default
+        handler that is added by module-level logging calls) are restored when
+        the pipeline is stopped.
+        """
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        for name, level in self.levels.items():
+            logging.getLogger(name).setLevel(level)
+        self._replaced = list(root.handlers)
+        for handler in self._replaced:
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        self.listener.start()
+        self.running = True
+
+    def stop(self):
+        """Remove the queue handler from the root logger. Writes all pending
+        records and closes the output handlers. Does nothing if the pipeline
+        is not running.
+        """
+        if not self.running:
+            return
+        self.running = False
+        root = logging.getLogger()
+        root.removeHandler(self.handler)
+        for handler in self._replaced:
+            root.addHandler(handler)
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+
+def init_logging(
+    logdir: str, level: Optional[str] = 'INFO', levels: Optional[Dict[str, str]] = None,
+    sampling: Optional[Dict[str, float]] = None, stream=None
+) -> LogPipeline:
+    """Start the logging pipeline for the Web API. All records are written to
+    the given stream (standard output by default). Errors are also written to
+    a rotating log file in the given log directory. Replaces the pipeline of
+    a previous call.
+
+    Parameters
+    ----------
+    logdir: string
+        Directory for the error log file.
+    level: string, default='INFO'
+        Level for the root logger.
+    levels: dict, default=None
+        Levels for individual loggers.
+    sampling: dict, default=None
+        Sampling rates for event types.
+    stream: file-like object, default=None
+        Output stream for all records.
+
+    Returns
+    -------
+    robflask.logger.LogPipeline
+    """
+    global _pipeline
+    formatter = JSONFormatter()
+    stream_handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    stream_handler.setFormatter(formatter)
+    os.makedirs(logdir, exist_ok=True)
+    file_handler = RotatingFileHandler(
+        os.path.join(logdir, 'webapi.log'),
+        maxBytes=1024 * 1024 * 100,
+        backupCount=20
+    )
+    file_handler.setLevel(logging.ERROR)
+    file_handler.setFormatter(formatter)
+    pipeline = LogPipeline(
+        handlers=[stream_handler, file_handler],
+        level=level,
+        levels=levels,
+        sampling=sampling
+    )
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+            _pipeline = None
+        pipeline.start()
+        _pipeline = pipeline
+    return pipeline
+
+
+# -- Request hooks ------------------------------------------------------------
+
+"""Request context for the request that is handled by the current thread."""
+_local = threading.local()
+
+
+def request_id(value: Optional[str]) -> str:
+    """Get the identifier for a request from the value of the request header.
+    Generates a new identifier if the header is missing or if the value does
+    not match the request identifier pattern. This prevents clients from
+    injecting arbitrary content into log records and response headers.
+
+    Parameters
+    ----------
+    value: string
+        Value of the request identifier header.
+
+    Returns
+    -------
+    string
+    """
+    if value is not None and REQUEST_ID_PATTERN.fullmatch(value):
+        return value
+    return uuid.uuid4().hex
+
+
+def request_user(user_id: str):
+    """Set the identifier of the authenticated user in the request context of
+    the current thread. Does nothing if no request is handled by the current
+    thread.
+
+    Parameters
+    ----------
+    user_id: string
+        Unique user identifier.
+    """
+    context = getattr(_local, 'context', None)
+    if context is not None:
+        context['user'] = user_id
+
+
+def init_request_logging(app):
+    """Register request hooks that set the request context for log records
+    and that write an access record for each request.
+
+    Parameters
+    ----------
+    app: flask.Flask
+        Flask application.
+    """
+    from flask import g, request
+
+    access = logging.getLogger(ACCESS_LOGGER)
+
+    def log_access(context: Dict, status: int, size: Optional[int], start: float):
+        access.info(
+            '{} {} {}'.format(context['method'], context['path'], status),
+            extra={
+                'event': EVENT_REQUEST,
+                'requestId': context['requestId'],
+                'method': context['method'],
+                'route': context['route'],
+                'user': context.get('user'),
+                'status': status,
+                'size': size,
+                'duration': round(time.perf_counter() - start, 6)
+            }
+        )
+
+    @app.before_request
+    def start_request():
+        rule = request.url_rule
+        context = {
+            'requestId': request_id(request.headers.get(HEADER_REQUEST_ID)),
+            'method': request.method,
+            'route': rule.rule if rule is not None else UNMATCHED_ROUTE
+        }
+        g.request_log = (context, time.perf_counter())
+        _local.context = context
+
+    @app.after_request
+    def send_request(response):
+        entry = g.pop('request_log', None)
+        _local.context = None
+        if entry is not None:
+            context, start = entry
+            context['path'] = request.path
+            response.headers[HEADER_REQUEST_ID] = context['requestId']
+            size = None if response.is_streamed else response.calculate_content_length()
+            status = response.status_code
+            call_on_close(response, lambda: log_access(context, status, size, start))
+        return response
+
+    @app.teardown_request
+    def stop_request(exc):
+        # Requests that failed without a response.
+        entry = g.pop('request_log', None)
+        _local.context = None
+        if entry is not None:
+            context, start = entry
+            context['path'] = request.path
+            log_access(context, 500, None, start)
+
+
+# -- Pipeline singleton -------------------------------------------------------
+
+"""Logging pipeline that was started by init_logging()."""
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+@atexit.register
+def _stop_pipeline():  # pragma: no cover
+    """Write pending log records when the interpreter exits."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+            _pipeline = None
@@ -0,0 +1,549 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Request metrics for the Web API in the Prometheus text exposition format.
+
+The metrics registry maintains counters, gauges and histograms for requests.
+All request metrics are labeled by the blueprint and the route (URL rule) of
+the request. Requests that do not match a route are labeled with an empty
+blueprint and the route '<unmatched>' to bound the number of label values.
+
+The duration of a request is measured from the start of the request until
+the response body was sent. In addition, the time that a request spends in
+each of the following phases is recorded separately:
+
+- service: time inside the service API context (authentication and database
+  queries of the flowserv service)
+- serialize: time for serializing JSON responses
+- io: time for sending the response body (including the time for generating
+  streamed response bodies)
+
+Phases are recorded for the thread that handles the request. Code that is
+not run for a request (e.g., the run watcher) is not recorded.
+"""
+
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import re
+import threading
+import time
+
+from robflask.response import call_on_close
+from robflask.tracing import span
+
+
+"""Default histogram buckets for durations (in seconds) and for response sizes
+(in bytes).
+"""
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+
+"""Route label for requests that do not match a route."""
+UNMATCHED_ROUTE = '<unmatched>'
+
+"""Request phases."""
+PHASE_IO = 'io'
+PHASE_SERIALIZE = 'serialize'
+PHASE_SERVICE = 'service'
+
+
+class Metric(object):
+    """Base class for metrics. A metric has a name, a help text and a list of
+    label names. Values are maintained for each combination of label values.
+    All metrics of a registry share the registry lock.
+    """
+    def __init__(self, name: str, help: str, labels: List[str], lock: threading.Lock, type: str):
+        """Initialize the metric properties.
+
+        Parameters
+        ----------
+        name: string
+            Unique metric name.
+        help: string
+            Metric description.
+        labels: list of string
+            Names of the metric labels.
+        lock: threading.Lock
+            Lock of the metric registry.
+        type: string
+            Metric type ('counter', 'gauge' or 'histogram').
+        """
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.type = type
+        self._lock = lock
+        self._values = dict()
+
+    def exposition(self) -> List[str]:
+        """Get the lines for the metric in the text exposition format.
+
+        Returns
+        -------
+        list of string
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = ['# HELP {} {}'.format(self.name, self.help), '# TYPE {} {}'.format(self.name, self.type)]
+        for key, value in values:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key: Tuple, value) -> List[str]:
+        """Get the sample lines for the given label values."""
+        return ['{}{} {}'.format(self.name, labelset(self.labels, key), format_value(value))]
+
+
+class Counter(Metric):
+    """Counter that can only be incremented."""
+    def __init__(self, name: str, help: str, labels: List[str], lock: threading.Lock):
+        super(Counter, self).__init__(name=name, help=help, labels=labels, lock=lock, type='counter')
+
+    def inc(self, *labels: str, value: Optional[float] = 1):
+        """Increment the counter for the given label values.
+
+        Parameters
+        ----------
+        labels: string
+            Label values.
+        value: float, default=1
+            Increment.
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+
+class Gauge(Metric):
+    """Gauge for a value that can go up and down."""
+    def __init__(self, name: str, help: str, labels: List[str], lock: threading.Lock):
+        super(Gauge, self).__init__(name=name, help=help, labels=labels, lock=lock, type='gauge')
+
+    def inc(self, *labels: str, value: Optional[float] = 1):
+        """Increment the gauge for the given label values.
+
+        Parameters
+        ----------
+        labels: string
+            Label values.
+        value: float, default=1
+            Increment (decrement if negative).
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def dec(self, *labels: str, value: Optional[float] = 1):
+        """Decrement the gauge for the given label values.
+
+        Parameters
+        ----------
+        labels: string
+            Label values.
+        value: float, default=1
+            Decrement.
+        """
+        self.inc(*labels, value=-value)
+
+
+class Histogram(Metric):
+    """Histogram that counts observed values in cumulative buckets and keeps
+    the sum and the number of observed values.
+    """
+    def __init__(self, name: str, help: str, labels: List[str], lock: threading.Lock, buckets: List[float]):
+        super(Histogram, self).__init__(name=name, help=help, labels=labels, lock=lock, type='histogram')
+        self.buckets = sorted(buckets)
+
+    def observe(self, *labels: str, value: float):
+        """Add an observed value for the given label values.
+
+        Parameters
+        ----------
+        labels: string
+            Label values.
+        value: float
+            Observed value.
+        """
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # Counts for each bucket, the +Inf bucket, and the sum.
+                counts = [0] * (len(self.buckets) + 2)
+                self._values[labels] = counts
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def _samples(self, key: Tuple, value: List) -> List[str]:
+        """Get the bucket, sum and count lines for the given label values."""
+        lines = list()
+        labels = self.labels + ['le']
+        for bound, count in zip(self.buckets + ['+Inf'], value[:-1]):
+            lines.append('{}_bucket{} {}'.format(self.name, labelset(labels, key + (str(bound),)), count))
+        lines.append('{}_sum{} {}'.format(self.name, labelset(self.labels, key), format_value(value[-1])))
+        lines.append('{}_count{} {}'.format(self.name, labelset(self.labels, key), value[-2]))
+        return lines
+
+
+class MetricsRegistry(object):
+    """Registry for the request metrics of the Web API. In addition to the
+    registered metrics, the exposition contains the values that are returned
+    by registered collector functions (e.g., statistics of the caches).
+    """
+    def __init__(self):
+        """Initialize the request metrics."""
+        self._lock = threading.Lock()
+        self._metrics = list()
+        self._collectors = list()
+        route = ['blueprint', 'route']
+        self.requests = self.counter(
+            'rob_http_requests_total',
+            'Number of handled requests.',
+            route + ['method', 'status']
+        )
+        self.in_flight = self.gauge(
+            'rob_http_requests_in_flight',
+            'Number of requests that are currently handled.',
+            route
+        )
+        self.duration = self.histogram(
+            'rob_http_request_duration_seconds',
+            'Request duration until the response body was sent.',
+            route + ['method'],
+            buckets=LATENCY_BUCKETS
+        )
+        self.size = self.histogram(
+            'rob_http_response_size_bytes',
+            'Size of response bodies with known content length.',
+            route,
+            buckets=SIZE_BUCKETS
+        )
+        self.phases = self.histogram(
+            'rob_http_request_phase_seconds',
+            'Time that requests spend in the service API, JSON serialization and response I/O.',
+            route + ['phase'],
+            buckets=LATENCY_BUCKETS
+        )
+
+    def collector(self, func: Callable):
+        """Register a function that returns a dictionary of additional metric
+        values. Each key in the dictionary is the metric name. Metrics whose
+        name ends with '_total' are exported as counters and all other metrics
+        as gauges. Values that are not numbers are ignored.
+
+        Parameters
+        ----------
+        func: callable
+            Function that returns a dictionary of metric values.
+        """
+        self._collectors.append(func)
+
+    def counter(self, name: str, help: str, labels: List[str]) -> Counter:
+        """Register a new counter."""
+        return self._register(Counter(name=name, help=help, labels=labels, lock=self._lock))
+
+    def exposition(self) -> str:
+        """Get all metrics in the Prometheus text exposition format.
+
+        Returns
+        -------
+        string
+        """
+        lines = list()
+        for metric in self._metrics:
+            lines.extend(metric.exposition())
+        for func in self._collectors:
+            for name, value in sorted(func().items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    metric_type = 'counter' if name.endswith('_total') else 'gauge'
+                    lines.append('# TYPE {} {}'.format(name, metric_type))
+                    lines.append('{} {}'.format(name, format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+    def gauge(self, name: str, help: str, labels: List[str]) -> Gauge:
+        """Register a new gauge."""
+        return self._register(Gauge(name=name, help=help, labels=labels, lock=self._lock))
+
+    def histogram(self, name: str, help: str, labels: List[str], buckets: List[float]) -> Histogram:
+        """Register a new histogram."""
+        return self._register(Histogram(name=name, help=help, labels=labels, lock=self._lock, buckets=buckets))
+
+    def _register(self, metric: Metric) -> Metric:
+        """Add a metric to the registry."""
+        self._metrics.append(metric)
+        return metric
+
+
+class RequestTimer(object):
+    """Collect the metrics for a single request. The timer is created when the
+    request starts and it is finished when the response body was sent (or
+    when the request failed without a response).
+    """
+    def __init__(self, registry: MetricsRegistry, blueprint: str, route: str, method: str):
+        """Initialize the request labels and start the timer.
+
+        Parameters
+        ----------
+        registry: robflask.metrics.MetricsRegistry
+            Registry for the request metrics.
+        blueprint: string
+            Name of the request blueprint.
+        route: string
+            URL rule of the request.
+        method: string
+            Request method.
+        """
+        self.registry = registry
+        self.blueprint = blueprint
+        self.route = route
+        self.method = method
+        self.phases = dict()
+        self.finished = False
+        self.start = time.perf_counter()
+        self.sent = None
+        registry.in_flight.inc(blueprint, route)
+
+    def add(self, phase: str, duration: float):
+        """Add time to the given request phase.
+
+        Parameters
+        ----------
+        phase: string
+            Request phase.
+        duration: float
+            Time (in seconds).
+        """
+        self.phases[phase] = self.phases.get(phase, 0) + duration
+
+    def finish(self, status: int, size: Optional[int] = None):
+        """Record the request metrics. Records the time for sending the body
+        if the response was returned.
+
+        Parameters
+        ----------
+        status: int
+            Response status code.
+        size: int, default=None
+            Response body size (if known).
+        """
+        if self.finished:
+            return
+        self.finished = True
+        now = time.perf_counter()
+        if self.sent is not None:
+            self.add(PHASE_IO, now - self.sent)
+        labels = (self.blueprint, self.route)
+        registry = self.registry
+        registry.in_flight.dec(*labels)
+        registry.requests.inc(*labels, self.method, str(status))
+        registry.duration.observe(*labels, self.method, value=now - self.start)
+        if size is not None:
+            registry.size.observe(*labels, value=size)
+        for phase, duration in self.phases.items():
+            registry.phases.observe(*labels, phase, value=duration)
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def format_value(value: float) -> str:
+    """Format a metric value.
+
+    Parameters
+    ----------
+    value: float
+        Metric value.
+
+    Returns
+    -------
+    string
+    """
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def labelset(names: List[str], values: Tuple) -> str:
+    """Get the label set for a sample in the text exposition format.
+
+    Parameters
+    ----------
+    names: list of string
+        Label names.
+    values: tuple
+        Label values.
+
+    Returns
+    -------
+    string
+    """
+    if not names:
+        return ''
+    labels = list()
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        labels.append('{}="{}"'.format(name, value))
+    return '{' + ','.join(labels) + '}'
+
+
+def metric_name(*parts: str) -> str:
+    """Get a metric name from the given parts. Converts camel case parts to
+    snake case.
+
+    Returns
+    -------
+    string
+    """
+    return '_'.join(re.sub(r'(?<!^)(?=[A-Z])', '_', p).lower() for p in parts)
+
+
+@contextmanager
+def phase(name: str):
+    """Record the time that is spent inside the context for the given phase of
+    the current request. The phase is also recorded as a span of the request
+    trace (if the request is traced). Does nothing if no request is timed or
+    traced for the current thread.
+
+    Parameters
+    ----------
+    name: string
+        Request phase.
+    """
+    with span(name):
+        timer = getattr(_local, 'timer', None)
+        if timer is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timer.add(name, time.perf_counter() - start)
+
+
+def stats_collector(
+    prefix: str, stats: Callable[[], Dict], gauges: Optional[List[str]] = None
+) -> Callable[[], Dict]:
+    """Get a collector function that returns the values of a statistics
+    dictionary as metrics with the given name prefix. Values in the
+    statistics dictionary are cumulative counts unless their key is listed
+    in gauges. The names of counters have the suffix '_total'.
+
+    Parameters
+    ----------
+    prefix: string
+        Metric name prefix.
+    stats: callable
+        Function that returns the statistics dictionary.
+    gauges: list of string, default=None
+        Keys of statistics values that can go up and down.
+
+    Returns
+    -------
+    callable
+    """
+    gauges = set(gauges) if gauges is not None else set()
+
+    def collect() -> Dict:
+        return {
+            metric_name(prefix, key) if key in gauges else metric_name(prefix, key, 'total'): value
+            for key, value in stats().items()
+        }
+
+    return collect
+
+
+# -- Request hooks ------------------------------------------------------------
+
+"""Timer for the request that is handled by the current thread."""
+_local = threading.local()
+
+
+def init_metrics(app):
+    """Register request hooks that record the request metrics for the given
+    Flask application.
+
+    Parameters
+    ----------
+    app: flask.Flask
+        Flask application.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def start_timer():
+        rule = request.url_rule
+        timer = RequestTimer(
+            registry=metrics(),
+            blueprint=request.blueprint or '',
+            route=rule.rule if rule is not None else UNMATCHED_ROUTE,
+            method=request.method
+        )
+        g.request_timer = timer
+        _local.timer = timer
+
+    @app.after_request
+    def send_timer(response):
+        timer = g.pop('request_timer', None)
+        _local.timer = None
+        if timer is not None:
+            size = None if response.is_streamed else response.calculate_content_length()
+            timer.sent = time.perf_counter()
+            call_on_close(response, lambda: timer.finish(status=response.status_code, size=size))
+        return response
+
+    @app.teardown_request
+    def stop_timer(exc):
+        # Requests that failed without a response.
+        timer = g.pop('request_timer', None)
+        _local.timer = None
+        if timer is not None:
+            timer.finish(status=500)
+
+
+# -- Registry singleton -------------------------------------------------------
+
+"""Global metrics registry for the Web API."""
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def metrics() -> MetricsRegistry:
+    """Get the global metrics registry. The registry is created on first
+    access. Statistics of the caches, the blob store, the run watcher, the
+    stream limit and the database connection pool are included as additional
+    metrics.
+
+    Returns
+    -------
+    robflask.metrics.MetricsRegistry
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from robflask.archive import archive_cache
+            from robflask.auth import token_cache
+            from robflask.blob import blob_store
+            from robflask.api.events import stream_limit
+            from robflask.database import pool_monitor
+            from robflask.leaderboard import cache
+            from robflask.watcher import watcher
+            registry = MetricsRegistry()
+            registry.collector(stats_collector('rob_archive_cache', lambda: archive_cache().stats()))
+            registry.collector(stats_collector('rob_blob_store', lambda: blob_store().stats()))
+            registry.collector(stats_collector(
+                'rob_db_pool',
+                lambda: pool_monitor().stats(),
+                gauges=['capacity', 'checkedout', 'peak', 'saturation']
+            ))
+            registry.collector(stats_collector('rob_leaderboard_cache', lambda: cache().stats(), gauges=['size']))
+            registry.collector(stats_collector('rob_streams', lambda: stream_limit().stats(), gauges=['active']))
+            registry.collector(stats_collector('rob_token_cache', lambda: token_cache().stats(), gauges=['size']))
+            registry.collector(stats_collector('rob_watcher', lambda: {'queries': watcher().queries}))
+            _registry = registry
+    return _registry
@@ -0,0 +1,270 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Opt-in profiling of individual requests.
+
+Profiling is disabled by default. If it is enabled in the Web API
+configuration, a request is profiled if it contains the profiling header with
+the configured key, or if it is selected by random sampling with the
+configured sampling rate. Sampling can be restricted to a list of endpoints
+(e.g., 'workflows.get_leaderboard' or 'runs.list_runs').
+
+Two profiling modes are supported:
+
+- sample: the stack of the thread that handles the request is sampled at a
+  fixed interval. The result is written as folded stacks (one line per stack
+  with the number of samples) that can be rendered as a flame graph, e.g.,
+  using flamegraph.pl or speedscope.
+- cprofile: the request handler is profiled using cProfile. The result is
+  written as a pstats file. Only one cProfile profiler can be active in a
+  process (Python 3.12 and later raise an error for a second one). Requests
+  that are selected while another request is profiled are not profiled.
+
+Profiles are written to the 'profiles' folder in the log directory. Only the
+request handler is profiled. Streamed response bodies are sent after the
+profile was written. No request hooks are registered if profiling is
+disabled.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional
+
+import cProfile
+import datetime
+import os
+import random
+import sys
+import threading
+import uuid
+
+
+"""Request header that selects a request for profiling."""
+HEADER_PROFILE = 'X-ROB-Profile'
+
+"""Profiling modes."""
+PROFILE_CPROFILE = 'cprofile'
+PROFILE_SAMPLE = 'sample'
+
+PROFILE_MODES = [PROFILE_CPROFILE, PROFILE_SAMPLE]
+
+"""Default interval (in seconds) between stack samples."""
+SAMPLE_INTERVAL = 0.005
+
+"""Lock that is held while a request is profiled in cProfile mode."""
+_cprofile_lock = threading.Lock()
+
+
+class StackSampler(object):
+    """Sample the stack of a thread at a fixed interval in a background
+    thread. Counts the number of samples for each distinct stack.
+    """
+    def __init__(self, thread_id: int, interval: Optional[float] = SAMPLE_INTERVAL):
+        """Initialize the sampled thread and the sampling interval.
+
+        Parameters
+        ----------
+        thread_id: int
+            Identifier of the sampled thread.
+        interval: float, default=0.005
+            Time (in seconds) between samples.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def folded(self) -> List[str]:
+        """Get the sampled stacks in the folded stack format. Each line
+        contains the semicolon-separated list of frames (from the outermost to
+        the innermost frame) and the number of samples.
+
+        Returns
+        -------
+        list of string
+        """
+        return ['{} {}'.format(stack, count) for stack, count in self.stacks.most_common()]
+
+    def start(self):
+        """Start sampling in a background thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the background thread to finish."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        """Take samples until the sampler is stopped."""
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = list()
+            while frame is not None:
+                code = frame.f_code
+                filename = os.path.basename(code.co_filename)
+                stack.append('{} ({}:{})'.format(code.co_name, filename, code.co_firstlineno))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+
+class RequestProfiler(object):
+    """Select requests for profiling and write the profiles to the output
+    directory.
+    """
+    def __init__(
+        self, outdir: str, mode: Optional[str] = PROFILE_SAMPLE, rate: Optional[float] = 0,
+        key: Optional[str] = None, endpoints: Optional[List[str]] = None,
+        interval: Optional[float] = SAMPLE_INTERVAL
+    ):
+        """Initialize the profiler configuration.
+
+        Parameters
+        ----------
+        outdir: string
+            Output directory for profiles.
+        mode: string, default='sample'
+            Profiling mode ('sample' or 'cprofile').
+        rate: float, default=0
+            Fraction of requests that are profiled.
+        key: string, default=None
+            Key that selects a request for profiling if it is given in the
+            profiling header. Requests are not selected by header if no key
+            is given.
+        endpoints: list of string, default=None
+            Endpoints for sampled requests. All endpoints are sampled if no
+            list is given.
+        interval: float, default=0.005
+            Time (in seconds) between stack samples.
+
+        Raises
+        ------
+        ValueError
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError("unknown profiling mode '{}'".format(mode))
+        self.outdir = outdir
+        self.mode = mode
+        self.rate = rate
+        self.key = key
+        self.endpoints = set(endpoints) if endpoints else None
+        self.interval = interval
+
+    def select(self, endpoint: Optional[str], headers: Dict) -> bool:
+        """Test if a request is selected for profiling.
+
+        Parameters
+        ----------
+        endpoint: string
+            Endpoint of the request.
+        headers: dict
+            Request headers.
+
+        Returns
+        -------
+        bool
+        """
+        if self.key is not None and headers.get(HEADER_PROFILE) == self.key:
+            return True
+        if self.endpoints is not None and endpoint not in self.endpoints:
+            return False
+        return self.rate > 0 and random.random() < self.rate
+
+    def start(self):
+        """Start profiling the current thread. Returns the profiler object.
+        Returns None in cProfile mode if another profiler is active.
+
+        Returns
+        -------
+        cProfile.Profile or robflask.profiling.StackSampler
+        """
+        if self.mode == PROFILE_CPROFILE:
+            if not _cprofile_lock.acquire(blocking=False):
+                return None
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiling tool (e.g., a debugger) is active.
+                _cprofile_lock.release()
+                return None
+        else:
+            profiler = StackSampler(threading.get_ident(), interval=self.interval)
+            profiler.start()
+        return profiler
+
+    def stop(self, profiler, endpoint: Optional[str]) -> str:
+        """Stop the given profiler and write the profile. Returns the name of
+        the profile file.
+
+        Parameters
+        ----------
+        profiler: cProfile.Profile or robflask.profiling.StackSampler
+            Profiler that was returned by start().
+        endpoint: string
+            Endpoint of the request.
+
+        Returns
+        -------
+        string
+        """
+        timestamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        name = '{}-{}-{}'.format(timestamp, endpoint or 'unmatched', uuid.uuid4().hex[:8])
+        os.makedirs(self.outdir, exist_ok=True)
+        if self.mode == PROFILE_CPROFILE:
+            try:
+                profiler.disable()
+            finally:
+                _cprofile_lock.release()
+            filename = name + '.prof'
+            profiler.dump_stats(os.path.join(self.outdir, filename))
+        else:
+            profiler.stop()
+            filename = name + '.folded'
+            with open(os.path.join(self.outdir, filename), 'w') as f:
+                for line in profiler.folded():
+                    f.write(line + '\n')
+        return filename
+
+
+def init_profiling(app, profiler: RequestProfiler):
+    """Register request hooks that profile the requests that are selected by
+    the given profiler.
+
+    Parameters
+    ----------
+    app: flask.Flask
+        Flask application.
+    profiler: robflask.profiling.RequestProfiler
+        Profiler for selected requests.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def start_profile():
+        if profiler.select(request.endpoint, request.headers):
+            profile = profiler.start()
+            if profile is not None:
+                g.request_profile = profile
+
+    @app.after_request
+    def write_profile(response):
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            response.headers[HEADER_PROFILE] = profiler.stop(profile, request.endpoint)
+        return response
+
+    @app.teardown_request
+    def stop_profile(exc):
+        # Requests that failed without a response.
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            profiler.stop(profile, request.endpoint)
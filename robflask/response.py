@@ -0,0 +1,170 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Callbacks for finished responses.
+
+Werkzeug calls the functions that are registered with ``call_on_close`` when
+the WSGI server closes the response iterable. Responses in direct passthrough
+mode (file downloads, result archives, event streams and long polls) are an
+exception: their body is handed to the server as is and the close hooks of
+the response are never called. The function call_on_close() of this module
+registers callbacks for both kinds of responses. The callbacks of passthrough
+responses are called when the server closes the response body.
+
+File wrappers of the WSGI server are kept so that the server can still send
+the file using ``sendfile``. The callbacks are attached to the wrapped file
+object instead. Bodies that support asynchronous iteration keep that support
+for the ASGI adapter.
+"""
+
+from typing import AsyncIterator, Callable, Iterator, List
+
+
+"""Attributes that reference the file object of WSGI file wrappers (werkzeug
+uses 'file', wsgiref and gunicorn use 'filelike').
+"""
+FILE_ATTRIBUTES = ['filelike', 'file']
+
+
+class ClosingBody(object):
+    """Response body that calls a list of callbacks after the wrapped body was
+    closed. The callbacks are called only once.
+    """
+    def __init__(self, body):
+        """Initialize the wrapped response body.
+
+        Parameters
+        ----------
+        body: iterable
+            Response body.
+        """
+        self.body = body
+        self.callbacks = list()
+        self.closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Get iterator for the wrapped body.
+
+        Returns
+        -------
+        iterator of bytes
+        """
+        return iter(self.body)
+
+    def close(self):
+        """Close the wrapped body and call the callbacks."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            close = getattr(self.body, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            run_callbacks(self.callbacks)
+
+
+class AsyncClosingBody(ClosingBody):
+    """Closing response body for bodies that support asynchronous
+    iteration.
+    """
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        """Get asynchronous iterator for the wrapped body.
+
+        Returns
+        -------
+        async iterator of bytes
+        """
+        return self.body.__aiter__()
+
+
+class ClosingFile(object):
+    """Proxy for the file object of a WSGI file wrapper that calls a list of
+    callbacks after the file was closed. All other attributes are read from
+    the wrapped file object.
+    """
+    def __init__(self, file):
+        """Initialize the wrapped file object.
+
+        Parameters
+        ----------
+        file: file-like object
+            File object of the file wrapper.
+        """
+        self.file = file
+        self.callbacks = list()
+        self.closed = False
+
+    def __getattr__(self, name):
+        """Get attribute of the wrapped file object."""
+        return getattr(self.file, name)
+
+    def close(self):
+        """Close the wrapped file object and call the callbacks."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.file.close()
+        finally:
+            run_callbacks(self.callbacks)
+
+
+def call_on_close(response, func: Callable):
+    """Register a function that is called when the given response was sent
+    and closed. Works for responses in direct passthrough mode as well.
+
+    Parameters
+    ----------
+    response: flask.Response
+        Response object.
+    func: callable
+        Function without arguments.
+    """
+    if not response.direct_passthrough:
+        response.call_on_close(func)
+        return
+    body = response.response
+    if isinstance(body, ClosingBody):
+        body.callbacks.append(func)
+        return
+    for attr in FILE_ATTRIBUTES:
+        file = getattr(body, attr, None)
+        if file is not None and hasattr(file, 'read') and hasattr(body, 'close'):
+            if not isinstance(file, ClosingFile):
+                file = ClosingFile(file)
+                setattr(body, attr, file)
+                # The file wrappers of wsgiref and gunicorn bind the close
+                # method of the file object when they are created.
+                if 'close' in vars(body):
+                    body.close = file.close
+            file.callbacks.append(func)
+            return
+    body = AsyncClosingBody(body) if hasattr(body, '__aiter__') else ClosingBody(body)
+    body.callbacks.append(func)
+    response.response = body
+
+
+def run_callbacks(callbacks: List[Callable]):
+    """Call all functions in the given list. All functions are called even if
+    one of them raises an error. The first error is raised after all
+    functions were called.
+
+    Parameters
+    ----------
+    callbacks: list of callable
+        Functions without arguments.
+    """
+    error = None
+    for func in callbacks:
+        try:
+            func()
+        except Exception as ex:
+            error = error if error is not None else ex
+    if error is not None:
+        raise error
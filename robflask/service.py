@@ -8,13 +8,288 @@
 
 """Global instance of the API factory that is used by the Flask application to
 interact with the flowserv instance.
+
+The flowserv API factory is wrapped by a factory that resolves access tokens
+using the access token cache. Requests with a cached token use the service API
+for the identifier of the authenticated user. This avoids validating the token
+against the database for every request.
+
+The wrapper can also share a single service API instance between all service
+calls for the same access token in the current thread (e.g., for the
+sub-requests of a batch request). The shared instance uses a single database
+session.
+
+The wrapped flowserv API factory is created lazily when it is first accessed
+(e.g., when the first request is handled or when the application reads the
+API path from the service configuration). Importing this module does not
+create the API factory or the database engine.
+"""
+
+from contextlib import contextmanager
+from typing import Callable, Optional, Tuple
+
+import datetime
+import threading
+import time
+
+from flowserv.error import UnauthenticatedAccessError
+from robflask.logger import request_user
+from robflask.metrics import PHASE_SERVICE, phase
+from robflask.tracing import SPAN_AUTH, span
+
+import flowserv.view.user as labels
+import robflask.config as config
+
+
+"""Name of the flowserv configuration parameter for the time period (in
+seconds) for which an access token is valid after login.
 """
+FLOWSERV_AUTH_LOGINTTL = 'FLOWSERV_AUTH_LOGINTTL'
+
+
+class CachedAuthFactory(object):
+    """Wrapper for a flowserv API factory. Access tokens are validated once
+    and then resolved to user identifiers using the global access token cache.
+    All other attributes (e.g., configuration values) are taken from the
+    wrapped factory.
+
+    The wrapped factory is either given when the wrapper is created or it is
+    created by the given loader function on first access.
+    """
+    def __init__(self, factory: Optional[object] = None, loader: Optional[Callable] = None):
+        """Initialize the wrapped API factory or the function that creates
+        the wrapped factory.
+
+        Parameters
+        ----------
+        factory: flowserv.service.api.APIFactory, default=None
+            API factory for the flowserv instance.
+        loader: callable, default=None
+            Function that returns the API factory for the flowserv instance.
+        """
+        self._factory = factory
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def __call__(self, user_id: Optional[str] = None, access_token: Optional[str] = None):
+        """Get an instance of the service API for the user that is identified
+        by the given user identifier or access token.
+
+        Parameters
+        ----------
+        user_id: string, default=None
+            Unique identifier of the authenticated user.
+        access_token: string, default=None
+            User access token.
+
+        Returns
+        -------
+        flowserv.service.api.API
+
+        Raises
+        ------
+        flowserv.error.UnauthenticatedAccessError
+        """
+        shared = getattr(self._local, 'shared', None)
+        if shared is not None and user_id is None and access_token == shared[0]:
+            yield shared[1]
+            return
+        # The time for authentication and for all service calls is recorded
+        # as the service phase of the current request.
+        with phase(PHASE_SERVICE):
+            if user_id is None and access_token is not None:
+                with span(SPAN_AUTH):
+                    user_id = authenticate(self.factory, access_token)
+                # Invalid tokens are passed on to flowserv. The service API
+                # raises an error only for operations that require an
+                # authenticated user.
+                if user_id is not None:
+                    access_token = None
+            if user_id is not None:
+                request_user(user_id)
+            with self.factory(user_id=user_id, access_token=access_token) as api:
+                yield api
+
+    def __getattr__(self, name):
+        """Get attributes from the wrapped factory."""
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.factory, name)
+
+    def authenticate(self, access_token: str) -> Optional[str]:
+        """Get the identifier of the user that is associated with the given
+        access token using the access token cache. Returns None if the token
+        is not valid.
+
+        Parameters
+        ----------
+        access_token: string
+            User access token.
+
+        Returns
+        -------
+        string
+        """
+        with phase(PHASE_SERVICE):
+            with span(SPAN_AUTH):
+                user_id = authenticate(self.factory, access_token)
+        if user_id is not None:
+            request_user(user_id)
+        return user_id
+
+    @property
+    def factory(self):
+        """Get the wrapped API factory. The factory is created on first access
+        if it was not given when the wrapper was created.
+
+        Returns
+        -------
+        flowserv.service.api.APIFactory
+        """
+        if self._factory is None:
+            with self._lock:
+                if self._factory is None:
+                    self._factory = self._loader()
+        return self._factory
+
+    @property
+    def initialized(self) -> bool:
+        """Test if the wrapped API factory has been created.
+
+        Returns
+        -------
+        bool
+        """
+        return self._factory is not None
+
+    @contextmanager
+    def shared(self, access_token: Optional[str] = None):
+        """Share a single service API instance for the given access token
+        within the context. All service calls for the same token in the
+        current thread use the shared instance. Nothing is shared if no
+        token is given.
+
+        Parameters
+        ----------
+        access_token: string, default=None
+            User access token.
+
+        Returns
+        -------
+        flowserv.service.api.API
+        """
+        if access_token is None or getattr(self._local, 'shared', None) is not None:
+            yield None
+            return
+        with self(access_token=access_token) as api:
+            self._local.shared = (access_token, api)
+            try:
+                yield api
+            finally:
+                self._local.shared = None
+
+
+def authenticate(factory, token: str) -> Optional[str]:
+    """Get the identifier of the user that is associated with the given access
+    token. Tokens that are not in the access token cache are validated by
+    flowserv and added to the cache. Returns None if the token is not valid.
 
-from typing import Optional
+    The cache entry expires no later than the access token. If flowserv does
+    not provide the expiry time of the token, the entry expires no later than
+    the login time-to-live after the token was validated (the maximum lifetime
+    of any token).
 
-from flowserv.client.api import ClientAPI
-from flowserv.config import env
-from flowserv.service.api import APIFactory
+    Parameters
+    ----------
+    factory: flowserv.service.api.APIFactory
+        API factory for the flowserv instance.
+    token: string
+        User access token.
+
+    Returns
+    -------
+    string
+    """
+    from robflask.auth import token_cache
+    cache = token_cache()
+    user_id = cache.get(token)
+    if user_id is None:
+        validated = time.time()
+        try:
+            with factory() as api:
+                user_id, expires = validate_token(api, token)
+        except UnauthenticatedAccessError:
+            return None
+        if expires is None:
+            ttl = factory.get(FLOWSERV_AUTH_LOGINTTL)
+            expires = validated + float(ttl) if ttl is not None else None
+        cache.put(token, user_id, expires=expires, validated=validated)
+    return user_id
+
+
+def create_factory(basedir: Optional[str] = None, database: Optional[str] = None):
+    """Create the flowserv API factory for the Flask application. The database
+    object for the factory is created by the Web API. Its engine uses the
+    connection pool configuration from the Web API configuration.
+
+    Parameters
+    ----------
+    basedir: string, default=None
+        Base directory for all workflow files. If no directory is given or
+        specified in the environment a temporary directory will be created.
+    database: string, default=None
+        Optional database connect url.
+
+    Returns
+    -------
+    flowserv.service.local.LocalAPIFactory
+    """
+    from flowserv.config import env
+    from flowserv.service.local import LocalAPIFactory
+    from robflask.database import init_db, pool_monitor, pool_options
+    settings = env().auth().run_async().webapp()
+    if basedir is not None:
+        settings.basedir(basedir)
+    if database is not None:
+        settings.database(database)
+    options = pool_options(
+        pool_size=config.DB_POOL_SIZE(),
+        max_overflow=config.DB_MAX_OVERFLOW(),
+        pre_ping=config.DB_POOL_PREPING(),
+        recycle=config.DB_POOL_RECYCLE()
+    )
+    db = init_db(settings, options=options, monitor=pool_monitor())
+    return LocalAPIFactory(env=settings, db=db)
+
+
+def validate_token(api, token: str) -> Tuple[str, Optional[float]]:
+    """Validate an access token. Returns the identifier of the associated user
+    and the expiry time of the token (in seconds since the epoch). The expiry
+    time is None if the service API does not provide access to the token.
+
+    Parameters
+    ----------
+    api: flowserv.service.api.API
+        Service API.
+    token: string
+        User access token.
+
+    Returns
+    -------
+    (string, float)
+
+    Raises
+    ------
+    flowserv.error.UnauthenticatedAccessError
+    """
+    auth = getattr(api.users(), 'auth', None)
+    if auth is None:
+        return api.users().whoami_user(api_key=token)[labels.USER_ID], None
+    user = auth.authenticate(token)
+    expires = datetime.datetime.fromisoformat(user.api_key.expires).timestamp()
+    return user.user_id, expires
 
 
 # API factory that is used by the Flask App. This global variable will be set
@@ -23,8 +298,9 @@ from flowserv.service.api import APIFactory
 service = None
 
 
-def init_service(basedir: Optional[str] = None, database: Optional[str] = None) -> APIFactory:
-    """Configure the API factory that is used by the Flask application.
+def init_service(basedir: Optional[str] = None, database: Optional[str] = None) -> CachedAuthFactory:
+    """Configure the API factory that is used by the Flask application. The
+    flowserv API factory is created when it is first accessed.
 
     Parameters
     ----------
@@ -36,16 +312,16 @@ def init_service(basedir: Optional[str] = None, database: Optional[str] = None)
 
     Returns
     -------
-    flowserv.service.api.APIFactory
+    robflask.service.CachedAuthFactory
     """
     global service
-    service = ClientAPI(
-        env=env().auth().run_async().webapp(),
-        basedir=basedir,
-        database=database
-    )
+    service = CachedAuthFactory(loader=lambda: create_factory(basedir=basedir, database=database))
+    # Clear cached objects that were retrieved from a previous service.
+    from robflask.leaderboard import cache
+    cache().invalidate()
     return service
 
 
-# Initialize the global service API factory.
+# Initialize the global service API factory. The flowserv API factory is
+# created on first access.
 service = init_service()
@@ -0,0 +1,533 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Request tracing for the Web API.
+
+Each request is recorded as a trace with a root span for the request and
+child spans for the phases of the request:
+
+- auth: validating the access token (included in the service span)
+- service: time inside the service API context (see robflask.metrics)
+- serialize: serializing the JSON response
+- io: sending the response body (including streamed files and archives)
+
+Request handlers can add spans for individual operations (e.g., the
+submission of a run to the workflow engine in 'start_run').
+
+The trace context is propagated using the W3C 'traceparent' header. If a
+request contains a valid header, the request span becomes a child of the
+given parent span. The response contains the 'traceparent' header for the
+request span.
+
+Finished traces are exported in a background thread. The file exporter writes
+one JSON document per span. The OTLP exporter sends spans to a collector
+using the OTLP/HTTP JSON encoding. Traces are dropped if the export queue is
+full. No request hooks are registered if tracing is disabled.
+"""
+
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+
+from robflask.response import call_on_close
+
+
+"""Header for propagating the trace context."""
+HEADER_TRACEPARENT = 'traceparent'
+
+"""Span kinds and status codes (following OTLP)."""
+SPAN_INTERNAL = 1
+SPAN_SERVER = 2
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+"""Identifier for the supported span exporters."""
+EXPORTER_FILE = 'file'
+EXPORTER_OTLP = 'otlp'
+
+EXPORTERS = [EXPORTER_FILE, EXPORTER_OTLP]
+
+"""Service name in the OTLP resource attributes."""
+SERVICE_NAME = 'rob-webapi'
+
+"""Span names for validating access tokens and for sending the response
+body.
+"""
+SPAN_AUTH = 'auth'
+SPAN_IO = 'io'
+
+
+class Span(object):
+    """Timed operation within a trace. The start and end times are given in
+    nanoseconds since the epoch.
+    """
+    def __init__(
+        self, name: str, trace_id: str, parent_id: Optional[str] = None,
+        kind: Optional[int] = SPAN_INTERNAL, attributes: Optional[Dict] = None
+    ):
+        """Initialize the span and start the timer.
+
+        Parameters
+        ----------
+        name: string
+            Span name.
+        trace_id: string
+            Trace identifier (32 hex digits).
+        parent_id: string, default=None
+            Identifier of the parent span (16 hex digits).
+        kind: int, default=1
+            Span kind.
+        attributes: dict, default=None
+            Span attributes.
+        """
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes if attributes is not None else dict()
+        self.status = STATUS_UNSET
+        self.start = time.time_ns()
+        self.end = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Get the duration of a finished span in seconds.
+
+        Returns
+        -------
+        float
+        """
+        return (self.end - self.start) / 1e9 if self.end is not None else None
+
+    def finish(self, status: Optional[int] = None):
+        """Stop the timer. Has no effect if the span is already finished.
+
+        Parameters
+        ----------
+        status: int, default=None
+            Span status code.
+        """
+        if self.end is None:
+            self.end = time.time_ns()
+            if status is not None:
+                self.status = status
+
+    def to_dict(self) -> Dict:
+        """Get the OTLP JSON serialization of the span.
+
+        Returns
+        -------
+        dict
+        """
+        doc = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end if self.end is not None else self.start),
+            'attributes': [{'key': k, 'value': attribute_value(v)} for k, v in self.attributes.items()],
+            'status': {'code': self.status}
+        }
+        if self.parent_id is not None:
+            doc['parentSpanId'] = self.parent_id
+        return doc
+
+    def traceparent(self) -> str:
+        """Get the traceparent header value for the span.
+
+        Returns
+        -------
+        string
+        """
+        return '00-{}-{}-01'.format(self.trace_id, self.span_id)
+
+
+class Trace(object):
+    """Spans of a single request. Spans are started as children of the
+    innermost open span.
+    """
+    def __init__(self, root: Span):
+        """Initialize the root span of the trace.
+
+        Parameters
+        ----------
+        root: robflask.tracing.Span
+            Root span of the trace.
+        """
+        self.root = root
+        self.spans = [root]
+        self.stack = [root]
+
+    def start_span(self, name: str, attributes: Optional[Dict] = None, push: Optional[bool] = True) -> Span:
+        """Start a child span of the innermost open span.
+
+        Parameters
+        ----------
+        name: string
+            Span name.
+        attributes: dict, default=None
+            Span attributes.
+        push: bool, default=True
+            Make the new span the innermost open span.
+
+        Returns
+        -------
+        robflask.tracing.Span
+        """
+        parent = self.stack[-1] if self.stack else self.root
+        span = Span(name, trace_id=self.root.trace_id, parent_id=parent.span_id, attributes=attributes)
+        self.spans.append(span)
+        if push:
+            self.stack.append(span)
+        return span
+
+
+class FileExporter(object):
+    """Write spans as JSON documents (one per line) to a file."""
+    def __init__(self, filename: str):
+        """Initialize the output file.
+
+        Parameters
+        ----------
+        filename: string
+            Path to the output file.
+        """
+        self.filename = filename
+
+    def export(self, spans: List[Span]):
+        """Append the given spans to the output file.
+
+        Parameters
+        ----------
+        spans: list of robflask.tracing.Span
+            Finished spans.
+        """
+        dirname = os.path.dirname(self.filename)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        with open(self.filename, 'a') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict()) + '\n')
+
+
+class OTLPExporter(object):
+    """Send spans to a collector using the OTLP/HTTP JSON encoding."""
+    def __init__(self, endpoint: str, timeout: Optional[float] = 5):
+        """Initialize the collector endpoint.
+
+        Parameters
+        ----------
+        endpoint: string
+            Base Url of the collector (e.g., http://localhost:4318). Spans are
+            sent to the '/v1/traces' path of the endpoint.
+        timeout: float, default=5
+            Timeout (in seconds) for requests to the collector.
+        """
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        """Send the given spans to the collector.
+
+        Parameters
+        ----------
+        spans: list of robflask.tracing.Span
+            Finished spans.
+        """
+        import urllib.request
+        doc = {
+            'resourceSpans': [{
+                'resource': {
+                    'attributes': [{'key': 'service.name', 'value': attribute_value(SERVICE_NAME)}]
+                },
+                'scopeSpans': [{
+                    'scope': {'name': 'robflask'},
+                    'spans': [span.to_dict() for span in spans]
+                }]
+            }]
+        }
+        req = urllib.request.Request(
+            self.url,
+            data=json.dumps(doc).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            response.read()
+
+
+class Tracer(object):
+    """Start traces for requests and export finished traces in a background
+    thread.
+    """
+    def __init__(
+        self, exporters: List, maxsize: Optional[int] = 10000, batch_size: Optional[int] = 512,
+        interval: Optional[float] = 1.0
+    ):
+        """Initialize the exporters and the export queue.
+
+        Parameters
+        ----------
+        exporters: list
+            Span exporters.
+        maxsize: int, default=10000
+            Maximum number of traces in the export queue.
+        batch_size: int, default=512
+            Maximum number of spans in a single export.
+        interval: float, default=1
+            Maximum time (in seconds) before queued spans are exported.
+        """
+        self.exporters = exporters
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.exported = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def finish(self, trace: Trace, status: Optional[int] = None):
+        """Finish the root span of the given trace and queue all spans of the
+        trace for export.
+
+        Parameters
+        ----------
+        trace: robflask.tracing.Trace
+            Request trace.
+        status: int, default=None
+            Status code for the root span.
+        """
+        trace.root.finish(status=status)
+        for span in trace.spans:
+            span.finish()
+        self._start()
+        try:
+            self._queue.put_nowait(trace.spans)
+        except queue.Full:
+            self.dropped += len(trace.spans)
+
+    def flush(self):
+        """Wait until all queued traces have been exported."""
+        self._queue.join()
+
+    def start_trace(
+        self, name: str, traceparent: Optional[str] = None, attributes: Optional[Dict] = None
+    ) -> Trace:
+        """Start a new trace. The root span is a child of the span in the given
+        traceparent header value (if valid).
+
+        Parameters
+        ----------
+        name: string
+            Name of the root span.
+        traceparent: string, default=None
+            Value of the traceparent request header.
+        attributes: dict, default=None
+            Attributes of the root span.
+
+        Returns
+        -------
+        robflask.tracing.Trace
+        """
+        parent = parse_traceparent(traceparent) if traceparent else None
+        trace_id, parent_id = parent if parent is not None else (os.urandom(16).hex(), None)
+        root = Span(name, trace_id=trace_id, parent_id=parent_id, kind=SPAN_SERVER, attributes=attributes)
+        return Trace(root)
+
+    def stats(self) -> Dict:
+        """Get the number of exported and dropped spans and the number of
+        failed exports.
+
+        Returns
+        -------
+        dict
+        """
+        return {'exported': self.exported, 'dropped': self.dropped, 'errors': self.errors}
+
+    def _export(self, spans: List[Span]):
+        """Export the given spans with all exporters."""
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as ex:
+                self.errors += 1
+                logging.warning('error exporting spans: {}'.format(ex))
+        self.exported += len(spans)
+
+    def _run(self):
+        """Export queued traces in batches."""
+        while True:
+            batch = self._queue.get()
+            count = 1
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch = batch + self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    count += 1
+                except queue.Empty:
+                    break
+            try:
+                self._export(batch)
+            finally:
+                for _ in range(count):
+                    self._queue.task_done()
+
+    def _start(self):
+        """Start the export thread if it is not running."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True)
+                    self._thread.start()
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def attribute_value(value) -> Dict:
+    """Get the OTLP JSON encoding for an attribute value.
+
+    Parameters
+    ----------
+    value: any
+        Attribute value.
+
+    Returns
+    -------
+    dict
+    """
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    elif isinstance(value, int):
+        return {'intValue': str(value)}
+    elif isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+"""Regular expression for valid traceparent header values."""
+TRACEPARENT = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+
+
+def parse_traceparent(value: str) -> Optional[Tuple[str, str]]:
+    """Get the trace identifier and the parent span identifier from a
+    traceparent header value. Returns None if the value is not valid.
+
+    Parameters
+    ----------
+    value: string
+        Value of the traceparent header.
+
+    Returns
+    -------
+    (string, string)
+    """
+    match = TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id = match.groups()
+    if trace_id == '0' * 32 or span_id == '0' * 16:
+        return None
+    return trace_id, span_id
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict] = None):
+    """Record the code inside the context as a span of the trace for the
+    current request. Does nothing if no request is traced in the current
+    thread.
+
+    Parameters
+    ----------
+    name: string
+        Span name.
+    attributes: dict, default=None
+        Span attributes.
+    """
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield None
+        return
+    child = trace.start_span(name, attributes=attributes)
+    try:
+        yield child
+    except Exception:
+        child.finish(status=STATUS_ERROR)
+        raise
+    finally:
+        child.finish()
+        if trace.stack and trace.stack[-1] is child:
+            trace.stack.pop()
+
+
+# -- Request hooks ------------------------------------------------------------
+
+"""Trace for the request that is handled by the current thread."""
+_local = threading.local()
+
+
+def init_tracing(app, tracer: Tracer):
+    """Register request hooks that trace all requests for the given Flask
+    application.
+
+    Parameters
+    ----------
+    app: flask.Flask
+        Flask application.
+    tracer: robflask.tracing.Tracer
+        Tracer for requests.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def start_trace():
+        rule = request.url_rule
+        route = rule.rule if rule is not None else '<unmatched>'
+        trace = tracer.start_trace(
+            name='{} {}'.format(request.method, route),
+            traceparent=request.headers.get(HEADER_TRACEPARENT),
+            attributes={'http.method': request.method, 'http.route': route, 'http.target': request.path}
+        )
+        g.request_trace = trace
+        _local.trace = trace
+
+    @app.after_request
+    def send_trace(response):
+        trace = g.pop('request_trace', None)
+        _local.trace = None
+        if trace is not None:
+            status = response.status_code
+            trace.root.attributes['http.status_code'] = status
+            response.headers[HEADER_TRACEPARENT] = trace.root.traceparent()
+            io = trace.start_span(SPAN_IO, push=False)
+
+            def finish():
+                io.finish()
+                tracer.finish(trace, status=STATUS_ERROR if status >= 500 else STATUS_OK)
+
+            call_on_close(response, finish)
+        return response
+
+    @app.teardown_request
+    def stop_trace(exc):
+        # Requests that failed without a response.
+        trace = g.pop('request_trace', None)
+        _local.trace = None
+        if trace is not None:
+            tracer.finish(trace, status=STATUS_ERROR)
@@ -0,0 +1,381 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Resumable chunked uploads.
+
+Large files are uploaded in a sequence of chunks instead of a single multipart
+request. The client first creates an upload session. Each chunk is then sent
+as the raw body of a separate request together with the offset of the chunk in
+the uploaded file. Chunks are written to a staging file in the upload session
+directory while they are read from the request stream. The SHA-256 checksum of
+the uploaded content is updated incrementally as the chunks arrive. When all
+chunks have been received the staging file is added to the flowserv file store
+for the submission and the session is removed.
+
+Chunks are only accepted at the current end of the staging file. If a chunk
+request fails the client can query the session for the number of bytes that
+have been received and resume the upload from that offset.
+
+The total size of the uploaded file is limited by the file size that is given
+when the session is created. Sessions without a file size are limited by the
+maximum upload size of the manager. The size of each chunk is limited by the
+caller (i.e., by the maximum request size of the application).
+
+Session metadata is stored next to the staging file in the session directory.
+Sessions can therefore be continued by any worker process that has access to
+the directory. The incremental checksum state is kept in memory by the worker
+that received the last chunk. Other workers recompute the checksum from the
+staging file before appending a chunk.
+"""
+
+from typing import Dict, IO, Optional
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from robflask.error import InvalidRequestError, UnknownUploadSessionError, UploadOffsetError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+"""Size of chunks (in bytes) that are read from the request stream."""
+CHUNK_SIZE = 64 * 1024
+
+"""Time (in seconds) after which inactive upload sessions are removed."""
+SESSION_TTL = 24 * 60 * 60
+
+"""Default maximum size (in bytes) of files that are uploaded in chunks."""
+UPLOAD_MAXSIZE = 10 * 1024 * 1024 * 1024
+
+"""Pattern for valid session identifiers."""
+SESSION_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+"""Labels for serialized upload sessions."""
+UPLOAD_CHECKSUM = 'checksum'
+UPLOAD_GROUP = 'groupId'
+UPLOAD_ID = 'id'
+UPLOAD_NAME = 'name'
+UPLOAD_OFFSET = 'offset'
+UPLOAD_SIZE = 'size'
+UPLOAD_USER = 'userId'
+
+
+class UploadSessionManager(object):
+    """Manager for upload sessions in a directory on the local file system.
+    Each session is represented by a metadata file '<id>.json' and the staging
+    file '<id>.data' for the uploaded content.
+    """
+    def __init__(
+        self, basedir: str, ttl: Optional[int] = SESSION_TTL,
+        maxsize: Optional[int] = UPLOAD_MAXSIZE
+    ):
+        """Initialize the session directory.
+
+        Parameters
+        ----------
+        basedir: string
+            Path to the directory for upload sessions.
+        ttl: int, default=24h
+            Time (in seconds) after which inactive sessions are removed.
+        maxsize: int, default=10GB
+            Maximum size (in bytes) of uploaded files.
+        """
+        self.basedir = basedir
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # Incremental checksums for the sessions that received chunks in this
+        # process. Maps session identifier to (offset, hash) tuples.
+        self._hashes = dict()
+        self._lock = threading.Lock()
+
+    def checksum(self, session_id: str) -> str:
+        """Get the hex digest of the SHA-256 checksum for the content that has
+        been received for the given session.
+
+        Parameters
+        ----------
+        session_id: string
+            Unique upload session identifier.
+
+        Returns
+        -------
+        string
+
+        Raises
+        ------
+        robflask.error.UnknownUploadSessionError
+        """
+        self.get(session_id)
+        return self._hash(session_id, self._offset(session_id)).hexdigest()
+
+    def create(
+        self, group_id: str, user_id: str, name: str, size: Optional[int] = None
+    ) -> Dict:
+        """Create a new upload session. Removes all expired sessions. The
+        session is rejected if the expected file size exceeds the maximum
+        upload size.
+
+        Parameters
+        ----------
+        group_id: string
+            Unique submission identifier.
+        user_id: string
+            Unique identifier of the user that created the session.
+        name: string
+            Name of the uploaded file.
+        size: int, default=None
+            Expected file size (if known).
+
+        Returns
+        -------
+        dict
+
+        Raises
+        ------
+        robflask.error.InvalidRequestError
+        """
+        if size is not None and size > self.maxsize:
+            msg = 'file size {} exceeds upload limit {}'
+            raise InvalidRequestError(msg.format(size, self.maxsize))
+        self.prune()
+        os.makedirs(self.basedir, exist_ok=True)
+        session_id = uuid.uuid4().hex
+        doc = {
+            UPLOAD_ID: session_id,
+            UPLOAD_GROUP: group_id,
+            UPLOAD_USER: user_id,
+            UPLOAD_NAME: name,
+            UPLOAD_SIZE: size
+        }
+        open(self.datafile(session_id), 'wb').close()
+        with open(self._metafile(session_id), 'w') as f:
+            json.dump(doc, f)
+        doc[UPLOAD_OFFSET] = 0
+        return doc
+
+    def datafile(self, session_id: str) -> str:
+        """Get path to the staging file for the given session.
+
+        Parameters
+        ----------
+        session_id: string
+            Unique upload session identifier.
+
+        Returns
+        -------
+        string
+        """
+        return os.path.join(self.basedir, '{}.data'.format(session_id))
+
+    def delete(self, session_id: str):
+        """Remove the given upload session and the staging file.
+
+        Parameters
+        ----------
+        session_id: string
+            Unique upload session identifier.
+        """
+        with self._lock:
+            self._hashes.pop(session_id, None)
+        for filename in [self._metafile(session_id), self.datafile(session_id)]:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def get(self, session_id: str) -> Dict:
+        """Get the serialized upload session. The offset in the result is the
+        number of bytes that have been received.
+
+        Parameters
+        ----------
+        session_id: string
+            Unique upload session identifier.
+
+        Returns
+        -------
+        dict
+
+        Raises
+        ------
+        robflask.error.UnknownUploadSessionError
+        """
+        if not SESSION_ID.match(session_id):
+            raise UnknownUploadSessionError(session_id)
+        try:
+            with open(self._metafile(session_id), 'r') as f:
+                doc = json.load(f)
+            doc[UPLOAD_OFFSET] = self._offset(session_id)
+        except (OSError, ValueError):
+            raise UnknownUploadSessionError(session_id)
+        return doc
+
+    def prune(self):
+        """Remove all sessions that have not received a chunk within the
+        session time-to-live period.
+        """
+        if not os.path.isdir(self.basedir):
+            return
+        expired = time.time() - self.ttl
+        for entry in os.scandir(self.basedir):
+            session_id, ext = os.path.splitext(entry.name)
+            if ext == '.data' and SESSION_ID.match(session_id):
+                try:
+                    if entry.stat().st_mtime < expired:
+                        self.delete(session_id)
+                except OSError:  # pragma: no cover
+                    pass
+
+    def write(
+        self, session_id: str, offset: int, stream: IO,
+        limit: Optional[int] = None
+    ) -> Dict:
+        """Append the chunk that is read from the given stream to the staging
+        file for an upload session. The chunk is rejected if the offset does
+        not match the number of bytes that have been received. The upload is
+        rejected if the uploaded data exceeds the file size of the session (or
+        the maximum upload size if the file size is not known) or if the chunk
+        exceeds the given limit.
+
+        The stream is read in blocks of fixed size. If reading the stream fails
+        (e.g., because the client disconnected) all bytes that have been read
+        until then remain in the staging file.
+
+        Parameters
+        ----------
+        session_id: string
+            Unique upload session identifier.
+        offset: int
+            Position of the chunk in the uploaded file.
+        stream: file-like object
+            Request input stream.
+        limit: int, default=None
+            Maximum size (in bytes) of the chunk.
+
+        Returns
+        -------
+        dict
+
+        Raises
+        ------
+        robflask.error.InvalidRequestError
+        robflask.error.UnknownUploadSessionError
+        robflask.error.UploadOffsetError
+        werkzeug.exceptions.RequestEntityTooLarge
+        """
+        doc = self.get(session_id)
+        size = doc.get(UPLOAD_SIZE)
+        maxsize = size if size is not None else self.maxsize
+        with open(self.datafile(session_id), 'r+b') as f:
+            # Prevent concurrent writes for the same session from different
+            # requests.
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    raise UploadOffsetError(offset, doc[UPLOAD_OFFSET])
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            if offset != position:
+                raise UploadOffsetError(offset, position)
+            checksum = self._hash(session_id, position)
+            try:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if position + len(chunk) > maxsize:
+                        raise InvalidRequestError('upload exceeds file size {}'.format(maxsize))
+                    if limit is not None and position + len(chunk) > offset + limit:
+                        raise RequestEntityTooLarge()
+                    f.write(chunk)
+                    checksum.update(chunk)
+                    position += len(chunk)
+            finally:
+                f.flush()
+                with self._lock:
+                    self._hashes[session_id] = (position, checksum)
+        doc[UPLOAD_OFFSET] = position
+        return doc
+
+    def _hash(self, session_id: str, offset: int):
+        """Get the incremental checksum for the first offset bytes of the
+        staging file. The checksum is recomputed from the staging file if the
+        state that is kept in memory is missing or outdated.
+
+        Returns
+        -------
+        hashlib.sha256
+        """
+        with self._lock:
+            state = self._hashes.get(session_id)
+        if state is not None and state[0] == offset:
+            return state[1]
+        checksum = hashlib.sha256()
+        remaining = offset
+        with open(self.datafile(session_id), 'rb') as f:
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:  # pragma: no cover
+                    break
+                checksum.update(chunk)
+                remaining -= len(chunk)
+        return checksum
+
+    def _metafile(self, session_id: str) -> str:
+        """Get path to the metadata file for the given session.
+
+        Returns
+        -------
+        string
+        """
+        return os.path.join(self.basedir, '{}.json'.format(session_id))
+
+    def _offset(self, session_id: str) -> int:
+        """Get the number of bytes in the staging file for the given session.
+
+        Returns
+        -------
+        int
+        """
+        return os.path.getsize(self.datafile(session_id))
+
+
+# -- Session manager singleton ------------------------------------------------
+
+"""Global upload session manager that is used by all request handlers."""
+_manager = None
+
+
+def upload_sessions() -> UploadSessionManager:
+    """Get the global upload session manager. The manager is (re-)created if
+    the session directory or the maximum upload size in the Web API
+    configuration changed.
+
+    Returns
+    -------
+    robflask.upload.UploadSessionManager
+    """
+    global _manager
+    from robflask.config import UPLOAD_DIR, UPLOAD_MAX_SIZE
+    basedir = UPLOAD_DIR()
+    maxsize = UPLOAD_MAX_SIZE()
+    if _manager is None or _manager.basedir != basedir or _manager.maxsize != maxsize:
+        _manager = UploadSessionManager(basedir=basedir, maxsize=maxsize)
+    return _manager
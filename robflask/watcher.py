@@ -0,0 +1,404 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Shared watcher for run state changes.
+
+The watcher maintains the list of submissions that have at least one active
+subscriber (e.g., an open event stream or a waiting long-poll request). A
+single background thread queries the runs for each watched submission once per
+polling interval and notifies all subscribers about runs that changed their
+state. The number of database queries therefore depends on the number of
+watched submissions and not on the number of subscribers.
+
+Subscribers wait on a queue for notifications. When the Web API is served by a
+WSGI server that uses green threads (e.g., gunicorn with gevent workers) idle
+subscribers do not occupy an operating system thread. When the Web API is
+served by an ASGI server subscribers wait for notifications in the event loop.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+from flowserv.error import UnauthenticatedAccessError, UnauthorizedAccessError, UnknownObjectError
+
+import flowserv.view.group as glbls
+import flowserv.view.run as labels
+
+
+class Subscription(object):
+    """Subscription for state changes of the runs in a submission. If a run
+    identifier is given only changes for that run are delivered.
+
+    The subscription maintains its own copy of the run descriptors for the
+    submission that is updated with every notification.
+    """
+    def __init__(
+        self, group_id: str, token: str, runs: Dict[str, Dict],
+        run_id: Optional[str] = None
+    ):
+        """Initialize the subscription properties.
+
+        Parameters
+        ----------
+        group_id: string
+            Unique submission identifier.
+        token: string
+            Access token of the subscribed user. The token is used by the
+            watcher to query the submission runs.
+        runs: dict
+            Mapping of run identifier to serialized run descriptors for the
+            run states that are known to the subscriber.
+        run_id: string, default=None
+            Optional identifier of the only run that the subscriber is
+            interested in.
+        """
+        self.group_id = group_id
+        self.token = token
+        self.runs = dict(runs)
+        self.run_id = run_id
+        self.closed = False
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._listeners = list()
+
+    async def async_get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, Dict]]:
+        """Wait for the next notification without blocking the event loop.
+        The result is the same as for get().
+
+        Parameters
+        ----------
+        timeout: float, default=None
+            Maximum time (in seconds) to wait for a notification.
+
+        Returns
+        -------
+        tuple of string and dict
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def wakeup():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # pragma: no cover
+                # The event loop has been closed.
+                pass
+
+        with self._lock:
+            self._listeners.append(wakeup)
+        try:
+            # Check the queue after registering the listener to avoid missing
+            # a notification that arrives in between.
+            while True:
+                try:
+                    return self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    await asyncio.wait_for(event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+                event.clear()
+        finally:
+            with self._lock:
+                self._listeners.remove(wakeup)
+
+    def close(self):
+        """Close the subscription. Wakes up a waiting subscriber."""
+        self.closed = True
+        self._queue.put(None)
+        self._wakeup()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, Dict]]:
+        """Wait for the next notification. Returns a tuple of run identifier
+        and serialized run descriptor. The descriptor is None for deleted
+        runs. Returns None if the timeout expired or if the subscription was
+        closed.
+
+        Parameters
+        ----------
+        timeout: float, default=None
+            Maximum time (in seconds) to wait for a notification.
+
+        Returns
+        -------
+        tuple of string and dict
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def notify(self, run_id: str, run: Optional[Dict]):
+        """Notify the subscriber about a state change for a run. The run
+        handle is None if the run was deleted.
+
+        Parameters
+        ----------
+        run_id: string
+            Unique run identifier.
+        run: dict
+            Serialized run descriptor.
+        """
+        if self.run_id is not None and self.run_id != run_id:
+            return
+        with self._lock:
+            if run is None:
+                self.runs.pop(run_id, None)
+            else:
+                self.runs[run_id] = run
+        self._queue.put((run_id, run))
+        self._wakeup()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Get a copy of the current mapping of run identifier to serialized
+        run descriptors for the subscribed submission.
+
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            return dict(self.runs)
+
+    def _wakeup(self):
+        """Wake up subscribers that wait in an event loop."""
+        with self._lock:
+            listeners = list(self._listeners)
+        for wakeup in listeners:
+            wakeup()
+
+
+class RunWatcher(object):
+    """Watcher for run state changes in submissions that have at least one
+    subscriber. The background thread is started with the first subscription
+    and terminates when there are no more subscribers.
+    """
+    def __init__(self, interval: float):
+        """Initialize the polling interval.
+
+        Parameters
+        ----------
+        interval: float
+            Time (in seconds) between queries for the state of watched runs.
+        """
+        self.interval = interval
+        self.queries = 0
+        self._groups = dict()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def poll(self):
+        """Query the runs for all watched submissions and notify subscribers
+        about runs that changed their state.
+        """
+        with self._lock:
+            groups = [(g, list(w['subscribers'])) for g, w in self._groups.items()]
+        for group_id, subscribers in groups:
+            runs = self._fetch(group_id, subscribers)
+            if runs is not None:
+                self._update(group_id, runs)
+
+    def subscribe(
+        self, group_id: str, token: str, runs: Dict[str, Dict],
+        run_id: Optional[str] = None
+    ) -> Subscription:
+        """Subscribe to state changes for runs of a given submission. The
+        caller is expected to have verified that the user is authorized to
+        access the submission runs.
+
+        The subscriber provides the run states that were retrieved right
+        before subscribing. These states are considered more recent than the
+        states that are known to the watcher. Other subscribers for the same
+        submission are notified about any difference.
+
+        Parameters
+        ----------
+        group_id: string
+            Unique submission identifier.
+        token: string
+            Access token of the subscribed user.
+        runs: dict
+            Mapping of run identifier to serialized run descriptors.
+        run_id: string, default=None
+            Optional identifier of the only run that the subscriber is
+            interested in.
+
+        Returns
+        -------
+        robflask.watcher.Subscription
+        """
+        sub = Subscription(group_id=group_id, token=token, runs=runs, run_id=run_id)
+        updates, subscribers = list(), list()
+        with self._lock:
+            watch = self._groups.get(group_id)
+            if watch is None:
+                watch = {'runs': dict(runs), 'subscribers': list()}
+                self._groups[group_id] = watch
+            else:
+                updates = changes(watch['runs'], runs)
+                watch['runs'] = dict(runs)
+                subscribers = list(watch['subscribers'])
+            watch['subscribers'].append(sub)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        for run_id, run, _ in updates:
+            for s in subscribers:
+                s.notify(run_id, run)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        """Remove the given subscription. Submissions without subscribers are
+        no longer watched.
+
+        Parameters
+        ----------
+        sub: robflask.watcher.Subscription
+            Subscription that is removed.
+        """
+        with self._lock:
+            watch = self._groups.get(sub.group_id)
+            if watch is not None and sub in watch['subscribers']:
+                watch['subscribers'].remove(sub)
+                if not watch['subscribers']:
+                    del self._groups[sub.group_id]
+
+    def _fetch(self, group_id: str, subscribers: List[Subscription]) -> Optional[List[Dict]]:
+        """Get the list of run descriptors for a submission. Uses the access
+        token of the most recent subscriber. Subscribers whose token is no
+        longer valid are closed. All subscribers are closed if the submission
+        does not exist anymore. The identifier of the benchmark that the
+        submission belongs to is retrieved on the first query for a watched
+        submission. The run descriptors in the listing do not contain the
+        benchmark identifier that is needed to update the leaderboard cache.
+
+        Returns None if the runs could not be retrieved.
+
+        Returns
+        -------
+        list of dict
+        """
+        from robflask.service import service
+        for sub in reversed(subscribers):
+            try:
+                with service(access_token=sub.token) as api:
+                    self.queries += 1
+                    runs = api.runs().list_runs(group_id=group_id)[labels.RUN_LIST]
+                    with self._lock:
+                        watch = self._groups.get(group_id)
+                        resolve = watch is not None and watch.get('workflow') is None
+                    if resolve:
+                        self.queries += 1
+                        group = api.groups().get_group(group_id=group_id)
+                        with self._lock:
+                            watch['workflow'] = group[glbls.WORKFLOW_ID]
+                    return runs
+            except (UnauthenticatedAccessError, UnauthorizedAccessError):
+                self._close(sub)
+            except UnknownObjectError:
+                for s in subscribers:
+                    self._close(s)
+                return None
+            except Exception as ex:  # pragma: no cover
+                logging.error(ex)
+                return None
+        return None
+
+    def _close(self, sub: Subscription):
+        """Close and remove the given subscription."""
+        self.unsubscribe(sub)
+        sub.close()
+
+    def _run(self):
+        """Poll run states until there are no more subscribers."""
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._groups:
+                    self._thread = None
+                    return
+            self.poll()
+
+    def _update(self, group_id: str, runs: List[Dict]):
+        """Update the known run states for a submission and notify the
+        subscribers about all changes.
+        """
+        from robflask.leaderboard import cache
+        runs = {run[labels.RUN_ID]: run for run in runs}
+        with self._lock:
+            watch = self._groups.get(group_id)
+            if watch is None:
+                return
+            updates = changes(watch['runs'], runs)
+            watch['runs'] = runs
+            subscribers = list(watch['subscribers'])
+            workflow_id = watch.get('workflow')
+        for run_id, run, prev in updates:
+            if run is not None:
+                cache().run_state(run, workflow_id=workflow_id)
+            else:
+                cache().run_deleted(prev, workflow_id=workflow_id)
+            for sub in subscribers:
+                sub.notify(run_id, run)
+
+
+# -- Helper functions ---------------------------------------------------------
+
+def changes(known: Dict[str, Dict], current: Dict[str, Dict]) -> List[Tuple[str, Dict, Dict]]:
+    """Get the list of runs whose state in the current mapping differs from
+    the state in the known mapping. Returns a list of tuples with the run
+    identifier, the current run descriptor (None for deleted runs) and the
+    known run descriptor (None for new runs).
+
+    Parameters
+    ----------
+    known: dict
+        Mapping of run identifier to serialized run descriptors.
+    current: dict
+        Mapping of run identifier to serialized run descriptors.
+
+    Returns
+    -------
+    list
+    """
+    result = list()
+    for run_id, run in current.items():
+        prev = known.get(run_id)
+        if prev is None or prev[labels.RUN_STATE] != run[labels.RUN_STATE]:
+            result.append((run_id, run, prev))
+    for run_id, prev in known.items():
+        if run_id not in current:
+            result.append((run_id, None, prev))
+    return result
+
+
+# -- Watcher singleton --------------------------------------------------------
+
+"""Global run watcher that is used by all request handlers."""
+_watcher = None
+
+
+def watcher() -> RunWatcher:
+    """Get the global run watcher. The watcher is created on first access
+    using the polling interval from the Web API configuration.
+
+    Returns
+    -------
+    robflask.watcher.RunWatcher
+    """
+    global _watcher
+    if _watcher is None:
+        from robflask.config import POLL_INTERVAL
+        _watcher = RunWatcher(interval=POLL_INTERVAL())
+    return _watcher
@@ -16,7 +16,7 @@ from setuptools import setup, find_packages
 
 install_requires = [
     'flowserv-core>=0.7.1',
-    'flask',
+    'flask>=2.2',
     'flask_cors'
 ]
 
@@ -32,10 +32,13 @@ dev_require = ['flake8', 'python-language-server']
 
 
 extras_require = {
+    'asgi': ['uvicorn'],
+    'brotli': ['brotli'],
     'docs': [
         'Sphinx',
         'sphinx-rtd-theme'
     ],
+    'orjson': ['orjson'],
     'tests': tests_require,
     'dev': dev_require + tests_require
 }
@@ -69,7 +72,7 @@ setup(
     author='Heiko Mueller',
     author_email='heiko.muller@gmail.com',
     license='MIT',
-    packages=find_packages(exclude=('tests',)),
+    packages=find_packages(exclude=('benchmarks', 'tests')),
     include_package_data=True,
     extras_require=extras_require,
     tests_require=tests_require,
@@ -0,0 +1,153 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Test serving the app routes with the ASGI adapter."""
+
+import asyncio
+import json
+
+from robflask.api.asgi import ASGIAdapter
+from robflask.api.util import HEADER_TOKEN
+from robflask.tests.user import create_user
+from robflask.watcher import watcher
+
+import flowserv.view.group as labels
+import flowserv.view.run as rlbls
+import robflask.config as config
+
+
+"""Url patterns."""
+CREATE_SUBMISSION = '{}/workflows/{}/groups'
+RUNS_EVENTS = '{}/groups/{}/runs/events'
+RUNS_POLL = '{}/groups/{}/runs/poll'
+UPLOAD_SESSIONS = '{}/uploads/{}/sessions'
+UPLOAD_SESSION = '{}/uploads/{}/sessions/{}'
+
+
+def asgi_request(
+    app, method, path, query='', headers=None, chunks=None, max_chunks=None
+):
+    """Send a request to the ASGI application. The request body is sent in
+    the given list of chunks. The client disconnects after the given number
+    of response body chunks was received. Returns the response status, the
+    response headers, and the list of received body chunks.
+    """
+    async def run():
+        requests = [
+            {'type': 'http.request', 'body': chunk, 'more_body': True}
+            for chunk in (chunks if chunks else [b''])
+        ]
+        requests[-1]['more_body'] = False
+        disconnected = asyncio.Event()
+        status, response_headers, body = None, dict(), list()
+
+        async def receive():
+            if requests:
+                return requests.pop(0)
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status, response_headers
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                response_headers = {k.decode(): v.decode() for k, v in message['headers']}
+            elif message.get('body'):
+                body.append(message['body'])
+                if max_chunks is not None and len(body) >= max_chunks:
+                    disconnected.set()
+            if not message.get('more_body', False) and message['type'] == 'http.response.body':
+                disconnected.set()
+
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': query.encode(),
+            'headers': [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=30)
+        return status, response_headers, body
+
+    return asyncio.run(run())
+
+
+def test_asgi_requests(client, benchmark_id):
+    """Test serving requests and mapping errors to responses with the ASGI
+    adapter.
+    """
+    app = ASGIAdapter(client.application, max_workers=4, max_content_length=1024)
+    # Service descriptor.
+    status, headers, body = asgi_request(app, 'GET', config.API_PATH() + '/')
+    assert status == 200
+    assert headers['content-type'] == 'application/json'
+    # Errors are mapped to the same responses as for the Flask app.
+    url = '{}/workflows/{}'.format(config.API_PATH(), 'UNKNOWN')
+    status, headers, body = asgi_request(app, 'GET', url)
+    assert status == 404
+    assert 'message' in json.loads(b''.join(body))
+    # Upload a file in chunks that are received in multiple messages. Use a
+    # small buffer size to stream the body to the request handler.
+    app.buffer_size = 100
+    _, token = create_user(client, '0000')
+    headers = {HEADER_TOKEN: token, 'Content-Type': 'application/json'}
+    url = CREATE_SUBMISSION.format(config.API_PATH(), benchmark_id)
+    r = client.post(url, json={labels.GROUP_NAME: 'S1'}, headers={HEADER_TOKEN: token})
+    submission_id = r.json[labels.GROUP_ID]
+    url = UPLOAD_SESSIONS.format(config.API_PATH(), submission_id)
+    doc = json.dumps({'name': 'data.txt', 'size': 2000}).encode()
+    status, _, body = asgi_request(app, 'POST', url, headers=headers, chunks=[doc])
+    assert status == 201
+    session_id = json.loads(b''.join(body))['id']
+    url = UPLOAD_SESSION.format(config.API_PATH(), submission_id, session_id)
+    for offset in [0, 1000]:
+        chunks = [b'x' * 500] * 2
+        status, _, body = asgi_request(
+            app, 'PUT', url, query='offset={}'.format(offset), headers={HEADER_TOKEN: token}, chunks=chunks
+        )
+        assert status == 200
+    assert json.loads(b''.join(body))['offset'] == 2000
+    # Requests with a body that exceeds the maximum content length are
+    # rejected before the request handler is called (if the size is declared)
+    # or while the body is received.
+    headers = {HEADER_TOKEN: token, 'Content-Length': '2000'}
+    status, _, body = asgi_request(app, 'PUT', url, query='offset=2000', headers=headers, chunks=[b'x' * 2000])
+    assert status == 413
+    assert 'error' in json.loads(b''.join(body))
+    chunks = [b'x' * 500] * 3
+    status, _, body = asgi_request(app, 'PUT', url, query='offset=2000', headers={HEADER_TOKEN: token}, chunks=chunks)
+    assert status == 413
+    app.buffer_size = 2000
+    status, _, body = asgi_request(app, 'PUT', url, query='offset=2000', headers={HEADER_TOKEN: token}, chunks=chunks)
+    assert status == 413
+    assert json.loads(b''.join(asgi_request(app, 'GET', url, headers={HEADER_TOKEN: token})[2]))['offset'] == 2000
+    app.executor.shutdown()
+
+
+def test_asgi_run_events(client, benchmark_id):
+    """Test waiting for run state changes in the event loop."""
+    app = ASGIAdapter(client.application, max_workers=2)
+    _, token = create_user(client, '0000')
+    headers = {HEADER_TOKEN: token}
+    url = CREATE_SUBMISSION.format(config.API_PATH(), benchmark_id)
+    r = client.post(url, json={labels.GROUP_NAME: 'S1'}, headers=headers)
+    submission_id = r.json[labels.GROUP_ID]
+    # The event stream is closed when the client disconnects.
+    url = RUNS_EVENTS.format(config.API_PATH(), submission_id)
+    status, response_headers, body = asgi_request(app, 'GET', url, headers=headers, max_chunks=1)
+    assert status == 200
+    assert response_headers['content-type'].startswith('text/event-stream')
+    assert body[0].startswith(b'retry:')
+    assert submission_id not in watcher()._groups
+    # Long-poll request that does not receive a notification.
+    url = RUNS_POLL.format(config.API_PATH(), submission_id)
+    status, _, body = asgi_request(app, 'GET', url, query='wait=0.5', headers=headers)
+    assert status == 200
+    assert json.loads(b''.join(body)) == {rlbls.RUN_LIST: []}
+    assert submission_id not in watcher()._groups
+    app.executor.shutdown()
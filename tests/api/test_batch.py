@@ -0,0 +1,64 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Test batch requests for multiple app routes."""
+
+from robflask.api.util import HEADER_TOKEN
+from robflask.auth import token_cache
+from robflask.tests.user import create_user
+
+import flowserv.view.group as labels
+import robflask.config as config
+
+
+"""Url patterns."""
+BATCH = '{}/batch'
+CREATE_SUBMISSION = '{}/workflows/{}/groups'
+
+
+def test_batch_requests(client, benchmark_id):
+    """Test handling multiple requests in a single batch request."""
+    # -- Setup ----------------------------------------------------------------
+    _, token = create_user(client, '0000')
+    headers = {HEADER_TOKEN: token}
+    url = CREATE_SUBMISSION.format(config.API_PATH(), benchmark_id)
+    r = client.post(url, json={labels.GROUP_NAME: 'S1'}, headers=headers)
+    submission_id = r.json[labels.GROUP_ID]
+    # -- Batch request --------------------------------------------------------
+    requests = [
+        {'path': '/workflows/{}'.format(benchmark_id)},
+        {'path': '/workflows/{}/groups'.format(benchmark_id)},
+        {'path': '/groups/{}'.format(submission_id)},
+        {'path': '/groups/{}/runs'.format(submission_id)},
+        {'path': '/uploads/{}/files'.format(submission_id), 'method': 'GET'},
+        {'path': '/groups/UNKNOWN'},
+        {'path': '/groups/{}/runs/events'.format(submission_id)}
+    ]
+    stats = token_cache().stats()
+    url = BATCH.format(config.API_PATH())
+    r = client.post(url, json={'requests': requests}, headers=headers)
+    assert r.status_code == 200
+    responses = r.json['responses']
+    assert [r['status'] for r in responses] == [200, 200, 200, 200, 200, 404, 400]
+    assert responses[0]['body']['id'] == benchmark_id
+    assert responses[2]['body']['id'] == submission_id
+    assert responses[3]['body']['runs'] == []
+    # The access token is resolved once for all sub-requests.
+    now = token_cache().stats()
+    assert now['hits'] + now['misses'] == stats['hits'] + stats['misses'] + 1
+    # Sub-requests without access token. Only the benchmark handle is public.
+    r = client.post(url, json={'requests': requests[:3]})
+    assert [r['status'] for r in r.json['responses']] == [200, 403, 403]
+    # -- Error cases ----------------------------------------------------------
+    r = client.post(url, json={'requests': [{'path': '/batch'}]}, headers=headers)
+    assert r.status_code == 400
+    body = {'requests': [{'path': '/groups/{}'.format(submission_id), 'method': 'DELETE'}]}
+    r = client.post(url, json=body, headers=headers)
+    assert r.status_code == 400
+    r = client.post(url, json={'requests': 'ABC'}, headers=headers)
+    assert r.status_code == 400
@@ -17,6 +17,22 @@ import flowserv.view.workflow as labels
 import robflask.config as config
 
 
+def test_conditional_get(client, benchmark_id):
+    """Test conditional requests for a benchmark handle and listing."""
+    for url in ['/workflows/{}'.format(benchmark_id), '/workflows']:
+        url = config.API_PATH() + url
+        r = client.get(url)
+        assert r.status_code == 200
+        etag = r.headers['ETag']
+        # Sending the entity tag returns a response without body.
+        r = client.get(url, headers={'If-None-Match': etag})
+        assert r.status_code == 304
+        assert r.data == b''
+        r = client.get(url, headers={'If-None-Match': '"unknown"'})
+        assert r.status_code == 200
+        assert r.headers['ETag'] == etag
+
+
 def test_get_benchmark(client, benchmark_id):
     """Test getting a benchmark handle."""
     url = config.API_PATH() + '/workflows/{}'.format(benchmark_id)
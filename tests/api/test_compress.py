@@ -0,0 +1,48 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Test compression of JSON responses."""
+
+import gzip
+import json
+
+from robflask.api.compress import COMPRESS_LEVEL, COMPRESS_MINSIZE
+
+import robflask.config as config
+
+
+def test_compress_json_response(client, benchmark_id):
+    """Test compressing JSON responses based on the Accept-Encoding header."""
+    client.application.config[COMPRESS_MINSIZE] = 0
+    url = '{}/workflows/{}'.format(config.API_PATH(), benchmark_id)
+    r = client.get(url)
+    assert r.status_code == 200
+    assert 'Content-Encoding' not in r.headers
+    doc = r.json
+    r = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert r.status_code == 200
+    assert r.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in r.headers['Vary']
+    assert json.loads(gzip.decompress(r.data)) == doc
+    # The entity tag of the compressed response can be used for conditional
+    # requests.
+    etag = r.headers['ETag']
+    assert etag.startswith('W/')
+    r = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert r.status_code == 304
+    # Unsupported encodings and small responses are not compressed.
+    r = client.get(url, headers={'Accept-Encoding': 'deflate'})
+    assert 'Content-Encoding' not in r.headers
+    client.application.config[COMPRESS_MINSIZE] = 1024 * 1024
+    r = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in r.headers
+    # Compression is disabled for level 0.
+    client.application.config[COMPRESS_MINSIZE] = 0
+    client.application.config[COMPRESS_LEVEL] = 0
+    r = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in r.headers
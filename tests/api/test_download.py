@@ -0,0 +1,66 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for sending file handles in download responses."""
+
+import io
+
+from flask import Flask
+
+from robflask.api.download import read_chunks, send_handle
+
+
+class BufferHandle(object):
+    """In-memory file handle that does not reference a local file."""
+    def __init__(self, data):
+        self.data = data
+
+    def open(self):
+        return io.BytesIO(self.data)
+
+    def size(self):
+        return len(self.data)
+
+
+class UnseekableIO(io.BytesIO):
+    """Byte stream that does not support random access."""
+    def seekable(self):
+        return False
+
+
+def test_read_chunks():
+    """Test reading byte ranges in chunks."""
+    data = b'0123456789'
+    assert list(read_chunks(io.BytesIO(data), chunk_size=4)) == [b'0123', b'4567', b'89']
+    assert b''.join(read_chunks(io.BytesIO(data), start=2, end=5)) == b'234'
+    assert b''.join(read_chunks(UnseekableIO(data), start=3, end=9, chunk_size=2)) == b'345678'
+    assert b''.join(read_chunks(UnseekableIO(data), start=20, end=30)) == b''
+
+
+def test_send_streamed_handle():
+    """Test streaming a file handle with and without range requests."""
+    app = Flask(__name__)
+    fh = BufferHandle(b'0123456789')
+    with app.test_request_context('/'):
+        r = send_handle(fh, download_name='data.txt', mimetype='text/plain')
+        r.direct_passthrough = False
+        assert r.status_code == 200
+        assert r.get_data() == b'0123456789'
+        assert r.headers['Accept-Ranges'] == 'bytes'
+        assert 'data.txt' in r.headers['Content-Disposition']
+    with app.test_request_context('/', headers={'Range': 'bytes=2-4'}):
+        r = send_handle(fh, download_name='data.txt')
+        r.direct_passthrough = False
+        assert r.status_code == 206
+        assert r.get_data() == b'234'
+        assert r.headers['Content-Range'] == 'bytes 2-4/10'
+        assert r.content_length == 3
+    with app.test_request_context('/', headers={'Range': 'bytes=20-30'}):
+        r = send_handle(fh, download_name='data.txt')
+        assert r.status_code == 416
+        assert r.headers['Content-Range'] == 'bytes */10'
@@ -0,0 +1,31 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Test serializing responses with the configured JSON provider."""
+
+import pytest
+
+from robflask.api.jsonprovider import JSON_ORJSON, JSON_STDLIB, init_json
+
+import robflask.config as config
+
+
+def test_json_providers(client, benchmark_id):
+    """Test that all JSON providers return the same response documents."""
+    app = client.application
+    url = '{}/workflows/{}'.format(config.API_PATH(), benchmark_id)
+    docs = list()
+    for provider in [JSON_STDLIB, JSON_ORJSON]:
+        init_json(app, provider=provider)
+        r = client.get(url)
+        assert r.status_code == 200
+        assert r.mimetype == 'application/json'
+        docs.append(r.json)
+    assert docs[0] == docs[1]
+    with pytest.raises(ValueError):
+        init_json(app, provider='unknown')
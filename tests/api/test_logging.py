@@ -0,0 +1,99 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Test the request context and the access records of the request log."""
+
+import io
+import logging
+
+from robflask.api.util import HEADER_TOKEN
+from robflask.logger import ACCESS_LOGGER, EVENT_REQUEST, HEADER_REQUEST_ID
+from robflask.tests.user import create_user
+
+import flowserv.view.files as flbls
+import flowserv.view.group as glbls
+import robflask.config as config
+
+
+class RecordCollector(logging.Handler):
+    """Keep all handled log records in a list."""
+    def __init__(self):
+        super(RecordCollector, self).__init__()
+        self.records = list()
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_access_log(client, benchmark_id):
+    """Test writing access records for requests."""
+    user_id, token = create_user(client, 'alice')
+    collector = RecordCollector()
+    access = logging.getLogger(ACCESS_LOGGER)
+    access.addHandler(collector)
+    try:
+        url = '{}/workflows/{}'.format(config.API_PATH(), benchmark_id)
+        headers = {HEADER_TOKEN: token, HEADER_REQUEST_ID: 'R1'}
+        r = client.get(url, headers=headers, buffered=True)
+        assert r.status_code == 200
+        assert r.headers[HEADER_REQUEST_ID] == 'R1'
+        # Invalid identifiers are replaced.
+        r = client.get(url, headers={HEADER_TOKEN: token, HEADER_REQUEST_ID: 'R1 <script>'}, buffered=True)
+        assert r.status_code == 200
+        assert r.headers[HEADER_REQUEST_ID] != 'R1 <script>'
+        r = client.get(config.API_PATH() + '/unknown/route', buffered=True)
+        assert r.status_code == 404
+        request_id = r.headers[HEADER_REQUEST_ID]
+    finally:
+        access.removeHandler(collector)
+    assert len(collector.records) == 3
+    record = collector.records[0]
+    assert record.event == EVENT_REQUEST
+    assert record.requestId == 'R1'
+    assert record.route == config.API_PATH() + '/workflows/<string:workflow_id>'
+    assert record.user == user_id
+    assert record.status == 200
+    assert record.duration > 0
+    assert collector.records[1].requestId != 'R1 <script>'
+    record = collector.records[2]
+    assert record.requestId == request_id
+    assert record.route == '<unmatched>'
+    assert record.user is None
+    assert record.status == 404
+
+
+def test_access_log_file_download(client, benchmark_id):
+    """Test writing access records for file downloads that are sent in
+    direct passthrough mode. File downloads are not authenticated.
+    """
+    _, token = create_user(client, 'alice')
+    headers = {HEADER_TOKEN: token}
+    url = '{}/workflows/{}/groups'.format(config.API_PATH(), benchmark_id)
+    r = client.post(url, json={glbls.GROUP_NAME: 'G1'}, headers=headers)
+    group_id = r.json[glbls.GROUP_ID]
+    url = '{}/uploads/{}/files'.format(config.API_PATH(), group_id)
+    data = {'file': (io.BytesIO(b'Alice\nBob\n'), 'names.txt')}
+    r = client.post(url, data=data, content_type='multipart/form-data', headers=headers)
+    file_id = r.json[flbls.FILE_ID]
+    collector = RecordCollector()
+    access = logging.getLogger(ACCESS_LOGGER)
+    access.addHandler(collector)
+    try:
+        url = '{}/uploads/{}/files/{}'.format(config.API_PATH(), group_id, file_id)
+        r = client.get(url, headers={HEADER_TOKEN: token, HEADER_REQUEST_ID: 'R2'}, buffered=True)
+        assert r.status_code == 200
+        assert r.data == b'Alice\nBob\n'
+    finally:
+        access.removeHandler(collector)
+    assert len(collector.records) == 1
+    record = collector.records[0]
+    assert record.requestId == 'R2'
+    assert record.route == config.API_PATH() + '/uploads/<string:group_id>/files/<string:file_id>'
+    assert record.user is None
+    assert record.status == 200
+    assert record.duration > 0
@@ -0,0 +1,82 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Test the request metrics endpoint."""
+
+import io
+
+from robflask.api.util import HEADER_TOKEN
+from robflask.tests.user import create_user
+
+import flowserv.view.files as flbls
+import flowserv.view.group as glbls
+import robflask.config as config
+
+
+def test_metrics_endpoint(client, benchmark_id):
+    """Test recording request metrics for blueprint routes."""
+    url = '{}/workflows/{}'.format(config.API_PATH(), benchmark_id)
+    r = client.get(url, buffered=True)
+    assert r.status_code == 200
+    r = client.get(config.API_PATH() + '/unknown/route', buffered=True)
+    assert r.status_code == 404
+    r = client.get('/metrics')
+    assert r.status_code == 200
+    assert r.mimetype == 'text/plain'
+    text = r.data.decode('utf-8')
+    route = 'blueprint="workflows",route="{}/workflows/<string:workflow_id>"'.format(config.API_PATH())
+    assert 'rob_http_requests_total{' + route + ',method="GET",status="200"}' in text
+    assert 'rob_http_request_duration_seconds_count{' + route + ',method="GET"}' in text
+    assert 'rob_http_request_phase_seconds_count{' + route + ',phase="service"}' in text
+    assert 'rob_http_request_phase_seconds_count{' + route + ',phase="serialize"}' in text
+    assert 'route="<unmatched>",method="GET",status="404"' in text
+    assert '# TYPE rob_leaderboard_cache_hits_total counter' in text
+    assert '# TYPE rob_leaderboard_cache_size gauge' in text
+    assert '# TYPE rob_db_pool_checkouts_total counter' in text
+    assert '# TYPE rob_db_pool_checkedout gauge' in text
+
+
+def test_metrics_file_download(client, benchmark_id):
+    """Test recording request metrics for file downloads that are sent in
+    direct passthrough mode.
+    """
+    _, token = create_user(client, '0000')
+    headers = {HEADER_TOKEN: token}
+    url = '{}/workflows/{}/groups'.format(config.API_PATH(), benchmark_id)
+    r = client.post(url, json={glbls.GROUP_NAME: 'G1'}, headers=headers)
+    group_id = r.json[glbls.GROUP_ID]
+    url = '{}/uploads/{}/files'.format(config.API_PATH(), group_id)
+    data = {'file': (io.BytesIO(b'Alice\nBob\n'), 'names.txt')}
+    r = client.post(url, data=data, content_type='multipart/form-data', headers=headers)
+    file_id = r.json[flbls.FILE_ID]
+    url = '{}/uploads/{}/files/{}'.format(config.API_PATH(), group_id, file_id)
+    route = 'blueprint="uploads",route="{}/uploads/<string:group_id>/files/<string:file_id>"'.format(config.API_PATH())
+    requests = 'rob_http_requests_total{' + route + ',method="GET",status="200"}'
+    durations = 'rob_http_request_duration_seconds_count{' + route + ',method="GET"}'
+    # The metrics registry is shared by all tests.
+    text = client.get('/metrics').data.decode('utf-8')
+    count = metric_value(text, requests)
+    duration_count = metric_value(text, durations)
+    for _ in range(3):
+        r = client.get(url, headers=headers, buffered=True)
+        assert r.status_code == 200
+        assert r.data == b'Alice\nBob\n'
+    text = client.get('/metrics').data.decode('utf-8')
+    assert metric_value(text, 'rob_http_requests_in_flight{' + route + '}') == 0
+    assert metric_value(text, requests) == count + 3
+    assert metric_value(text, durations) == duration_count + 3
+
+
+def metric_value(text, sample):
+    """Get the value of a metric sample from the exposition text. Returns 0
+    if the sample is not in the text.
+    """
+    for line in text.splitlines():
+        if line.startswith(sample + ' '):
+            return float(line.split(' ')[-1])
+    return 0
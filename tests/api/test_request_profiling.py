@@ -0,0 +1,49 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Test profiling requests that are selected by the profiling header."""
+
+import os
+
+from robflask.api import create_app
+from robflask.profiling import HEADER_PROFILE
+
+import robflask.config as config
+
+
+def test_profile_requests(client, benchmark_id, tmpdir):
+    """Test writing profiles for requests with the profiling header."""
+    # Profiling is disabled by default.
+    url = '{}/workflows/{}'.format(config.API_PATH(), benchmark_id)
+    r = client.get(url, headers={HEADER_PROFILE: 'secret'})
+    assert HEADER_PROFILE not in r.headers
+    os.environ[config.ROB_WEBAPI_LOG] = str(tmpdir)
+    os.environ[config.ROB_WEBAPI_PROFILE] = 'true'
+    os.environ[config.ROB_WEBAPI_PROFILE_KEY] = 'secret'
+    profiles = os.path.join(str(tmpdir), 'profiles')
+    try:
+        for mode, suffix in [('sample', '.folded'), ('cprofile', '.prof')]:
+            os.environ[config.ROB_WEBAPI_PROFILE_MODE] = mode
+            app = create_app({'TESTING': True})
+            with app.test_client() as profiled:
+                # Requests without the key are not profiled.
+                r = profiled.get(url, headers={HEADER_PROFILE: 'unknown'})
+                assert r.status_code == 200
+                assert HEADER_PROFILE not in r.headers
+                r = profiled.get(url, headers={HEADER_PROFILE: 'secret'})
+                assert r.status_code == 200
+                filename = r.headers[HEADER_PROFILE]
+                assert filename.endswith(suffix)
+                assert 'workflows.get_benchmark' in filename
+                assert os.path.isfile(os.path.join(profiles, filename))
+        assert len(os.listdir(profiles)) == 2
+    finally:
+        del os.environ[config.ROB_WEBAPI_LOG]
+        del os.environ[config.ROB_WEBAPI_PROFILE]
+        del os.environ[config.ROB_WEBAPI_PROFILE_KEY]
+        del os.environ[config.ROB_WEBAPI_PROFILE_MODE]
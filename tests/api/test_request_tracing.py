@@ -0,0 +1,91 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Test tracing requests with the file span exporter."""
+
+import io
+import json
+import os
+
+from robflask.api import create_app
+from robflask.api.util import HEADER_TOKEN
+from robflask.tests.user import create_user
+from robflask.tracing import HEADER_TRACEPARENT
+
+import flowserv.view.files as flbls
+import flowserv.view.group as glbls
+import robflask.config as config
+
+
+def test_trace_requests(client, benchmark_id, tmpdir):
+    """Test recording request spans for a traced request."""
+    _, token = create_user(client, 'alice')
+    os.environ[config.ROB_WEBAPI_LOG] = str(tmpdir)
+    os.environ[config.ROB_WEBAPI_TRACING] = 'true'
+    try:
+        app = create_app({'TESTING': True})
+    finally:
+        del os.environ[config.ROB_WEBAPI_LOG]
+        del os.environ[config.ROB_WEBAPI_TRACING]
+    trace_id = '0af7651916cd43dd8448eb211c80319c'
+    headers = {HEADER_TOKEN: token, HEADER_TRACEPARENT: '00-{}-b7ad6b7169203331-01'.format(trace_id)}
+    url = '{}/workflows/{}'.format(config.API_PATH(), benchmark_id)
+    with app.test_client() as traced:
+        r = traced.get(url, headers=headers, buffered=True)
+        assert r.status_code == 200
+        assert r.headers[HEADER_TRACEPARENT].startswith('00-{}-'.format(trace_id))
+        # Requests without a traceparent header start a new trace.
+        r = traced.get(url, buffered=True)
+        assert trace_id not in r.headers[HEADER_TRACEPARENT]
+    app.extensions['robflask.tracing'].flush()
+    with open(os.path.join(str(tmpdir), 'traces.jsonl')) as f:
+        spans = [json.loads(line) for line in f]
+    spans = [s for s in spans if s['traceId'] == trace_id]
+    names = sorted(s['name'] for s in spans)
+    route = 'GET {}/workflows/<string:workflow_id>'.format(config.API_PATH())
+    assert names == sorted(['auth', 'io', 'serialize', 'service', route])
+    root = [s for s in spans if s['name'] == route][0]
+    assert root['parentSpanId'] == 'b7ad6b7169203331'
+
+
+def test_trace_file_download(client, benchmark_id, tmpdir):
+    """Test recording request spans for a file download that is sent in
+    direct passthrough mode.
+    """
+    _, token = create_user(client, 'alice')
+    headers = {HEADER_TOKEN: token}
+    url = '{}/workflows/{}/groups'.format(config.API_PATH(), benchmark_id)
+    r = client.post(url, json={glbls.GROUP_NAME: 'G1'}, headers=headers)
+    group_id = r.json[glbls.GROUP_ID]
+    url = '{}/uploads/{}/files'.format(config.API_PATH(), group_id)
+    data = {'file': (io.BytesIO(b'Alice\nBob\n'), 'names.txt')}
+    r = client.post(url, data=data, content_type='multipart/form-data', headers=headers)
+    file_id = r.json[flbls.FILE_ID]
+    os.environ[config.ROB_WEBAPI_LOG] = str(tmpdir)
+    os.environ[config.ROB_WEBAPI_TRACING] = 'true'
+    try:
+        app = create_app({'TESTING': True})
+    finally:
+        del os.environ[config.ROB_WEBAPI_LOG]
+        del os.environ[config.ROB_WEBAPI_TRACING]
+    trace_id = '0af7651916cd43dd8448eb211c80319d'
+    headers = {HEADER_TRACEPARENT: '00-{}-b7ad6b7169203331-01'.format(trace_id)}
+    url = '{}/uploads/{}/files/{}'.format(config.API_PATH(), group_id, file_id)
+    with app.test_client() as traced:
+        r = traced.get(url, headers=headers, buffered=True)
+        assert r.status_code == 200
+        assert r.data == b'Alice\nBob\n'
+    app.extensions['robflask.tracing'].flush()
+    with open(os.path.join(str(tmpdir), 'traces.jsonl')) as f:
+        spans = [json.loads(line) for line in f]
+    spans = [s for s in spans if s['traceId'] == trace_id]
+    route = 'GET {}/uploads/<string:group_id>/files/<string:file_id>'.format(config.API_PATH())
+    assert sorted(s['name'] for s in spans) == sorted(['io', 'service', route])
+    root = [s for s in spans if s['name'] == route][0]
+    io_span = [s for s in spans if s['name'] == 'io'][0]
+    assert io_span['parentSpanId'] == root['spanId']
@@ -10,11 +10,17 @@
 
 import io
 import pytest
+import sys
+import tarfile
 import time
+import types
 
 from flowserv.service.run.argument import serialize_fh
+from robflask.api.events import STREAM_MAX_THREADS, stream_limit
 from robflask.api.util import HEADER_TOKEN
+from robflask.archive import archive_cache
 from robflask.tests.user import create_user
+from robflask.watcher import watcher
 
 import flowserv.model.workflow.state as st
 import flowserv.view.files as flbls
@@ -31,9 +37,13 @@ BENCHMARK_LEADERBOARD = '{}/workflows/{}/leaderboard'
 RUN_ARCHIVE = '{}/runs/{}/downloads/archive'
 RUN_FILE = '{}/runs/{}/downloads/files/{}'
 RUN_GET = '{}/runs/{}'
+RUN_STATUS = '{}/runs/status'
 RUN_CANCEL = RUN_GET
 RUN_DELETE = RUN_GET
+RUN_EVENTS = '{}/runs/{}/events'
 RUNS_LIST = '{}/groups/{}/runs'
+RUNS_EVENTS = '{}/groups/{}/runs/events'
+RUNS_POLL = '{}/groups/{}/runs/poll'
 SUBMISSION_CREATE = '{}/workflows/{}/groups'
 SUBMISSION_FILES = '{}/uploads/{}/files'
 SUBMISSION_FILE = '{}/uploads/{}/files/{}'
@@ -125,6 +135,180 @@ def test_delete_run(prepare_submission):
     assert len(doc[rlbls.RUN_LIST]) == 0
 
 
+def test_poll_runs(prepare_submission):
+    """Test polling the state of submission runs."""
+    # Create user, submission and upload the run file.
+    client, headers, benchmark_id, submission_id, file_id = prepare_submission
+    url = RUNS_POLL.format(config.API_PATH(), submission_id)
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200
+    assert r.json[rlbls.RUN_LIST] == []
+    # -- Start run ------------------------------------------------------------
+    run_url = SUBMISSION_RUN.format(config.API_PATH(), submission_id)
+    body = {
+        rlbls.RUN_ARGUMENTS: [
+            {'name': 'names', 'value': serialize_fh(file_id)},
+            {'name': 'greeting', 'value': 'Hi'},
+            {'name': 'sleeptime', 'value': 1}
+        ]
+    }
+    r = client.post(run_url, json=body, headers=headers)
+    run_id = r.json['id']
+    r = client.get(url, headers=headers)
+    assert r.json[rlbls.RUN_LIST] == [run_id]
+    # -- Long-poll until the run is finished ----------------------------------
+    poll_url = url + '?state={}&wait=10'.format(st.STATE_SUCCESS)
+    counter = 0
+    while True:
+        r = client.get(poll_url, headers=headers)
+        assert r.status_code == 200
+        if r.json[rlbls.RUN_LIST] == [run_id]:
+            break
+        counter += 1
+        assert counter < 5
+    # -- Error cases ----------------------------------------------------------
+    r = client.get(url + '?state=UNKNOWN', headers=headers)
+    assert r.status_code == 400
+    r = client.get(url + '?wait=abc', headers=headers)
+    assert r.status_code == 400
+    r = client.get(url)
+    assert r.status_code == 403
+
+
+def test_run_events(prepare_submission):
+    """Test streaming run state changes as server-sent events."""
+    # Create user, submission and upload the run file.
+    client, headers, benchmark_id, submission_id, file_id = prepare_submission
+    # Open event stream for the submission before starting the run.
+    url = RUNS_EVENTS.format(config.API_PATH(), submission_id)
+    stream = client.get(url, headers=headers, buffered=False)
+    assert stream.status_code == 200
+    assert stream.mimetype == 'text/event-stream'
+    # -- Start run ------------------------------------------------------------
+    url = SUBMISSION_RUN.format(config.API_PATH(), submission_id)
+    body = {
+        rlbls.RUN_ARGUMENTS: [
+            {'name': 'names', 'value': serialize_fh(file_id)},
+            {'name': 'greeting', 'value': 'Hi'},
+            {'name': 'sleeptime', 'value': 1}
+        ]
+    }
+    r = client.post(url, json=body, headers=headers)
+    run_id = r.json['id']
+    # The stream for the run is closed after the run finished.
+    url = RUN_EVENTS.format(config.API_PATH(), run_id)
+    r = client.get(url, headers=headers, buffered=False)
+    assert r.status_code == 200
+    data = b''.join(r.response).decode('utf-8')
+    assert data.count('event: state') >= 1
+    assert st.STATE_SUCCESS in data.split('event: state')[-1]
+    # The submission stream received the state changes for the run.
+    for chunk in stream.response:
+        if st.STATE_SUCCESS.encode('utf-8') in chunk:
+            break
+    stream.close()
+    # Error when requesting events without access token.
+    r = client.get(url)
+    assert r.status_code == 403
+
+
+def test_stream_limit_default(monkeypatch):
+    """Test the default stream limit for threaded and green-thread workers."""
+    import robflask.api.events as events
+    monkeypatch.delenv(config.ROB_WEBAPI_STREAM_MAX, raising=False)
+    monkeypatch.setattr(events, '_limit', None)
+    assert stream_limit().maxsize == STREAM_MAX_THREADS
+    monkey = types.ModuleType('gevent.monkey')
+    monkey.is_module_patched = lambda name: name == 'threading'
+    monkeypatch.setitem(sys.modules, 'gevent.monkey', monkey)
+    monkeypatch.setattr(events, '_limit', None)
+    assert stream_limit().maxsize == 0
+    monkeypatch.setenv(config.ROB_WEBAPI_STREAM_MAX, '4')
+    monkeypatch.setattr(events, '_limit', None)
+    assert stream_limit().maxsize == 4
+
+
+def test_stream_limit(prepare_submission):
+    """Test rejecting event streams and long-poll requests when the maximum
+    number of waiting requests is reached.
+    """
+    client, headers, benchmark_id, submission_id, file_id = prepare_submission
+    limit = stream_limit()
+    active = limit.active
+    stream = client.get(RUNS_EVENTS.format(config.API_PATH(), submission_id), headers=headers, buffered=False)
+    assert stream.status_code == 200
+    assert limit.active == active + 1
+    # The watcher retrieves the benchmark of the submission for updates of
+    # the leader board cache.
+    watcher().poll()
+    assert watcher()._groups[submission_id]['workflow'] == benchmark_id
+    stream.close()
+    assert limit.active == active
+    # Take all slots of the limit.
+    maxsize = limit.maxsize
+    limit.maxsize = active + 1
+    assert limit.acquire()
+    try:
+        r = client.get(RUNS_EVENTS.format(config.API_PATH(), submission_id), headers=headers)
+        assert r.status_code == 503
+        assert r.headers['Retry-After'] == '5'
+        url = RUNS_POLL.format(config.API_PATH(), submission_id)
+        r = client.get(url + '?wait=1', headers=headers)
+        assert r.status_code == 503
+        # Requests that do not wait are not limited.
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200
+    finally:
+        limit.release()
+        limit.maxsize = maxsize
+    r = client.get(url + '?wait=0.1', headers=headers)
+    assert r.status_code == 200
+    assert limit.active == active
+
+
+def test_run_status(prepare_submission):
+    """Test getting the state of multiple runs in a single request."""
+    # Create user, submission and upload the run file.
+    client, headers, benchmark_id, submission_id, file_id = prepare_submission
+    # -- Start runs -----------------------------------------------------------
+    url = SUBMISSION_RUN.format(config.API_PATH(), submission_id)
+    body = {
+        rlbls.RUN_ARGUMENTS: [
+            {'name': 'names', 'value': serialize_fh(file_id)},
+            {'name': 'greeting', 'value': 'Hi'},
+            {'name': 'sleeptime', 'value': 0}
+        ]
+    }
+    run_ids = [client.post(url, json=body, headers=headers).json['id'] for _ in range(3)]
+    # -- Get run states -------------------------------------------------------
+    url = RUN_STATUS.format(config.API_PATH())
+    r = client.post(url, json={'runs': run_ids + ['UNKNOWN']}, headers=headers)
+    assert r.status_code == 200
+    assert [run['id'] for run in r.json['runs']] == run_ids
+    assert r.json['missing'] == ['UNKNOWN']
+    assert 'arguments' in r.json['runs'][0]
+    body = {'runs': run_ids, 'projection': 'compact'}
+    r = client.post(url, json=body, headers=headers)
+    assert r.status_code == 200
+    assert [run['id'] for run in r.json['runs']] == run_ids
+    # All compact entries contain the same fields.
+    for run in r.json['runs']:
+        assert set(run) == {'id', 'state', 'createdAt', 'startedAt', 'finishedAt'}
+    # Runs of other users are reported as missing.
+    _, token = create_user(client, '0001')
+    r = client.post(url, json={'runs': run_ids}, headers={HEADER_TOKEN: token})
+    assert r.status_code == 200
+    assert r.json['runs'] == []
+    assert r.json['missing'] == run_ids
+    # -- Error cases ----------------------------------------------------------
+    r = client.post(url, json={'runs': run_ids, 'projection': 'none'}, headers=headers)
+    assert r.status_code == 400
+    r = client.post(url, json={'runs': 'ABC'}, headers=headers)
+    assert r.status_code == 400
+    r = client.post(url, json={'runs': run_ids})
+    assert r.status_code == 403
+
+
 def test_submission_run(prepare_submission):
     """Tests start and monitor a run and access run resources."""
     # Create user, submission and upload the run file.
@@ -152,6 +336,11 @@ def test_submission_run(prepare_submission):
         assert r.status_code == 200
         obj = r.json
     assert obj['state'] == st.STATE_SUCCESS
+    # The handle of a finished run can be validated using the entity tag or
+    # the modification time.
+    assert 'Last-Modified' in r.headers
+    r = client.get(url, headers={**headers, 'If-None-Match': r.headers['ETag']})
+    assert r.status_code == 304
     # -- Run resources --------------------------------------------------------
     resources = {r['name']: r for r in obj['files']}
     assert len(resources) == 2
@@ -164,10 +353,36 @@ def test_submission_run(prepare_submission):
     data = str(r.data)
     assert 'Hi Alice' in data
     assert 'Hi Bob' in data
+    # Download a partial file using a range request.
+    r = client.get(res_url, headers={**headers, 'Range': 'bytes=0-1'})
+    assert r.status_code == 206
+    assert r.data == b'Hi'
     # Run archive
     url = RUN_ARCHIVE.format(config.API_PATH(), run_id)
     r = client.get(url, headers=headers)
     assert r.status_code == 200
+    assert r.mimetype == 'application/gzip'
+    with tarfile.open(fileobj=io.BytesIO(r.data), mode='r:gz') as tar:
+        assert set(tar.getnames()) == set(resources.keys())
+    # Repeated downloads are served from the archive cache.
+    hits = archive_cache().stats()['hits']
+    data = r.data
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200
+    assert r.data == data
+    assert archive_cache().stats()['hits'] == hits + 1
+    r = client.get(url + '?compression=none', headers=headers)
+    assert r.status_code == 200
+    assert r.mimetype == 'application/x-tar'
+    with tarfile.open(fileobj=io.BytesIO(r.data), mode='r:') as tar:
+        member = tar.extractfile('results/greetings.txt')
+        assert b'Hi Alice' in member.read()
+    r = client.get(url)
+    assert r.status_code == 200
+    r = client.get(url + '?level=10', headers=headers)
+    assert r.status_code == 400
+    r = client.get(url + '?compression=zip', headers=headers)
+    assert r.status_code == 400
     # -- Workflow resources ---------------------------------------------------
     url = BENCHMARK_GET.format(config.API_PATH(), benchmark_id)
     b = client.get(url).json
@@ -200,6 +415,19 @@ def test_submission_run(prepare_submission):
     url = BENCHMARK_LEADERBOARD.format(config.API_PATH(), benchmark_id)
     r = client.get(url)
     assert r.status_code == 200
+    assert r.headers['X-Cache'] == 'MISS'
+    # The second request is served from the leader board cache.
+    r = client.get(url)
+    assert r.status_code == 200
+    assert r.headers['X-Cache'] == 'HIT'
+    # Page of the ranking with the rank of the submission.
+    r = client.get(url + '?limit=1&groupId={}'.format(submission_id))
+    assert r.status_code == 200
+    assert len(r.json['ranking']) <= 1
+    assert r.json['total'] >= len(r.json['ranking'])
+    assert 'rank' in r.json
+    r = client.get(url + '?limit=0')
+    assert r.status_code == 400
     url += '?includeAll'
     r = client.get(url)
     assert r.status_code == 200
@@ -9,6 +9,7 @@
 """Test app routes that interact with benchmark submissions and file uploads.
 """
 
+import hashlib
 import io
 import os
 
@@ -29,6 +30,143 @@ LARGE_FILE = os.path.join(DIR, '../.files/data/largefile.txt')
 CREATE_SUBMISSION = '{}/workflows/{}/groups'
 SUBMISSION_FILES = '{}/uploads/{}/files'
 SUBMISSION_FILE = '{}/uploads/{}/files/{}'
+UPLOAD_BLOB = '{}/uploads/{}/blobs/{}'
+UPLOAD_SESSIONS = '{}/uploads/{}/sessions'
+UPLOAD_SESSION = '{}/uploads/{}/sessions/{}'
+
+
+def test_blob_uploads(client, benchmark_id):
+    """Test uploading files by referencing the checksum of content that was
+    uploaded to the same submission before.
+    """
+    # -- Setup ----------------------------------------------------------------
+    # Create new user and two submissions.
+    user_1, token_1 = create_user(client, '0000')
+    user_2, token_2 = create_user(client, '0001')
+    headers = {HEADER_TOKEN: token_1}
+    url = CREATE_SUBMISSION.format(config.API_PATH(), benchmark_id)
+    r = client.post(url, json={labels.GROUP_NAME: 'S1'}, headers=headers)
+    s1 = r.json[labels.GROUP_ID]
+    r = client.post(url, json={labels.GROUP_NAME: 'S2'}, headers=headers)
+    s2 = r.json[labels.GROUP_ID]
+    with open(SMALL_FILE, 'rb') as f:
+        content = f.read()
+    checksum = hashlib.sha256(content).hexdigest()
+    # -- Check for unknown content --------------------------------------------
+    url = UPLOAD_BLOB.format(config.API_PATH(), s1, checksum)
+    assert client.head(url, headers=headers).status_code == 404
+    # -- Upload file and check for known content ------------------------------
+    data = {'file': (io.BytesIO(content), 'names.txt')}
+    r = client.post(
+        SUBMISSION_FILES.format(config.API_PATH(), s1),
+        data=data,
+        content_type='multipart/form-data',
+        headers=headers
+    )
+    assert r.status_code == 201
+    assert r.json['checksum'] == checksum
+    url = UPLOAD_BLOB.format(config.API_PATH(), s1, checksum)
+    assert client.head(url, headers=headers).status_code == 200
+    r = client.get(url, headers=headers)
+    assert r.json == {'checksum': checksum, 'size': len(content)}
+    # Users that are not members of the submission cannot check for content.
+    assert client.head(url, headers={HEADER_TOKEN: token_2}).status_code == 403
+    # Content that was uploaded to a different submission is unknown.
+    url = UPLOAD_BLOB.format(config.API_PATH(), s2, checksum)
+    assert client.head(url, headers=headers).status_code == 404
+    r = client.post(url, json={'name': 'names.txt'}, headers=headers)
+    assert r.status_code == 404
+    # -- Upload file by reference ---------------------------------------------
+    url = UPLOAD_BLOB.format(config.API_PATH(), s1, checksum)
+    r = client.post(url, json={'name': 'copy.txt'}, headers=headers)
+    assert r.status_code == 201
+    file_id = r.json[flbls.FILE_ID]
+    url = SUBMISSION_FILE.format(config.API_PATH(), s1, file_id)
+    r = client.get(url, headers=headers)
+    assert r.data == content
+    url = UPLOAD_BLOB.format(config.API_PATH(), s1, '0' * 64)
+    r = client.post(url, json={'name': 'names.txt'}, headers=headers)
+    assert r.status_code == 404
+
+
+def test_chunked_upload(client, benchmark_id):
+    """Test uploading a file that exceeds the maximum request size in
+    chunks.
+    """
+    # -- Setup ----------------------------------------------------------------
+    # Create two users and a submission for the first user.
+    user_1, token_1 = create_user(client, '0000')
+    user_2, token_2 = create_user(client, '0001')
+    headers = {HEADER_TOKEN: token_1}
+    url = CREATE_SUBMISSION.format(config.API_PATH(), benchmark_id)
+    r = client.post(url, json={labels.GROUP_NAME: 'S1'}, headers=headers)
+    submission_id = r.json[labels.GROUP_ID]
+    with open(LARGE_FILE, 'rb') as f:
+        data = f.read()
+    # -- Upload file in chunks ------------------------------------------------
+    url = UPLOAD_SESSIONS.format(config.API_PATH(), submission_id)
+    r = client.post(url, json={'name': 'large.txt', 'size': len(data)}, headers=headers)
+    assert r.status_code == 201
+    session_id = r.json['id']
+    url = UPLOAD_SESSION.format(config.API_PATH(), submission_id, session_id)
+    r = client.put(url + '?offset=0', data=data[:1024], headers=headers)
+    assert r.status_code == 200
+    assert r.json['offset'] == 1024
+    # Chunks that do not start at the current offset are rejected.
+    r = client.put(url + '?offset=512', data=data[512:1536], headers=headers)
+    assert r.status_code == 409
+    assert r.json['offset'] == 1024
+    # Chunks that exceed the maximum request size are rejected.
+    r = client.put(url + '?offset=1024', data=data[1024:2049], headers=headers)
+    assert r.status_code == 413
+    # Other users cannot access the upload session.
+    r = client.get(url, headers={HEADER_TOKEN: token_2})
+    assert r.status_code == 403
+    # The upload cannot be completed before all data was received.
+    r = client.post(url, headers=headers)
+    assert r.status_code == 400
+    offset = client.get(url, headers=headers).json['offset']
+    while offset < len(data):
+        r = client.put(url + '?offset={}'.format(offset), data=data[offset:offset + 1024], headers=headers)
+        assert r.status_code == 200
+        offset = r.json['offset']
+    checksum = hashlib.sha256(data).hexdigest()
+    r = client.post(url, json={'checksum': checksum}, headers=headers)
+    assert r.status_code == 201
+    assert r.json['checksum'] == checksum
+    file_id = r.json[flbls.FILE_ID]
+    # The session is removed after the upload was completed.
+    r = client.get(url, headers=headers)
+    assert r.status_code == 404
+    url = SUBMISSION_FILE.format(config.API_PATH(), submission_id, file_id)
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200
+    assert r.data == data
+    # -- Checksum mismatch and cancel upload ----------------------------------
+    url = UPLOAD_SESSIONS.format(config.API_PATH(), submission_id)
+    r = client.post(url, json={'name': 'names.txt'}, headers=headers)
+    url = UPLOAD_SESSION.format(config.API_PATH(), submission_id, r.json['id'])
+    client.put(url, data=b'Alice', headers=headers)
+    r = client.post(url, json={'checksum': checksum}, headers=headers)
+    assert r.status_code == 400
+    r = client.delete(url, headers=headers)
+    assert r.status_code == 204
+    r = client.get(url, headers=headers)
+    assert r.status_code == 404
+    # -- Maximum upload size --------------------------------------------------
+    os.environ[config.ROB_WEBAPI_UPLOAD_MAXSIZE] = '2048'
+    url = UPLOAD_SESSIONS.format(config.API_PATH(), submission_id)
+    r = client.post(url, json={'name': 'large.txt', 'size': len(data)}, headers=headers)
+    assert r.status_code == 400
+    # Sessions without a file size are limited by the maximum upload size.
+    r = client.post(url, json={'name': 'large.txt'}, headers=headers)
+    url = UPLOAD_SESSION.format(config.API_PATH(), submission_id, r.json['id'])
+    for offset in [0, 1024]:
+        r = client.put(url + '?offset={}'.format(offset), data=data[offset:offset + 1024], headers=headers)
+        assert r.status_code == 200
+    r = client.put(url + '?offset=2048', data=b'0', headers=headers)
+    assert r.status_code == 400
+    del os.environ[config.ROB_WEBAPI_UPLOAD_MAXSIZE]
 
 
 def test_submission_uploads(client, benchmark_id):
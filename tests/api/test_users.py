@@ -9,8 +9,12 @@
 """Unit tests that create, retrieve, and authenticate users."""
 
 import json
+import time
 
 from robflask.api.util import HEADER_TOKEN
+from robflask.auth import token_cache
+from robflask.service import validate_token
+from robflask.tests.user import create_user
 
 import flowserv.view.user as labels
 import robflask.config as config
@@ -64,6 +68,30 @@ def test_list_users(client):
     assert len(json.loads(r.data)[LABELS['USERS']]) == 2
 
 
+def test_list_users_paginated(client):
+    """Test paginated user listings."""
+    names = ['user{}'.format(i) for i in range(5)]
+    _, token = create_user(client, names[0])
+    for name in names[1:]:
+        create_user(client, name)
+    headers = {HEADER_TOKEN: token}
+    url = config.API_PATH() + '/users?limit=2'
+    users = list()
+    while url is not None:
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200
+        page = [u[LABELS['NAME']] for u in r.json[LABELS['USERS']]]
+        assert len(page) <= 2
+        users.extend(page)
+        link = r.headers.get('Link')
+        url = link[1:link.index('>')] if link is not None else None
+    assert users == names
+    # Invalid pagination arguments.
+    for query in ['limit=0', 'limit=ABC', 'cursor=ABC']:
+        r = client.get(config.API_PATH() + '/users?' + query, headers=headers)
+        assert r.status_code == 400
+
+
 def test_register_user(client):
     """Test creating and activating a user."""
     # Create an inactive user
@@ -142,3 +170,43 @@ def test_reset_password(client):
     data = {LABELS['NAME']: 'user1', LABELS['PASSWORD']: 'passwd'}
     r = client.post(config.API_PATH() + '/users/login', json=data)
     assert r.status_code == 200
+
+
+def test_token_cache(client, benchmark_id):
+    """Test caching validated access tokens and invalidating them on
+    logout.
+    """
+    user_id, token = create_user(client, 'user1')
+    headers = {HEADER_TOKEN: token}
+    url = '{}/workflows/{}/groups'.format(config.API_PATH(), benchmark_id)
+    # The token was added to the cache at login.
+    hits = token_cache().stats()['hits']
+    r = client.post(url, json={'name': 'S1'}, headers=headers)
+    assert r.status_code == 201
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200
+    assert token_cache().stats()['hits'] == hits + 2
+    # After logout the cached token is invalid.
+    r = client.post(config.API_PATH() + '/users/logout', headers=headers)
+    assert r.status_code == 200
+    r = client.post(url, json={'name': 'S2'}, headers=headers)
+    assert r.status_code == 403
+
+
+def test_token_expiry(client):
+    """Test that tokens that are validated by flowserv are cached no longer
+    than the tokens are valid.
+    """
+    user_id, token = create_user(client, 'user1')
+    from robflask.service import service
+    with service() as api:
+        uid, expires = validate_token(api, token)
+    assert uid == user_id
+    assert expires > time.time()
+    # Remove the token that was cached at login. The entry that is created
+    # when the token is validated again expires with the token.
+    cache = token_cache()
+    cache._entries.pop(token)
+    assert service.authenticate(token) == user_id
+    assert cache._entries[token][2] == min(expires, cache._entries[token][1] + cache.ttl)
+    assert service.authenticate('unknown') is None
@@ -10,6 +10,8 @@
 
 import pytest
 
+from datetime import datetime
+
 import robflask.api.util as util
 import robflask.error as err
 
@@ -26,3 +28,15 @@ def test_jsonbody_errors():
         util.jsonbody(list())
     with pytest.raises(err.InvalidRequestError):
         util.jsonbody(FakeRequest())
+
+
+def test_last_modified():
+    """Test getting the most recent timestamp from a list of timestamps."""
+    ts = util.last_modified([
+        '2021-01-29T10:00:00.000001',
+        None,
+        '2021-01-29T12:00:00.000001',
+        '2021-01-29T11:00:00.000001'
+    ])
+    assert ts == datetime(2021, 1, 29, 12, 0, 0, 1)
+    assert util.last_modified([None, None]) is None
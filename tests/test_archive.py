@@ -0,0 +1,106 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for the streaming tar archive generator."""
+
+import io
+import os
+import pytest
+import tarfile
+import threading
+
+from robflask.archive import ArchiveCache, archive_key, archive_prefix, stream_archive
+
+
+class BufferHandle(object):
+    """In-memory file handle with optional unknown file size."""
+    def __init__(self, data, known_size=True):
+        self.data = data
+        self.known_size = known_size
+
+    def open(self):
+        return io.BytesIO(self.data)
+
+    def size(self):
+        if not self.known_size:
+            raise NotImplementedError()
+        return len(self.data)
+
+
+class LocalHandle(object):
+    """File handle for a file on the local file system."""
+    def __init__(self, filename):
+        self.filename = filename
+
+
+@pytest.mark.parametrize('compresslevel,mode', [(None, 'r:'), (1, 'r:gz'), (9, 'r:gz')])
+def test_stream_archive(compresslevel, mode, tmpdir):
+    """Test generating archives with different compression levels."""
+    filename = os.path.join(tmpdir, 'local.txt')
+    with open(filename, 'wb') as f:
+        f.write(b'local file')
+    data = os.urandom(200 * 1024)
+    files = [
+        ('results/a.txt', BufferHandle(b'Alice')),
+        ('results/b.bin', BufferHandle(data, known_size=False)),
+        ('local.txt', LocalHandle(filename))
+    ]
+    chunks = list(stream_archive(files, compresslevel=compresslevel))
+    # The archive is sent in multiple chunks.
+    assert len(chunks) > 1
+    with tarfile.open(fileobj=io.BytesIO(b''.join(chunks)), mode=mode) as tar:
+        assert tar.getnames() == ['results/a.txt', 'results/b.bin', 'local.txt']
+        assert tar.extractfile('results/a.txt').read() == b'Alice'
+        assert tar.extractfile('results/b.bin').read() == data
+        assert tar.extractfile('local.txt').read() == b'local file'
+
+
+def test_stream_empty_archive():
+    """Test generating an archive without files."""
+    data = b''.join(stream_archive([], compresslevel=6))
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r:gz') as tar:
+        assert tar.getnames() == []
+
+
+def test_archive_cache(tmpdir):
+    """Test adding, retrieving and evicting cached archives."""
+    cache = ArchiveCache(basedir=os.path.join(tmpdir, 'archives'), maxsize=25)
+    key = archive_key('run', 'R1', 6)
+    assert key.startswith(archive_prefix('run', 'R1'))
+    assert cache.get(key) is None
+    # Archives are cached only after all chunks were sent.
+    chunks = cache.store(key, iter([b'0123456789', b'0123456789']))
+    next(chunks)
+    chunks.close()
+    assert cache.get(key) is None
+    assert list(cache.store(key, iter([b'0123456789', b'0123456789']))) == [b'0123456789'] * 2
+    filename = cache.get(key)
+    with open(filename, 'rb') as f:
+        assert f.read() == b'01234567890123456789'
+    # Adding a second archive exceeds the maximum cache size. The least
+    # recently used archive is removed.
+    os.utime(filename, (0, 0))
+    list(cache.store(archive_key('run', 'R2', None), iter([b'0123456789'])))
+    assert cache.get(key) is None
+    assert cache.get(archive_key('run', 'R2', None)) is not None
+    assert cache.stats() == {'hits': 2, 'misses': 3}
+    # Remove all archives for a run.
+    cache.remove(archive_prefix('run', 'R2'))
+    assert cache.get(archive_key('run', 'R2', None)) is None
+    # Invalid keys and disabled caches.
+    assert cache.filename('../R1') is None
+    cache = ArchiveCache(basedir=os.path.join(tmpdir, 'archives'), maxsize=0)
+    assert list(cache.store(key, iter([b'0123']))) == [b'0123']
+    assert cache.get(key) is None
+    # Cache counters are updated by concurrent requests.
+    threads = [threading.Thread(target=lambda: [cache.get(key) for _ in range(1000)]) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.stats() == {'hits': 0, 'misses': 4001}
@@ -0,0 +1,59 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for the access token cache."""
+
+import time
+
+from robflask.auth import TokenCache
+
+
+def test_token_cache_expiry():
+    """Test expiry of cached access tokens."""
+    cache = TokenCache(ttl=60)
+    cache.put('T1', 'U1')
+    cache.put('T2', 'U2', expires=time.time() - 1)
+    assert cache.get('T1') == 'U1'
+    assert cache.get('T2') is None
+    assert cache.get('T3') is None
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'invalidations': 0, 'size': 1}
+    # Tokens are not cached if the time-to-live is not positive.
+    cache = TokenCache(ttl=0)
+    cache.put('T1', 'U1')
+    assert cache.get('T1') is None
+    # The least recently used token is removed if the maximum size is
+    # exceeded.
+    cache = TokenCache(ttl=60, maxsize=2)
+    cache.put('T1', 'U1')
+    cache.put('T2', 'U2')
+    cache.get('T1')
+    cache.put('T3', 'U3')
+    assert cache.get('T1') == 'U1'
+    assert cache.get('T2') is None
+
+
+def test_token_cache_invalidate(tmpdir):
+    """Test invalidating the cached tokens of a user in multiple caches that
+    share the directory for user marker files.
+    """
+    c1 = TokenCache(ttl=60, basedir=str(tmpdir))
+    c2 = TokenCache(ttl=60, basedir=str(tmpdir))
+    validated = time.time() - 1
+    for cache in [c1, c2]:
+        cache.put('T1', 'U1', validated=validated)
+        cache.put('T2', 'U2', validated=validated)
+    c1.invalidate('U1')
+    assert c1.get('T1') is None
+    assert c2.get('T1') is None
+    assert c2.get('T2') == 'U2'
+    # Tokens that were validated after the invalidation are valid.
+    c2.put('T3', 'U1', validated=time.time() + 1)
+    assert c2.get('T3') == 'U1'
+    # Tokens that were validated before the invalidation remain invalid.
+    c2.put('T1', 'U1', validated=validated)
+    assert c2.get('T1') is None
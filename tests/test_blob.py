@@ -0,0 +1,72 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for the content-addressed store of uploaded files."""
+
+import hashlib
+import io
+import os
+import pytest
+
+from robflask.blob import BlobFile, BlobStore
+
+
+def test_blob_deduplication(tmpdir):
+    """Test storing identical content once and linking uploaded files to the
+    stored blob.
+    """
+    store = BlobStore(basedir=os.path.join(tmpdir, 'blobs'))
+    data = b'Alice\nBob'
+    checksum, blobfile = store.write(io.BytesIO(data))
+    assert checksum == hashlib.sha256(data).hexdigest()
+    assert store.get(checksum) == blobfile
+    assert store.get(checksum.upper()) == blobfile
+    # Writing the same content again returns the existing blob.
+    assert store.write(io.BytesIO(data)) == (checksum, blobfile)
+    assert store.stats() == {'hits': 1, 'misses': 1, 'savedBytes': len(data)}
+    # Add a staged file with the same content.
+    staged = os.path.join(tmpdir, 'staged.txt')
+    with open(staged, 'wb') as f:
+        f.write(data)
+    assert store.add(staged, checksum) == blobfile
+    assert not os.path.exists(staged)
+    # Store the blob as an uploaded file.
+    target = os.path.join(tmpdir, 'files', 'names.txt')
+    BlobFile(blobfile).store(target)
+    with open(target, 'rb') as f:
+        assert f.read() == data
+    assert os.stat(blobfile).st_nlink == 2
+    # Invalid and unknown checksums.
+    assert store.get('0' * 64) is None
+    assert store.get('../names.txt') is None
+    with pytest.raises(ValueError):
+        store.filename('../names.txt')
+
+
+def test_prune_blobs(tmpdir):
+    """Test removing blobs that are not referenced by uploaded files."""
+    store = BlobStore(basedir=os.path.join(tmpdir, 'blobs'))
+    c1, b1 = store.write(io.BytesIO(b'A'))
+    c2, b2 = store.write(io.BytesIO(b'B'))
+    BlobFile(b1).store(os.path.join(tmpdir, 'A.txt'))
+    # Unreferenced blobs are kept during the grace period.
+    store.prune()
+    assert store.get(c2) == b2
+    store.grace = 0
+    store.prune()
+    assert store.get(c1) == b1
+    assert store.get(c2) is None
+    os.remove(os.path.join(tmpdir, 'A.txt'))
+    store.prune()
+    assert store.get(c1) is None
+    # Blobs that are returned by the store are kept for the grace period.
+    store.grace = 60
+    c3, b3 = store.write(io.BytesIO(b'C'))
+    os.utime(b3, (0, 0))
+    assert store.get(c3) == b3
+    assert os.stat(b3).st_mtime > 0
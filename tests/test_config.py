@@ -21,6 +21,115 @@ def test_apipath():
     assert config.API_PATH() is not None
 
 
+def test_archive_cache_config():
+    """Test accessing the configuration parameters for the archive cache."""
+    os.environ[config.ROB_WEBAPI_ARCHIVE_CACHE] = '.archives'
+    os.environ[config.ROB_WEBAPI_ARCHIVE_CACHESIZE] = '1024'
+    assert config.ARCHIVE_CACHE_DIR() == os.path.abspath('.archives')
+    assert config.ARCHIVE_CACHE_SIZE() == 1024
+    del os.environ[config.ROB_WEBAPI_ARCHIVE_CACHE]
+    del os.environ[config.ROB_WEBAPI_ARCHIVE_CACHESIZE]
+    assert os.path.basename(config.ARCHIVE_CACHE_DIR()) == 'archives'
+    assert config.ARCHIVE_CACHE_SIZE() == 1024 * 1024 * 1024
+
+
+def test_archive_compresslevel():
+    """Test accessing the default compression level for result archives."""
+    os.environ[config.ROB_WEBAPI_ARCHIVE_COMPRESSLEVEL] = '1'
+    assert config.ARCHIVE_COMPRESSLEVEL() == 1
+    os.environ[config.ROB_WEBAPI_ARCHIVE_COMPRESSLEVEL] = '10'
+    with pytest.raises(ValueError):
+        config.ARCHIVE_COMPRESSLEVEL()
+    del os.environ[config.ROB_WEBAPI_ARCHIVE_COMPRESSLEVEL]
+    assert config.ARCHIVE_COMPRESSLEVEL() == 6
+
+
+def test_asgi_threads():
+    """Test accessing the thread pool size for the ASGI application."""
+    os.environ[config.ROB_WEBAPI_ASGI_THREADS] = '8'
+    assert config.ASGI_THREADS() == 8
+    os.environ[config.ROB_WEBAPI_ASGI_THREADS] = '0'
+    with pytest.raises(ValueError):
+        config.ASGI_THREADS()
+    del os.environ[config.ROB_WEBAPI_ASGI_THREADS]
+    assert config.ASGI_THREADS() == 32
+
+
+def test_auth_ttl():
+    """Test accessing the time-to-live for cached access tokens."""
+    os.environ[config.ROB_WEBAPI_AUTH_TTL] = '10'
+    assert config.AUTH_TTL() == 10
+    del os.environ[config.ROB_WEBAPI_AUTH_TTL]
+    assert config.AUTH_TTL() == 60
+
+
+def test_blob_dir(tmpdir):
+    """Test accessing the directory for the blob store."""
+    os.environ[config.ROB_WEBAPI_BLOB_DIR] = str(tmpdir)
+    assert config.BLOB_DIR() == os.path.abspath(str(tmpdir))
+    del os.environ[config.ROB_WEBAPI_BLOB_DIR]
+
+
+def test_compress_config():
+    """Test accessing the compression configuration for JSON responses."""
+    os.environ[config.ROB_WEBAPI_COMPRESSLEVEL] = '0'
+    assert config.COMPRESS_LEVEL() == 0
+    os.environ[config.ROB_WEBAPI_COMPRESSLEVEL] = '10'
+    with pytest.raises(ValueError):
+        config.COMPRESS_LEVEL()
+    del os.environ[config.ROB_WEBAPI_COMPRESSLEVEL]
+    assert config.COMPRESS_LEVEL() == 6
+    os.environ[config.ROB_WEBAPI_COMPRESSMINSIZE] = '100'
+    assert config.COMPRESS_MIN_SIZE() == 100
+    del os.environ[config.ROB_WEBAPI_COMPRESSMINSIZE]
+    assert config.COMPRESS_MIN_SIZE() == 1024
+
+
+def test_db_pool_config():
+    """Test accessing the database connection pool configuration."""
+    os.environ[config.ROB_WEBAPI_DB_POOLSIZE] = '20'
+    os.environ[config.ROB_WEBAPI_DB_MAXOVERFLOW] = '-1'
+    os.environ[config.ROB_WEBAPI_DB_PREPING] = 'True'
+    os.environ[config.ROB_WEBAPI_DB_RECYCLE] = '1800'
+    assert config.DB_POOL_SIZE() == 20
+    assert config.DB_MAX_OVERFLOW() == -1
+    assert config.DB_POOL_PREPING()
+    assert config.DB_POOL_RECYCLE() == 1800
+    os.environ[config.ROB_WEBAPI_DB_POOLSIZE] = '-1'
+    with pytest.raises(ValueError):
+        config.DB_POOL_SIZE()
+    for var in [
+        config.ROB_WEBAPI_DB_POOLSIZE,
+        config.ROB_WEBAPI_DB_MAXOVERFLOW,
+        config.ROB_WEBAPI_DB_PREPING,
+        config.ROB_WEBAPI_DB_RECYCLE
+    ]:
+        del os.environ[var]
+    assert config.DB_POOL_SIZE() == 5
+    assert config.DB_MAX_OVERFLOW() == 10
+    assert not config.DB_POOL_PREPING()
+    assert config.DB_POOL_RECYCLE() == -1
+
+
+def test_json_provider():
+    """Test accessing the JSON provider identifier."""
+    os.environ[config.ROB_WEBAPI_JSON] = 'JSON'
+    assert config.JSON_PROVIDER() == 'json'
+    del os.environ[config.ROB_WEBAPI_JSON]
+    assert config.JSON_PROVIDER() == 'orjson'
+
+
+def test_leaderboard_ttl():
+    """Test accessing the time-to-live for cached leader boards."""
+    os.environ[config.ROB_WEBAPI_LEADERBOARD_TTL] = '10'
+    assert config.LEADERBOARD_TTL() == 10
+    os.environ[config.ROB_WEBAPI_LEADERBOARD_TTL] = 'ABC'
+    with pytest.raises(ValueError):
+        config.LEADERBOARD_TTL()
+    del os.environ[config.ROB_WEBAPI_LEADERBOARD_TTL]
+    assert config.LEADERBOARD_TTL() == 60
+
+
 def test_logdir():
     """Test getting the environment variable value for the logging directory
     that is used by the Flask service.
@@ -35,6 +144,31 @@ def test_logdir():
     assert os.path.basename(config.LOG_DIR()) == 'log'
 
 
+def test_log_config():
+    """Test accessing the logging configuration parameters."""
+    assert config.LOG_LEVEL() == 'INFO'
+    assert config.LOG_LEVELS() == dict()
+    assert config.LOG_SAMPLING() == dict()
+    os.environ[config.ROB_WEBAPI_LOG_LEVEL] = 'debug'
+    os.environ[config.ROB_WEBAPI_LOG_LEVELS] = 'robflask.access=warning, sqlalchemy=INFO'
+    os.environ[config.ROB_WEBAPI_LOG_SAMPLING] = 'request=0.1,download=1'
+    assert config.LOG_LEVEL() == 'DEBUG'
+    assert config.LOG_LEVELS() == {'robflask.access': 'WARNING', 'sqlalchemy': 'INFO'}
+    assert config.LOG_SAMPLING() == {'request': 0.1, 'download': 1}
+    os.environ[config.ROB_WEBAPI_LOG_LEVEL] = 'verbose'
+    with pytest.raises(ValueError):
+        config.LOG_LEVEL()
+    os.environ[config.ROB_WEBAPI_LOG_LEVELS] = 'sqlalchemy'
+    with pytest.raises(ValueError):
+        config.LOG_LEVELS()
+    os.environ[config.ROB_WEBAPI_LOG_SAMPLING] = 'request=2'
+    with pytest.raises(ValueError):
+        config.LOG_SAMPLING()
+    del os.environ[config.ROB_WEBAPI_LOG_LEVEL]
+    del os.environ[config.ROB_WEBAPI_LOG_LEVELS]
+    del os.environ[config.ROB_WEBAPI_LOG_SAMPLING]
+
+
 def test_max_upload_size():
     """Test accessing the maximum file size for file uploads."""
     # Set the environment variable and ensure that the respective value is
@@ -50,3 +184,100 @@ def test_max_upload_size():
     # returned.
     del os.environ[config.ROB_WEBAPI_CONTENTLENGTH]
     assert config.MAX_CONTENT_LENGTH() == 16 * 1024 * 1024
+
+
+def test_metrics():
+    """Test accessing the flag that enables request metrics."""
+    os.environ[config.ROB_WEBAPI_METRICS] = 'false'
+    assert not config.METRICS()
+    del os.environ[config.ROB_WEBAPI_METRICS]
+    assert config.METRICS()
+
+
+def test_poll_config():
+    """Test accessing the configuration parameters for long-polling."""
+    os.environ[config.ROB_WEBAPI_POLL_INTERVAL] = '0.5'
+    os.environ[config.ROB_WEBAPI_POLL_MAXWAIT] = '10'
+    assert config.POLL_INTERVAL() == 0.5
+    assert config.POLL_MAX_WAIT() == 10
+    del os.environ[config.ROB_WEBAPI_POLL_INTERVAL]
+    del os.environ[config.ROB_WEBAPI_POLL_MAXWAIT]
+    assert config.POLL_INTERVAL() == 1
+    assert config.POLL_MAX_WAIT() == 60
+
+
+def test_profile_config():
+    """Test accessing the configuration parameters for request profiling."""
+    assert not config.PROFILE()
+    assert config.PROFILE_ENDPOINTS() is None
+    assert config.PROFILE_KEY() is None
+    assert config.PROFILE_MODE() == 'sample'
+    assert config.PROFILE_RATE() == 0
+    os.environ[config.ROB_WEBAPI_PROFILE] = 'true'
+    os.environ[config.ROB_WEBAPI_PROFILE_ENDPOINTS] = 'runs.get_run, runs.list_runs'
+    os.environ[config.ROB_WEBAPI_PROFILE_KEY] = 'secret'
+    os.environ[config.ROB_WEBAPI_PROFILE_MODE] = 'cProfile'
+    os.environ[config.ROB_WEBAPI_PROFILE_RATE] = '0.1'
+    assert config.PROFILE()
+    assert config.PROFILE_ENDPOINTS() == ['runs.get_run', 'runs.list_runs']
+    assert config.PROFILE_KEY() == 'secret'
+    assert config.PROFILE_MODE() == 'cprofile'
+    assert config.PROFILE_RATE() == 0.1
+    os.environ[config.ROB_WEBAPI_PROFILE_RATE] = '2'
+    with pytest.raises(ValueError):
+        config.PROFILE_RATE()
+    del os.environ[config.ROB_WEBAPI_PROFILE]
+    del os.environ[config.ROB_WEBAPI_PROFILE_ENDPOINTS]
+    del os.environ[config.ROB_WEBAPI_PROFILE_KEY]
+    del os.environ[config.ROB_WEBAPI_PROFILE_MODE]
+    del os.environ[config.ROB_WEBAPI_PROFILE_RATE]
+
+
+def test_stream_config():
+    """Test accessing the maximum number of waiting streams."""
+    os.environ[config.ROB_WEBAPI_STREAM_MAX] = '0'
+    assert config.STREAM_MAX() == 0
+    os.environ[config.ROB_WEBAPI_STREAM_MAX] = '-1'
+    with pytest.raises(ValueError):
+        config.STREAM_MAX()
+    del os.environ[config.ROB_WEBAPI_STREAM_MAX]
+    assert config.STREAM_MAX() is None
+
+
+def test_tracing_config():
+    """Test accessing the configuration parameters for request tracing."""
+    assert not config.TRACING()
+    assert config.TRACING_ENDPOINT() == 'http://localhost:4318'
+    assert config.TRACING_EXPORTERS() == ['file']
+    os.environ[config.ROB_WEBAPI_TRACING] = 'true'
+    os.environ[config.ROB_WEBAPI_TRACING_ENDPOINT] = 'http://collector:4318'
+    os.environ[config.ROB_WEBAPI_TRACING_EXPORTERS] = 'file, OTLP'
+    assert config.TRACING()
+    assert config.TRACING_ENDPOINT() == 'http://collector:4318'
+    assert config.TRACING_EXPORTERS() == ['file', 'otlp']
+    os.environ[config.ROB_WEBAPI_TRACING_EXPORTERS] = 'zipkin'
+    with pytest.raises(ValueError):
+        config.TRACING_EXPORTERS()
+    del os.environ[config.ROB_WEBAPI_TRACING]
+    del os.environ[config.ROB_WEBAPI_TRACING_ENDPOINT]
+    del os.environ[config.ROB_WEBAPI_TRACING_EXPORTERS]
+
+
+def test_upload_dir(tmpdir):
+    """Test accessing the directory for chunked upload sessions."""
+    os.environ[config.ROB_WEBAPI_UPLOAD_DIR] = str(tmpdir)
+    assert config.UPLOAD_DIR() == os.path.abspath(str(tmpdir))
+    del os.environ[config.ROB_WEBAPI_UPLOAD_DIR]
+
+
+def test_upload_max_size():
+    """Test accessing the maximum size of files that are uploaded in
+    chunks.
+    """
+    os.environ[config.ROB_WEBAPI_UPLOAD_MAXSIZE] = '1024'
+    assert config.UPLOAD_MAX_SIZE() == 1024
+    os.environ[config.ROB_WEBAPI_UPLOAD_MAXSIZE] = '0'
+    with pytest.raises(ValueError):
+        config.UPLOAD_MAX_SIZE()
+    del os.environ[config.ROB_WEBAPI_UPLOAD_MAXSIZE]
+    assert config.UPLOAD_MAX_SIZE() == 10 * 1024 * 1024 * 1024
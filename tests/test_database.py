@@ -0,0 +1,73 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for the database connection pool configuration and monitor."""
+
+import os
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool, QueuePool
+
+from robflask.database import PoolMonitor, init_db, pool_options
+
+import flowserv.config as flconfig
+
+
+def test_init_db(tmpdir):
+    """Test creating the database object for the flowserv API factory."""
+    monitor = PoolMonitor()
+    basedir = os.path.join(tmpdir, 'api')
+    env = {flconfig.FLOWSERV_BASEDIR: basedir}
+    db = init_db(env, options=pool_options(2, 0, False, -1), monitor=monitor)
+    # The default database is created and initialized.
+    assert env[flconfig.FLOWSERV_DB] == 'sqlite:///{}/flowserv.db'.format(basedir)
+    assert os.path.isfile(os.path.join(basedir, 'flowserv.db'))
+    # Options are not applied for SQLite.
+    assert monitor.stats()['capacity'] is None
+    checkouts = monitor.stats()['checkouts']
+    with db.session() as session:
+        session.execute(text('SELECT 1'))
+    assert monitor.stats()['checkouts'] == checkouts + 1
+    # Existing databases are not initialized again.
+    connect_url = 'sqlite:///{}'.format(os.path.join(tmpdir, 'db', 'db.sqlite'))
+    db = init_db({flconfig.FLOWSERV_BASEDIR: basedir, flconfig.FLOWSERV_DB: connect_url}, {}, monitor)
+    assert os.path.isdir(os.path.join(tmpdir, 'db'))
+    assert monitor.stats()['checkouts'] == 0
+
+
+def test_pool_monitor(tmpdir):
+    """Test pool statistics for a connection pool with a fixed capacity."""
+    connect_url = 'sqlite:///{}'.format(os.path.join(tmpdir, 'db.sqlite'))
+    engine = create_engine(connect_url, poolclass=QueuePool, pool_size=2, max_overflow=0)
+    monitor = PoolMonitor()
+    monitor.attach(engine, capacity=2)
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        stats = monitor.stats()
+        assert stats['checkedout'] == 1
+        assert stats['saturation'] == 0.5
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+    stats = monitor.stats()
+    assert stats['checkedout'] == 0
+    assert stats['checkouts'] == 2
+    assert stats['peak'] == 1
+    # The pooled connection is reused.
+    assert stats['connects'] == 1
+
+
+def test_pool_options():
+    """Test engine arguments for different pool configurations."""
+    assert pool_options(0, 10, True, -1) == {'poolclass': NullPool, 'pool_pre_ping': True}
+    options = pool_options(5, 10, False, 3600)
+    assert options == {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_pre_ping': False,
+        'pool_recycle': 3600
+    }
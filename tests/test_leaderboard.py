@@ -0,0 +1,304 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for the leader board cache and leader board pages."""
+
+from io import BytesIO
+
+import json
+import time
+
+from flowserv.model.template.schema import ResultColumn, ResultSchema, SortColumn
+from robflask.leaderboard import LeaderboardCache, SortedRanking, group_rank, leaderboard_page
+
+import flowserv.model.workflow.state as st
+
+
+"""Result schema for the leader boards in the tests."""
+SCHEMA = ResultSchema(
+    result_file='results/analytics.json',
+    columns=[ResultColumn('score', 'Score', 'int'), ResultColumn('time', 'Time', 'float', required=False)]
+)
+
+
+def descriptor(run_id, state):
+    """Get run descriptor in the format of flowserv run listings."""
+    return {'id': run_id, 'state': state, 'createdAt': '2021-01-01T00:00:00'}
+
+
+def entry(run_id, group_id, value):
+    """Get serialized ranking entry for a run with a given result value."""
+    return {
+        'run': {'id': run_id},
+        'group': {'id': group_id, 'name': group_id},
+        'results': [{'name': 'score', 'value': value}]
+    }
+
+
+def leaderboard(*entries):
+    """Get serialized leader board for a list of ranking entries."""
+    return {'schema': [{'name': 'score', 'label': 'Score', 'dtype': 'int'}], 'ranking': list(entries)}
+
+
+def ranking(doc):
+    """Get list of run identifiers in the ranking of a leader board."""
+    return [e['run']['id'] for e in doc['ranking']]
+
+
+def run(run_id, state, workflow_id='W1'):
+    """Get serialized run handle for a given run and state."""
+    return {'id': run_id, 'state': state, 'workflowId': workflow_id}
+
+
+class RunsAPI(object):
+    """Service API that returns the run handle for a run."""
+    def __init__(self, runs):
+        self.handles = runs
+
+    def runs(self):
+        return self
+
+    def get_run(self, run_id):
+        return self.handles[run_id]
+
+
+class ResultsAPI(object):
+    """Service API that returns a result file for every run."""
+    def __init__(self, results):
+        self.results = results
+
+    def runs(self):
+        return self
+
+    def get_result_file(self, run_id, file_id):
+        fh = BytesIO(json.dumps(self.results[run_id]).encode('utf-8'))
+        return type('FileHandle', (object,), {'open': lambda self: fh})()
+
+
+def test_cache_hits_and_misses():
+    """Test adding and retrieving leader boards from the cache."""
+    cache = LeaderboardCache(ttl=60)
+    order_by = [('max_len', False), ('avg_count', None)]
+    assert cache.get('W1', order_by, None) is None
+    cache.put('W1', order_by, None, {'ranking': []})
+    assert cache.get('W1', order_by, None) == {'ranking': []}
+    # The include all flag and the sort columns are part of the cache key.
+    assert cache.get('W1', order_by, True) is None
+    assert cache.get('W1', None, None) is None
+    assert cache.get('W2', order_by, None) is None
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 4
+    assert stats['size'] == 1
+
+
+def test_cache_expiry_and_size():
+    """Test expiry of cache entries and the maximum cache size."""
+    cache = LeaderboardCache(ttl=0)
+    cache.put('W1', None, None, {})
+    assert cache.get('W1', None, None) is None
+    cache = LeaderboardCache(ttl=1)
+    cache.put('W1', None, None, {})
+    time.sleep(1.1)
+    assert cache.get('W1', None, None) is None
+    cache = LeaderboardCache(ttl=60, maxsize=2)
+    cache.put('W1', None, None, {})
+    cache.put('W2', None, None, {})
+    cache.get('W1', None, None)
+    cache.put('W3', None, None, {})
+    assert cache.get('W1', None, None) is not None
+    assert cache.get('W2', None, None) is None
+
+
+def test_cache_invalidation():
+    """Test invalidating cached leader boards when runs finish."""
+    cache = LeaderboardCache(ttl=60)
+    cache.put('W1', None, None, {})
+    cache.put('W1', None, True, {})
+    cache.put('W2', None, None, {})
+    # Active runs do not invalidate the cache.
+    cache.run_state(run('R1', st.STATE_RUNNING))
+    assert cache.get('W1', None, None) is not None
+    # A finished run invalidates all entries for the run workflow only.
+    cache.run_state(run('R1', st.STATE_SUCCESS))
+    assert cache.get('W1', None, None) is None
+    assert cache.get('W1', None, True) is None
+    assert cache.get('W2', None, None) is not None
+    # Observing the same terminal state again does not invalidate the cache.
+    cache.put('W1', None, None, {})
+    cache.run_state(run('R1', st.STATE_SUCCESS))
+    assert cache.get('W1', None, None) is not None
+    # The workflow identifier can be given for runs that do not contain it.
+    cache.run_state(descriptor('R2', st.STATE_RUNNING))
+    cache.run_state(descriptor('R2', st.STATE_ERROR), workflow_id='W2')
+    assert cache.get('W1', None, None) is not None
+    assert cache.get('W2', None, None) is None
+    # Deleting a finished run invalidates the workflow entries.
+    cache.run_deleted(run('R1', st.STATE_SUCCESS))
+    assert cache.get('W1', None, None) is None
+
+
+def test_cache_run_descriptors():
+    """Test notifying the cache about the runs in a run listing. Run
+    descriptors contain the run identifier, state and creation time only.
+    """
+    cache = LeaderboardCache(ttl=60)
+    cache.put('W1', None, None, {})
+    cache.put('W2', None, None, {})
+    # The first observed state of a run does not invalidate the cache, even
+    # if the run is in a terminal state.
+    cache.run_state(descriptor('R1', st.STATE_SUCCESS))
+    cache.run_state(descriptor('R2', st.STATE_ERROR))
+    cache.run_state(descriptor('R3', st.STATE_RUNNING))
+    assert cache.get('W1', None, None) is not None
+    assert cache.get('W2', None, None) is not None
+    assert cache.stats()['invalidations'] == 0
+    # Transitions of runs without a known workflow do not change the cache.
+    cache.run_state(descriptor('R3', st.STATE_ERROR))
+    cache.run_deleted(descriptor('R3', st.STATE_ERROR))
+    assert cache.get('W1', None, None) is not None
+    assert cache.get('W2', None, None) is not None
+    # The workflow of the run is read from the run handle if a service API
+    # is given.
+    api = RunsAPI({'R4': run('R4', st.STATE_ERROR, workflow_id='W2')})
+    cache.run_state(descriptor('R4', st.STATE_PENDING), api=api)
+    cache.run_state(descriptor('R4', st.STATE_ERROR), api=api)
+    assert cache.get('W1', None, None) is not None
+    assert cache.get('W2', None, None) is None
+    # Runs that are removed from the list of tracked runs set a new baseline
+    # when they are observed again.
+    cache = LeaderboardCache(ttl=60, maxruns=1)
+    cache.put('W1', None, None, {})
+    cache.run_state(descriptor('R1', st.STATE_RUNNING))
+    cache.run_state(descriptor('R2', st.STATE_RUNNING))
+    cache.run_state(descriptor('R1', st.STATE_SUCCESS), workflow_id='W1')
+    assert cache.get('W1', None, None) is not None
+
+
+def test_leaderboard_page():
+    """Test getting pages of a serialized leader board."""
+    ranking = [{'group': {'id': 'G{}'.format(i)}, 'results': []} for i in range(10)]
+    leaderboard = {'schema': [], 'ranking': ranking}
+    page = leaderboard_page(leaderboard, limit=3)
+    assert [e['group']['id'] for e in page['ranking']] == ['G0', 'G1', 'G2']
+    assert page['total'] == 10
+    assert page['offset'] == 0
+    assert page['limit'] == 3
+    assert 'rank' not in page
+    page = leaderboard_page(leaderboard, limit=3, offset=8, group_id='G4')
+    assert [e['group']['id'] for e in page['ranking']] == ['G8', 'G9']
+    assert page['rank'] == 5
+    page = leaderboard_page(leaderboard, offset=12, group_id='G99')
+    assert page['ranking'] == []
+    assert page['rank'] is None
+    assert 'limit' not in page
+    # The cached leader board is not modified.
+    assert len(leaderboard['ranking']) == 10
+    assert 'total' not in leaderboard
+    # Rank of the first entry for a group.
+    assert group_rank(ranking + [{'group': {'id': 'G0'}}], 'G0') == 1
+    assert group_rank([], 'G0') is None
+
+
+def test_sorted_ranking_insert():
+    """Test inserting entries into a sorted ranking."""
+    doc = leaderboard(entry('R1', 'G1', 10), entry('R2', 'G2', 5))
+    r = SortedRanking(doc, order_by=None, include_all=True, schema=SCHEMA)
+    assert r.incremental
+    r.insert(entry('R3', 'G1', 7))
+    assert ranking(r.leaderboard) == ['R1', 'R3', 'R2']
+    # Inserting does not modify the original leader board.
+    assert ranking(doc) == ['R1', 'R2']
+    # Entries for known runs are ignored.
+    r.insert(entry('R3', 'G1', 7))
+    assert ranking(r.leaderboard) == ['R1', 'R3', 'R2']
+    # Multiple pending entries are merged when the leader board is read. The
+    # published leader board is not modified in place.
+    published = r.leaderboard
+    r.insert(entry('R4', 'G3', 1))
+    r.insert(entry('R5', 'G3', 10))
+    r.insert(entry('R6', 'G4', 12))
+    assert ranking(published) == ['R1', 'R3', 'R2']
+    assert ranking(r.leaderboard) == ['R6', 'R1', 'R5', 'R3', 'R2', 'R4']
+    # Ascending sort order.
+    doc = leaderboard(entry('R2', 'G2', 5), entry('R1', 'G1', 10))
+    r = SortedRanking(doc, order_by=[('score', False)], include_all=True, schema=SCHEMA)
+    r.insert(entry('R3', 'G3', 7))
+    r.insert(entry('R4', 'G4', None))
+    assert ranking(r.leaderboard) == ['R2', 'R3', 'R1', 'R4']
+    # Only the best run for each group.
+    doc = leaderboard(entry('R1', 'G1', 10), entry('R2', 'G2', 5))
+    r = SortedRanking(doc, order_by=None, include_all=False, schema=SCHEMA)
+    r.insert(entry('R3', 'G1', 7))
+    assert ranking(r.leaderboard) == ['R1', 'R2']
+    r.insert(entry('R4', 'G2', 12))
+    assert ranking(r.leaderboard) == ['R4', 'R1']
+    r.insert(entry('R5', 'G3', 6))
+    r.insert(entry('R6', 'G3', 8))
+    r.insert(entry('R7', 'G1', 11))
+    assert ranking(r.leaderboard) == ['R4', 'R7', 'R6']
+    assert r.group('G3') == {'id': 'G3', 'name': 'G3'}
+    assert r.group('G9') is None
+    # The default sort order is taken from the result schema.
+    schema = ResultSchema(
+        result_file=SCHEMA.result_file,
+        columns=SCHEMA.columns,
+        order_by=[SortColumn('score', sort_desc=False)]
+    )
+    doc = leaderboard(entry('R2', 'G2', 5), entry('R1', 'G1', 10))
+    r = SortedRanking(doc, order_by=None, include_all=True, schema=schema)
+    r.insert(entry('R3', 'G3', 7))
+    assert ranking(r.leaderboard) == ['R2', 'R3', 'R1']
+    # Rankings that are not sorted in the expected order or that do not have
+    # a result schema are not maintained incrementally.
+    doc = leaderboard(entry('R1', 'G1', 5), entry('R2', 'G2', 10))
+    assert not SortedRanking(doc, order_by=None, include_all=True, schema=SCHEMA).incremental
+    doc = leaderboard(entry('R1', 'G1', 10), entry('R2', 'G2', 5))
+    assert not SortedRanking(doc, order_by=None, include_all=True).incremental
+    assert not SortedRanking(doc, order_by=[('score', None)], include_all=True).incremental
+
+
+def test_cache_incremental_update():
+    """Test updating cached leader boards when runs finish successfully."""
+    cache = LeaderboardCache(ttl=60)
+    doc = leaderboard(entry('R1', 'G1', 10), entry('R2', 'G2', 5))
+    cache.put('W1', None, None, doc, schema=SCHEMA)
+    doc = leaderboard(entry('R2', 'G2', 5), entry('R1', 'G1', 10))
+    cache.put('W1', [('score', False)], True, doc, schema=SCHEMA)
+    api = ResultsAPI({'R3': {'score': '7'}})
+    cache.run_state(descriptor('R3', st.STATE_RUNNING))
+    handle = run('R3', st.STATE_SUCCESS)
+    handle['groupId'] = 'G2'
+    handle['files'] = [
+        {'id': 'F0', 'name': 'results/other.json'},
+        {'id': 'F1', 'name': 'results/analytics.json'}
+    ]
+    cache.run_state(handle, api=api)
+    assert ranking(cache.get('W1', None, None)) == ['R1', 'R3']
+    doc = cache.get('W1', [('score', False)], True)
+    assert ranking(doc) == ['R2', 'R3', 'R1']
+    # Values are read from the result file of the schema and cast to the
+    # column type. Optional columns without value are omitted.
+    assert doc['ranking'][1]['results'] == [{'name': 'score', 'value': 7}]
+    assert doc['ranking'][1]['group'] == {'id': 'G2', 'name': 'G2'}
+    assert cache.stats()['updates'] == 1
+    # Successful runs without result file invalidate the leader boards.
+    cache.run_state(descriptor('R4', st.STATE_RUNNING))
+    handle = run('R4', st.STATE_SUCCESS)
+    handle['groupId'] = 'G2'
+    handle['files'] = [{'id': 'F0', 'name': 'results/other.json'}]
+    cache.run_state(handle, api=api)
+    assert cache.get('W1', None, None) is None
+    # Leader boards without result schema are invalidated.
+    cache.put('W1', None, None, leaderboard(entry('R1', 'G1', 10)))
+    cache.run_state(descriptor('R5', st.STATE_RUNNING))
+    handle = run('R5', st.STATE_SUCCESS)
+    handle['groupId'] = 'G1'
+    handle['files'] = [{'id': 'F1', 'name': 'results/analytics.json'}]
+    cache.run_state(handle, api=ResultsAPI({'R5': {'score': 12}}))
+    assert cache.get('W1', None, None) is None
@@ -0,0 +1,93 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for the structured logging pipeline."""
+
+import io
+import json
+import logging
+import os
+
+from robflask.logger import SamplingFilter, init_logging, request_id, request_user
+
+import robflask.logger as logger
+
+
+def test_log_pipeline(tmpdir):
+    """Test writing log records as JSON documents in a background thread."""
+    # Root handlers are replaced by the pipeline.
+    default = logging.StreamHandler(io.StringIO())
+    logging.getLogger().addHandler(default)
+    stream = io.StringIO()
+    pipeline = init_logging(
+        logdir=str(tmpdir),
+        level='INFO',
+        levels={'robflask.test.quiet': 'ERROR'},
+        stream=stream
+    )
+    logger._local.context = {'requestId': 'R1', 'method': 'GET', 'route': '/runs/<string:run_id>'}
+    request_user('U1')
+    logging.getLogger('robflask.test').info('run %s', 'R0', extra={'event': 'poll'})
+    logging.getLogger('robflask.test').debug('not logged')
+    logging.getLogger('robflask.test.quiet').warning('not logged')
+    logger._local.context = None
+    request_user('U2')
+    try:
+        raise ValueError('failed')
+    except ValueError:
+        logging.getLogger('robflask.test').exception('error')
+    pipeline.stop()
+    assert default.stream.getvalue() == ''
+    assert default in logging.getLogger().handlers
+    logging.getLogger().removeHandler(default)
+    docs = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(docs) == 2
+    doc = docs[0]
+    assert doc['message'] == 'run R0'
+    assert doc['level'] == 'INFO'
+    assert doc['logger'] == 'robflask.test'
+    assert doc['event'] == 'poll'
+    assert doc['requestId'] == 'R1'
+    assert doc['route'] == '/runs/<string:run_id>'
+    assert doc['user'] == 'U1'
+    doc = docs[1]
+    assert 'requestId' not in doc
+    assert 'ValueError: failed' in doc['exception']
+    # Errors are also written to the log file.
+    with open(os.path.join(str(tmpdir), 'webapi.log')) as f:
+        docs = [json.loads(line) for line in f.read().splitlines()]
+    assert [doc['message'] for doc in docs] == ['error']
+
+
+def test_sampling_filter():
+    """Test sampling log records by event type."""
+    sampler = SamplingFilter({'request': 0, 'download': 1})
+
+    def record(level, event=None):
+        rec = logging.LogRecord('test', level, __file__, 1, 'message', None, None)
+        if event is not None:
+            rec.event = event
+        return rec
+
+    assert not sampler.filter(record(logging.INFO, 'request'))
+    assert sampler.filter(record(logging.WARNING, 'request'))
+    assert sampler.filter(record(logging.INFO, 'download'))
+    assert sampler.filter(record(logging.INFO, 'poll'))
+    assert sampler.filter(record(logging.INFO))
+    assert sampler.dropped == 1
+
+
+def test_request_id():
+    """Test validating request identifiers from the request header."""
+    assert request_id('R1') == 'R1'
+    assert request_id('a.b_c-D9') == 'a.b_c-D9'
+    assert request_id('x' * 128) == 'x' * 128
+    for value in [None, '', 'x' * 129, 'R1\nR2', 'R 1', 'R1;drop', '\u00e9']:
+        generated = request_id(value)
+        assert generated != value
+        assert len(generated) == 32
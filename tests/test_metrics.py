@@ -0,0 +1,59 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for the request metrics registry."""
+
+from robflask.metrics import MetricsRegistry, RequestTimer, metric_name, phase, stats_collector
+
+import robflask.metrics as metrics
+
+
+def test_metrics_exposition():
+    """Test the text exposition of request metrics."""
+    registry = MetricsRegistry()
+    registry.collector(stats_collector(
+        'rob_cache',
+        lambda: {'hits': 2, 'savedBytes': 10, 'size': 3, 'capacity': None},
+        gauges=['capacity', 'size']
+    ))
+    timer = RequestTimer(registry, blueprint='runs', route='/runs/<string:run_id>', method='GET')
+    metrics._local.timer = timer
+    with phase('service'):
+        pass
+    metrics._local.timer = None
+    text = registry.exposition()
+    assert 'rob_http_requests_in_flight{blueprint="runs",route="/runs/<string:run_id>"} 1' in text
+    timer.sent = timer.start
+    timer.finish(status=200, size=300)
+    # Finishing a request twice has no effect.
+    timer.finish(status=200, size=300)
+    text = registry.exposition()
+    labels = 'blueprint="runs",route="/runs/<string:run_id>"'
+    assert 'rob_http_requests_total{' + labels + ',method="GET",status="200"} 1' in text
+    assert 'rob_http_requests_in_flight{' + labels + '} 0' in text
+    assert 'rob_http_response_size_bytes_bucket{' + labels + ',le="256"} 0' in text
+    assert 'rob_http_response_size_bytes_bucket{' + labels + ',le="1024"} 1' in text
+    assert 'rob_http_response_size_bytes_count{' + labels + '} 1' in text
+    assert 'rob_http_request_duration_seconds_count{' + labels + ',method="GET"} 1' in text
+    assert 'rob_http_request_phase_seconds_count{' + labels + ',phase="service"} 1' in text
+    assert 'rob_http_request_phase_seconds_count{' + labels + ',phase="io"} 1' in text
+    # Statistics from collectors. Values that are not numbers are ignored.
+    # Cumulative values are counters.
+    assert '# TYPE rob_cache_hits_total counter\nrob_cache_hits_total 2' in text
+    assert '# TYPE rob_cache_saved_bytes_total counter\nrob_cache_saved_bytes_total 10' in text
+    assert '# TYPE rob_cache_size gauge\nrob_cache_size 3' in text
+    assert 'rob_cache_capacity' not in text
+    # Phases outside of a timed request are ignored.
+    with phase('service'):
+        pass
+
+
+def test_metric_name():
+    """Test converting statistics keys to metric names."""
+    assert metric_name('rob_db_pool', 'holdTime') == 'rob_db_pool_hold_time'
+    assert metric_name('rob_cache', 'hits') == 'rob_cache_hits'
@@ -0,0 +1,95 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for the request profiler."""
+
+import cProfile
+import os
+import pstats
+import pytest
+import time
+
+from robflask.profiling import HEADER_PROFILE, RequestProfiler
+
+
+def busy(seconds):
+    """Keep the current thread busy for the given time."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        pass
+
+
+def test_profile_folded_stacks(tmpdir):
+    """Test writing a sampled profile as folded stacks."""
+    profiler = RequestProfiler(outdir=str(tmpdir), interval=0.001)
+    profile = profiler.start()
+    busy(0.1)
+    filename = profiler.stop(profile, 'runs.get_run')
+    assert filename.endswith('.folded')
+    with open(os.path.join(str(tmpdir), filename)) as f:
+        lines = f.read().splitlines()
+    assert len(lines) > 0
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+    assert any('busy (test_profiling.py' in line for line in lines)
+
+
+def test_profile_pstats(tmpdir):
+    """Test writing a cProfile profile."""
+    profiler = RequestProfiler(outdir=str(tmpdir), mode='cprofile')
+    profile = profiler.start()
+    busy(0.01)
+    filename = profiler.stop(profile, None)
+    assert filename.endswith('.prof')
+    assert 'unmatched' in filename
+    stats = pstats.Stats(os.path.join(str(tmpdir), filename))
+    assert any(func[2] == 'busy' for func in stats.stats)
+    with pytest.raises(ValueError):
+        RequestProfiler(outdir=str(tmpdir), mode='unknown')
+
+
+def test_profile_pstats_concurrent(tmpdir, monkeypatch):
+    """Test skipping cProfile profiles while another request is profiled."""
+    profiler = RequestProfiler(outdir=str(tmpdir), mode='cprofile')
+    profile = profiler.start()
+    assert profiler.start() is None
+    profiler.stop(profile, None)
+    profile = profiler.start()
+    assert profile is not None
+    profiler.stop(profile, None)
+
+    # Profiles are skipped if another profiling tool is active.
+    class ActiveProfile(cProfile.Profile):
+        def enable(self):
+            raise ValueError('Another profiling tool is already active')
+
+    monkeypatch.setattr(cProfile, 'Profile', ActiveProfile)
+    assert profiler.start() is None
+    monkeypatch.undo()
+    profile = profiler.start()
+    assert profile is not None
+    profiler.stop(profile, None)
+
+
+def test_select_requests(tmpdir):
+    """Test selecting requests for profiling."""
+    # Only requests with the key are selected if the rate is zero.
+    profiler = RequestProfiler(outdir=str(tmpdir), key='secret')
+    assert profiler.select('runs.get_run', {HEADER_PROFILE: 'secret'})
+    assert not profiler.select('runs.get_run', {HEADER_PROFILE: 'unknown'})
+    assert not profiler.select('runs.get_run', {})
+    # No request is selected by the header if no key is given.
+    profiler = RequestProfiler(outdir=str(tmpdir))
+    assert not profiler.select('runs.get_run', {HEADER_PROFILE: 'secret'})
+    # Sampling is restricted to the given endpoints. The header selects
+    # requests for all endpoints.
+    profiler = RequestProfiler(outdir=str(tmpdir), rate=1, key='secret', endpoints=['runs.get_run'])
+    assert profiler.select('runs.get_run', {})
+    assert not profiler.select('runs.list_runs', {})
+    assert profiler.select('runs.list_runs', {HEADER_PROFILE: 'secret'})
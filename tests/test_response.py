@@ -0,0 +1,91 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for callbacks of finished responses."""
+
+from wsgiref.util import FileWrapper
+
+import asyncio
+import io
+
+from flask import Response
+from werkzeug.wsgi import FileWrapper as WerkzeugFileWrapper
+
+from robflask.response import AsyncClosingBody, ClosingBody, call_on_close
+
+
+class AsyncBody(object):
+    """Response body with asynchronous iteration."""
+    def __iter__(self):
+        yield b'sync'
+
+    def __aiter__(self):
+        async def generate():
+            yield b'async'
+
+        return generate()
+
+
+def test_close_buffered_response():
+    """Test callbacks for responses that are not in passthrough mode."""
+    calls = list()
+    response = Response(b'data')
+    call_on_close(response, lambda: calls.append(1))
+    response.close()
+    assert calls == [1]
+
+
+def test_close_passthrough_body():
+    """Test callbacks for passthrough responses with a generator body."""
+    calls = list()
+    response = Response(iter([b'a', b'b']), direct_passthrough=True)
+    call_on_close(response, lambda: calls.append(1))
+    call_on_close(response, lambda: calls.append(2))
+    body = response.get_app_iter({'REQUEST_METHOD': 'GET'})
+    assert isinstance(body, ClosingBody)
+    assert b''.join(body) == b'ab'
+    body.close()
+    body.close()
+    assert calls == [1, 2]
+    # Bodies with asynchronous iteration keep the asynchronous iterator.
+    calls = list()
+    response = Response(AsyncBody(), direct_passthrough=True)
+    call_on_close(response, lambda: calls.append(1))
+    body = response.get_app_iter({'REQUEST_METHOD': 'GET'})
+    assert isinstance(body, AsyncClosingBody)
+
+    async def read():
+        return [chunk async for chunk in body]
+
+    assert asyncio.run(read()) == [b'async']
+    body.close()
+    assert calls == [1]
+
+
+def test_close_file_wrapper():
+    """Test callbacks for passthrough responses with a file wrapper body. The
+    file wrapper is kept.
+    """
+    for wrapper in [FileWrapper, WerkzeugFileWrapper]:
+        calls = list()
+        f = io.BytesIO(b'data')
+        body = wrapper(f)
+        response = Response(body, direct_passthrough=True)
+        call_on_close(response, lambda: calls.append(1))
+        assert response.get_app_iter({'REQUEST_METHOD': 'GET'}) is body
+        assert b''.join(body) == b'data'
+        body.close()
+        assert f.closed
+        assert calls == [1]
+        # Responses to HEAD requests close the body.
+        calls = list()
+        body = wrapper(io.BytesIO(b'data'))
+        response = Response(body, direct_passthrough=True)
+        call_on_close(response, lambda: calls.append(1))
+        response.get_app_iter({'REQUEST_METHOD': 'HEAD'}).close()
+        assert calls == [1]
@@ -0,0 +1,52 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Test the import time of the Web API modules."""
+
+import os
+import subprocess
+import sys
+
+
+DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = os.path.join(DIR, '..')
+
+
+def import_times(stderr):
+    """Get mapping of module name to cumulative import time (in microseconds)
+    from the output of a Python interpreter that is run with -X importtime.
+    """
+    modules = dict()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        modules[module.strip()] = int(cumulative)
+    return modules
+
+
+def test_import_time_profile():
+    """Import the application factory and the service module in a fresh
+    interpreter. Importing the modules does not create the flowserv API
+    factory. Prints the modules with the largest cumulative import time.
+    """
+    code = 'import robflask.api, robflask.service as s; assert not s.service.initialized'
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    stderr = proc.stderr.decode('utf-8')
+    assert proc.returncode == 0, stderr
+    modules = import_times(stderr)
+    assert 'robflask.api' in modules
+    assert 'flowserv.client.api' not in modules
+    print('cumulative(ms)  module')
+    for module, cumulative in sorted(modules.items(), key=lambda m: -m[1])[:15]:
+        print('{:14.1f}  {}'.format(cumulative / 1000, module))
@@ -0,0 +1,115 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for request traces and span exporters."""
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import json
+import os
+import pytest
+import threading
+
+from robflask.metrics import phase
+from robflask.tracing import FileExporter, OTLPExporter, Tracer, parse_traceparent, span
+
+import robflask.tracing as tracing
+
+
+class Collector(BaseHTTPRequestHandler):
+    """Local collector stand-in that keeps the received request bodies."""
+    requests = list()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        Collector.requests.append((self.path, json.loads(body)))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def collector():
+    """Run the local collector stand-in in a background thread."""
+    Collector.requests = list()
+    server = HTTPServer(('127.0.0.1', 0), Collector)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+def test_export_trace(collector, tmpdir):
+    """Test exporting the spans of a trace to a file and a collector."""
+    filename = os.path.join(str(tmpdir), 'traces.jsonl')
+    tracer = Tracer([FileExporter(filename), OTLPExporter(collector)])
+    parent = '00-{}-{}-01'.format('a' * 32, 'b' * 16)
+    trace = tracer.start_trace('POST /runs', traceparent=parent, attributes={'http.method': 'POST'})
+    # Spans are only recorded for the trace of the current thread.
+    with span('unrecorded') as s:
+        assert s is None
+    tracing._local.trace = trace
+    with phase('service'):
+        with span('auth', attributes={'cached': True}):
+            pass
+        with pytest.raises(ValueError):
+            with span('flowserv.start_run'):
+                raise ValueError()
+    tracing._local.trace = None
+    tracer.finish(trace, status=tracing.STATUS_OK)
+    tracer.flush()
+    assert tracer.stats() == {'exported': 4, 'dropped': 0, 'errors': 0}
+    with open(filename) as f:
+        spans = {doc['name']: doc for doc in [json.loads(line) for line in f]}
+    root = spans['POST /runs']
+    assert root['traceId'] == 'a' * 32
+    assert root['parentSpanId'] == 'b' * 16
+    assert root['kind'] == tracing.SPAN_SERVER
+    assert root['status']['code'] == tracing.STATUS_OK
+    service = spans['service']
+    assert service['parentSpanId'] == root['spanId']
+    assert spans['auth']['parentSpanId'] == service['spanId']
+    assert spans['auth']['attributes'] == [{'key': 'cached', 'value': {'boolValue': True}}]
+    assert spans['flowserv.start_run']['parentSpanId'] == service['spanId']
+    assert spans['flowserv.start_run']['status']['code'] == tracing.STATUS_ERROR
+    for doc in spans.values():
+        assert int(doc['startTimeUnixNano']) <= int(doc['endTimeUnixNano'])
+    # The collector receives the same spans in the OTLP/HTTP JSON encoding.
+    assert len(Collector.requests) == 1
+    path, body = Collector.requests[0]
+    assert path == '/v1/traces'
+    resource = body['resourceSpans'][0]
+    assert resource['resource']['attributes'][0]['value'] == {'stringValue': 'rob-webapi'}
+    names = [s['name'] for s in resource['scopeSpans'][0]['spans']]
+    assert sorted(names) == sorted(spans.keys())
+
+
+def test_export_errors(tmpdir):
+    """Test that failed exports do not raise errors."""
+    tracer = Tracer([OTLPExporter('http://127.0.0.1:1', timeout=1)])
+    tracer.finish(tracer.start_trace('GET /'))
+    tracer.flush()
+    assert tracer.stats()['errors'] == 1
+
+
+def test_parse_traceparent():
+    """Test parsing traceparent header values."""
+    trace_id, span_id = '0af7651916cd43dd8448eb211c80319c', 'b7ad6b7169203331'
+    value = '00-{}-{}-01'.format(trace_id, span_id)
+    assert parse_traceparent(value) == (trace_id, span_id)
+    assert parse_traceparent(value.upper()) == (trace_id, span_id)
+    assert parse_traceparent('00-{}-{}-01'.format('0' * 32, span_id)) is None
+    assert parse_traceparent('00-{}-{}-01'.format(trace_id, '0' * 16)) is None
+    assert parse_traceparent('invalid') is None
+    # A new trace is started for invalid values.
+    trace = Tracer([]).start_trace('GET /', traceparent='invalid')
+    assert len(trace.root.trace_id) == 32
+    assert trace.root.parent_id is None
@@ -0,0 +1,89 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for the manager of resumable chunked uploads."""
+
+import hashlib
+import io
+import os
+import pytest
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from robflask.error import InvalidRequestError, UnknownUploadSessionError, UploadOffsetError
+from robflask.upload import UploadSessionManager
+
+import robflask.upload as labels
+
+
+class FailingStream(object):
+    """Input stream that raises an error after returning the given data."""
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def read(self, size):
+        chunk = self.data.read(size)
+        if not chunk:
+            raise IOError('client disconnected')
+        return chunk
+
+
+def test_chunked_upload(tmpdir):
+    """Test writing chunks and resuming an interrupted upload."""
+    data = os.urandom(200 * 1024)
+    sessions = UploadSessionManager(basedir=str(tmpdir))
+    doc = sessions.create(group_id='G1', user_id='U1', name='data.bin', size=len(data))
+    session_id = doc[labels.UPLOAD_ID]
+    assert doc[labels.UPLOAD_OFFSET] == 0
+    doc = sessions.write(session_id, 0, io.BytesIO(data[:100000]))
+    assert doc[labels.UPLOAD_OFFSET] == 100000
+    # Chunks have to start at the current offset.
+    with pytest.raises(UploadOffsetError) as ex:
+        sessions.write(session_id, 50, io.BytesIO(data[50:]))
+    assert ex.value.offset == 100000
+    # Interrupted chunk. The received bytes are kept.
+    with pytest.raises(IOError):
+        sessions.write(session_id, 100000, FailingStream(data[100000:150000]))
+    assert sessions.get(session_id)[labels.UPLOAD_OFFSET] == 150000
+    # Resume the upload using a different manager (i.e., without the
+    # incremental checksum state).
+    sessions = UploadSessionManager(basedir=str(tmpdir))
+    sessions.write(session_id, 150000, io.BytesIO(data[150000:]))
+    assert sessions.checksum(session_id) == hashlib.sha256(data).hexdigest()
+    with open(sessions.datafile(session_id), 'rb') as f:
+        assert f.read() == data
+    # Data beyond the expected file size is rejected.
+    with pytest.raises(InvalidRequestError):
+        sessions.write(session_id, len(data), io.BytesIO(b'0'))
+    sessions.delete(session_id)
+    with pytest.raises(UnknownUploadSessionError):
+        sessions.get(session_id)
+    # Limits for the file size and the chunk size.
+    sessions = UploadSessionManager(basedir=str(tmpdir), maxsize=1024)
+    with pytest.raises(InvalidRequestError):
+        sessions.create(group_id='G1', user_id='U1', name='data.bin', size=1025)
+    session_id = sessions.create(group_id='G1', user_id='U1', name='data.bin')[labels.UPLOAD_ID]
+    with pytest.raises(RequestEntityTooLarge):
+        sessions.write(session_id, 0, io.BytesIO(data[:600]), limit=512)
+    with pytest.raises(InvalidRequestError):
+        sessions.write(session_id, 0, io.BytesIO(data[:2048]))
+
+
+def test_prune_sessions(tmpdir):
+    """Test removing expired upload sessions."""
+    sessions = UploadSessionManager(basedir=str(tmpdir), ttl=60)
+    session_id = sessions.create(group_id='G1', user_id='U1', name='A.txt')[labels.UPLOAD_ID]
+    sessions.prune()
+    assert sessions.get(session_id)[labels.UPLOAD_OFFSET] == 0
+    os.utime(sessions.datafile(session_id), (0, 0))
+    sessions.create(group_id='G1', user_id='U1', name='B.txt')
+    with pytest.raises(UnknownUploadSessionError):
+        sessions.get(session_id)
+    # Invalid session identifier.
+    with pytest.raises(UnknownUploadSessionError):
+        sessions.get('../' + session_id)
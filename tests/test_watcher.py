@@ -0,0 +1,104 @@
+# This file is part of the Reproducible Open Benchmarks for Data Analysis
+# Platform (ROB).
+#
+# Copyright (C) 2019-2021 NYU.
+#
+# ROB is free software; you can redistribute it and/or modify it under the
+# terms of the MIT License; see LICENSE file for more details.
+
+"""Unit tests for the shared run state watcher."""
+
+import asyncio
+import threading
+
+from robflask.watcher import RunWatcher, Subscription, changes
+
+import flowserv.model.workflow.state as st
+
+
+def run(run_id, state):
+    """Get serialized run descriptor for a given run and state."""
+    return {'id': run_id, 'state': state}
+
+
+def test_run_changes():
+    """Test computing the list of changed runs."""
+    known = {'R1': run('R1', st.STATE_PENDING), 'R2': run('R2', st.STATE_RUNNING)}
+    current = {'R2': run('R2', st.STATE_SUCCESS), 'R3': run('R3', st.STATE_PENDING)}
+    result = {run_id: (r, prev) for run_id, r, prev in changes(known, current)}
+    assert result['R1'] == (None, known['R1'])
+    assert result['R2'] == (current['R2'], known['R2'])
+    assert result['R3'] == (current['R3'], None)
+    assert changes(known, known) == []
+
+
+def test_subscription_filter():
+    """Test notifications for subscriptions for a single run."""
+    sub = Subscription('G1', 'token', runs={}, run_id='R1')
+    sub.notify('R2', run('R2', st.STATE_RUNNING))
+    sub.notify('R1', run('R1', st.STATE_RUNNING))
+    assert sub.get(timeout=0.1) == ('R1', run('R1', st.STATE_RUNNING))
+    assert sub.get(timeout=0.1) is None
+    assert sub.snapshot() == {'R1': run('R1', st.STATE_RUNNING)}
+    sub.close()
+    assert sub.get(timeout=0.1) is None
+    assert sub.closed
+
+
+def test_watcher_subscriptions():
+    """Test notifying subscribers about run state changes."""
+    watcher = RunWatcher(interval=60)
+    runs = {'R1': run('R1', st.STATE_PENDING)}
+    s1 = watcher.subscribe('G1', 'token', runs=runs)
+    # A new subscriber with a more recent state notifies the existing
+    # subscribers.
+    s2 = watcher.subscribe('G1', 'token', runs={'R1': run('R1', st.STATE_RUNNING)})
+    assert s1.get(timeout=0.1) == ('R1', run('R1', st.STATE_RUNNING))
+    assert s2.get(timeout=0.1) is None
+    # Changes that are observed by the watcher are sent to all subscribers.
+    watcher._update('G1', [run('R1', st.STATE_RUNNING), run('R2', st.STATE_PENDING)])
+    assert s1.get(timeout=0.1) == ('R2', run('R2', st.STATE_PENDING))
+    assert s2.get(timeout=0.1) == ('R2', run('R2', st.STATE_PENDING))
+    assert s1.get(timeout=0.1) is None
+    # Submissions without subscribers are no longer watched.
+    watcher.unsubscribe(s1)
+    watcher.unsubscribe(s2)
+    watcher._update('G1', [])
+    assert s1.get(timeout=0.1) is None
+
+
+def test_watcher_cache_updates(monkeypatch):
+    """Test passing the benchmark identifier of a watched submission to the
+    leader board cache.
+    """
+    calls = list()
+
+    class Cache(object):
+        def run_state(self, run, workflow_id=None):
+            calls.append(('state', run['id'], workflow_id))
+
+        def run_deleted(self, run, workflow_id=None):
+            calls.append(('deleted', run['id'], workflow_id))
+
+    monkeypatch.setattr('robflask.leaderboard.cache', lambda: Cache())
+    watcher = RunWatcher(interval=60)
+    sub = watcher.subscribe('G1', 'token', runs={'R1': run('R1', st.STATE_RUNNING)})
+    watcher._groups['G1']['workflow'] = 'W1'
+    watcher._update('G1', [run('R2', st.STATE_SUCCESS)])
+    assert sorted(calls) == [('deleted', 'R1', 'W1'), ('state', 'R2', 'W1')]
+    watcher.unsubscribe(sub)
+
+
+def test_subscription_async_get():
+    """Test waiting for notifications in an event loop."""
+    sub = Subscription('G1', 'token', runs={})
+
+    async def wait():
+        assert await sub.async_get(timeout=0.1) is None
+        # Notification from a different thread wakes up the waiting
+        # subscriber.
+        threading.Timer(0.1, sub.notify, args=('R1', run('R1', st.STATE_RUNNING))).start()
+        return await sub.async_get(timeout=5)
+
+    assert asyncio.run(wait()) == ('R1', run('R1', st.STATE_RUNNING))
+    assert sub._listeners == []